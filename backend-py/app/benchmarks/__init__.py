@@ -0,0 +1,6 @@
+"""Performance benchmarks for backend-py.
+
+Run from backend-py/app with the source directory on the path, e.g.:
+
+    PYTHONPATH=src uv run python -m benchmarks.logging_middleware
+"""
@@ -0,0 +1,116 @@
+"""Check the cold-start import cost of the ``app`` module against a budget.
+
+Each run imports ``app`` in a fresh interpreter with ``-X importtime`` and
+reports the cumulative import time plus the heaviest top-level packages.
+The command exits with status 1 when the fastest run exceeds the budget, or
+when a module that must stay lazy (LLM clients, data-science stacks) was
+imported at startup.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.import_time [--budget-ms N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Only imported on the code paths that need them
+LAZY_MODULES = (
+    "autogen",
+    "langchain_core",
+    "langchain_openai",
+    "numpy",
+    "openai",
+    "pandas",
+    "scipy",
+    "strawberry",
+    "supabase",
+    "tiktoken",
+    "uvicorn",
+)
+
+
+@dataclass(frozen=True)
+class ImportProfile:
+    """Parsed ``-X importtime`` output of one run."""
+
+    total_us: int
+    self_us_by_package: dict[str, int]
+
+    @property
+    def total_ms(self) -> float:
+        """Cumulative import time of ``app`` in milliseconds."""
+        return self.total_us / 1000
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Import a module in a fresh interpreter and parse its import times."""
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        cwd=SRC_DIR,
+        env=env,
+        text=True,
+    )
+    total_us = 0
+    self_us_by_package: dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        package = name.strip().split(".")[0]
+        self_us_by_package[package] += int(self_us)
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    return ImportProfile(total_us, dict(self_us_by_package))
+
+
+def main() -> None:
+    """Profile the import and exit non-zero when over budget."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000")),
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--module", default="app")
+    args = parser.parse_args()
+
+    profiles = [profile_import(args.module) for _ in range(args.runs)]
+    fastest = min(profiles, key=lambda p: p.total_us)
+
+    print(f"import {args.module}: {fastest.total_ms:.0f} ms (best of {args.runs})")
+    heaviest = sorted(
+        fastest.self_us_by_package.items(), key=lambda item: item[1], reverse=True
+    )
+    for package, self_us in heaviest[: args.top]:
+        print(f"  {package:<32}{self_us / 1000:>8.1f} ms")
+
+    failures = [
+        f"{package} is imported at startup; import it where it is used"
+        for package in LAZY_MODULES
+        if package in fastest.self_us_by_package
+    ]
+    if fastest.total_ms > args.budget_ms:
+        failures.append(
+            f"import time {fastest.total_ms:.0f} ms exceeds budget "
+            f"{args.budget_ms:.0f} ms"
+        )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Run the end-to-end load test.
+
+See the package docstring for usage; ``--help`` lists all options.
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine
+
+from .database import SeededUser, prepare_schema, seed, start_postgres
+from .driver import RequestFactory, RunResult, run_concurrency, run_rate
+from .prometheus import scrape
+from .stubs import (
+    StubServer,
+    create_auth_stub,
+    create_openai_stub,
+    free_port,
+    token_for,
+)
+
+APP_DIR = Path(__file__).resolve().parents[2]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SCENARIOS = ("chat", "history", "auth")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    database = parser.add_mutually_exclusive_group()
+    database.add_argument(
+        "--database-url",
+        default=os.getenv("DATABASE_URL"),
+        help="Existing database (default: $DATABASE_URL)",
+    )
+    database.add_argument(
+        "--docker", action="store_true", help="Start a disposable pgvector container"
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--history-messages", type=int, default=50)
+    parser.add_argument("--openai-latency-ms", type=float, default=800.0)
+    parser.add_argument("--openai-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--workers", type=int, default=2, help="App worker processes")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated subset of {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--mode", choices=("rate", "concurrency"), default="rate")
+    parser.add_argument(
+        "--levels",
+        default="5,10,20",
+        help="Requests per second (rate) or clients (concurrency), comma-separated",
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds")
+    parser.add_argument("--output", type=Path, help="Result JSON path")
+    args = parser.parse_args()
+    if not args.docker and not args.database_url:
+        parser.error("set --database-url, $DATABASE_URL or --docker")
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def _request_factories(users: list[SeededUser]) -> dict[str, RequestFactory]:
+    """Build requests for each scenario, rotating through the seeded users."""
+
+    def headers(sequence: int) -> tuple[SeededUser, dict[str, str]]:
+        user = users[sequence % len(users)]
+        return user, {"Authorization": f"Bearer {token_for(user.user_id)}"}
+
+    def chat(client: httpx.AsyncClient, sequence: int) -> httpx.Request:
+        user, auth = headers(sequence)
+        return client.build_request(
+            "POST",
+            "/api/chat",
+            headers=auth,
+            json={
+                "message": f"Load test {sequence}",
+                "chat_room_id": user.chat_room_id,
+            },
+        )
+
+    def history(client: httpx.AsyncClient, sequence: int) -> httpx.Request:
+        user, auth = headers(sequence)
+        return client.build_request(
+            "GET", f"/api/chat/{user.chat_room_id}/messages", headers=auth
+        )
+
+    def auth(client: httpx.AsyncClient, sequence: int) -> httpx.Request:
+        # The API has no auth-only endpoint. A token the stub rejects makes
+        # verify_token fail before any database access, isolating the
+        # authentication round trip.
+        user = users[sequence % len(users)]
+        return client.build_request(
+            "GET",
+            f"/api/chat/{user.chat_room_id}/messages",
+            headers={"Authorization": "Bearer invalid"},
+        )
+
+    return {"chat": chat, "history": history, "auth": auth}
+
+
+def _start_app(
+    args: argparse.Namespace, database_url: str, auth_url: str, openai_url: str
+) -> tuple[subprocess.Popen[bytes], str]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SUPABASE_URL": auth_url,
+        "SUPABASE_PUBLISHABLE_KEY": "bench-publishable-key",
+        "OPENAI_API_KEY": "bench-openai-key",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "OPENAI_API_BASE": f"{openai_url}/v1",
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "SQL_ECHO": "false",
+        "TRACE_SAMPLE_RATE": "0",
+        "LOG_FORMAT": "json",
+        # The seeded users would quickly hit their quota; opt in to measure it
+        "RATE_LIMIT_ENABLED": os.environ.get("RATE_LIMIT_ENABLED", "false"),
+    }
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    process = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=APP_DIR / "src", env=env
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def _wait_ready(process: subprocess.Popen[bytes], base_url: str) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            msg = f"App exited with code {process.returncode}"
+            raise RuntimeError(msg)
+        try:
+            if httpx.get(f"{base_url}/readyz").status_code == httpx.codes.OK:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    msg = "App did not become ready within 60 seconds"
+    raise TimeoutError(msg)
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    scenario: str,
+    factory: RequestFactory,
+    level: float,
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    before = await scrape(client)
+    result: RunResult
+    if args.mode == "rate":
+        result = await run_rate(
+            client,
+            scenario,
+            factory,
+            rate=level,
+            duration=args.duration,
+            warmup=args.warmup,
+        )
+    else:
+        result = await run_concurrency(
+            client,
+            scenario,
+            factory,
+            concurrency=int(level),
+            duration=args.duration,
+            warmup=args.warmup,
+        )
+    after = await scrape(client)
+    summary = result.summary()
+    # The metrics delta also covers warm-up requests, so divide by all of them.
+    summary["database"] = (after - before).report(result.sent)
+    return summary
+
+
+async def _run(
+    args: argparse.Namespace, base_url: str, users: list[SeededUser]
+) -> list[dict[str, Any]]:
+    factories = _request_factories(users)
+    levels = [float(level) for level in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    results = []
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=120
+    ) as client:
+        for scenario, level in itertools.product(args.scenarios.split(","), levels):
+            summary = await _run_level(
+                client, scenario, factories[scenario], level, args
+            )
+            latency = summary["latency_ms"]
+            print(
+                f"{scenario:8} {args.mode}={level:g}: "
+                f"{summary['throughput_rps']:.1f} req/s, "
+                f"p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} ms, "
+                f"statuses={summary['statuses']}"
+            )
+            results.append(summary)
+    return results
+
+
+def _git_commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"],  # noqa: S607
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() or None
+
+
+def main() -> None:
+    """Run the load test and write the report."""
+    args = _parse_args()
+    container = None
+    auth_stub = StubServer(create_auth_stub())
+    openai_stub = StubServer(
+        create_openai_stub(
+            args.openai_latency_ms, args.openai_jitter_ms, args.completion_tokens
+        )
+    )
+    app: subprocess.Popen[bytes] | None = None
+    try:
+        if args.docker:
+            container = start_postgres()
+            database_url = container.get_connection_url()
+        else:
+            database_url = args.database_url
+        engine = create_engine(database_url)
+        prepare_schema(engine)
+        users = seed(engine, args.users, args.history_messages)
+        engine.dispose()
+
+        auth_stub.start()
+        openai_stub.start()
+        app, base_url = _start_app(args, database_url, auth_stub.url, openai_stub.url)
+        _wait_ready(app, base_url)
+        results = asyncio.run(_run(args, base_url, users))
+    finally:
+        if app is not None:
+            app.send_signal(signal.SIGTERM)
+            app.wait(timeout=60)
+        auth_stub.stop()
+        openai_stub.stop()
+        if container is not None:
+            container.stop()
+
+    started_at = dt.datetime.now(tz=dt.UTC)
+    output = args.output or RESULTS_DIR / f"{started_at:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    config["database_url"] = "docker" if args.docker else "external"
+    report = {
+        "created_at": started_at.isoformat(),
+        "git_commit": _git_commit(),
+        "config": config,
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
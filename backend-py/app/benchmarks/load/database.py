@@ -0,0 +1,182 @@
+"""Database setup for load tests.
+
+Either uses an existing database (DATABASE_URL) or starts a disposable
+pgvector container with testcontainers, then creates the schema from the
+SQLModel models and seeds users with chat history.
+"""
+
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sqlalchemy import Engine, Index, MetaData, text
+from sqlmodel import Session, SQLModel
+
+from domain.entity.models import (
+    ChatRooms,
+    Embeddings,
+    Messages,
+    UserChats,
+    UserProfiles,
+    Users,
+    VirtualUserChats,
+    VirtualUsers,
+)
+
+if TYPE_CHECKING:
+    from testcontainers.postgres import PostgresContainer
+
+POSTGRES_IMAGE = "pgvector/pgvector:pg16"
+# Post-migration SQL the backend depends on (the others need Supabase's auth schema)
+POST_MIGRATIONS = tuple(
+    Path(__file__).resolve().parents[4] / "drizzle/config/post-migration" / name
+    for name in (
+        "01_rate_limit.sql",
+        "02_jobs.sql",
+        "03_message_index.sql",
+        "04_document_index.sql",
+    )
+)
+EMBEDDING_DIMENSIONS = 1536
+# Operator classes of the HNSW indexes in drizzle/schema/schema.ts
+HNSW_INDEXES = {
+    "embeddings_embedding_bit_idx": "bit_hamming_ops",
+    "embeddings_embedding_reduced_a_idx": "vector_cosine_ops",
+    "embeddings_embedding_reduced_b_idx": "vector_cosine_ops",
+}
+
+
+@dataclass(frozen=True)
+class SeededUser:
+    """A user with a chat room that the load driver can act as."""
+
+    user_id: uuid.UUID
+    chat_room_id: int
+
+
+def start_postgres() -> "PostgresContainer":
+    """Start a disposable pgvector container.
+
+    testcontainers is a dev dependency, so it is imported here rather than
+    for every benchmark run against an existing database.
+
+    Returns:
+        The running container; stop it with ``stop()``
+    """
+    from testcontainers.postgres import PostgresContainer  # noqa: PLC0415
+
+    # Without a driver the URL is a plain postgresql:// one the app also accepts
+    return PostgresContainer(POSTGRES_IMAGE, driver=None).start()
+
+
+def _table_metadata() -> MetaData:
+    """Copy the models' tables with the indexes as the migrations create them.
+
+    sqlacodegen generates expression indexes without the expression, which
+    would be created on no columns; the post-migrations create them. It also
+    drops the access method and operator class of the HNSW indexes, which
+    would otherwise be created as B-trees the searches cannot use.
+    """
+    metadata = MetaData()
+    for table in SQLModel.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        for index in list(copy.indexes):
+            if not index.expressions:
+                copy.indexes.discard(index)
+            elif index.name in HNSW_INDEXES:
+                copy.indexes.discard(index)
+                (column,) = index.columns
+                Index(
+                    index.name,
+                    column,
+                    postgresql_using="hnsw",
+                    postgresql_ops={column.name: HNSW_INDEXES[index.name]},
+                )
+    return metadata
+
+
+def prepare_schema(engine: Engine) -> None:
+    """Create the pgvector extension, any missing tables and SQL functions."""
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    _table_metadata().create_all(engine)
+    with engine.begin() as connection:
+        for path in POST_MIGRATIONS:
+            connection.exec_driver_sql(path.read_text())
+
+
+def seed(
+    engine: Engine,
+    users: int,
+    history_messages: int,
+    embeddings: int = 3,
+) -> list[SeededUser]:
+    """Insert users that each own a chat room with message history.
+
+    Each user gets a profile, a virtual user linked to the room and
+    ``history_messages`` messages, so the chat endpoint exercises its
+    read-existing paths instead of creating rows on the first request.
+
+    Args:
+        engine: Engine of the target database
+        users: Number of users to create
+        history_messages: Messages per chat room
+        embeddings: Embedded past messages per user for the memory search
+
+    Returns:
+        Seeded users with their chat room IDs
+    """
+    seeded: list[SeededUser] = []
+    with Session(engine) as session:
+        for _ in range(users):
+            user_id = uuid.uuid4()
+            virtual_user_id = uuid.uuid4()
+            session.add(Users(id=user_id, account_name=f"bench_{user_id.hex[:12]}"))
+            session.add(
+                UserProfiles(user_id=user_id, email=f"{user_id}@bench.example.com")
+            )
+            session.add(
+                VirtualUsers(id=virtual_user_id, name="AI Assistant", owner_id=user_id)
+            )
+            chat_room = ChatRooms(type="PRIVATE")
+            session.add(chat_room)
+            session.flush()
+            if chat_room.id is None:
+                msg = "Chat room ID was not generated"
+                raise RuntimeError(msg)
+            session.add(UserChats(user_id=user_id, chat_room_id=chat_room.id))
+            session.add(
+                VirtualUserChats(
+                    virtual_user_id=virtual_user_id, chat_room_id=chat_room.id
+                )
+            )
+            session.add_all(
+                # The user and the virtual user take turns
+                Messages(
+                    chat_room_id=chat_room.id,
+                    sender_id=None if position % 2 else user_id,
+                    virtual_user_id=virtual_user_id if position % 2 else None,
+                    content=f"History message {position}",
+                )
+                for position in range(history_messages)
+            )
+            session.add_all(
+                Embeddings(
+                    id=f"bench-{uuid.uuid4()}",
+                    embedding=_unit_vector(index),
+                    content=f"Benchmark memory {index}",
+                    metadata_={"source": "load-test", "user_id": str(user_id)},
+                )
+                for index in range(embeddings)
+            )
+            seeded.append(SeededUser(user_id=user_id, chat_room_id=chat_room.id))
+        session.commit()
+    return seeded
+
+
+def _unit_vector(index: int) -> list[float]:
+    # Zero vectors have no cosine distance, so each row gets a distinct axis
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    vector[index % EMBEDDING_DIMENSIONS] = 1.0
+    return vector
@@ -0,0 +1,176 @@
+"""Load generation and latency statistics.
+
+Two modes are supported:
+
+- rate (open loop): requests start on a fixed schedule regardless of how long
+  earlier ones take, and latency is measured from the scheduled start. A slow
+  server therefore shows up as queueing delay instead of silently lowering the
+  offered load (coordinated omission).
+- concurrency (closed loop): a fixed number of clients send requests back to
+  back, which measures throughput at a given level of parallelism.
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+RequestFactory = Callable[[httpx.AsyncClient, int], httpx.Request]
+
+
+@dataclass
+class RunResult:
+    """Outcome of one scenario at one load level."""
+
+    scenario: str
+    mode: str
+    level: float
+    duration_seconds: float
+    latencies_ms: list[float] = field(default_factory=list)
+    statuses: Counter[str] = field(default_factory=Counter)
+    sent: int = 0  # Including warm-up requests
+
+    def record(self, status: str, latency_ms: float) -> None:
+        """Record one completed request of the measured window."""
+        self.statuses[status] += 1
+        self.latencies_ms.append(latency_ms)
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize latencies, throughput and status codes."""
+        ordered = sorted(self.latencies_ms)
+        return {
+            "scenario": self.scenario,
+            "mode": self.mode,
+            "level": self.level,
+            "requests": len(ordered),
+            "throughput_rps": len(ordered) / self.duration_seconds,
+            "latency_ms": {
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            },
+            "statuses": dict(self.statuses),
+        }
+
+
+def percentile(ordered: list[float], rank: float) -> float | None:
+    """Get a nearest-rank percentile of sorted values."""
+    if not ordered:
+        return None
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    request: httpx.Request,
+    result: RunResult,
+    started: float,
+    *,
+    measured: bool,
+) -> None:
+    result.sent += 1
+    try:
+        response = await client.send(request)
+        await response.aread()
+        status = str(response.status_code)
+    except httpx.HTTPError as error:
+        status = type(error).__name__
+    if measured:
+        result.record(status, (time.perf_counter() - started) * 1000)
+
+
+async def run_rate(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    scenario: str,
+    make_request: RequestFactory,
+    *,
+    rate: float,
+    duration: float,
+    warmup: float,
+) -> RunResult:
+    """Send requests at a fixed rate (open loop).
+
+    Args:
+        client: HTTP client pointed at the app
+        scenario: Scenario name for the report
+        make_request: Builds the n-th request with the client
+        rate: Requests per second
+        duration: Measured seconds
+        warmup: Seconds of unmeasured load before the measurement
+
+    Returns:
+        Latencies of requests scheduled during the measured window
+    """
+    result = RunResult(scenario, "rate", rate, duration)
+    interval = 1 / rate
+    total = math.ceil((warmup + duration) * rate)
+    warmup_requests = math.ceil(warmup * rate)
+    origin = time.perf_counter()
+    tasks: list[asyncio.Task[None]] = []
+    for sequence in range(total):
+        scheduled = origin + sequence * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        send = _send(
+            client,
+            make_request(client, sequence),
+            result,
+            scheduled,
+            measured=sequence >= warmup_requests,
+        )
+        tasks.append(asyncio.create_task(send))
+    await asyncio.gather(*tasks)
+    return result
+
+
+async def run_concurrency(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    scenario: str,
+    make_request: RequestFactory,
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> RunResult:
+    """Keep a fixed number of requests in flight (closed loop).
+
+    Args:
+        client: HTTP client pointed at the app
+        scenario: Scenario name for the report
+        make_request: Builds the n-th request with the client
+        concurrency: Number of concurrent clients
+        duration: Measured seconds
+        warmup: Seconds of unmeasured load before the measurement
+
+    Returns:
+        Latencies of requests started during the measured window
+    """
+    result = RunResult(scenario, "concurrency", concurrency, duration)
+    origin = time.perf_counter()
+    measure_from = origin + warmup
+    stop_at = measure_from + duration
+    counter = 0
+
+    async def worker() -> None:
+        nonlocal counter
+        while (started := time.perf_counter()) < stop_at:
+            sequence = counter
+            counter += 1
+            await _send(
+                client,
+                make_request(client, sequence),
+                result,
+                started,
+                measured=started >= measure_from,
+            )
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result
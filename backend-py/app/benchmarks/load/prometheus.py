@@ -0,0 +1,84 @@
+"""Read database metrics from the app's /metrics endpoint.
+
+The app exports SQL statement counts and pool checkout waits as Prometheus
+histograms. Scraping before and after a run and subtracting gives per-run
+values without resetting the server.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+FAST_CHECKOUT_BUCKET = "0.01"
+
+
+@dataclass(frozen=True)
+class DatabaseSnapshot:
+    """Cumulative database metric values at one point in time."""
+
+    queries: float = 0.0
+    checkout_waits: float = 0.0
+    checkout_wait_seconds: float = 0.0
+    fast_checkout_waits: float = 0.0
+
+    def __sub__(self, other: "DatabaseSnapshot") -> "DatabaseSnapshot":
+        return DatabaseSnapshot(
+            queries=self.queries - other.queries,
+            checkout_waits=self.checkout_waits - other.checkout_waits,
+            checkout_wait_seconds=self.checkout_wait_seconds
+            - other.checkout_wait_seconds,
+            fast_checkout_waits=self.fast_checkout_waits - other.fast_checkout_waits,
+        )
+
+    def report(self, requests: int) -> dict[str, Any]:
+        """Summarize the delta of one run.
+
+        Args:
+            requests: Requests completed during the run
+
+        Returns:
+            Queries per request and pool wait statistics
+        """
+        return {
+            "queries": self.queries,
+            "queries_per_request": self.queries / requests if requests else None,
+            "pool_checkouts": self.checkout_waits,
+            "pool_wait_mean_ms": (
+                self.checkout_wait_seconds / self.checkout_waits * 1000
+                if self.checkout_waits
+                else None
+            ),
+            "pool_waits_over_10ms": self.checkout_waits - self.fast_checkout_waits,
+        }
+
+
+def parse_snapshot(exposition: str) -> DatabaseSnapshot:
+    """Extract database metrics from Prometheus text exposition.
+
+    Samples are summed across label sets, which also merges the per-worker
+    series of multiprocess mode.
+    """
+    values: dict[str, float] = {}
+    for family in text_string_to_metric_families(exposition):
+        for sample in family.samples:
+            name = sample.name
+            if name == "db_pool_checkout_wait_seconds_bucket":
+                if sample.labels.get("le") != FAST_CHECKOUT_BUCKET:
+                    continue
+                name = "fast"
+            values[name] = values.get(name, 0.0) + sample.value
+    return DatabaseSnapshot(
+        queries=values.get("db_query_duration_seconds_count", 0.0),
+        checkout_waits=values.get("db_pool_checkout_wait_seconds_count", 0.0),
+        checkout_wait_seconds=values.get("db_pool_checkout_wait_seconds_sum", 0.0),
+        fast_checkout_waits=values.get("fast", 0.0),
+    )
+
+
+async def scrape(client: httpx.AsyncClient) -> DatabaseSnapshot:
+    """Scrape /metrics of the app."""
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    return parse_snapshot(response.text)
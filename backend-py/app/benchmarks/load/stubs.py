@@ -0,0 +1,176 @@
+"""Local stand-ins for Supabase auth and the OpenAI API.
+
+Both run as uvicorn servers in background threads of the load-test process.
+The auth stub accepts tokens of the form ``bench-<user uuid>`` so seeded users
+can authenticate without a real Supabase project.
+"""
+
+import asyncio
+import random
+import socket
+import threading
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+TOKEN_PREFIX = "bench-"  # noqa: S105
+EMBEDDING_DIMENSIONS = 1536
+
+
+def token_for(user_id: uuid.UUID) -> str:
+    """Get the bearer token the auth stub accepts for a user."""
+    return f"{TOKEN_PREFIX}{user_id}"
+
+
+def free_port() -> int:
+    """Get a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def create_auth_stub() -> Starlette:
+    """Create a Supabase auth (GoTrue) stub."""
+
+    async def get_user(request: Request) -> JSONResponse:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not token.startswith(TOKEN_PREFIX):
+            return JSONResponse(
+                {"code": 401, "msg": "invalid JWT"},
+                status_code=401,
+            )
+        user_id = token.removeprefix(TOKEN_PREFIX)
+        return JSONResponse(
+            {
+                "id": user_id,
+                "aud": "authenticated",
+                "role": "authenticated",
+                "email": f"{user_id}@bench.example.com",
+                "app_metadata": {"provider": "email"},
+                "user_metadata": {},
+                "created_at": "2025-01-01T00:00:00Z",
+            }
+        )
+
+    async def health(_request: Request) -> JSONResponse:
+        return JSONResponse({"name": "GoTrue", "description": "GoTrue stub"})
+
+    return Starlette(
+        routes=[
+            Route("/auth/v1/user", get_user),
+            Route("/auth/v1/health", health),
+        ]
+    )
+
+
+def create_openai_stub(
+    latency_ms: float, jitter_ms: float, completion_tokens: int
+) -> Starlette:
+    """Create an OpenAI-compatible chat completions server.
+
+    Args:
+        latency_ms: Mean response latency
+        jitter_ms: Standard deviation of the latency
+        completion_tokens: Number of words in each reply
+
+    Returns:
+        Starlette app serving POST /v1/chat/completions and /v1/embeddings
+    """
+    reply = " ".join(["token"] * completion_tokens)
+
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        delay_ms = max(0.0, random.gauss(latency_ms, jitter_ms))
+        await asyncio.sleep(delay_ms / 1000)
+        prompt_tokens = sum(
+            len(str(message.get("content", "")).split())
+            for message in body.get("messages", [])
+        )
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "bench"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        vector = [1.0] + [0.0] * (EMBEDDING_DIMENSIONS - 1)
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": index, "embedding": vector}
+                    for index in range(len(inputs))
+                ],
+                "model": body.get("model", "bench"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/embeddings", embeddings, methods=["POST"]),
+        ]
+    )
+
+
+class StubServer:
+    """Run an ASGI app with uvicorn in a background thread."""
+
+    def __init__(self, app: Starlette) -> None:
+        self.port = free_port()
+        config = uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            access_log=False,
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Start the server and wait until it accepts connections."""
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                msg = f"Stub server on port {self.port} did not start"
+                raise RuntimeError(msg)
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.should_exit = True
+        if self._thread.is_alive():
+            self._thread.join()
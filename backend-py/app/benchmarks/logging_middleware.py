@@ -0,0 +1,135 @@
+"""Benchmark LoggingMiddleware against the former BaseHTTPMiddleware version.
+
+Drives an in-process app through httpx's ASGI transport, so the numbers only
+contain routing, middleware and logging overhead (no sockets). Logs are
+rendered as JSON and discarded so terminal I/O does not dominate.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.logging_middleware [--requests N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+import httpx
+import structlog
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware.logging_middleware import LoggingMiddleware
+from util.logging import clear_request_context, get_logger, set_request_context
+
+logger = get_logger(__name__)
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation replaced by the ASGI version."""
+
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
+        set_request_context(request_id, getattr(request.state, "user_id", None))
+        logger.info(
+            "Request started",
+            method=request.method,
+            path=request.url.path,
+            query=str(request.query_params),
+        )
+        start_time = time.perf_counter()
+        try:
+            response = await call_next(request)
+            logger.info(
+                "Request completed",
+                status_code=response.status_code,
+                duration_ms=round((time.perf_counter() - start_time) * 1000, 2),
+            )
+            response.headers["x-request-id"] = request_id
+            return response
+        finally:
+            clear_request_context()
+
+
+def build_app(middleware: type | None) -> FastAPI:
+    """Build a minimal app with JSON and streaming endpoints."""
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.get("/json")
+    async def json_endpoint() -> dict[str, str]:
+        return {"message": "OK"}
+
+    @app.get("/stream")
+    async def stream_endpoint() -> StreamingResponse:
+        async def chunks() -> AsyncIterator[bytes]:
+            for i in range(20):
+                yield f"data: {i}\n\n".encode()
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+async def measure(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    """Return requests per second for the given endpoint."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Warm up routing and logger caches
+        for _ in range(50):
+            await client.get(path)
+
+        per_worker = requests // concurrency
+
+        async def worker() -> None:
+            for _ in range(per_worker):
+                await client.get(path)
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+    return per_worker * concurrency / elapsed
+
+
+def configure_silent_json_logging() -> None:
+    """Render logs as JSON like production, but drop the output."""
+    os.environ["LOG_FORMAT"] = "json"
+    from util.logging import configure_logging  # noqa: PLC0415
+
+    configure_logging()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    configure_silent_json_logging()
+
+    variants = {
+        "none": build_app(None),
+        "base_http (legacy)": build_app(LegacyLoggingMiddleware),
+        "asgi (current)": build_app(LoggingMiddleware),
+    }
+    for path in ("/json", "/stream"):
+        print(f"{path}  ({args.requests} requests, concurrency {args.concurrency})")
+        for name, app in variants.items():
+            rps = asyncio.run(measure(app, path, args.requests, args.concurrency))
+            print(f"  {name:<20} {rps:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""Microbenchmarks for request hot paths.
+
+Covers the logging processor chain (pretty and JSON), response serialization,
+request context handling, middleware overhead, gateway statement construction
+and retrieval reranking. ``baseline.json`` holds the reference numbers;
+``compare`` runs the suite and exits with status 1 when a case is slower than
+the baseline by more than the threshold. Changes to a hot path should include
+the compare output, and refresh the baseline (``run --save-baseline``) once
+merged. With ``-k`` only the selected cases are re-recorded, which is refused
+unless the Python version and platform match the baseline's.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.micro run [-k 'logging.*']
+    PYTHONPATH=src uv run python -m benchmarks.micro compare [--threshold 0.15]
+    PYTHONPATH=src uv run python -m benchmarks.micro run --save-baseline
+"""
@@ -0,0 +1,225 @@
+"""Run microbenchmarks or compare them with the baseline.
+
+See the package docstring for usage; ``--help`` lists all options.
+"""
+
+import argparse
+import datetime as dt
+import fnmatch
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+from . import (
+    gateway_cases,
+    logging_cases,
+    middleware_cases,
+    rate_limit_cases,
+    retrieval_cases,
+    serialization_cases,
+)
+from .harness import measure, select
+
+# Importing the case modules registers their benchmarks
+CASE_MODULES = (
+    gateway_cases,
+    logging_cases,
+    middleware_cases,
+    rate_limit_cases,
+    retrieval_cases,
+    serialization_cases,
+)
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.15
+# Report fields the results of a baseline depend on
+ENVIRONMENT_KEYS = ("python", "platform", "machine")
+
+
+def _git_commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"],  # noqa: S607
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() or None
+
+
+def run(patterns: list[str] | None, repeat: int, min_time: float) -> dict[str, Any]:
+    """Run the selected benchmarks and print one line per case.
+
+    Returns:
+        Report with environment metadata and per-case results
+    """
+    results: dict[str, Any] = {}
+    for case in select(patterns):
+        measurement = measure(case, repeat, min_time)
+        results[case.name] = measurement.to_dict()
+        print(
+            f"{case.name:<50} {measurement.median_ns / 1000:>10.2f} µs"
+            f"  ±{measurement.stdev_ns / 1000:.2f}",
+            file=sys.stderr,
+        )
+    return {
+        "created_at": dt.datetime.now(tz=dt.UTC).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """Print a comparison table and list regressed cases.
+
+    A case regresses when its fastest sample is more than ``threshold`` (a
+    fraction) slower than in the baseline. The minimum is used rather than
+    the median because it is the least affected by other load on the machine.
+    Cases missing on either side are reported but never count as regressions.
+
+    Returns:
+        Names of regressed cases
+    """
+    regressions = []
+    base_results: dict[str, Any] = baseline["results"]
+    current_results: dict[str, Any] = current["results"]
+    print(f"{'benchmark (min µs)':<50} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name in sorted(base_results.keys() | current_results.keys()):
+        if name not in current_results:
+            print(f"{name:<50} {'':>10} {'missing':>10}")
+            continue
+        now = current_results[name]["min_ns"] / 1000
+        if name not in base_results:
+            print(f"{name:<50} {'new':>10} {now:>10.2f}")
+            continue
+        before = base_results[name]["min_ns"] / 1000
+        change = now / before - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<50} {before:>10.2f} {now:>10.2f} {change:>+8.1%}{marker}")
+    if baseline.get("platform") != current.get("platform") or baseline.get(
+        "python"
+    ) != current.get("python"):
+        print(
+            "warning: baseline was recorded on "
+            f"{baseline.get('platform')} / Python {baseline.get('python')}; "
+            "absolute numbers are only comparable on the same machine",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def _matching(results: dict[str, Any], patterns: list[str]) -> dict[str, Any]:
+    return {
+        name: result
+        for name, result in results.items()
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(subparser: argparse.ArgumentParser) -> None:
+        subparser.add_argument(
+            "-k",
+            dest="patterns",
+            action="append",
+            help="Glob of benchmark names to run (repeatable), e.g. 'logging.*'",
+        )
+        subparser.add_argument("--repeat", type=int, default=7)
+        subparser.add_argument(
+            "--min-time", type=float, default=0.1, help="Seconds per sample"
+        )
+
+    run_parser = subparsers.add_parser("run", help="Run and save results")
+    add_run_options(run_parser)
+    run_parser.add_argument("--output", type=Path, help="Result JSON path")
+    run_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Write to {BASELINE.name} (with -k, replace only the selected cases)",
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare results with the baseline; exit 1 on regressions"
+    )
+    add_run_options(compare_parser)
+    compare_parser.add_argument(
+        "current",
+        type=Path,
+        nargs="?",
+        help="Result JSON to compare (default: run the benchmarks now)",
+    )
+    compare_parser.add_argument("--baseline", type=Path, default=BASELINE)
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed slowdown as a fraction (default: %(default)s)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Entry point."""
+    args = _parse_args()
+    if args.command == "run":
+        report = run(args.patterns, args.repeat, args.min_time)
+        if args.save_baseline and args.patterns and BASELINE.exists():
+            # Re-record only the selected cases and keep the others
+            baseline = json.loads(BASELINE.read_text())
+            if any(baseline.get(key) != report[key] for key in ENVIRONMENT_KEYS):
+                # One file holds the numbers of one interpreter on one machine
+                sys.exit(
+                    "baseline was recorded on "
+                    f"{baseline.get('platform')} / Python {baseline.get('python')}; "
+                    "re-record all cases (run --save-baseline without -k)"
+                )
+            previous = baseline["results"]
+            stale = _matching(previous, args.patterns)
+            report["results"] = {
+                **{
+                    name: value for name, value in previous.items() if name not in stale
+                },
+                **report["results"],
+            }
+        output = BASELINE if args.save_baseline else args.output
+        text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+        if output is None:
+            print(text, end="")
+        else:
+            output.write_text(text)
+            print(f"Wrote {output}", file=sys.stderr)
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if args.patterns:
+        baseline["results"] = _matching(baseline["results"], args.patterns)
+    if args.current is not None:
+        current = json.loads(args.current.read_text())
+    else:
+        current = run(args.patterns, args.repeat, args.min_time)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than "
+            f"{args.threshold:.0%}: {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
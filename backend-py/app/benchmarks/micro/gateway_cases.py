@@ -0,0 +1,114 @@
+"""Gateway statement construction benchmarks.
+
+Gateways are called with a session that records the statement instead of
+executing it, so each case measures the Python-side work of one gateway call:
+building the SQLModel statement or model instance plus the ``trace_methods``
+wrapper (with tracing disabled, as in production by default).
+"""
+
+import uuid
+from typing import Any
+
+from sqlmodel import Session
+
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.message_gateway import MessageGateway
+from gateway.user_profile_gateway import UserProfileGateway
+from gateway.virtual_user_gateway import VirtualUserGateway
+
+from .harness import bench
+
+USER_ID = uuid.UUID("5a6b7c8d-9e0f-4a1b-8c2d-3e4f5a6b7c8d")
+VIRTUAL_USER_ID = uuid.UUID("3f2b8c1e-4d5a-4f6b-8c7d-9e0f1a2b3c4d")
+QUERY_EMBEDDING = [0.01] * 1536
+
+
+class _EmptyResult:
+    def first(self) -> None:
+        return None
+
+    def all(self) -> list[Any]:
+        return []
+
+    def one(self) -> int:
+        return 0
+
+
+class RecordingSession:
+    """Stands in for a Session: keeps the last statement, returns no rows."""
+
+    def __init__(self) -> None:
+        self.statement: Any = None
+
+    def exec(self, statement: Any) -> _EmptyResult:  # noqa: ANN401
+        """Record the statement."""
+        self.statement = statement
+        return _EmptyResult()
+
+    def add(self, instance: object) -> None:
+        """Ignore the instance."""
+
+    def commit(self) -> None:
+        """Do nothing."""
+
+    def refresh(self, instance: object) -> None:
+        """Do nothing."""
+
+
+_session: Any = RecordingSession()
+session: Session = _session
+
+chat_room_gateway = ChatRoomGateway()
+embeddings_gateway = EmbeddingsGateway()
+message_gateway = MessageGateway()
+user_profile_gateway = UserProfileGateway()
+virtual_user_gateway = VirtualUserGateway()
+
+
+@bench("gateway.chat_room.get_by_id")
+def _chat_room_get_by_id() -> None:
+    chat_room_gateway.get_by_id(42, session)
+
+
+@bench("gateway.chat_room.is_member")
+def _chat_room_is_member() -> None:
+    chat_room_gateway.is_member(42, USER_ID, session)
+
+
+@bench("gateway.embeddings.search_similar")
+def _embeddings_search_similar() -> None:
+    embeddings_gateway.search_similar(
+        QUERY_EMBEDDING, limit=3, session=session, user_id=str(USER_ID)
+    )
+
+
+@bench("gateway.embeddings.count_by_user")
+def _embeddings_count_by_user() -> None:
+    embeddings_gateway.count_by_user(str(USER_ID), session)
+
+
+@bench("gateway.message.create")
+def _message_create() -> None:
+    message_gateway.create(
+        chat_room_id=42,
+        virtual_sender_id=VIRTUAL_USER_ID,
+        content="Hello",
+        session=session,
+    )
+
+
+@bench("gateway.message.get_recent_by_chat_room_id")
+def _message_get_recent() -> None:
+    message_gateway.get_recent_by_chat_room_id(42, 100, session)
+
+
+@bench("gateway.user_profile.get_or_create")
+def _user_profile_get_or_create() -> None:
+    # No row is found, so this includes building the new profile
+    user_profile_gateway.get_or_create(USER_ID, session)
+
+
+@bench("gateway.virtual_user.get_by_owner_id")
+def _virtual_user_get_by_owner_id() -> None:
+    virtual_user_gateway.get_by_owner_id(USER_ID, session)
@@ -0,0 +1,178 @@
+"""Timing harness for microbenchmarks.
+
+Each case is a timer ``(loops) -> seconds`` that runs the measured operation
+``loops`` times and returns the elapsed time, so setup and event loop start-up
+stay outside the measurement. The harness calibrates ``loops`` until one
+sample takes at least ``min_time`` seconds, then reports the median, minimum
+and standard deviation over ``repeat`` samples in nanoseconds per operation.
+"""
+
+import asyncio
+import fnmatch
+import gc
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+Timer = Callable[[int], float]
+Setup = Callable[[], None]
+
+
+@dataclass(frozen=True)
+class Case:
+    """A registered benchmark."""
+
+    name: str
+    timer: Timer
+    setup: Setup | None = None
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """Result of one benchmark in nanoseconds per operation."""
+
+    name: str
+    loops: int
+    median_ns: float
+    min_ns: float
+    stdev_ns: float
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to the JSON result format."""
+        return {
+            "loops": self.loops,
+            "median_ns": round(self.median_ns, 1),
+            "min_ns": round(self.min_ns, 1),
+            "stdev_ns": round(self.stdev_ns, 1),
+        }
+
+
+REGISTRY: dict[str, Case] = {}
+
+
+def register(name: str, timer: Timer, setup: Setup | None = None) -> None:
+    """Register a timer under a unique name.
+
+    Args:
+        name: Dotted benchmark name (``<area>.<subject>.<variant>``)
+        timer: Runs the operation ``loops`` times and returns elapsed seconds
+        setup: Called once before the case is measured, e.g. to switch global
+            configuration such as the log format
+
+    Raises:
+        ValueError: If the name is already registered
+    """
+    if name in REGISTRY:
+        msg = f"Benchmark {name!r} is already registered"
+        raise ValueError(msg)
+    REGISTRY[name] = Case(name, timer, setup)
+
+
+def bench(
+    name: str, setup: Setup | None = None
+) -> Callable[[Callable[[], object]], Callable[[], object]]:
+    """Register a zero-argument function as a benchmark.
+
+    Example:
+        @bench("serialization.chat_response.model_dump_json")
+        def _dump() -> str:
+            return response.model_dump_json()
+    """
+
+    def decorator(func: Callable[[], object]) -> Callable[[], object]:
+        def timer(loops: int) -> float:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            return time.perf_counter() - start
+
+        register(name, timer, setup)
+        return func
+
+    return decorator
+
+
+def bench_async(
+    name: str, setup: Setup | None = None
+) -> Callable[[Callable[[], Awaitable[object]]], Callable[[], Awaitable[object]]]:
+    """Register a coroutine function as a benchmark.
+
+    All loops of one sample run inside a single event loop.
+    """
+
+    def decorator(
+        func: Callable[[], Awaitable[object]],
+    ) -> Callable[[], Awaitable[object]]:
+        async def run(loops: int) -> float:
+            start = time.perf_counter()
+            for _ in range(loops):
+                await func()
+            return time.perf_counter() - start
+
+        def timer(loops: int) -> float:
+            return asyncio.run(run(loops))
+
+        register(name, timer, setup)
+        return func
+
+    return decorator
+
+
+def select(patterns: list[str] | None) -> list[Case]:
+    """Get registered cases matching any of the glob patterns (all if None)."""
+    cases = sorted(REGISTRY.values(), key=lambda case: case.name)
+    if not patterns:
+        return cases
+    return [
+        case
+        for case in cases
+        if any(fnmatch.fnmatchcase(case.name, pattern) for pattern in patterns)
+    ]
+
+
+def calibrate(timer: Timer, min_time: float) -> int:
+    """Find a loop count for which one sample takes at least ``min_time``."""
+    loops = 1
+    while True:
+        elapsed = timer(loops)
+        if elapsed >= min_time:
+            return loops
+        # Aim slightly above min_time, at most 10x more loops per step
+        factor = min_time * 1.2 / elapsed if elapsed > 0 else 10
+        loops = max(loops + 1, int(loops * min(factor, 10)))
+
+
+def measure(case: Case, repeat: int, min_time: float) -> Measurement:
+    """Time one case.
+
+    Garbage collection is disabled during each sample (as in timeit) so
+    collections triggered by earlier cases do not land in this one.
+
+    Args:
+        case: Benchmark to run
+        repeat: Number of samples
+        min_time: Minimum seconds per sample
+
+    Returns:
+        Per-operation statistics over all samples
+    """
+    if case.setup is not None:
+        case.setup()
+    loops = calibrate(case.timer, min_time)
+    samples: list[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            samples.append(case.timer(loops) / loops * 1e9)
+        finally:
+            gc.enable()
+    return Measurement(
+        name=case.name,
+        loops=loops,
+        median_ns=statistics.median(samples),
+        min_ns=min(samples),
+        stdev_ns=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    )
@@ -0,0 +1,92 @@
+"""util.logging processor chain benchmarks.
+
+The chain is configured exactly as in the app (``configure_logging``) for the
+development (pretty) and production (JSON) formats; only the output stream is
+replaced with /dev/null. JSON logs are written synchronously, so the numbers
+include rendering but not the background writer hand-off.
+"""
+
+import os
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import structlog
+
+import util.logging
+from util.logging import (
+    add_request_context,
+    clear_request_context,
+    configure_logging,
+    get_logger,
+    set_request_context,
+)
+
+from .harness import bench
+
+REQUEST_ID = "3f2b8c1e-4d5a-4f6b-8c7d-9e0f1a2b3c4d"
+USER_ID = "5a6b7c8d-9e0f-4a1b-8c2d-3e4f5a6b7c8d"
+
+_logger: Any = get_logger("benchmark")
+
+
+def configure_null_logging(*, pretty: bool) -> None:
+    """Configure the app's logging chain with output discarded.
+
+    Args:
+        pretty: Use the development console renderer instead of JSON
+    """
+    global _logger  # noqa: PLW0603
+    env = {
+        "LOG_FORMAT": "pretty" if pretty else "json",
+        "LOG_ASYNC": "false",
+        "LOG_SAMPLING": "false",
+    }
+    # is_development() is also true when stderr is a terminal
+    with (
+        mock.patch.dict(os.environ, env),
+        mock.patch.object(util.logging, "is_development", return_value=pretty),
+    ):
+        configure_logging()
+    devnull = Path(os.devnull)
+    factory: Any = (
+        structlog.PrintLoggerFactory(devnull.open("w"))
+        if pretty
+        else structlog.BytesLoggerFactory(devnull.open("wb"))
+    )
+    structlog.configure(logger_factory=factory)
+    # Loggers cache their configuration on first use, so take a fresh one
+    _logger = get_logger("benchmark")
+    set_request_context(REQUEST_ID, USER_ID, "/api/chat")
+
+
+def _pretty() -> None:
+    configure_null_logging(pretty=True)
+
+
+def _json() -> None:
+    configure_null_logging(pretty=False)
+
+
+def _log_request_completed() -> None:
+    _logger.info("Request completed", status_code=200, duration_ms=12.34, db_queries=5)
+
+
+bench("logging.pretty.info", setup=_pretty)(_log_request_completed)
+bench("logging.json.info", setup=_json)(_log_request_completed)
+
+
+@bench("logging.json.debug_filtered", setup=_json)
+def _debug_filtered() -> None:
+    _logger.debug("Cache hit", key="chat_room:1")
+
+
+@bench("logging.add_request_context", setup=_json)
+def _add_request_context() -> None:
+    add_request_context(None, "info", {"event": "Request completed"})
+
+
+@bench("logging.set_and_clear_request_context")
+def _set_and_clear_request_context() -> None:
+    set_request_context(REQUEST_ID, USER_ID, "/api/chat")
+    clear_request_context()
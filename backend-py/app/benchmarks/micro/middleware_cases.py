@@ -0,0 +1,73 @@
+"""Middleware overhead benchmarks.
+
+Calls ASGI apps directly (no HTTP client or sockets) with a GET to a trivial
+JSON endpoint, so the difference between ``middleware.none`` and the other
+cases is the per-request cost of the middleware. ``middleware.app_stack`` uses
+the middleware list of the real app in its configured order.
+"""
+
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Message
+
+from app import app as application
+from middleware.logging_middleware import LoggingMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.tracing_middleware import TracingMiddleware
+
+from .harness import bench_async
+from .logging_cases import configure_null_logging
+
+SCOPE: dict[str, Any] = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/healthcheck",
+    "raw_path": b"/healthcheck",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"bench"), (b"user-agent", b"benchmark")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+def build_app(middleware: list[Middleware]) -> FastAPI:
+    """Build an app with one JSON endpoint behind the given middleware."""
+    app = FastAPI(middleware=middleware)
+
+    @app.get("/healthcheck")
+    async def healthcheck() -> dict[str, str]:
+        return {"message": "OK"}
+
+    return app
+
+
+async def _receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(_message: Message) -> None:
+    return None
+
+
+def _bench_app(name: str, app: ASGIApp) -> None:
+    async def call() -> None:
+        await app(dict(SCOPE), _receive, _send)
+
+    bench_async(name, setup=_setup)(call)
+
+
+def _setup() -> None:
+    configure_null_logging(pretty=False)
+
+
+_bench_app("middleware.none", build_app([]))
+_bench_app("middleware.tracing", build_app([Middleware(TracingMiddleware)]))
+_bench_app("middleware.logging", build_app([Middleware(LoggingMiddleware)]))
+_bench_app("middleware.metrics", build_app([Middleware(MetricsMiddleware)]))
+_bench_app("middleware.app_stack", build_app(list(application.user_middleware)))
@@ -0,0 +1,76 @@
+"""Rate limiter hot-path benchmarks.
+
+These measure what a rate-limited request costs when it is decided in memory:
+consuming a leased token, and rejecting a user whose rejection is still
+remembered. The shared bucket is replaced by a gateway that grants from
+memory, so the database round trip made once per lease is not included.
+"""
+
+import contextlib
+import uuid
+from typing import Any
+
+from sqlmodel import Session
+
+from domain.entity.rate_limit import RateLimitGrant, RateLimitTier
+from domain.exceptions import RateLimitExceededError
+from gateway.rate_limit_gateway import RateLimitGateway
+from gateway.subscription_gateway import SubscriptionGateway
+from usecase.rate_limit_usecase import RateLimitSettings, RateLimitUseCase
+
+from .gateway_cases import session
+from .harness import bench
+
+USER_ID = uuid.UUID("5a6b7c8d-9e0f-4a1b-8c2d-3e4f5a6b7c8d")
+
+
+class _InMemoryRateLimitGateway(RateLimitGateway):
+    def __init__(self, grant: RateLimitGrant) -> None:
+        self.grant = grant
+
+    def acquire(
+        self,
+        key: str,  # noqa: ARG002
+        tier: RateLimitTier,  # noqa: ARG002
+        requested: int,  # noqa: ARG002
+        session: Session,  # noqa: ARG002
+    ) -> RateLimitGrant:
+        return self.grant
+
+
+def _limiter(grant: RateLimitGrant) -> RateLimitUseCase:
+    limiter = RateLimitUseCase(
+        rate_limit_gateway=_InMemoryRateLimitGateway(grant),
+        subscription_gateway=SubscriptionGateway(),
+        session_factory=lambda: contextlib.nullcontext(session),
+        settings=RateLimitSettings(lease_ttl=1e9),
+    )
+    # Resolve the tier and take the first lease outside the measurement
+    with contextlib.suppress(RateLimitExceededError):
+        limiter.execute(USER_ID, session)
+    return limiter
+
+
+_leased: Any = None
+_blocked: Any = None
+
+
+def _setup_leased() -> None:
+    global _leased  # noqa: PLW0603
+    _leased = _limiter(RateLimitGrant(granted=2**62))
+
+
+def _setup_blocked() -> None:
+    global _blocked  # noqa: PLW0603
+    _blocked = _limiter(RateLimitGrant(granted=0, retry_after_seconds=1e9))
+
+
+@bench("ratelimit.execute.leased", setup=_setup_leased)
+def _execute_leased() -> None:
+    _leased.execute(USER_ID, session)
+
+
+@bench("ratelimit.execute.blocked", setup=_setup_blocked)
+def _execute_blocked() -> None:
+    with contextlib.suppress(RateLimitExceededError):
+        _blocked.execute(USER_ID, session)
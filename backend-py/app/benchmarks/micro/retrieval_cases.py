@@ -0,0 +1,40 @@
+"""Retrieval reranking benchmarks.
+
+These measure max-marginal-relevance reranking of search candidates with
+the embedding model's dimensions: one query, and a batch of queries
+reranked in one computation as VectorStoreGateway does.
+"""
+
+from typing import Any
+
+from domain.service.mmr_service import max_marginal_relevance
+from gateway.embeddings_gateway import EMBEDDING_DIMENSIONS
+from gateway.vectorstore_gateway import RETRIEVER_FETCH_K, RETRIEVER_K
+
+from .harness import bench
+
+BATCH = 32
+
+_queries: Any = None
+_candidates: Any = None
+
+
+def _setup() -> None:
+    global _queries, _candidates  # noqa: PLW0603
+    import numpy as np  # noqa: PLC0415
+
+    rng = np.random.default_rng(0)
+    _queries = rng.standard_normal((BATCH, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    _candidates = rng.standard_normal(
+        (BATCH, RETRIEVER_FETCH_K, EMBEDDING_DIMENSIONS), dtype=np.float32
+    )
+
+
+@bench("retrieval.mmr.single", setup=_setup)
+def _mmr_single() -> None:
+    max_marginal_relevance(_queries[:1], _candidates[:1], RETRIEVER_K)
+
+
+@bench("retrieval.mmr.batch_32", setup=_setup)
+def _mmr_batch() -> None:
+    max_marginal_relevance(_queries, _candidates, RETRIEVER_K)
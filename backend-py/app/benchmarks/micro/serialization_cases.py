@@ -0,0 +1,93 @@
+"""Response serialization benchmarks.
+
+Each payload is rendered three ways:
+
+- ``JSONResponse``: FastAPI's default path for a route returning a model
+  (validate against the response model, serialize, stdlib JSONResponse)
+- ``ORJSONResponse``: the same path with ORJSONResponse, the app's default class
+- ``model_response``: ModelJSONResponse, which the hot endpoints return to
+  dump the model straight to bytes
+"""
+
+import datetime as dt
+import uuid
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import BaseModel
+
+from app import app
+from controller.responses import ModelJSONResponse, ORJSONResponse
+from domain.entity.chat import (
+    ChatHistoryResponse,
+    ChatMessage,
+    ChatResponse,
+    VirtualUserProfileSummary,
+    VirtualUserSummary,
+)
+
+from .harness import bench_async
+
+VIRTUAL_USER_ID = uuid.UUID("5a6b7c8d-9e0f-4a1b-8c2d-3e4f5a6b7c8d")
+
+CHAT_RESPONSE = ChatResponse(
+    chat_room_id=42,
+    user_message_id=1001,
+    ai_message_id=1002,
+    ai_response="これはベンチマーク用のAI応答です。" * 20,
+    virtual_user=VirtualUserSummary(
+        id=VIRTUAL_USER_ID,
+        name="AI Assistant",
+        profile=VirtualUserProfileSummary(backstory="A helpful assistant."),
+    ),
+)
+
+
+def _history(size: int) -> ChatHistoryResponse:
+    return ChatHistoryResponse(
+        chat_room_id=42,
+        messages=[
+            ChatMessage(
+                id=index,
+                content=f"History message {index} " * 8,
+                created_at=dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
+                + dt.timedelta(seconds=index),
+                virtual_user_id=VIRTUAL_USER_ID,
+            )
+            for index in range(size)
+        ],
+    )
+
+
+def _route(path: str) -> APIRoute:
+    for route in app.router.routes:
+        if isinstance(route, APIRoute) and route.path == path:
+            return route
+    msg = f"Route {path} not found"
+    raise LookupError(msg)
+
+
+def _bench_payload(name: str, path: str, content: BaseModel) -> None:
+    field = _route(path).response_field
+
+    def via_response_model(response_class: type[Response]) -> None:
+        async def render() -> None:
+            body = await serialize_response(field=field, response_content=content)
+            response_class(body)
+
+        bench_async(f"serialization.{name}.{response_class.__name__}")(render)
+
+    via_response_model(JSONResponse)
+    via_response_model(ORJSONResponse)
+
+    async def model_response() -> None:
+        ModelJSONResponse(content)
+
+    bench_async(f"serialization.{name}.model_response")(model_response)
+
+
+_bench_payload("chat_response", "/api/chat", CHAT_RESPONSE)
+for _size in (100, 500):
+    _bench_payload(
+        f"chat_history_{_size}", "/api/chat/{chat_room_id}/messages", _history(_size)
+    )
@@ -0,0 +1,136 @@
+"""Near-duplicate detection throughput and recall.
+
+Runs the near-duplicate stages of ``near_duplicate_service`` on synthetic
+data without a database:
+
+- signing: MinHash signatures of generated Japanese texts per second
+- grouping: ``find_duplicate_groups`` (the batch pass) over millions of
+  signatures, a share of which are planted near-duplicates of other rows
+- lookup: ``NearDuplicateIndex.find`` (the ingestion check) per second
+
+Planted near-duplicates have a share of their signature bytes replaced, as
+an edited copy of a text would. Recall is the share of planted rows grouped
+with their source row; false groups are groups without a planted row.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.near_duplicates [--rows 2000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from domain.service.near_duplicate_service import (
+    PERMUTATIONS,
+    NearDuplicateIndex,
+    duplicate_mask,
+    find_duplicate_groups,
+    minhash,
+)
+
+# Code points the generated texts are drawn from (hiragana and kanji)
+CHARACTERS = [chr(code) for code in range(0x3042, 0x3094)] + [
+    chr(code) for code in range(0x4E00, 0x4E00 + 500)
+]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument(
+        "--duplicates", type=float, default=0.05, help="Share of planted rows"
+    )
+    parser.add_argument(
+        "--edit",
+        type=float,
+        default=0.1,
+        help="Share of signature bytes replaced in a planted row",
+    )
+    parser.add_argument("--texts", type=int, default=5_000, help="Texts to sign")
+    parser.add_argument("--text-length", type=int, default=800)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def _report(stage: str, count: int, seconds: float, extra: str = "") -> None:
+    print(
+        f"{stage:<10}{count:>12,}{seconds:>10.2f} s{count / seconds:>14,.0f}/s  {extra}"
+    )
+
+
+def _sign(rng: np.random.Generator, args: argparse.Namespace) -> None:
+    picks = rng.integers(len(CHARACTERS), size=(args.texts, args.text_length))
+    texts = ["".join(CHARACTERS[index] for index in row) for row in picks]
+    start = time.perf_counter()
+    for text in texts:
+        minhash(text)
+    _report("signing", args.texts, time.perf_counter() - start)
+
+
+def _plant(
+    rng: np.random.Generator, args: argparse.Namespace
+) -> tuple[np.ndarray, np.ndarray]:
+    """Make random signatures whose last rows are edited copies of others."""
+    signatures = rng.integers(256, size=(args.rows, PERMUTATIONS), dtype=np.uint8)
+    planted = int(args.rows * args.duplicates)
+    sources = rng.integers(args.rows - planted, size=planted)
+    copies = signatures[sources]
+    edits = rng.random(copies.shape) < args.edit
+    copies[edits] = rng.integers(256, size=int(edits.sum()), dtype=np.uint8)
+    signatures[args.rows - planted :] = copies
+    return signatures, sources
+
+
+def _group(signatures: np.ndarray, sources: np.ndarray) -> None:
+    start = time.perf_counter()
+    labels = find_duplicate_groups(signatures)
+    seconds = time.perf_counter() - start
+    planted = len(sources)
+    recall = float(np.mean(labels[len(signatures) - planted :] == labels[sources]))
+    mask = duplicate_mask(labels)
+    grouped = set(labels[mask].tolist())
+    false_groups = len(grouped - set(labels[len(signatures) - planted :].tolist()))
+    _report(
+        "grouping",
+        len(signatures),
+        seconds,
+        f"recall {recall:.3f}, duplicates {int(mask.sum()):,}, "
+        f"false groups {false_groups:,}",
+    )
+
+
+def _lookup(
+    signatures: np.ndarray, sources: np.ndarray, args: argparse.Namespace
+) -> None:
+    originals = len(signatures) - len(sources)
+    start = time.perf_counter()
+    index = NearDuplicateIndex(
+        signatures[:originals], [str(row) for row in range(originals)]
+    )
+    _report("indexing", originals, time.perf_counter() - start)
+    lookups = min(args.lookups, len(sources))
+    start = time.perf_counter()
+    found = sum(
+        index.find(signatures[originals + row].tobytes()) == str(sources[row])
+        for row in range(lookups)
+    )
+    _report(
+        "lookup", lookups, time.perf_counter() - start, f"recall {found / lookups:.3f}"
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    args = _parse_args()
+    rng = np.random.default_rng(args.seed)
+    print(f"{'stage':<10}{'items':>12}{'time':>12}{'throughput':>16}")
+    _sign(rng, args)
+    signatures, sources = _plant(rng, args)
+    _group(signatures, sources)
+    _lookup(signatures, sources, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure the per-span cost of util.tracing.
+
+Compares a bare function call with the same call wrapped by ``traced`` when
+tracing is disabled, when the trace is not sampled, and when every span is
+sampled and exported (to an in-memory exporter, so I/O is excluded).
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.tracing_overhead [--iterations N]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from util.tracing import (
+    InMemorySpanExporter,
+    configure_tracing,
+    shutdown_tracing,
+    start_span,
+    traced,
+)
+
+
+def _work() -> int:
+    return sum(range(10))
+
+
+_traced_work = traced("work")(_work)
+
+
+def _measure(func: Callable[[], object], iterations: int) -> float:
+    """Return the mean duration of one call in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def _in_root(iterations: int) -> float:
+    """Call the traced function inside a request-like root span."""
+    with start_span("request"):
+        return _measure(_traced_work, iterations)
+
+
+def main() -> None:
+    """Run the benchmark and print per-call overhead."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    baseline = _measure(_work, args.iterations)
+
+    configure_tracing(0.0)
+    disabled = _in_root(args.iterations)
+
+    exporter = InMemorySpanExporter()
+    configure_tracing(1.0, exporter)
+    sampled = _in_root(args.iterations)
+    shutdown_tracing()
+
+    print(f"{'mode':<12}{'us/call':>10}{'overhead':>12}")
+    for mode, value in (
+        ("baseline", baseline),
+        ("unsampled", disabled),
+        ("sampled", sampled),
+    ):
+        print(f"{mode:<12}{value:>10.3f}{value - baseline:>12.3f}")
+    print(f"exported spans: {len(exporter.spans)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Compare the two-stage vector search with the exact search.
+
+Loads clustered synthetic embeddings into the embeddings table, then runs
+the same queries through ``EmbeddingsGateway.search_similar`` exactly (every
+float vector) and in two stages for several candidate counts: HNSW
+candidates from the binary-quantized vectors or from PCA-reduced vectors,
+reranked by exact cosine distance. Recall@k is the share of the exact top k
+that the two-stage search also returns.
+
+The "filtered" searches are limited to one user owning a small share of
+the rows (--user-share), as memory recall is. Most HNSW candidates then
+belong to other users and are filtered out, so these show whether the
+iterative index scan keeps the recall up.
+
+The rows and the benchmark's projection version are deleted afterwards, so
+an existing database can be used.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.vector_search [--docker]
+        [--rows N] [--candidates 40,100,400] [--user-share 0.01]
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+import numpy as np
+from sqlalchemy import Engine, create_engine, delete, text
+from sqlmodel import Session, col
+
+from benchmarks.load.database import prepare_schema, start_postgres
+from domain.entity.models import EmbeddingProjections, Embeddings
+from domain.entity.projection import REDUCED_DIMENSIONS, EmbeddingProjection
+from domain.service.projection_service import fit_pca
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EMBEDDING_DIMENSIONS, EmbeddingsGateway
+
+ID_PREFIX = "vector-bench-"
+COPY_BATCH = 1000
+PCA_SAMPLE = 5000
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    database = parser.add_mutually_exclusive_group()
+    database.add_argument(
+        "--database-url",
+        default=os.getenv("DATABASE_URL"),
+        help="Existing database (default: $DATABASE_URL)",
+    )
+    database.add_argument(
+        "--docker", action="store_true", help="Start a disposable pgvector container"
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--candidates",
+        default="40,100,200,400",
+        help="Comma-separated candidate counts of the two-stage search",
+    )
+    parser.add_argument(
+        "--user-share",
+        type=float,
+        default=0.01,
+        help="Share of the rows owned by the user of the filtered searches",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    normalized: np.ndarray = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return normalized
+
+
+def _generate(rng: np.random.Generator, rows: int, clusters: int) -> np.ndarray:
+    """Make clustered unit vectors, like embeddings of related texts."""
+    centers = rng.normal(size=(clusters, EMBEDDING_DIMENSIONS))
+    assignments = rng.integers(clusters, size=rows)
+    noise = rng.normal(scale=0.6, size=(rows, EMBEDDING_DIMENSIONS))
+    return _normalize(centers[assignments] + noise)
+
+
+def _load(engine: Engine, vectors: np.ndarray, owners: list[str]) -> None:
+    """Insert the vectors with COPY, which is far faster than INSERT here."""
+    connection = engine.raw_connection()
+    try:
+        # psycopg2's COPY is not part of the DB-API
+        driver: Any = connection.driver_connection
+        with driver.cursor() as cursor:
+            for start in range(0, len(vectors), COPY_BATCH):
+                buffer = io.StringIO()
+                for index in range(start, min(start + COPY_BATCH, len(vectors))):
+                    values = ",".join(f"{value:.6f}" for value in vectors[index])
+                    metadata = json.dumps(
+                        {"source": "vector-bench", "user_id": owners[index]}
+                    )
+                    buffer.write(
+                        f"{ID_PREFIX}{index}\t[{values}]\tdocument {index}\t"
+                        f"{metadata}\n"
+                    )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY embeddings (id, embedding, content, metadata) FROM STDIN",
+                    buffer,
+                )
+        connection.commit()
+    finally:
+        connection.close()
+    with engine.begin() as connection_:
+        connection_.execute(text("ANALYZE embeddings"))
+
+
+def _reduce(engine: Engine, vectors: np.ndarray) -> EmbeddingProjection:
+    """Fit a PCA on a sample and store the reduced vectors (not activated)."""
+    sample = vectors[:PCA_SAMPLE]
+    gateway = EmbeddingsGateway()
+    projection_gateway = EmbeddingProjectionGateway()
+    with Session(engine) as session:
+        version = projection_gateway.create(
+            fit_pca(sample, REDUCED_DIMENSIONS), session
+        )
+        projection = projection_gateway.get(version, session)
+        assert projection is not None  # noqa: S101
+        for start in range(0, len(vectors), COPY_BATCH):
+            batch = vectors[start : start + COPY_BATCH]
+            gateway.set_reduced(
+                [
+                    (f"{ID_PREFIX}{start + offset}", reduced)
+                    for offset, reduced in enumerate(projection.project(batch).tolist())
+                ],
+                projection,
+                session,
+            )
+        session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE embeddings"))
+    return projection
+
+
+def _timed(search: Callable[[], list[Embeddings]]) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    results = search()
+    return [row.id for row in results], (time.perf_counter() - start) * 1000
+
+
+def _report(label: str, recalls: list[float], latencies: list[float]) -> None:
+    quantiles = statistics.quantiles(latencies, n=20)
+    print(
+        f"{label:<22}{statistics.fmean(recalls):>10.3f}"
+        f"{statistics.median(latencies):>10.2f}{quantiles[18]:>10.2f}"
+    )
+
+
+def run(engine: Engine, args: argparse.Namespace) -> None:
+    """Load the data, run the searches and print recall and latency."""
+    rng = np.random.default_rng(args.seed)
+    vectors = _generate(rng, args.rows, args.clusters)
+    user_id, other_user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    owners = [
+        user_id if owned else other_user_id
+        for owned in rng.random(args.rows) < args.user_share
+    ]
+    print(f"Loading {args.rows} vectors ...")
+    _load(engine, vectors, owners)
+    print("Reducing vectors ...")
+    projection = _reduce(engine, vectors)
+    try:
+        # Queries near stored vectors, so each has true near neighbors
+        picks = rng.integers(args.rows, size=args.queries)
+        noise = rng.normal(scale=0.02, size=(args.queries, EMBEDDING_DIMENSIONS))
+        queries = _normalize(vectors[picks] + noise).tolist()
+        _search(engine, queries, projection, user_id, args)
+    finally:
+        with Session(engine) as session:
+            session.exec(
+                delete(EmbeddingProjections).where(
+                    col(EmbeddingProjections.version) == projection.version
+                )
+            )
+            session.commit()
+
+
+def _search(
+    engine: Engine,
+    queries: list[list[float]],
+    projection: EmbeddingProjection,
+    user_id: str,
+    args: argparse.Namespace,
+) -> None:
+    gateway = EmbeddingsGateway()
+    candidate_counts = [int(value) for value in args.candidates.split(",")]
+    latencies: dict[str, list[float]] = {}
+    recalls: dict[str, list[float]] = {}
+    with Session(engine) as session:
+        for query, (scope, scope_user_id) in itertools.product(
+            queries, (("", None), (" filtered", user_id))
+        ):
+            search = partial(
+                gateway.search_similar, query, args.k, session, scope_user_id
+            )
+            expected, elapsed = _timed(partial(search, exact=True))
+            session.commit()
+            latencies.setdefault(f"exact{scope}", []).append(elapsed)
+            recalls.setdefault(f"exact{scope}", []).append(1.0)
+            for candidates in candidate_counts:
+                for tier, tier_projection in (("binary", None), ("pca", projection)):
+                    found, elapsed = _timed(
+                        partial(
+                            search, candidates=candidates, projection=tier_projection
+                        )
+                    )
+                    session.commit()
+                    label = f"{tier}{scope} ({candidates})"
+                    latencies.setdefault(label, []).append(elapsed)
+                    recalls.setdefault(label, []).append(
+                        len(set(found) & set(expected)) / max(len(expected), 1)
+                    )
+
+    print(f"{'search':<22}{f'recall@{args.k}':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, values in latencies.items():
+        _report(label, recalls[label], values)
+
+
+def main() -> None:
+    """Run the benchmark against the configured database."""
+    args = _parse_args()
+    container = start_postgres() if args.docker or not args.database_url else None
+    database_url = (
+        container.get_connection_url() if container is not None else args.database_url
+    )
+    engine = create_engine(database_url)
+    try:
+        prepare_schema(engine)
+        run(engine, args)
+    finally:
+        with Session(engine) as session:
+            session.exec(
+                delete(Embeddings).where(col(Embeddings.id).startswith(ID_PREFIX))
+            )
+            session.commit()
+        engine.dispose()
+        if container is not None:
+            container.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,77 @@
 """原則Docstringの記述は必須とする."""
 
-import uvicorn
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from controller import router
+from container import Container
+from controller import include_graphql, router
+from controller.responses import ORJSONResponse
+from middleware.logging_middleware import LoggingMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.tracing_middleware import TracingMiddleware
+from util.logging import configure_logging
+from util.metrics import mark_process_dead
+from util.tracing import configure_tracing_from_env
+from worker import run_background
+
+configure_logging()
+configure_tracing_from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build shared dependencies once per worker and close them on shutdown.
+
+    uvicorn only starts accepting connections on a worker after startup has
+    finished, so the warm-up, including the import of the GraphQL API, runs
+    before the worker receives traffic.
 
-app = FastAPI()
+    Log and span queues are flushed at process exit (atexit), after the last
+    request and lifespan log lines have been written.
+
+    With JOBS_EMBEDDED_WORKER=true each worker also runs a background job
+    pool and the message indexer, which finish their running work before
+    the container is closed.
+    """
+    app.state.ready = False
+    container = Container.create()
+    app.state.container = container
+    include_graphql(app)
+    if os.getenv("APP_WARMUP", "true").lower() != "false":
+        await container.warm_up()
+    job_worker_stop = asyncio.Event()
+    job_worker = (
+        asyncio.create_task(run_background(container, job_worker_stop))
+        if os.getenv("JOBS_EMBEDDED_WORKER", "false").lower() == "true"
+        else None
+    )
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        if job_worker is not None:
+            job_worker_stop.set()
+            await job_worker
+        container.close()
+        mark_process_dead(os.getpid())
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Starlette wraps in reverse order: Metrics -> Logging -> Tracing -> app
+app.add_middleware(TracingMiddleware)
+app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(router)
 
 if __name__ == "__main__":
+    import uvicorn
+
     # Development only - bind to all interfaces
     uvicorn.run(app, host="0.0.0.0", port=8000)  # noqa: S104
@@ -0,0 +1,210 @@
+"""Per-worker dependency container.
+
+Gateways and HTTP-backed clients are stateless with respect to requests, so
+they are built once in the application lifespan and shared. Only the access
+token and database session vary per request and are passed at call time.
+"""
+
+import asyncio
+from dataclasses import dataclass
+
+from fastapi import Request
+from fastapi.requests import HTTPConnection
+
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.current_user_gateway import CurrentUserGateway
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.indexer_watermark_gateway import IndexerWatermarkGateway
+from gateway.job_gateway import JobGateway
+from gateway.message_gateway import MessageGateway
+from gateway.openai_gateway import OpenAIGateway
+from gateway.rate_limit_gateway import RateLimitGateway
+from gateway.subscription_gateway import SubscriptionGateway
+from gateway.user_profile_gateway import UserProfileGateway
+from gateway.virtual_user_gateway import VirtualUserGateway
+from gateway.virtual_user_profile_gateway import VirtualUserProfileGateway
+from infra.db_client import dispose_engine, session_scope, warm_up_engine
+from infra.supabase_client import SupabaseClient
+from usecase.chat_graph_usecase import ChatGraphUseCase
+from usecase.chat_history_usecase import ChatHistoryUseCase
+from usecase.chat_usecase import ChatUseCase
+from usecase.embedding_reduction_usecase import EmbeddingReductionUseCase
+from usecase.job_worker_usecase import JobHandler, JobWorkerUseCase
+from usecase.message_indexer_usecase import MessageIndexerUseCase
+from usecase.rate_limit_usecase import RateLimitUseCase
+from util.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Container:
+    """Shared clients, gateways and use cases of one worker process."""
+
+    supabase_client: SupabaseClient
+    openai_gateway: OpenAIGateway
+    chat_usecase: ChatUseCase
+    chat_history_usecase: ChatHistoryUseCase
+    chat_graph_usecase: ChatGraphUseCase
+    job_gateway: JobGateway
+    job_worker_usecase: JobWorkerUseCase
+    message_indexer_usecase: MessageIndexerUseCase
+
+    @classmethod
+    def create(cls) -> "Container":
+        """Build all shared dependencies.
+
+        Returns:
+            Container holding the worker's singletons
+        """
+        supabase_client = SupabaseClient()
+        openai_gateway = OpenAIGateway()
+        chat_room_gateway = ChatRoomGateway()
+        message_gateway = MessageGateway()
+        virtual_user_gateway = VirtualUserGateway()
+        embeddings_gateway = EmbeddingsGateway()
+        projection_gateway = EmbeddingProjectionGateway()
+        job_gateway = JobGateway()
+        # Background job handlers by kind (see JobGateway.enqueue)
+        job_handlers: dict[str, JobHandler] = {
+            **EmbeddingReductionUseCase(
+                embeddings_gateway=embeddings_gateway,
+                projection_gateway=projection_gateway,
+                job_gateway=job_gateway,
+            ).job_handlers(),
+        }
+        chat_usecase = ChatUseCase(
+            current_user_gateway=CurrentUserGateway(supabase_client),
+            user_profile_gateway=UserProfileGateway(),
+            chat_room_gateway=chat_room_gateway,
+            message_gateway=message_gateway,
+            virtual_user_gateway=virtual_user_gateway,
+            embeddings_gateway=embeddings_gateway,
+            openai_gateway=openai_gateway,
+            rate_limit_usecase=RateLimitUseCase(
+                rate_limit_gateway=RateLimitGateway(),
+                subscription_gateway=SubscriptionGateway(),
+                session_factory=session_scope,
+            ),
+            projection_gateway=projection_gateway,
+        )
+        return cls(
+            supabase_client=supabase_client,
+            openai_gateway=openai_gateway,
+            chat_usecase=chat_usecase,
+            chat_history_usecase=ChatHistoryUseCase(
+                chat_room_gateway=chat_room_gateway,
+                message_gateway=message_gateway,
+            ),
+            chat_graph_usecase=ChatGraphUseCase(
+                chat_room_gateway=chat_room_gateway,
+                message_gateway=message_gateway,
+                virtual_user_gateway=virtual_user_gateway,
+                virtual_user_profile_gateway=VirtualUserProfileGateway(),
+            ),
+            job_gateway=job_gateway,
+            job_worker_usecase=JobWorkerUseCase(
+                job_gateway=job_gateway,
+                handlers=job_handlers,
+                session_factory=session_scope,
+            ),
+            message_indexer_usecase=MessageIndexerUseCase(
+                message_gateway=message_gateway,
+                embeddings_gateway=embeddings_gateway,
+                watermark_gateway=IndexerWatermarkGateway(),
+                openai_gateway=openai_gateway,
+                session_factory=session_scope,
+                projection_gateway=projection_gateway,
+            ),
+        )
+
+    async def warm_up(self) -> None:
+        """Prepare connections and clients before the worker serves traffic.
+
+        Opens the database pool connections and the Supabase auth
+        connection, builds the LLM client and compiles the default prompt
+        prefix concurrently. A failing step is logged and
+        skipped, so an unavailable dependency delays only the requests that
+        need it instead of keeping the worker from starting.
+        """
+        steps = {
+            "database_pool": warm_up_engine,
+            "supabase_auth": self.supabase_client.warm_up,
+            "llm_client": self.openai_gateway.warm_up,
+            "prompt_templates": self.chat_usecase.warm_up,
+        }
+        results = await asyncio.gather(
+            *(asyncio.to_thread(step) for step in steps.values()),
+            return_exceptions=True,
+        )
+        for name, result in zip(steps, results, strict=True):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up step failed", step=name, error=str(result))
+
+    def close(self) -> None:
+        """Close HTTP clients and the database connection pool."""
+        self.openai_gateway.close()
+        self.supabase_client.close()
+        dispose_engine()
+
+
+def get_container(request: HTTPConnection) -> Container:
+    """Get the container built by the application lifespan.
+
+    Args:
+        request: Current request or WebSocket connection
+
+    Returns:
+        The worker's container
+    """
+    container: Container = request.app.state.container
+    return container
+
+
+def get_chat_usecase(request: HTTPConnection) -> ChatUseCase:
+    """FastAPI dependency returning the shared ChatUseCase.
+
+    Args:
+        request: Current request or WebSocket connection
+
+    Returns:
+        The worker's ChatUseCase
+    """
+    return get_container(request).chat_usecase
+
+
+def get_chat_history_usecase(request: Request) -> ChatHistoryUseCase:
+    """FastAPI dependency returning the shared ChatHistoryUseCase.
+
+    Args:
+        request: Current request
+
+    Returns:
+        The worker's ChatHistoryUseCase
+    """
+    return get_container(request).chat_history_usecase
+
+
+def get_chat_graph_usecase(request: Request) -> ChatGraphUseCase:
+    """FastAPI dependency returning the shared ChatGraphUseCase.
+
+    Args:
+        request: Current request
+
+    Returns:
+        The worker's ChatGraphUseCase
+    """
+    return get_container(request).chat_graph_usecase
+
+
+def get_supabase_client(request: Request) -> SupabaseClient:
+    """FastAPI dependency returning the shared SupabaseClient.
+
+    Args:
+        request: Current request
+
+    Returns:
+        The worker's SupabaseClient
+    """
+    return get_container(request).supabase_client
@@ -1,7 +1,31 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, FastAPI
 
 from controller.base_controller import router as base_router
+from controller.chat_ws_controller import router as chat_ws_router
+from controller.metrics_controller import router as metrics_router
+
+GRAPHQL_PATH = "/graphql"
 
 router = APIRouter()
 
 router.include_router(base_router, tags=["base"])
+router.include_router(chat_ws_router, tags=["chat"])
+router.include_router(metrics_router, tags=["metrics"])
+
+
+def include_graphql(app: FastAPI) -> None:
+    """Serve the GraphQL API from the app.
+
+    Called from the lifespan rather than at import time: strawberry is slow
+    to import, and the worker only accepts requests after startup. A later
+    lifespan of the same app (tests) includes the router once.
+
+    Args:
+        app: Application to serve the API from
+    """
+    if getattr(app.state, "graphql_included", False):
+        return
+    from controller.graphql import router as graphql_router  # noqa: PLC0415
+
+    app.include_router(graphql_router, prefix=GRAPHQL_PATH, tags=["graphql"])
+    app.state.graphql_included = True
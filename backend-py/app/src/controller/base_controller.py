@@ -1,12 +1,18 @@
+import math
 from typing import Annotated
+from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlmodel import Session
 from supabase_auth.types import User
 
-from domain.entity.chat import ChatRequest, ChatResponse
+from container import get_chat_history_usecase, get_chat_usecase
+from controller.responses import ModelJSONResponse
+from domain.entity.chat import ChatHistoryResponse, ChatRequest, ChatResponse
+from domain.exceptions import RateLimitExceededError, ResourceNotFoundError
 from infra.db_client import get_session
 from middleware.auth_middleware import authorization_header, verify_token
+from usecase.chat_history_usecase import ChatHistoryUseCase
 from usecase.chat_usecase import ChatUseCase
 
 router = APIRouter()
@@ -24,12 +30,22 @@ async def healthcheck() -> dict[str, str]:
     return {"message": "OK"}
 
 
-@router.post("/api/chat")
+@router.get("/readyz")
+async def readyz(request: Request, response: Response) -> dict[str, str]:
+    """Readiness probe: 503 until the lifespan warm-up has finished."""
+    if not getattr(request.app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    return {"status": "ready"}
+
+
+@router.post("/api/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     session: Annotated[Session, Depends(get_session)],
     auth_header: Annotated[str, Depends(authorization_header)],
-) -> ChatResponse:
+    use_case: Annotated[ChatUseCase, Depends(get_chat_usecase)],
+) -> ModelJSONResponse:
     """Chat endpoint that uses all domain models.
 
     This endpoint:
@@ -41,6 +57,9 @@ async def chat(
     - Gets virtual user profile (VirtualUserProfiles)
     - Searches embeddings (Embeddings)
     - Calls OpenAI API
+
+    Users over their rate limit get 429 with a Retry-After header, and
+    rooms the user does not belong to get 404.
     """
     # Extract token from header
     if not auth_header.startswith("Bearer "):
@@ -50,5 +69,30 @@ async def chat(
     token = auth_header.split(" ")[1]
 
     # Execute use case
-    use_case = ChatUseCase(access_token=token)
-    return use_case.execute(request, session)
+    try:
+        response = use_case.execute(request, session, token)
+    except RateLimitExceededError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        ) from e
+    except ResourceNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    return ModelJSONResponse(response)
+
+
+@router.get("/api/chat/{chat_room_id}/messages", response_model=ChatHistoryResponse)
+async def chat_history(
+    chat_room_id: int,
+    current_user: Annotated[User, Depends(verify_token)],
+    session: Annotated[Session, Depends(get_session)],
+    use_case: Annotated[ChatHistoryUseCase, Depends(get_chat_history_usecase)],
+    limit: Annotated[int, Query(ge=1, le=500)] = 100,
+) -> ModelJSONResponse:
+    """Get the latest messages of a chat room the user belongs to."""
+    try:
+        history = use_case.execute(chat_room_id, UUID(current_user.id), session, limit)
+    except ResourceNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    return ModelJSONResponse(history)
@@ -0,0 +1,309 @@
+"""WebSocket chat transport.
+
+A connection authenticates once, then multiplexes chat turns for any number
+of chat rooms and streams each AI reply token by token. The user and their
+virtual user are resolved once per connection instead of once per message.
+
+Backpressure is applied per connection: the server stops reading frames
+while ``max_in_flight`` turns are running, and token streaming pauses while
+the client is slower than the model and the send queue is full.
+"""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from functools import cache
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, ValidationError
+from sqlmodel import Session
+
+from container import get_chat_usecase
+from domain.entity.chat import ChatRequest, ChatResponse
+from domain.entity.chat_socket import (
+    AuthFrame,
+    ChatFrame,
+    DoneFrame,
+    ErrorFrame,
+    ReadyFrame,
+    StartedFrame,
+    TokenFrame,
+    client_frame_adapter,
+)
+from domain.exceptions import RateLimitExceededError, ResourceNotFoundError
+from infra.db_client import get_session_factory
+from usecase.chat_usecase import ChatContext, ChatTurn, ChatUseCase
+from util.logging import get_logger
+
+router = APIRouter()
+
+logger = get_logger(__name__)
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+# Close code for failed authentication (4000-4999 are application codes)
+WS_UNAUTHORIZED = 4401
+
+
+@dataclass(frozen=True)
+class ChatSocketSettings:
+    """Per-connection limits of the WebSocket chat transport."""
+
+    # Turns running at once; further frames are not read until one finishes
+    max_in_flight: int = 4
+    # Frames waiting to be sent before token streaming pauses
+    send_queue_size: int = 64
+    # Seconds to wait for the auth frame
+    auth_timeout: float = 10.0
+    # Connections are closed after this many seconds so tokens are rechecked
+    max_connection_seconds: float = 3600.0
+
+    @classmethod
+    def from_env(cls) -> "ChatSocketSettings":
+        """Build settings from WS_CHAT_* environment variables.
+
+        Returns:
+            WebSocket chat settings
+        """
+        return cls(
+            max_in_flight=int(os.getenv("WS_CHAT_MAX_IN_FLIGHT", "4")),
+            send_queue_size=int(os.getenv("WS_CHAT_SEND_QUEUE", "64")),
+            auth_timeout=float(os.getenv("WS_CHAT_AUTH_TIMEOUT", "10")),
+            max_connection_seconds=float(
+                os.getenv("WS_CHAT_MAX_CONNECTION_SECONDS", "3600")
+            ),
+        )
+
+
+@cache
+def get_chat_socket_settings() -> ChatSocketSettings:
+    """FastAPI dependency returning the WebSocket chat settings."""
+    return ChatSocketSettings.from_env()
+
+
+class ChatConnection:
+    """An authenticated WebSocket connection running chat turns."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        use_case: ChatUseCase,
+        session_factory: SessionFactory,
+        context: ChatContext,
+        settings: ChatSocketSettings,
+    ) -> None:
+        """Initialize the connection.
+
+        Args:
+            websocket: Accepted WebSocket
+            use_case: Shared chat use case
+            session_factory: Opens a short database session per step
+            context: Context of the authenticated user
+            settings: Per-connection limits
+        """
+        self.websocket = websocket
+        self.use_case = use_case
+        self.session_factory = session_factory
+        self.context = context
+        self._send_queue: asyncio.Queue[BaseModel] = asyncio.Queue(
+            settings.send_queue_size
+        )
+        self._in_flight = asyncio.Semaphore(settings.max_in_flight)
+        # Turns of the same room run one after another to keep message order
+        self._room_locks: dict[int, asyncio.Lock] = {}
+        # One database step at a time: the connection holds at most one
+        # pooled connection, and turns never race on the cached context
+        self._db_lock = asyncio.Lock()
+        self._turns: set[asyncio.Task[None]] = set()
+
+    async def run(self) -> None:
+        """Read frames and run their turns until the client disconnects."""
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self._send(ReadyFrame())
+            while True:
+                await self._in_flight.acquire()
+                try:
+                    raw = await self.websocket.receive_text()
+                except BaseException:
+                    self._in_flight.release()
+                    raise
+                self._dispatch(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for turn in self._turns:
+                turn.cancel()
+            await asyncio.gather(*self._turns, return_exceptions=True)
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    def _dispatch(self, raw: str) -> None:
+        try:
+            frame = client_frame_adapter.validate_json(raw)
+        except ValidationError as e:
+            frame = None
+            detail = str(e)
+        else:
+            detail = "Already authenticated"
+        if not isinstance(frame, ChatFrame):
+            self._in_flight.release()
+            self._send_nowait(ErrorFrame(code="invalid_request", detail=detail))
+            return
+        task = asyncio.create_task(self._run_turn(frame))
+        self._turns.add(task)
+        task.add_done_callback(self._turns.discard)
+
+    async def _run_turn(self, frame: ChatFrame) -> None:
+        try:
+            if frame.chat_room_id is None:
+                await self._chat(frame)
+            else:
+                lock = self._room_locks.setdefault(frame.chat_room_id, asyncio.Lock())
+                async with lock:
+                    await self._chat(frame)
+        except RateLimitExceededError as e:
+            await self._send(
+                ErrorFrame(
+                    id=frame.id,
+                    code="rate_limited",
+                    detail=str(e),
+                    retry_after=e.retry_after,
+                )
+            )
+        except ResourceNotFoundError as e:
+            await self._send(ErrorFrame(id=frame.id, code="not_found", detail=str(e)))
+        except Exception:
+            logger.exception("Chat turn failed", turn_id=frame.id)
+            await self._send(
+                ErrorFrame(id=frame.id, code="internal_error", detail="Chat failed")
+            )
+        finally:
+            self._in_flight.release()
+
+    async def _chat(self, frame: ChatFrame) -> None:
+        request = ChatRequest(message=frame.message, chat_room_id=frame.chat_room_id)
+        async with self._db_lock:
+            await asyncio.to_thread(self._admit_turn)
+        # The query is embedded with no database connection or lock held, so
+        # other turns of the connection can use the database meanwhile
+        query_embedding = await asyncio.to_thread(
+            self.use_case.embed_query, request.message
+        )
+        async with self._db_lock:
+            turn = await asyncio.to_thread(self._prepare_turn, request, query_embedding)
+        await self._send(
+            StartedFrame(
+                id=frame.id,
+                chat_room_id=turn.chat_room_id,
+                user_message_id=turn.user_message_id,
+            )
+        )
+
+        # No database connection is held while the reply streams
+        chunks: list[str] = []
+        async with contextlib.aclosing(self.use_case.stream_reply(turn)) as stream:
+            async for delta in stream:
+                chunks.append(delta)
+                await self._send(TokenFrame(id=frame.id, delta=delta))
+
+        async with self._db_lock:
+            response = await asyncio.to_thread(
+                self._complete_turn, turn, "".join(chunks)
+            )
+        await self._send(DoneFrame(id=frame.id, **dict(response)))
+
+    def _admit_turn(self) -> None:
+        with self.session_factory() as session:
+            self.use_case.admit_turn(self.context, session)
+
+    def _prepare_turn(
+        self, request: ChatRequest, query_embedding: list[float] | None
+    ) -> ChatTurn:
+        with self.session_factory() as session:
+            return self.use_case.prepare_turn(
+                self.context, request, query_embedding, session
+            )
+
+    def _complete_turn(self, turn: ChatTurn, ai_response: str) -> ChatResponse:
+        with self.session_factory() as session:
+            return self.use_case.complete_turn(self.context, turn, ai_response, session)
+
+    async def _send(self, frame: BaseModel) -> None:
+        await self._send_queue.put(frame)
+
+    def _send_nowait(self, frame: BaseModel) -> None:
+        # Error replies to invalid frames are dropped while the queue is full
+        with contextlib.suppress(asyncio.QueueFull):
+            self._send_queue.put_nowait(frame)
+
+    async def _send_loop(self) -> None:
+        while True:
+            frame = await self._send_queue.get()
+            await self.websocket.send_text(frame.model_dump_json())
+
+
+def _bearer_token(header: str | None) -> str | None:
+    if header is None or not header.startswith("Bearer "):
+        return None
+    return header.split(" ")[1]
+
+
+async def _authenticate(
+    websocket: WebSocket,
+    use_case: ChatUseCase,
+    session_factory: SessionFactory,
+    settings: ChatSocketSettings,
+) -> ChatContext | None:
+    token = _bearer_token(websocket.headers.get("authorization"))
+    if token is None:
+        try:
+            async with asyncio.timeout(settings.auth_timeout):
+                raw = await websocket.receive_text()
+            frame = client_frame_adapter.validate_json(raw)
+        except (TimeoutError, ValidationError):
+            return None
+        if not isinstance(frame, AuthFrame):
+            return None
+        token = frame.token
+
+    def open_context() -> ChatContext:
+        with session_factory() as session:
+            return use_case.open_context(token, session)
+
+    try:
+        return await asyncio.to_thread(open_context)
+    except Exception:  # noqa: BLE001
+        logger.warning("WebSocket authentication failed")
+        return None
+
+
+@router.websocket("/ws/chat")
+async def chat_socket(
+    websocket: WebSocket,
+    use_case: Annotated[ChatUseCase, Depends(get_chat_usecase)],
+    session_factory: Annotated[SessionFactory, Depends(get_session_factory)],
+    settings: Annotated[ChatSocketSettings, Depends(get_chat_socket_settings)],
+) -> None:
+    """Chat over a WebSocket connection.
+
+    The access token is sent as an ``Authorization: Bearer`` header or, for
+    browsers, as a first ``{"type": "auth", "token": ...}`` frame. The
+    connection is closed with code 4401 if authentication fails.
+    """
+    await websocket.accept()
+    context = await _authenticate(websocket, use_case, session_factory, settings)
+    if context is None:
+        await websocket.close(code=WS_UNAUTHORIZED, reason="Unauthorized")
+        return
+
+    connection = ChatConnection(websocket, use_case, session_factory, context, settings)
+    try:
+        async with asyncio.timeout(settings.max_connection_seconds):
+            await connection.run()
+    except TimeoutError:
+        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
@@ -0,0 +1,33 @@
+"""GraphQL API for chat rooms, messages and virtual users."""
+
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel import Session
+from strawberry.fastapi import GraphQLRouter
+from supabase_auth.types import User
+
+from container import get_chat_graph_usecase
+from controller.graphql.context import GraphQLContext
+from controller.graphql.schema import create_schema
+from infra.db_client import get_session
+from middleware.auth_middleware import verify_token
+from usecase.chat_graph_usecase import ChatGraphUseCase
+
+
+async def get_context(
+    current_user: Annotated[User, Depends(verify_token)],
+    session: Annotated[Session, Depends(get_session)],
+    use_case: Annotated[ChatGraphUseCase, Depends(get_chat_graph_usecase)],
+) -> GraphQLContext:
+    """Build the context of an authenticated GraphQL request."""
+    return GraphQLContext(UUID(current_user.id), session, use_case)
+
+
+# GraphiQL is disabled: every request, including the IDE page, needs a token
+router = GraphQLRouter[GraphQLContext, None](
+    create_schema(), context_getter=get_context, graphql_ide=None
+)
+
+__all__ = ["router"]
@@ -0,0 +1,119 @@
+"""Per-request GraphQL context with DataLoaders.
+
+Loaders are created for every request, so their caches never outlive the
+request's database session or leak data between users.
+
+Resolvers and loaders run on the event loop, so the use case's blocking
+reads are run in a worker thread, one at a time since a Session is not
+thread-safe.
+"""
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import TypeVar
+from uuid import UUID
+
+from sqlmodel import Session
+from strawberry.dataloader import DataLoader
+from strawberry.fastapi import BaseContext
+
+from domain.entity.models import Messages, VirtualUserProfiles, VirtualUsers
+from usecase.chat_graph_usecase import ChatGraphUseCase
+
+T = TypeVar("T")
+
+
+class SessionReader:
+    """Runs blocking reads on a request's session off the event loop."""
+
+    def __init__(self, session: Session) -> None:
+        """Initialize the reader.
+
+        Args:
+            session: Database session of the request
+        """
+        self.session = session
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, read: Callable[[Session], T]) -> T:
+        """Run a read in a worker thread after the previous one has finished.
+
+        Args:
+            read: Function taking the session
+
+        Returns:
+            The read's result
+        """
+        async with self._lock:
+            return await asyncio.to_thread(read, self.session)
+
+
+@dataclass(frozen=True)
+class Loaders:
+    """DataLoaders batching each relation into one statement per tick."""
+
+    # Keyed by (chat room ID, message limit)
+    messages: DataLoader[tuple[int, int], list[Messages]]
+    chat_room_virtual_users: DataLoader[int, list[VirtualUsers]]
+    virtual_users: DataLoader[UUID, VirtualUsers | None]
+    virtual_user_profiles: DataLoader[UUID, VirtualUserProfiles | None]
+
+    @classmethod
+    def create(cls, use_case: ChatGraphUseCase, reader: SessionReader) -> "Loaders":
+        """Build loaders reading through the use case with one session.
+
+        Args:
+            use_case: Use case providing the batch reads
+            reader: Reader of the request's session
+
+        Returns:
+            Fresh loaders with empty caches
+        """
+
+        async def load_messages(keys: list[tuple[int, int]]) -> list[list[Messages]]:
+            return await reader(partial(use_case.load_messages, keys))
+
+        async def load_chat_room_virtual_users(
+            chat_room_ids: list[int],
+        ) -> list[list[VirtualUsers]]:
+            return await reader(
+                partial(use_case.load_chat_room_virtual_users, chat_room_ids)
+            )
+
+        async def load_virtual_users(ids: list[UUID]) -> list[VirtualUsers | None]:
+            return await reader(partial(use_case.load_virtual_users, ids))
+
+        async def load_virtual_user_profiles(
+            ids: list[UUID],
+        ) -> list[VirtualUserProfiles | None]:
+            return await reader(partial(use_case.load_virtual_user_profiles, ids))
+
+        return cls(
+            messages=DataLoader(load_fn=load_messages),
+            chat_room_virtual_users=DataLoader(load_fn=load_chat_room_virtual_users),
+            virtual_users=DataLoader(load_fn=load_virtual_users),
+            virtual_user_profiles=DataLoader(load_fn=load_virtual_user_profiles),
+        )
+
+
+class GraphQLContext(BaseContext):
+    """Context passed to every resolver of a request."""
+
+    def __init__(
+        self, user_id: UUID, session: Session, use_case: ChatGraphUseCase
+    ) -> None:
+        """Initialize the context.
+
+        Args:
+            user_id: ID of the authenticated user
+            session: Database session of the request
+            use_case: Use case for the chat graph
+        """
+        super().__init__()
+        self.user_id = user_id
+        self.session = session
+        self.use_case = use_case
+        self.read = SessionReader(session)
+        self.loaders = Loaders.create(use_case, self.read)
@@ -0,0 +1,206 @@
+"""GraphQL schema extensions: persisted queries and query cost limits.
+
+Persisted queries follow the Apollo automatic persisted queries protocol:
+clients send ``extensions.persistedQuery.sha256Hash`` and omit the query text
+once the server knows it. Queries can also be preloaded from a manifest, and
+ad-hoc queries can be disabled so only the manifest's queries run.
+"""
+
+import hashlib
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    SelectionSetNode,
+    VariableNode,
+    get_operation_ast,
+)
+from strawberry.extensions import SchemaExtension
+
+# Field arguments that bound the length of a returned list
+LIST_SIZE_ARGUMENTS = frozenset({"first", "last", "limit"})
+
+
+class PersistedQueryStore:
+    """Query texts by SHA-256 hash for one worker.
+
+    Manifest entries are permanent; queries registered by clients are kept
+    in a bounded LRU cache.
+    """
+
+    def __init__(
+        self,
+        manifest: Mapping[str, str] | None = None,
+        *,
+        allow_registration: bool = True,
+        max_size: int = 1000,
+    ) -> None:
+        """Initialize the store.
+
+        Args:
+            manifest: Preloaded queries by hash
+            allow_registration: Accept query texts that are not in the manifest
+            max_size: Maximum number of registered queries kept
+        """
+        self.manifest = dict(manifest or {})
+        self.allow_registration = allow_registration
+        self.max_size = max_size
+        self._registered: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, sha256_hash: str) -> str | None:
+        """Get a query text by hash."""
+        query = self.manifest.get(sha256_hash)
+        if query is None:
+            query = self._registered.get(sha256_hash)
+            if query is not None:
+                self._registered.move_to_end(sha256_hash)
+        return query
+
+    def register(self, sha256_hash: str, query: str) -> None:
+        """Remember a query text sent along with its hash."""
+        if sha256_hash in self.manifest:
+            return
+        self._registered[sha256_hash] = query
+        self._registered.move_to_end(sha256_hash)
+        if len(self._registered) > self.max_size:
+            self._registered.popitem(last=False)
+
+
+def _error(message: str, code: str) -> GraphQLError:
+    return GraphQLError(message, extensions={"code": code})
+
+
+class PersistedQueries(SchemaExtension):
+    """Resolve query texts from persisted query hashes."""
+
+    def __init__(self, store: PersistedQueryStore) -> None:
+        """Initialize the extension.
+
+        Args:
+            store: The worker's persisted query store
+        """
+        self.store = store
+
+    def on_operation(self) -> Iterator[None]:
+        """Fill in or register the query before it is parsed.
+
+        Raises:
+            GraphQLError: If the hash is unknown or does not match the query,
+                or if an ad-hoc query is sent while registration is disabled
+
+        Yields:
+            None
+        """
+        context = self.execution_context
+        persisted: Any = (context.operation_extensions or {}).get("persistedQuery")
+        if not isinstance(persisted, dict) or "sha256Hash" not in persisted:
+            if not self.store.allow_registration:
+                msg = "Only persisted queries are allowed"
+                raise _error(msg, "PERSISTED_QUERY_REQUIRED")
+            yield
+            return
+
+        sha256_hash = str(persisted["sha256Hash"])
+        if context.query is None:
+            query = self.store.get(sha256_hash)
+            if query is None:
+                msg = "PersistedQueryNotFound"
+                raise _error(msg, "PERSISTED_QUERY_NOT_FOUND")
+            context.query = query
+        else:
+            if hashlib.sha256(context.query.encode()).hexdigest() != sha256_hash:
+                msg = "provided sha does not match query"
+                raise _error(msg, "BAD_REQUEST")
+            if self.store.get(sha256_hash) is None:
+                if not self.store.allow_registration:
+                    msg = "Only persisted queries are allowed"
+                    raise _error(msg, "PERSISTED_QUERY_REQUIRED")
+                self.store.register(sha256_hash, context.query)
+        yield
+
+
+class QueryCostLimiter(SchemaExtension):
+    """Reject operations whose estimated cost exceeds a limit.
+
+    Every field costs 1. The cost of a field's selection is multiplied by
+    the field's list size: its ``first``/``last``/``limit`` argument, or the
+    field's entry in ``default_list_sizes`` if the argument is omitted.
+    Rejected operations are not executed, so no statement is sent.
+    """
+
+    def __init__(self, max_cost: int, default_list_sizes: Mapping[str, int]) -> None:
+        """Initialize the limiter.
+
+        Args:
+            max_cost: Highest allowed cost
+            default_list_sizes: List size of list fields by field name
+        """
+        self.max_cost = max_cost
+        self.default_list_sizes = default_list_sizes
+
+    def on_execute(self) -> Iterator[None]:
+        """Compute the cost after validation and before execution.
+
+        Raises:
+            GraphQLError: If the operation is too expensive
+
+        Yields:
+            None
+        """
+        context = self.execution_context
+        document = context.graphql_document
+        operation = (
+            get_operation_ast(document, context.operation_name) if document else None
+        )
+        if document is not None and operation is not None:
+            fragments = {
+                definition.name.value: definition
+                for definition in document.definitions
+                if isinstance(definition, FragmentDefinitionNode)
+            }
+            cost = self._cost(operation.selection_set, fragments, context.variables)
+            if cost > self.max_cost:
+                msg = f"Query cost {cost} exceeds the maximum of {self.max_cost}"
+                raise _error(msg, "QUERY_TOO_COMPLEX")
+        yield
+
+    def _cost(
+        self,
+        selection_set: SelectionSetNode,
+        fragments: Mapping[str, FragmentDefinitionNode],
+        variables: Mapping[str, Any] | None,
+    ) -> int:
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost += 1
+                if selection.selection_set is not None:
+                    cost += self._list_size(selection, variables) * self._cost(
+                        selection.selection_set, fragments, variables
+                    )
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+                cost += self._cost(fragment.selection_set, fragments, variables)
+            elif isinstance(selection, InlineFragmentNode):
+                cost += self._cost(selection.selection_set, fragments, variables)
+        return cost
+
+    def _list_size(self, field: FieldNode, variables: Mapping[str, Any] | None) -> int:
+        for argument in field.arguments or ():
+            if argument.name.value not in LIST_SIZE_ARGUMENTS:
+                continue
+            value = argument.value
+            if isinstance(value, IntValueNode):
+                return int(value.value)
+            if isinstance(value, VariableNode) and variables:
+                size = variables.get(value.name.value)
+                if isinstance(size, int):
+                    return size
+        return self.default_list_sizes.get(field.name.value, 1)
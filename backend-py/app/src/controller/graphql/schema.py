@@ -0,0 +1,137 @@
+"""GraphQL schema and its protective limits."""
+
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+import orjson
+import strawberry
+from strawberry.extensions import (
+    MaxAliasesLimiter,
+    ParserCache,
+    QueryDepthLimiter,
+    ValidationCache,
+)
+from strawberry.types import Info
+
+from controller.graphql.context import GraphQLContext
+from controller.graphql.extensions import (
+    PersistedQueries,
+    PersistedQueryStore,
+    QueryCostLimiter,
+)
+from controller.graphql.types import (
+    DEFAULT_CHAT_ROOMS,
+    DEFAULT_MESSAGES,
+    DEFAULT_VIRTUAL_USERS,
+    MAX_CHAT_ROOMS,
+    ChatRoom,
+    check_list_size,
+)
+
+# Used for the query cost when a list field's size argument is omitted
+DEFAULT_LIST_SIZES = {
+    "chatRooms": DEFAULT_CHAT_ROOMS,
+    "messages": DEFAULT_MESSAGES,
+    "virtualUsers": DEFAULT_VIRTUAL_USERS,
+}
+
+
+@strawberry.type
+class Query:
+    """Root query type."""
+
+    @strawberry.field
+    async def chat_rooms(
+        self, info: Info[GraphQLContext, None], first: int = DEFAULT_CHAT_ROOMS
+    ) -> list[ChatRoom]:
+        """Chat rooms of the requesting user, newest first."""
+        check_list_size("first", first, MAX_CHAT_ROOMS)
+        context = info.context
+        chat_rooms = await context.read(
+            partial(context.use_case.get_chat_rooms, context.user_id, first)
+        )
+        return [ChatRoom.from_model(chat_room) for chat_room in chat_rooms]
+
+    @strawberry.field
+    async def chat_room(
+        self, info: Info[GraphQLContext, None], chat_room_id: int
+    ) -> ChatRoom | None:
+        """A chat room of the requesting user (null if not a member)."""
+        context = info.context
+        chat_room = await context.read(
+            partial(context.use_case.get_chat_room, chat_room_id, context.user_id)
+        )
+        return None if chat_room is None else ChatRoom.from_model(chat_room)
+
+
+@dataclass(frozen=True)
+class GraphQLSettings:
+    """Limits and persisted query configuration of the GraphQL API."""
+
+    max_depth: int = 6
+    max_cost: int = 20000
+    max_aliases: int = 15
+    # Preloaded persisted queries by SHA-256 hash
+    persisted_queries: dict[str, str] = field(default_factory=dict)
+    # Reject query texts that are not in persisted_queries
+    persisted_queries_only: bool = False
+    persisted_query_cache_size: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "GraphQLSettings":
+        """Build settings from GRAPHQL_* environment variables.
+
+        GRAPHQL_PERSISTED_QUERIES is the path of a JSON manifest mapping
+        SHA-256 hashes to query texts.
+
+        Returns:
+            GraphQL settings
+        """
+        manifest_path = os.getenv("GRAPHQL_PERSISTED_QUERIES")
+        return cls(
+            max_depth=int(os.getenv("GRAPHQL_MAX_DEPTH", "6")),
+            max_cost=int(os.getenv("GRAPHQL_MAX_COST", "20000")),
+            max_aliases=int(os.getenv("GRAPHQL_MAX_ALIASES", "15")),
+            persisted_queries=(
+                orjson.loads(Path(manifest_path).read_bytes()) if manifest_path else {}
+            ),
+            persisted_queries_only=(
+                os.getenv("GRAPHQL_PERSISTED_QUERIES_ONLY", "false").lower() == "true"
+            ),
+            persisted_query_cache_size=int(
+                os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", "1000")
+            ),
+        )
+
+
+def create_schema(settings: GraphQLSettings | None = None) -> strawberry.Schema:
+    """Create the schema with its extensions.
+
+    Parsed and validated documents are cached, so repeated (persisted)
+    queries skip both steps.
+
+    Args:
+        settings: Limits and persisted queries (default: from the environment)
+
+    Returns:
+        The GraphQL schema
+    """
+    settings = settings or GraphQLSettings.from_env()
+    store = PersistedQueryStore(
+        settings.persisted_queries,
+        allow_registration=not settings.persisted_queries_only,
+        max_size=settings.persisted_query_cache_size,
+    )
+    return strawberry.Schema(
+        query=Query,
+        extensions=[
+            PersistedQueries(store),
+            ParserCache(maxsize=settings.persisted_query_cache_size),
+            QueryDepthLimiter(max_depth=settings.max_depth),
+            MaxAliasesLimiter(max_alias_count=settings.max_aliases),
+            ValidationCache(maxsize=settings.persisted_query_cache_size),
+            QueryCostLimiter(settings.max_cost, DEFAULT_LIST_SIZES),
+        ],
+    )
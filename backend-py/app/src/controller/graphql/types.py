@@ -0,0 +1,144 @@
+"""GraphQL object types for chat rooms and their relations.
+
+Every relation is resolved through the request's DataLoaders, so a nested
+query costs one statement per relation regardless of how many rooms,
+messages or virtual users it returns.
+"""
+
+from datetime import datetime
+from typing import Self
+from uuid import UUID
+
+import strawberry
+from strawberry.types import Info
+
+from controller.graphql.context import GraphQLContext
+from domain.entity.models import ChatRooms, Messages, VirtualUserProfiles, VirtualUsers
+
+DEFAULT_CHAT_ROOMS = 20
+MAX_CHAT_ROOMS = 100
+DEFAULT_MESSAGES = 50
+MAX_MESSAGES = 500
+# Typical number of virtual users in a room, used for the query cost
+DEFAULT_VIRTUAL_USERS = 5
+
+
+def check_list_size(name: str, value: int, maximum: int) -> None:
+    """Validate a list size argument.
+
+    Raises:
+        ValueError: If the value is outside 1..maximum
+    """
+    if not 1 <= value <= maximum:
+        msg = f"{name} must be between 1 and {maximum}"
+        raise ValueError(msg)
+
+
+@strawberry.type
+class VirtualUserProfile:
+    """Persona of a virtual user."""
+
+    personality: str
+    tone: str
+    knowledge_area: list[str]
+    backstory: str
+    quirks: str | None
+
+    @classmethod
+    def from_model(cls, profile: VirtualUserProfiles) -> Self:
+        """Build the type from a database row."""
+        return cls(
+            personality=profile.personality,
+            tone=profile.tone,
+            knowledge_area=profile.knowledge_area,
+            backstory=profile.backstory,
+            quirks=profile.quirks,
+        )
+
+
+@strawberry.type
+class VirtualUser:
+    """AI persona taking part in chat rooms."""
+
+    id: UUID
+    name: str
+
+    @classmethod
+    def from_model(cls, virtual_user: VirtualUsers) -> Self:
+        """Build the type from a database row."""
+        return cls(id=virtual_user.id, name=virtual_user.name)
+
+    @strawberry.field
+    async def profile(
+        self, info: Info[GraphQLContext, None]
+    ) -> VirtualUserProfile | None:
+        """Profile of the virtual user, if it has one."""
+        profile = await info.context.loaders.virtual_user_profiles.load(self.id)
+        return None if profile is None else VirtualUserProfile.from_model(profile)
+
+
+@strawberry.type
+class Message:
+    """Message posted by a user or a virtual user."""
+
+    id: int
+    content: str
+    created_at: datetime
+    sender_id: UUID | None
+    virtual_user_id: UUID | None
+
+    @classmethod
+    def from_model(cls, message: Messages) -> Self:
+        """Build the type from a database row."""
+        return cls(
+            id=message.id,
+            content=message.content,
+            created_at=message.created_at,
+            sender_id=message.sender_id,
+            virtual_user_id=message.virtual_user_id,
+        )
+
+    @strawberry.field
+    async def virtual_user(
+        self, info: Info[GraphQLContext, None]
+    ) -> VirtualUser | None:
+        """Virtual user that posted the message (null for user messages)."""
+        if self.virtual_user_id is None:
+            return None
+        virtual_user = await info.context.loaders.virtual_users.load(
+            self.virtual_user_id
+        )
+        return None if virtual_user is None else VirtualUser.from_model(virtual_user)
+
+
+@strawberry.type
+class ChatRoom:
+    """Chat room the requesting user belongs to."""
+
+    id: int
+    type: str
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, chat_room: ChatRooms) -> Self:
+        """Build the type from a database row."""
+        return cls(
+            id=chat_room.id, type=chat_room.type, created_at=chat_room.created_at
+        )
+
+    @strawberry.field
+    async def messages(
+        self, info: Info[GraphQLContext, None], last: int = DEFAULT_MESSAGES
+    ) -> list[Message]:
+        """Latest messages of the room in chronological order."""
+        check_list_size("last", last, MAX_MESSAGES)
+        messages = await info.context.loaders.messages.load((self.id, last))
+        return [Message.from_model(message) for message in messages]
+
+    @strawberry.field
+    async def virtual_users(
+        self, info: Info[GraphQLContext, None]
+    ) -> list[VirtualUser]:
+        """Virtual users linked to the room."""
+        virtual_users = await info.context.loaders.chat_room_virtual_users.load(self.id)
+        return [VirtualUser.from_model(virtual_user) for virtual_user in virtual_users]
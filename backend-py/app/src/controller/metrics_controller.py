@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from util.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Expose metrics in Prometheus text format."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,27 @@
+"""JSON response classes backed by orjson and pydantic-core.
+
+The app uses ORJSONResponse as its default response class. Hot endpoints
+return ModelJSONResponse, which dumps the response model straight to bytes
+with pydantic-core. FastAPI skips its own serialization for returned Response
+objects, so this also avoids re-validating the model against response_model
+and the jsonable_encoder pass. Declare ``response_model`` on such routes to
+keep the OpenAPI schema.
+"""
+
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+__all__ = ["ModelJSONResponse", "ORJSONResponse"]
+
+
+class ModelJSONResponse(ORJSONResponse):
+    """Serialize a pydantic model directly to JSON bytes."""
+
+    def render(self, content: Any) -> bytes:  # noqa: ANN401
+        """Render a model with pydantic-core and anything else with orjson."""
+        if isinstance(content, BaseModel):
+            return pydantic_core.to_json(content)
+        return super().render(content)
@@ -0,0 +1,47 @@
+"""Near-duplicate pass over the embeddings table.
+
+Signs embeddings that have no MinHash signature yet, groups near-duplicates
+(messages only within one user's), and deletes all but the oldest row of
+each group. The counts and the grouping throughput are logged.
+
+Usage:
+    cd src && python dedup.py [--dry-run]
+
+Settings (environment variables):
+    NEAR_DUPLICATE_THRESHOLD: Estimated 3-gram Jaccard similarity from which
+        texts are near-duplicates (default 0.8)
+    NEAR_DUPLICATE_BATCH_SIZE: Embeddings signed or deleted per transaction
+        (default 5000)
+"""
+
+import argparse
+
+from gateway.embeddings_gateway import EmbeddingsGateway
+from infra.db_client import dispose_engine, session_scope
+from usecase.near_duplicate_usecase import NearDuplicateUseCase
+from util.logging import configure_logging
+
+
+def main() -> None:
+    """Run the near-duplicate pass."""
+    parser = argparse.ArgumentParser(
+        description="Delete near-duplicate rows of the embeddings table."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count the near-duplicates"
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    usecase = NearDuplicateUseCase(
+        embeddings_gateway=EmbeddingsGateway(), session_factory=session_scope
+    )
+    try:
+        usecase.sign_missing()
+        usecase.deduplicate(dry_run=args.dry_run)
+    finally:
+        dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
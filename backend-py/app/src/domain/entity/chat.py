@@ -1,8 +1,9 @@
 """Chat API request and response models."""
 
-from typing import Any
+from datetime import datetime
+from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class ChatRequest(BaseModel):
@@ -12,6 +13,30 @@ class ChatRequest(BaseModel):
     chat_room_id: int | None = None
 
 
+class HistoryMessage(BaseModel):
+    """An earlier message of a chat room sent along with a turn."""
+
+    model_config = ConfigDict(frozen=True)
+
+    content: str
+    # Written by the user rather than the virtual user
+    from_user: bool
+
+
+class VirtualUserProfileSummary(BaseModel):
+    """Public part of a virtual user's profile."""
+
+    backstory: str | None = None
+
+
+class VirtualUserSummary(BaseModel):
+    """The virtual user that answered a chat message."""
+
+    id: UUID
+    name: str
+    profile: VirtualUserProfileSummary
+
+
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
 
@@ -19,4 +44,23 @@ class ChatResponse(BaseModel):
     user_message_id: int
     ai_message_id: int
     ai_response: str
-    virtual_user: dict[str, Any]
+    virtual_user: VirtualUserSummary
+
+
+class ChatMessage(BaseModel):
+    """A message in a chat room history."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    content: str
+    created_at: datetime
+    sender_id: UUID | None = None
+    virtual_user_id: UUID | None = None
+
+
+class ChatHistoryResponse(BaseModel):
+    """Response model for chat history endpoint."""
+
+    chat_room_id: int
+    messages: list[ChatMessage]
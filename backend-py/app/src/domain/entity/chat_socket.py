@@ -0,0 +1,74 @@
+"""Frames of the WebSocket chat protocol.
+
+Every frame is a JSON object whose ``type`` selects the model. Frames of a
+chat turn carry the client-chosen ``id`` of the turn, so replies to turns in
+different rooms can be interleaved on one connection.
+"""
+
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from domain.entity.chat import ChatResponse
+
+
+class AuthFrame(BaseModel):
+    """Client frame carrying the access token (if not sent as a header)."""
+
+    type: Literal["auth"]
+    token: str
+
+
+class ChatFrame(BaseModel):
+    """Client frame sending a message to a chat room."""
+
+    type: Literal["chat"]
+    id: str = Field(min_length=1, max_length=64)
+    message: str = Field(min_length=1)
+    chat_room_id: int | None = None
+
+
+ClientFrame = Annotated[AuthFrame | ChatFrame, Field(discriminator="type")]
+
+client_frame_adapter: TypeAdapter[AuthFrame | ChatFrame] = TypeAdapter(ClientFrame)
+
+
+class ReadyFrame(BaseModel):
+    """Server frame sent once the connection is authenticated."""
+
+    type: Literal["ready"] = "ready"
+
+
+class StartedFrame(BaseModel):
+    """Server frame sent once the user's message is saved."""
+
+    type: Literal["started"] = "started"
+    id: str
+    chat_room_id: int
+    user_message_id: int
+
+
+class TokenFrame(BaseModel):
+    """Server frame carrying the next chunk of the AI reply."""
+
+    type: Literal["token"] = "token"
+    id: str
+    delta: str
+
+
+class DoneFrame(ChatResponse):
+    """Server frame sent once the AI reply is saved."""
+
+    type: Literal["done"] = "done"
+    id: str
+
+
+class ErrorFrame(BaseModel):
+    """Server frame reporting a failed turn or an invalid frame."""
+
+    type: Literal["error"] = "error"
+    # None for frames that could not be attributed to a turn
+    id: str | None = None
+    code: Literal["invalid_request", "not_found", "rate_limited", "internal_error"]
+    detail: str
+    retry_after: float | None = None
@@ -0,0 +1,45 @@
+"""Document chunks ingested into the embeddings table."""
+
+import hashlib
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+# Embedding IDs of document chunks are "document:<document_id>:<content hash>"
+DOCUMENT_EMBEDDING_PREFIX = "document:"
+
+
+class DocumentChunk(BaseModel):
+    """A chunk of a document's text, embedded as one row."""
+
+    model_config = ConfigDict(frozen=True)
+
+    # Caller-chosen document key (e.g. a file path)
+    document_id: str
+    content: str
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the chunk's text."""
+        return hashlib.sha256(self.content.encode()).hexdigest()
+
+    @property
+    def embedding_id(self) -> str:
+        """Primary key of the chunk's row in the embeddings table.
+
+        It is derived from the text, so a chunk that is unchanged when the
+        document is ingested again maps to its existing row.
+        """
+        return f"{DOCUMENT_EMBEDDING_PREFIX}{self.document_id}:{self.content_hash}"
+
+    def metadata(self) -> dict[str, Any]:
+        """Metadata stored with the chunk's embedding.
+
+        Returns:
+            JSON metadata; document_id finds the document's chunks
+        """
+        return {
+            "source": "document",
+            "document_id": self.document_id,
+            "content_hash": self.content_hash,
+        }
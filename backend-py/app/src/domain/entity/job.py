@@ -0,0 +1,23 @@
+"""Background jobs claimed from the jobs table."""
+
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ClaimedJob(BaseModel):
+    """A job leased to a worker until its visibility timeout."""
+
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    # Includes the current attempt; used to fence updates after a lease is lost
+    attempts: int
+    max_attempts: int
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether this is the last attempt the job is allowed."""
+        return self.attempts >= self.max_attempts
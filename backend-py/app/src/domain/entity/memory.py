@@ -0,0 +1,75 @@
+"""Chat messages indexed into the embeddings table as long-term memory."""
+
+import hashlib
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict
+
+# Embedding IDs of indexed messages are "message:<id>"
+MESSAGE_EMBEDDING_PREFIX = "message:"
+
+
+class IndexerPosition(BaseModel):
+    """Last row an incremental indexer has indexed, in commit order.
+
+    Rows are ordered by the ID of the transaction that inserted them, then
+    by row ID.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    xact_id: int = 0
+    id: int = 0
+
+
+class MessageDocument(BaseModel):
+    """A message with the user whose memory it belongs to."""
+
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    chat_room_id: int
+    # Sender, or the owner of the virtual user that sent the message
+    user_id: UUID
+    sender_id: UUID | None
+    virtual_user_id: UUID | None
+    content: str
+    created_at: datetime
+    # Inserting transaction; with id the indexer's position after this message
+    xact_id: int
+
+    @property
+    def position(self) -> IndexerPosition:
+        """Indexer position right after this message."""
+        return IndexerPosition(xact_id=self.xact_id, id=self.id)
+
+    @property
+    def embedding_id(self) -> str:
+        """Primary key of the message's row in the embeddings table."""
+        return f"{MESSAGE_EMBEDDING_PREFIX}{self.id}"
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the embedded text; unchanged text is not embedded again."""
+        return hashlib.sha256(self.content.encode()).hexdigest()
+
+    def metadata(self) -> dict[str, Any]:
+        """Metadata stored with the message's embedding.
+
+        Returns:
+            JSON metadata; user_id and chat_room_id scope retrieval
+        """
+        return {
+            "source": "message",
+            "message_id": self.id,
+            "chat_room_id": self.chat_room_id,
+            "user_id": str(self.user_id),
+            "sender_id": str(self.sender_id) if self.sender_id else None,
+            "virtual_user_id": (
+                str(self.virtual_user_id) if self.virtual_user_id else None
+            ),
+            "created_at": self.created_at.isoformat(),
+            "content_hash": self.content_hash,
+        }
@@ -2,8 +2,9 @@ from typing import Any, Optional
 import datetime
 import uuid
 
+from pgvector.sqlalchemy.bit import BIT
 from pgvector.sqlalchemy.vector import VECTOR
-from sqlalchemy import ARRAY, BigInteger, CheckConstraint, Column, Enum, ForeignKeyConstraint, Index, Integer, PrimaryKeyConstraint, Text, UniqueConstraint, Uuid, text
+from sqlalchemy import ARRAY, BigInteger, Boolean, CheckConstraint, Column, Computed, Double, Enum, ForeignKeyConstraint, Index, Integer, LargeBinary, PrimaryKeyConstraint, Text, UniqueConstraint, Uuid, text
 from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -33,9 +34,36 @@ class ChatRooms(SQLModel, table=True):
     virtual_user_chats: list['VirtualUserChats'] = Relationship(back_populates='chat_room')
 
 
+class EmbeddingProjections(SQLModel, table=True):
+    __tablename__ = 'embedding_projections'
+    __table_args__ = (
+        CheckConstraint("slot = ANY (ARRAY['a'::text, 'b'::text])", name='embedding_projections_slot_check'),
+        PrimaryKeyConstraint('version', name='embedding_projections_pkey'),
+        Index('embedding_projections_active_key', 'active', unique=True)
+    )
+
+    version: int = Field(sa_column=Column('version', Integer, primary_key=True))
+    method: str = Field(sa_column=Column('method', Text, nullable=False))
+    source_dimensions: int = Field(sa_column=Column('source_dimensions', Integer, nullable=False))
+    dimensions: int = Field(sa_column=Column('dimensions', Integer, nullable=False))
+    sample_size: int = Field(sa_column=Column('sample_size', Integer, nullable=False))
+    mean: bytes = Field(sa_column=Column('mean', LargeBinary, nullable=False))
+    components: bytes = Field(sa_column=Column('components', LargeBinary, nullable=False))
+    slot: str = Field(sa_column=Column('slot', Text, nullable=False))
+    active: bool = Field(sa_column=Column('active', Boolean, nullable=False, server_default=text('false')))
+    created_at: datetime.datetime = Field(sa_column=Column('created_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    explained_variance: Optional[float] = Field(default=None, sa_column=Column('explained_variance', Double(53)))
+    activated_at: Optional[datetime.datetime] = Field(default=None, sa_column=Column('activated_at', TIMESTAMP(True, 3)))
+
+
 class Embeddings(SQLModel, table=True):
     __table_args__ = (
         PrimaryKeyConstraint('id', name='embeddings_pkey'),
+        Index('embeddings_document_id_idx'),
+        Index('embeddings_embedding_bit_idx', 'embedding_bit'),
+        Index('embeddings_embedding_reduced_a_idx', 'embedding_reduced_a'),
+        Index('embeddings_embedding_reduced_b_idx', 'embedding_reduced_b'),
+        Index('embeddings_user_id_idx')
     )
 
     id: str = Field(sa_column=Column('id', Text, primary_key=True))
@@ -44,6 +72,44 @@ class Embeddings(SQLModel, table=True):
     metadata_: dict = Field(sa_column=Column('metadata', JSONB, nullable=False))
     created_at: datetime.datetime = Field(sa_column=Column('created_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
     updated_at: datetime.datetime = Field(sa_column=Column('updated_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    embedding_bit: Optional[Any] = Field(default=None, sa_column=Column('embedding_bit', BIT(1536), Computed('(binary_quantize(embedding))::bit(1536)', persisted=True)))
+    embedding_reduced_a: Optional[Any] = Field(default=None, sa_column=Column('embedding_reduced_a', VECTOR(256)))
+    reduction_version_a: Optional[int] = Field(default=None, sa_column=Column('reduction_version_a', Integer))
+    embedding_reduced_b: Optional[Any] = Field(default=None, sa_column=Column('embedding_reduced_b', VECTOR(256)))
+    reduction_version_b: Optional[int] = Field(default=None, sa_column=Column('reduction_version_b', Integer))
+    content_minhash: Optional[bytes] = Field(default=None, sa_column=Column('content_minhash', LargeBinary))
+
+
+class IndexerWatermarks(SQLModel, table=True):
+    __tablename__ = 'indexer_watermarks'
+    __table_args__ = (
+        PrimaryKeyConstraint('name', name='indexer_watermarks_pkey'),
+    )
+
+    name: str = Field(sa_column=Column('name', Text, primary_key=True))
+    position: int = Field(sa_column=Column('position', BigInteger, nullable=False, server_default=text('0')))
+    xact_id: int = Field(sa_column=Column('xact_id', BigInteger, nullable=False, server_default=text('0')))
+    updated_at: datetime.datetime = Field(sa_column=Column('updated_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+
+
+class Jobs(SQLModel, table=True):
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='jobs_pkey'),
+        Index('jobs_claim_idx', 'queue', 'run_at')
+    )
+
+    id: int = Field(sa_column=Column('id', BigInteger, primary_key=True))
+    queue: str = Field(sa_column=Column('queue', Text, nullable=False, server_default=text("'default'::text")))
+    kind: str = Field(sa_column=Column('kind', Text, nullable=False))
+    payload: dict = Field(sa_column=Column('payload', JSONB, nullable=False, server_default=text("'{}'::jsonb")))
+    status: str = Field(sa_column=Column('status', Enum('queued', 'running', 'failed', name='job_status'), nullable=False, server_default=text("'queued'::job_status")))
+    attempts: int = Field(sa_column=Column('attempts', Integer, nullable=False, server_default=text('0')))
+    max_attempts: int = Field(sa_column=Column('max_attempts', Integer, nullable=False, server_default=text('5')))
+    run_at: datetime.datetime = Field(sa_column=Column('run_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    created_at: datetime.datetime = Field(sa_column=Column('created_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    updated_at: datetime.datetime = Field(sa_column=Column('updated_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    locked_until: Optional[datetime.datetime] = Field(default=None, sa_column=Column('locked_until', TIMESTAMP(True, 3)))
+    last_error: Optional[str] = Field(default=None, sa_column=Column('last_error', Text))
 
 
 class Organizations(SQLModel, table=True):
@@ -59,6 +125,17 @@ class Organizations(SQLModel, table=True):
     corporate_users: list['CorporateUsers'] = Relationship(back_populates='organization')
 
 
+class RateLimitBuckets(SQLModel, table=True):
+    __tablename__ = 'rate_limit_buckets'
+    __table_args__ = (
+        PrimaryKeyConstraint('key', name='rate_limit_buckets_pkey'),
+    )
+
+    key: str = Field(sa_column=Column('key', Text, primary_key=True))
+    tokens: float = Field(sa_column=Column('tokens', Double(53), nullable=False))
+    updated_at: datetime.datetime = Field(sa_column=Column('updated_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+
+
 class Users(SQLModel, table=True):
     __table_args__ = (
         PrimaryKeyConstraint('id', name='users_pkey'),
@@ -216,13 +293,16 @@ class Messages(SQLModel, table=True):
         ForeignKeyConstraint(['chat_room_id'], ['chat_rooms.id'], ondelete='CASCADE', name='messages_chat_room_id_chat_rooms_id_fk'),
         ForeignKeyConstraint(['sender_id'], ['users.id'], ondelete='CASCADE', name='messages_sender_id_users_id_fk'),
         ForeignKeyConstraint(['virtual_user_id'], ['virtual_users.id'], ondelete='CASCADE', name='messages_virtual_user_id_virtual_users_id_fk'),
-        PrimaryKeyConstraint('id', name='messages_pkey')
+        PrimaryKeyConstraint('id', name='messages_pkey'),
+        Index('messages_chat_room_id_id_idx', 'chat_room_id', 'id'),
+        Index('messages_xact_id_id_idx', 'xact_id', 'id')
     )
 
     id: int = Field(sa_column=Column('id', Integer, primary_key=True))
     chat_room_id: int = Field(sa_column=Column('chat_room_id', Integer, nullable=False))
     content: str = Field(sa_column=Column('content', Text, nullable=False))
     created_at: datetime.datetime = Field(sa_column=Column('created_at', TIMESTAMP(True, 3), nullable=False, server_default=text('now()')))
+    xact_id: int = Field(sa_column=Column('xact_id', BigInteger, nullable=False, server_default=text('((pg_current_xact_id())::text)::bigint')))
     sender_id: Optional[uuid.UUID] = Field(default=None, sa_column=Column('sender_id', Uuid))
     virtual_user_id: Optional[uuid.UUID] = Field(default=None, sa_column=Column('virtual_user_id', Uuid))
 
@@ -0,0 +1,61 @@
+"""Versioned dimensionality reductions of the embeddings."""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import ArrayLike, NDArray
+
+# Dimensions of the reduced vectors of embeddings
+REDUCED_DIMENSIONS = 256
+# Columns of embeddings holding reduced vectors (embedding_reduced_<slot>).
+# A new version is written to the slot the active version does not use
+REDUCTION_SLOTS = ("a", "b")
+
+
+@dataclass(frozen=True)
+class ProjectionFit:
+    """A fitted linear reduction that has not been stored yet."""
+
+    # "pca" or "random"
+    method: str
+    mean: "NDArray[np.float32]"
+    # One row per reduced dimension
+    components: "NDArray[np.float32]"
+    sample_size: int
+    # Share of the sample's variance kept (PCA only)
+    explained_variance: float | None = None
+
+
+@dataclass(frozen=True)
+class EmbeddingProjection:
+    """A stored linear map from embeddings to reduced vectors.
+
+    A version's matrix never changes, so a query is only compared with
+    stored vectors reduced by the same version.
+    """
+
+    version: int
+    method: str
+    mean: "NDArray[np.float32]"
+    components: "NDArray[np.float32]"
+    # One of REDUCTION_SLOTS
+    slot: str
+
+    def project(self, vectors: "ArrayLike") -> "NDArray[np.float32]":
+        """Reduce vectors and scale them to unit length for cosine search.
+
+        Args:
+            vectors: Embeddings with the source dimensions
+
+        Returns:
+            One reduced vector per row
+        """
+        import numpy as np  # noqa: PLC0415
+
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        reduced = centered @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        unit: NDArray[np.float32] = reduced / np.maximum(norms, np.float32(1e-12))
+        return unit
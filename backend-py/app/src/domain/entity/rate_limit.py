@@ -0,0 +1,25 @@
+"""Rate limit tiers and shared token bucket grants."""
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class RateLimitTier(BaseModel):
+    """Request quota of a subscription tier."""
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    requests_per_minute: float = Field(gt=0)
+    burst: int = Field(ge=1)
+
+    @property
+    def refill_per_second(self) -> float:
+        """Tokens added to the bucket per second."""
+        return self.requests_per_minute / 60
+
+
+class RateLimitGrant(BaseModel):
+    """Result of taking tokens from the shared bucket."""
+
+    granted: int
+    retry_after_seconds: float = 0.0
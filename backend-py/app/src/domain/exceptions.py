@@ -11,3 +11,16 @@ class ResourceNotFoundError(Exception):
 
 class ConfigurationError(Exception):
     """Raised when configuration is invalid or missing."""
+
+
+class RateLimitExceededError(Exception):
+    """Raised when a user has used up their request quota."""
+
+    def __init__(self, retry_after: float) -> None:
+        """Initialize with the wait time until the next request is allowed.
+
+        Args:
+            retry_after: Seconds until a request token becomes available
+        """
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
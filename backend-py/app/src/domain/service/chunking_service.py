@@ -0,0 +1,182 @@
+"""Streaming split of documents into token-bounded, overlapping chunks.
+
+Text is read block by block and cut into sentences as it arrives, so the
+memory held is bounded by the block size and the chunk size, not by the
+document. Sentences end at Japanese full stops, exclamation and question
+marks, which need no following whitespace, at Latin terminators followed
+by whitespace, and at line breaks. A sentence longer than a chunk is split
+at the longest prefix that fits, so unpunctuated Japanese text is cut
+between characters.
+
+Sentences are packed into chunks of at most ``max_tokens`` tokens. Each
+chunk starts with the last sentences of the previous one (up to
+``overlap_tokens``), so text near a cut appears in context in both chunks.
+Cuts are content-defined: once a chunk holds half of ``max_tokens``, it
+ends after a paragraph or after a sentence whose hash selects it. An edit
+then moves only the cuts up to the next such sentence, and the chunks
+after it keep their text (and content hash).
+"""
+
+import re
+import zlib
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from typing import TextIO
+
+# Counts the tokens of a text (e.g. util.tokenizer.count_tokens)
+TokenCounter = Callable[[str], int]
+
+# Characters read from a file per block
+READ_BLOCK_CHARS = 64 * 1024
+
+# Text without any sentence end is cut after this many characters per
+# token of ``max_tokens``; tokens are rarely longer
+CHARS_PER_TOKEN_BOUND = 8
+
+# One sentence in this many ends a chunk (once it is half full)
+CUT_DIVISOR = 8
+
+_SENTENCE_END = re.compile(
+    r"[。．！？]+[」』）】〕\]\)\"'”’]*\s*"  # noqa: RUF001 - Japanese, no whitespace
+    r"|[.!?;]+[\"'”’\)\]]*\s+"  # noqa: RUF001 - Latin, whitespace follows
+    r"|\n\s*"  # line breaks
+)
+_PARAGRAPH_END = re.compile(r"\n[^\S\n]*\n\s*$")
+
+
+def read_blocks(file: TextIO, size: int = READ_BLOCK_CHARS) -> Iterator[str]:
+    """Read a text file in blocks of at most ``size`` characters.
+
+    Args:
+        file: File opened in text mode
+        size: Characters per block
+
+    Yields:
+        Consecutive blocks of the file
+    """
+    while block := file.read(size):
+        yield block
+
+
+def split_sentences(blocks: Iterable[str], max_chars: int) -> Iterator[str]:
+    """Split streamed text into sentences, keeping their trailing whitespace.
+
+    Args:
+        blocks: Consecutive pieces of the text
+        max_chars: Text without a sentence end is cut at this length
+
+    Yields:
+        Sentences; joined, they are the text
+    """
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            # A terminator at the end may continue in the next block
+            if match.end() == len(buffer):
+                break
+            yield buffer[start : match.end()]
+            start = match.end()
+        buffer = buffer[start:]
+        while len(buffer) > max_chars:
+            yield buffer[:max_chars]
+            buffer = buffer[max_chars:]
+    if buffer:
+        yield buffer
+
+
+def chunk_text(
+    blocks: Iterable[str],
+    count_tokens: TokenCounter,
+    *,
+    max_tokens: int = 512,
+    overlap_tokens: int = 64,
+) -> Iterator[str]:
+    """Split streamed text into overlapping chunks of bounded token count.
+
+    A chunk's size is the sum of its sentences' token counts.
+
+    Args:
+        blocks: Consecutive pieces of the text (e.g. from read_blocks)
+        count_tokens: Token counter of the embedding model
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Maximum tokens repeated from the previous chunk
+
+    Yields:
+        Chunks with surrounding whitespace stripped
+
+    Raises:
+        ValueError: If the overlap is not smaller than the chunk size
+    """
+    if not 0 <= overlap_tokens < max_tokens:
+        msg = f"overlap_tokens must be in [0, {max_tokens}), got {overlap_tokens}"
+        raise ValueError(msg)
+    min_tokens = max_tokens // 2
+    window: deque[tuple[str, int]] = deque()
+    size = 0
+    # Whether the window holds text beyond the previous chunk's overlap
+    fresh = False
+    sentences = split_sentences(blocks, max_tokens * CHARS_PER_TOKEN_BOUND)
+    for sentence in sentences:
+        if not sentence.strip():
+            continue
+        for piece in _fit(sentence, count_tokens, max_tokens):
+            tokens = count_tokens(piece)
+            if size + tokens > max_tokens and fresh:
+                yield _join(window)
+                size = _keep_overlap(window, size, overlap_tokens)
+                fresh = False
+            while size + tokens > max_tokens:
+                size -= window.popleft()[1]
+            window.append((piece, tokens))
+            size += tokens
+            fresh = True
+            if size >= min_tokens and _is_cut(piece):
+                yield _join(window)
+                size = _keep_overlap(window, size, overlap_tokens)
+                fresh = False
+    if fresh:
+        yield _join(window)
+
+
+def _fit(sentence: str, count_tokens: TokenCounter, max_tokens: int) -> Iterator[str]:
+    """Split a sentence into pieces of at most ``max_tokens`` tokens."""
+    while count_tokens(sentence) > max_tokens:
+        # Longest prefix that fits; token counts grow with the prefix
+        low, high = 1, len(sentence) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(sentence[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        # Cut Latin text between words if that keeps most of the piece
+        space = sentence.rfind(" ", 0, low)
+        end = space + 1 if space > low // 2 else low
+        yield sentence[:end]
+        sentence = sentence[end:]
+    if sentence:
+        yield sentence
+
+
+def _is_cut(piece: str) -> bool:
+    if _PARAGRAPH_END.search(piece):
+        return True
+    return zlib.crc32(piece.strip().encode()) % CUT_DIVISOR == 0
+
+
+def _keep_overlap(window: deque[tuple[str, int]], size: int, overlap: int) -> int:
+    """Drop all but the trailing sentences that fit in ``overlap`` tokens."""
+    kept = 0
+    for _, tokens in reversed(window):
+        if kept + tokens > overlap:
+            break
+        kept += tokens
+    while size > kept:
+        size -= window.popleft()[1]
+    return size
+
+
+def _join(window: deque[tuple[str, int]]) -> str:
+    return "".join(piece for piece, _ in window).strip()
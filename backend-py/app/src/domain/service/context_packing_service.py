@@ -0,0 +1,123 @@
+"""Packing of retrieved texts into a token-bounded prompt context.
+
+Retrieved texts arrive closest first. They are packed in that order under a
+token budget, so a long text cannot crowd the context window or inflate
+the cost of a turn. A text that does not fit is cut after its last sentence
+that does, never mid-sentence. Texts that the conversation history already
+contains are skipped, since the model sees them there.
+"""
+
+import unicodedata
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from domain.service.chunking_service import TokenCounter, split_sentences
+
+# Separator between packed texts
+SEPARATOR = "\n"
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    """Outcome of packing retrieved texts."""
+
+    # Packed texts joined by SEPARATOR, or None if none was packed
+    text: str | None
+    tokens: int
+    # Tokens of all retrieved texts joined, before packing
+    candidate_tokens: int
+    # Texts packed whole and cut at a sentence end
+    packed: int
+    truncated: int
+    # Texts skipped as contained in the history (or in an earlier text)
+    covered: int
+    # Texts left out because not even their first sentence fit
+    over_budget: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens not sent compared to sending every retrieved text."""
+        # Joined texts can merge into fewer tokens than counted apart
+        return max(self.candidate_tokens - self.tokens, 0)
+
+
+def pack_context(
+    texts: Sequence[str],
+    count_tokens: TokenCounter,
+    *,
+    budget: int,
+    history: Iterable[str] = (),
+) -> PackedContext:
+    """Pack texts by relevance under a token budget.
+
+    Args:
+        texts: Retrieved texts, most relevant first
+        count_tokens: Token counter of the chat model
+        budget: Maximum tokens of the packed context
+        history: Texts already in the prompt (e.g. recent messages)
+
+    Returns:
+        The packed context with token and text counts
+    """
+    seen = "\0".join(_normalize(text) for text in history)
+    parts: list[str] = []
+    remaining = budget
+    candidate_tokens = truncated = covered = over_budget = 0
+    separator_tokens = count_tokens(SEPARATOR)
+    for text in texts:
+        stripped = text.strip()
+        if not stripped:
+            continue
+        tokens = count_tokens(stripped)
+        # As if every text were sent, separated like the packed ones
+        candidate_tokens += tokens + (separator_tokens if candidate_tokens else 0)
+        normalized = _normalize(stripped)
+        if normalized in seen:
+            covered += 1
+            continue
+        seen += "\0" + normalized
+        # Every text after the first is preceded by a separator
+        available = remaining - (separator_tokens if parts else 0)
+        if tokens <= available:
+            parts.append(stripped)
+            remaining = available - tokens
+            continue
+        prefix, prefix_tokens = _sentence_prefix(stripped, count_tokens, available)
+        if not prefix:
+            over_budget += 1
+            continue
+        parts.append(prefix)
+        truncated += 1
+        remaining = available - prefix_tokens
+    packed_text = SEPARATOR.join(parts) if parts else None
+    return PackedContext(
+        text=packed_text,
+        tokens=count_tokens(packed_text) if packed_text else 0,
+        candidate_tokens=candidate_tokens,
+        packed=len(parts) - truncated,
+        truncated=truncated,
+        covered=covered,
+        over_budget=over_budget,
+    )
+
+
+def _sentence_prefix(
+    text: str, count_tokens: TokenCounter, budget: int
+) -> tuple[str, int]:
+    """Take the leading sentences of a text that fit in ``budget`` tokens."""
+    kept: list[str] = []
+    tokens = 0
+    if budget > 0:
+        for sentence in split_sentences([text], max_chars=len(text)):
+            sentence_tokens = count_tokens(sentence)
+            if tokens + sentence_tokens > budget:
+                break
+            kept.append(sentence)
+            tokens += sentence_tokens
+    prefix = "".join(kept).strip()
+    return prefix, count_tokens(prefix) if prefix else 0
+
+
+def _normalize(text: str) -> str:
+    """Fold width, case and whitespace so a quoted text is still found."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
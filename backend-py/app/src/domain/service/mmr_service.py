@@ -0,0 +1,93 @@
+"""Max-marginal-relevance reranking of search results.
+
+MMR picks results one at a time, each maximizing
+
+    lambda_mult * sim(query, candidate)
+    - (1 - lambda_mult) * max(sim(candidate, picked) for picked in results)
+
+so near-identical candidates are not all returned. All similarities are
+computed up front as cosine similarity matrices, and the queries of a
+batch are reranked together: a pick is one array step over every query
+and candidate, and the only Python loop is over the ``k`` picks.
+
+numpy is imported on first use so the API workers do not load it at start.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import ArrayLike, NDArray
+
+# Weight of relevance against diversity (1 ranks by relevance only)
+LAMBDA_MULT = 0.5
+
+
+def max_marginal_relevance(
+    queries: "ArrayLike",
+    candidates: "ArrayLike",
+    k: int,
+    *,
+    lambda_mult: float = LAMBDA_MULT,
+    mask: "ArrayLike | None" = None,
+) -> "NDArray[np.intp]":
+    """Pick up to ``k`` relevant and diverse candidates per query.
+
+    Args:
+        queries: Query vectors, shape (queries, dimensions)
+        candidates: Candidate vectors per query, shape (queries, candidates,
+            dimensions); pad shorter candidate lists and mask the padding
+        k: Results per query
+        lambda_mult: Weight of relevance against diversity, in [0, 1]
+        mask: False for padding candidates, shape (queries, candidates)
+
+    Returns:
+        Candidate indices per query in pick order, shape (queries, k);
+        -1 where a query has fewer than ``k`` candidates
+
+    Raises:
+        ValueError: If lambda_mult is outside [0, 1]
+    """
+    import numpy as np  # noqa: PLC0415
+
+    if not 0 <= lambda_mult <= 1:
+        msg = f"lambda_mult must be in [0, 1], got {lambda_mult}"
+        raise ValueError(msg)
+    query_matrix = _normalize(np.asarray(queries, dtype=np.float32))
+    candidate_matrix = _normalize(np.asarray(candidates, dtype=np.float32))
+    count, width = candidate_matrix.shape[:2]
+    available = (
+        np.ones((count, width), dtype=bool)
+        if mask is None
+        else np.array(mask, dtype=bool)
+    )
+    picks = np.full((count, k), -1, dtype=np.intp)
+    if width == 0 or k == 0:
+        return picks
+    # Batched matrix products: (q, n, d) @ (q, d, 1) and (q, n, d) @ (q, d, n)
+    relevance = (candidate_matrix @ query_matrix[:, :, None])[:, :, 0]
+    pairwise = candidate_matrix @ candidate_matrix.transpose(0, 2, 1)
+    rows = np.arange(count)
+    # Similarity of each candidate to the closest result picked so far;
+    # nothing is picked yet, so the first pick is by relevance alone
+    redundancy = np.zeros((count, width), dtype=np.float32)
+    for step in range(min(k, width)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        pick = np.argmax(scores, axis=1)
+        found = available[rows, pick]
+        picks[found, step] = pick[found]
+        available[rows, pick] = False
+        similarity = pairwise[rows, pick]
+        redundancy = similarity if step == 0 else np.maximum(redundancy, similarity)
+    return picks
+
+
+def _normalize(vectors: "NDArray[np.float32]") -> "NDArray[np.float32]":
+    import numpy as np  # noqa: PLC0415
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    # Zero vectors (e.g. padding) stay zero
+    norms[norms == 0] = 1
+    normalized: NDArray[np.float32] = vectors / norms
+    return normalized
@@ -0,0 +1,346 @@
+"""Near-duplicate detection of texts with b-bit MinHash and LSH banding.
+
+A text's signature is a MinHash of its character 3-grams, so it needs no
+word segmentation and works for Japanese. Each of the PERMUTATIONS hash
+functions keeps only the low 8 bits of its minimum (b-bit MinHash), so a
+signature is 64 bytes. The share of equal bytes of two signatures,
+corrected for chance byte collisions, estimates the Jaccard similarity of
+the two texts' 3-gram sets.
+
+Candidates are found by LSH banding: the signature is cut into BANDS bands
+of BAND_ROWS bytes, and texts that agree on a whole band are compared.
+With 16 bands of 4 bytes, pairs with a Jaccard similarity of 0.7 become
+candidates with 98% probability and pairs below 0.3 almost never.
+Signatures are kept in NumPy arrays (64 bytes per row plus 8 bytes per row
+and band for the lookup tables).
+
+numpy and scipy are imported on first use so the API workers do not load
+them at start.
+"""
+
+import unicodedata
+from collections.abc import Iterable, Sequence
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+PERMUTATIONS = 64
+BANDS = 16
+BAND_ROWS = PERMUTATIONS // BANDS
+# Rows whose estimated 3-gram Jaccard similarity reaches this are
+# near-duplicates
+THRESHOLD = 0.8
+
+SHINGLE = 3
+# Neighbors compared in each band's sort order by find_duplicate_groups
+NEIGHBORS = 8
+
+# Chance that two unrelated minimums agree on their low 8 bits
+_BYTE_COLLISION = 1 / 256
+_SEED = 0x5EED
+# Odd multipliers of the 3-gram hash
+_SHINGLE_MULTIPLIERS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+)
+
+
+def minhash(text: str) -> bytes:
+    """Compute the b-bit MinHash signature of a text's character 3-grams.
+
+    Text is NFKC-normalized, lowercased and whitespace-collapsed first, so
+    width and spacing variants of a text have the same signature.
+
+    Args:
+        text: Text to sign
+
+    Returns:
+        PERMUTATIONS bytes (for a bytea column)
+    """
+    import numpy as np  # noqa: PLC0415
+
+    normalized = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32)
+    codes = codes.astype(np.uint64)
+    if len(codes) < SHINGLE:
+        codes = np.pad(codes, (0, SHINGLE - len(codes)))
+    count = len(codes) - SHINGLE + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset, multiplier in enumerate(_SHINGLE_MULTIPLIERS):
+        shingles ^= codes[offset : offset + count] * np.uint64(multiplier)
+    # One hash function per column; a repeated 3-gram counts once
+    hashed = _mix(np.unique(shingles)[:, None] ^ _permutation_seeds()[None, :])
+    signature: NDArray[np.uint8] = (hashed.min(axis=0) & np.uint64(0xFF)).astype(
+        np.uint8
+    )
+    return signature.tobytes()
+
+
+def minhashes(texts: Iterable[str]) -> "NDArray[np.uint8]":
+    """Compute the signatures of texts.
+
+    Args:
+        texts: Texts to sign
+
+    Returns:
+        One row of PERMUTATIONS bytes per text
+    """
+    return signature_matrix([minhash(text) for text in texts])
+
+
+def signature_matrix(signatures: Sequence[bytes]) -> "NDArray[np.uint8]":
+    """Stack stored signatures into a matrix.
+
+    Args:
+        signatures: Signatures as returned by minhash
+
+    Returns:
+        One row of PERMUTATIONS bytes per signature
+    """
+    import numpy as np  # noqa: PLC0415
+
+    matrix: NDArray[np.uint8] = np.frombuffer(
+        b"".join(signatures), dtype=np.uint8
+    ).reshape(len(signatures), PERMUTATIONS)
+    return matrix
+
+
+def similarity(
+    signatures: "NDArray[np.uint8]", others: "NDArray[np.uint8]"
+) -> "NDArray[np.float64]":
+    """Estimate the 3-gram Jaccard similarity of signature pairs.
+
+    Args:
+        signatures: Signature rows
+        others: Signature rows to compare with, row by row (or one row)
+
+    Returns:
+        Estimated similarity per row
+    """
+    import numpy as np  # noqa: PLC0415
+
+    equal = (signatures == others).mean(axis=-1)
+    estimate: NDArray[np.float64] = np.clip(
+        (equal - _BYTE_COLLISION) / (1 - _BYTE_COLLISION), 0, 1
+    )
+    return estimate
+
+
+def find_duplicate_groups(
+    signatures: "NDArray[np.uint8]",
+    scopes: "NDArray[np.int64] | None" = None,
+    threshold: float = THRESHOLD,
+) -> "NDArray[np.intp]":
+    """Group rows whose signatures are near-duplicates.
+
+    Rows are sorted by each band (then by the whole signature), and each
+    row is compared with its next NEIGHBORS rows that share the band; near
+    pairs are joined into connected components. Exact copies sort next to
+    each other, so any number of them form one group. Runs in O(n log n).
+
+    Args:
+        signatures: Signature row per row
+        scopes: Scope per row; only rows of the same scope are grouped
+            (e.g. one user's messages)
+        threshold: Estimated similarity from which rows are near-duplicates
+
+    Returns:
+        Group label per row; rows without near-duplicates have their own
+    """
+    import numpy as np  # noqa: PLC0415
+    from scipy.sparse import coo_array  # noqa: PLC0415
+    from scipy.sparse.csgraph import connected_components  # noqa: PLC0415
+
+    rows = len(signatures)
+    if rows == 0:
+        return np.zeros(0, dtype=np.intp)
+    if scopes is None:
+        scopes = np.zeros(rows, dtype=np.int64)
+    keys = _band_keys(signatures)
+    # Ties within a band are ordered by a hash of the whole signature, so
+    # exact copies are neighbors
+    columns = np.ascontiguousarray(signatures).view(np.uint64)
+    digest = np.zeros(rows, dtype=np.uint64)
+    for column in columns.T:
+        digest = _mix(digest ^ column)
+    sources: list[NDArray[np.intp]] = [np.array([], dtype=np.intp)]
+    targets: list[NDArray[np.intp]] = [np.array([], dtype=np.intp)]
+    for band in range(BANDS):
+        order = np.lexsort((digest, keys[:, band], scopes))
+        sorted_keys = keys[order, band]
+        sorted_scopes = scopes[order]
+        for offset in range(1, min(NEIGHBORS, rows - 1) + 1):
+            # Only rows sharing the bucket are compared in full
+            pairs = np.flatnonzero(
+                (sorted_keys[:-offset] == sorted_keys[offset:])
+                & (sorted_scopes[:-offset] == sorted_scopes[offset:])
+            )
+            source, target = order[pairs], order[pairs + offset]
+            near = similarity(signatures[source], signatures[target]) >= threshold
+            sources.append(source[near])
+            targets.append(target[near])
+    source = np.concatenate(sources)
+    target = np.concatenate(targets)
+    graph = coo_array(
+        (np.ones(len(source), dtype=np.int8), (source, target)), shape=(rows, rows)
+    )
+    labels: NDArray[np.intp]
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def duplicate_mask(labels: "NDArray[np.intp]") -> "NDArray[np.bool_]":
+    """Mark all rows of each group but the first.
+
+    Args:
+        labels: Group label per row (from find_duplicate_groups)
+
+    Returns:
+        True for the rows to drop as duplicates of an earlier row
+    """
+    import numpy as np  # noqa: PLC0415
+
+    _, first = np.unique(labels, return_index=True)
+    mask = np.ones(len(labels), dtype=bool)
+    mask[first] = False
+    return mask
+
+
+class NearDuplicateIndex:
+    """Lookup of near-duplicate signatures for ingestion.
+
+    Each band's keys are sorted once, so finding candidates is a binary
+    search per band. Signatures added later are kept in a small buffer that
+    is scanned in full and merged into the sorted tables when it fills up.
+    """
+
+    # Added signatures merged into the sorted tables at once
+    BUFFER_SIZE = 4096
+
+    def __init__(
+        self,
+        signatures: "NDArray[np.uint8]",
+        ids: Sequence[str],
+        threshold: float = THRESHOLD,
+    ) -> None:
+        """Build the index.
+
+        Args:
+            signatures: Signature row per row
+            ids: ID of each row, returned by find
+            threshold: Estimated similarity from which rows are
+                near-duplicates
+        """
+        import numpy as np  # noqa: PLC0415
+
+        self.threshold = threshold
+        self._ids = list(ids)
+        self._signatures = np.asarray(signatures, dtype=np.uint8).reshape(
+            -1, PERMUTATIONS
+        )
+        self._buffer: list[bytes] = []
+        self._sort()
+
+    def __len__(self) -> int:
+        """Number of indexed signatures."""
+        return len(self._ids)
+
+    def find(self, signature: bytes) -> str | None:
+        """Find the indexed signature most similar to one, if near enough.
+
+        Args:
+            signature: Signature as returned by minhash
+
+        Returns:
+            ID of the nearest near-duplicate, or None if there is none
+        """
+        import numpy as np  # noqa: PLC0415
+
+        query = signature_matrix([signature])
+        buckets = []
+        for band, key in enumerate(_band_keys(query)[0]):
+            # Searched with the table's own dtype, so the table is not copied
+            start = np.searchsorted(self._keys[band], key, side="left")
+            stop = np.searchsorted(self._keys[band], key, side="right")
+            buckets.append(self._orders[band][start:stop])
+        rows = np.unique(np.concatenate(buckets))
+        scores = similarity(self._signatures[rows], query)
+        if self._buffer:
+            # Few enough to compare in full
+            rows = np.concatenate(
+                [rows, len(self._signatures) + np.arange(len(self._buffer))]
+            )
+            scores = np.concatenate(
+                [scores, similarity(signature_matrix(self._buffer), query)]
+            )
+        if not len(rows):
+            return None
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self._ids[int(rows[best])]
+
+    def add(self, signature: bytes, id_: str) -> None:
+        """Index a signature.
+
+        Args:
+            signature: Signature as returned by minhash
+            id_: ID returned when the signature is found
+        """
+        import numpy as np  # noqa: PLC0415
+
+        self._buffer.append(signature)
+        self._ids.append(id_)
+        if len(self._buffer) >= self.BUFFER_SIZE:
+            self._signatures = np.concatenate(
+                [self._signatures, signature_matrix(self._buffer)]
+            )
+            self._buffer = []
+            self._sort()
+
+    def _sort(self) -> None:
+        import numpy as np  # noqa: PLC0415
+
+        keys = _band_keys(self._signatures)
+        self._orders: list[NDArray[np.int32]] = []
+        self._keys: list[NDArray[np.uint32]] = []
+        for band in range(BANDS):
+            order = np.argsort(keys[:, band], kind="stable").astype(np.int32)
+            self._orders.append(order)
+            self._keys.append(keys[order, band])
+
+
+def _band_keys(signatures: "NDArray[np.uint8]") -> "NDArray[np.uint32]":
+    """View each band of BAND_ROWS bytes as one integer key."""
+    import numpy as np  # noqa: PLC0415
+
+    keys: NDArray[np.uint32] = (
+        np.ascontiguousarray(signatures).view(np.uint32).reshape(-1, BANDS)
+    )
+    return keys
+
+
+@cache
+def _permutation_seeds() -> "NDArray[np.uint64]":
+    import numpy as np  # noqa: PLC0415
+
+    seeds: NDArray[np.uint64] = np.random.default_rng(_SEED).integers(
+        0, 2**64 - 1, size=PERMUTATIONS, dtype=np.uint64, endpoint=True
+    )
+    return seeds
+
+
+def _mix(hashes: "NDArray[np.uint64]") -> "NDArray[np.uint64]":
+    """Finalize hashes with splitmix64 so every bit depends on every input bit."""
+    import numpy as np  # noqa: PLC0415
+
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    mixed: NDArray[np.uint64] = hashes ^ (hashes >> np.uint64(31))
+    return mixed
@@ -0,0 +1,71 @@
+"""Fitting of linear dimensionality reductions for the embeddings.
+
+numpy is imported on first use so the API workers do not load it at start.
+"""
+
+from typing import TYPE_CHECKING
+
+from domain.entity.projection import ProjectionFit
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
+
+def fit_pca(sample: "ArrayLike", dimensions: int) -> ProjectionFit:
+    """Fit a PCA that keeps the sample's top principal components.
+
+    Args:
+        sample: Embeddings to fit on (more rows than ``dimensions``)
+        dimensions: Number of components to keep
+
+    Returns:
+        The fitted reduction
+
+    Raises:
+        ValueError: If the sample has too few rows
+    """
+    import numpy as np  # noqa: PLC0415
+
+    matrix = np.asarray(sample, dtype=np.float64)
+    if matrix.shape[0] <= dimensions:
+        msg = f"PCA needs more than {dimensions} sample rows, got {matrix.shape[0]}"
+        raise ValueError(msg)
+    mean = matrix.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(matrix - mean, full_matrices=False)
+    variances = singular_values**2
+    return ProjectionFit(
+        method="pca",
+        mean=mean.astype(np.float32),
+        components=components[:dimensions].astype(np.float32),
+        sample_size=matrix.shape[0],
+        explained_variance=float(variances[:dimensions].sum() / variances.sum()),
+    )
+
+
+def fit_random_projection(
+    source_dimensions: int, dimensions: int, seed: int | None = None
+) -> ProjectionFit:
+    """Draw a random orthonormal projection (needs no sample).
+
+    By the Johnson-Lindenstrauss lemma the projection roughly preserves
+    distances; it is the fallback while there is too little data for PCA.
+
+    Args:
+        source_dimensions: Dimensions of the embeddings
+        dimensions: Dimensions of the reduced vectors
+        seed: Random seed
+
+    Returns:
+        The drawn reduction
+    """
+    import numpy as np  # noqa: PLC0415
+
+    gaussian = np.random.default_rng(seed).normal(size=(source_dimensions, dimensions))
+    # Orthonormal columns, so no two reduced dimensions duplicate each other
+    basis, _ = np.linalg.qr(gaussian)
+    return ProjectionFit(
+        method="random",
+        mean=np.zeros(source_dimensions, dtype=np.float32),
+        components=basis.T.astype(np.float32),
+        sample_size=0,
+    )
@@ -0,0 +1,104 @@
+"""Layout of chat prompts for provider prompt caching.
+
+Providers cache the longest prompt prefix they have seen recently and bill
+cached tokens at a discount, so a prompt is laid out from its most stable
+part to its least stable one:
+
+1. the global system prompt (gateway.const.default_template)
+2. the virtual user's persona (VirtualUserProfiles)
+3. the conversation so far
+4. context retrieved for this turn
+5. the current message
+
+The first two make up the system message, which is compiled once per
+persona and reused verbatim. OpenAIGateway sends each earlier message of the
+conversation as a message of its own, and the context and current message
+last. ChatUseCase moves the start of the history by whole blocks of
+messages (CHAT_HISTORY_BLOCK), so until it moves, a turn's prompt begins
+with all messages but the last of the previous turn's prompt.
+
+OpenAI only caches prompts of 1024 tokens or more, in steps of 128 tokens.
+The system message alone is usually shorter, so a prompt is served from the
+cache once the system message and history together pass 1024 tokens. With
+the default history budget (CHAT_HISTORY_TOKENS=2000) that happens after a
+few turns. llm_prompt_tokens_total{cache="cached"} shows whether it does.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Self
+
+from domain.entity.models import VirtualUserProfiles
+from gateway.const.default_template import DEFAULT_SYSTEM_MESSAGE
+
+# Personas whose compiled prefix is kept per worker
+PREFIX_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Persona:
+    """What a virtual user says about itself in the system prompt."""
+
+    name: str
+    personality: str = ""
+    tone: str = ""
+    knowledge_area: tuple[str, ...] = ()
+    backstory: str = ""
+    quirks: str = ""
+
+    @classmethod
+    def from_profile(cls, name: str, profile: VirtualUserProfiles | None) -> Self:
+        """Build the persona of a virtual user.
+
+        Args:
+            name: Virtual user's name
+            profile: Virtual user's profile, if it has one
+
+        Returns:
+            Persona (the name only without a profile)
+        """
+        if profile is None:
+            return cls(name=name)
+        return cls(
+            name=name,
+            personality=profile.personality,
+            tone=profile.tone,
+            knowledge_area=tuple(profile.knowledge_area),
+            backstory=profile.backstory,
+            quirks=profile.quirks or "",
+        )
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """System message shared by every turn with a persona."""
+
+    system_prompt: str
+    # Same for equal prefixes; the provider routes requests by it so that
+    # they reach the machine holding the cached prefix
+    cache_key: str
+
+
+@lru_cache(maxsize=PREFIX_CACHE_SIZE)
+def compile_prefix(persona: Persona) -> PromptPrefix:
+    """Compile the system message of a persona.
+
+    Args:
+        persona: Virtual user's persona
+
+    Returns:
+        The global system prompt followed by the persona
+    """
+    lines = [f"あなたの名前は「{persona.name}」です。"]
+    fields = (
+        ("性格", persona.personality),
+        ("口調", persona.tone),
+        ("得意分野", "、".join(persona.knowledge_area)),
+        ("経歴", persona.backstory),
+        ("癖", persona.quirks),
+    )
+    lines.extend(f"{label}: {value}" for label, value in fields if value)
+    system_prompt = f"{DEFAULT_SYSTEM_MESSAGE}\n\n" + "\n".join(lines)
+    digest = hashlib.sha256(system_prompt.encode()).hexdigest()
+    return PromptPrefix(system_prompt=system_prompt, cache_key=f"chat:{digest[:32]}")
@@ -1,7 +1,16 @@
+from collections.abc import Sequence
+from typing import TypeVar
+
 from pydantic import BaseModel
 
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
 from gateway.llm_gateway import LLMGateway
+from gateway.openai_gateway import OpenAIGateway
 from gateway.vectorstore_gateway import VectorStoreGateway
+from infra.db_client import dispose_engine, session_scope
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
 class RAGService:
@@ -13,54 +22,89 @@ class RAGService:
         self.llm_gateway = llm_gateway
         self.vector_store_gateway = vector_store_gateway
 
-    def generate_text_from_rag(self, prompt: str) -> str:
-        """LLMモデルを使用してRAGからレスポンスを生成します。."""
+    def generate_text_from_rag(self, prompt: str, user_id: str | None = None) -> str:
+        """LLMモデルを使用してRAGからレスポンスを生成します。.
+
+        user_idを省略すると、ユーザーに属さない共有の文書だけを検索します。
+        """
         response: str = self.llm_gateway.generate_text_from_rag(
             prompt,
-            self.vector_store_gateway.as_retriever(),
+            self.vector_store_gateway.as_retriever(user_id=user_id),
         )
         return response
 
+    def generate_texts_from_rag(
+        self, prompts: Sequence[str], user_id: str | None = None
+    ) -> list[str]:
+        """複数のプロンプトへのレスポンスを1回の検索でまとめて生成します。."""
+        return self.llm_gateway.generate_texts_from_rag(
+            prompts,
+            self.vector_store_gateway.as_retriever(user_id=user_id),
+        )
+
     def generate_model_from_rag(
         self,
         prompt: str,
-        pydantic_model: type[BaseModel],
-    ) -> BaseModel:
+        pydantic_model: type[ModelT],
+        user_id: str | None = None,
+    ) -> ModelT:
         """LLMモデルを使用してRAGから構造化されたレスポンスを生成します。."""
-        result: BaseModel = self.llm_gateway.generate_model_from_rag(
+        result: ModelT = self.llm_gateway.generate_model_from_rag(
             prompt,
             pydantic_model,
-            self.vector_store_gateway.as_retriever(),
+            self.vector_store_gateway.as_retriever(user_id=user_id),
         )
 
         return result
 
+    def generate_models_from_rag(
+        self,
+        prompts: Sequence[str],
+        pydantic_model: type[ModelT],
+        user_id: str | None = None,
+    ) -> list[ModelT]:
+        """複数のプロンプトへの構造化されたレスポンスを1回の検索でまとめて生成します。."""
+        return self.llm_gateway.generate_models_from_rag(
+            prompts,
+            pydantic_model,
+            self.vector_store_gateway.as_retriever(user_id=user_id),
+        )
+
 
 def main() -> None:
     """Main function for testing RAG service."""
-    table_name = "embeddings"
-    query_name = "match_documents"
-
-    llm_gateway = LLMGateway()
+    openai_gateway = OpenAIGateway()
+    llm_gateway = LLMGateway(openai_gateway)
     vector_store_gateway = VectorStoreGateway(
-        table_name=table_name,
-        query_name=query_name,
+        embeddings_gateway=EmbeddingsGateway(),
+        openai_gateway=openai_gateway,
+        session_factory=session_scope,
+        projection_gateway=EmbeddingProjectionGateway(),
     )
 
     rag_service = RAGService(llm_gateway, vector_store_gateway)
 
-    # Add some example texts to the vector store
-    vector_store_gateway.add_texts(
-        texts=["This is a sample text", "Another example document"],
-        user_id="user1",
-    )
+    try:
+        # Add some example texts to the vector store
+        vector_store_gateway.add_texts(
+            texts=["This is a sample text", "Another example document"],
+            user_id="user1",
+        )
 
-    prompt = "こんにちはお元気ですか?"
-    llm_gateway.generate_text(prompt, "AIの返答")
+        prompt = "こんにちはお元気ですか?"
+        llm_gateway.generate_text(prompt, "AIの返答")
 
-    rag_service.generate_text_from_rag(
-        "サンプルテキストを教えてください。",
-    )
+        rag_service.generate_text_from_rag(
+            "サンプルテキストを教えてください。",
+            user_id="user1",
+        )
+        rag_service.generate_texts_from_rag(
+            ["サンプルテキストは何ですか?", "例となる文書は何ですか?"],
+            user_id="user1",
+        )
+    finally:
+        openai_gateway.close()
+        dispose_engine()
 
 
 if __name__ == "__main__":
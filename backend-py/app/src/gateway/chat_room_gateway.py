@@ -1,10 +1,12 @@
 from uuid import UUID
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
 from domain.entity.models import ChatRooms, UserChats
+from util.tracing import trace_methods
 
 
+@trace_methods("gateway.ChatRoomGateway")
 class ChatRoomGateway:
     def create(
         self,
@@ -32,6 +34,39 @@ class ChatRoomGateway:
         statement = select(ChatRooms).where(ChatRooms.id == chat_room_id)
         return session.exec(statement).first()
 
+    def get_by_user_id(
+        self,
+        user_id: UUID,
+        limit: int,
+        session: Session,
+    ) -> list[ChatRooms]:
+        """Get the chat rooms the user belongs to, newest first."""
+        statement = (
+            select(ChatRooms)
+            .join(UserChats, col(UserChats.chat_room_id) == ChatRooms.id)
+            .where(UserChats.user_id == user_id)
+            .order_by(col(ChatRooms.id).desc())
+            .limit(limit)
+        )
+        return list(session.exec(statement).all())
+
+    def is_member(
+        self,
+        chat_room_id: int,
+        user_id: UUID,
+        session: Session,
+    ) -> bool:
+        """Check whether the user belongs to the chat room."""
+        statement = (
+            select(UserChats.id)
+            .where(
+                UserChats.chat_room_id == chat_room_id,
+                UserChats.user_id == user_id,
+            )
+            .limit(1)
+        )
+        return session.exec(statement).first() is not None
+
     def update(
         self,
         chat_room_id: int,
@@ -5,16 +5,18 @@ from sqlmodel import Session, select
 from domain.entity.models import Users
 from domain.exceptions import AuthenticationError
 from infra.supabase_client import SupabaseClient
+from util.tracing import trace_methods
 
 
+@trace_methods("gateway.CurrentUserGateway")
 class CurrentUserGateway:
-    def __init__(self, access_token: str | None = None) -> None:
-        """Initialize the gateway with the Supabase client."""
-        self.supabase_client = SupabaseClient(access_token)
+    def __init__(self, supabase_client: SupabaseClient) -> None:
+        """Initialize the gateway with the shared Supabase client."""
+        self.supabase_client = supabase_client
 
-    def get_current_user(self, session: Session) -> Users | None:
-        """Get the current user from the database."""
-        user = self.supabase_client.get_user()
+    def get_current_user(self, access_token: str, session: Session) -> Users | None:
+        """Get the user of the access token from the database."""
+        user = self.supabase_client.get_user(access_token)
         if user is None:
             msg = "User not found"
             raise AuthenticationError(msg)
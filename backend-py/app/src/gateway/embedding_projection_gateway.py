@@ -0,0 +1,181 @@
+"""Embedding Projection Gateway for versioned dimensionality reductions."""
+
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, col, select
+
+from domain.entity.models import EmbeddingProjections
+from domain.entity.projection import (
+    REDUCTION_SLOTS,
+    EmbeddingProjection,
+    ProjectionFit,
+)
+from util.tracing import trace_methods
+
+# Matrices are stored as little-endian float32
+MATRIX_DTYPE = "<f4"
+
+
+@trace_methods("gateway.EmbeddingProjectionGateway")
+class EmbeddingProjectionGateway:
+    """Gateway for the embedding_projections table.
+
+    A version's matrix is never updated, so loaded projections are cached
+    by version for the lifetime of the gateway. At most one version is
+    active, i.e. used to reduce queries. Each version is written to one of
+    REDUCTION_SLOTS, and a new version never takes the active one's slot.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the gateway with an empty projection cache."""
+        self._cache: dict[int, EmbeddingProjection] = {}
+
+    def create(self, fit: ProjectionFit, session: Session) -> int:
+        """Store a fitted reduction as a new, inactive version.
+
+        The version gets the slot the active version does not use, so the
+        active version's reduced vectors stay searchable while the new
+        version's are written. Flushes to assign the version, without
+        committing.
+
+        Args:
+            fit: Fitted reduction
+            session: Database session
+
+        Returns:
+            Version of the stored projection
+        """
+        dimensions, source_dimensions = fit.components.shape
+        active_slot = session.exec(
+            select(EmbeddingProjections.slot).where(col(EmbeddingProjections.active))
+        ).first()
+        row = EmbeddingProjections(
+            method=fit.method,
+            source_dimensions=source_dimensions,
+            dimensions=dimensions,
+            sample_size=fit.sample_size,
+            explained_variance=fit.explained_variance,
+            mean=fit.mean.astype(MATRIX_DTYPE).tobytes(),
+            components=fit.components.astype(MATRIX_DTYPE).tobytes(),
+            slot=next(slot for slot in REDUCTION_SLOTS if slot != active_slot),
+        )
+        session.add(row)
+        session.flush()
+        return row.version
+
+    def get(self, version: int, session: Session) -> EmbeddingProjection | None:
+        """Get a projection by version.
+
+        Args:
+            version: Projection version
+            session: Database session
+
+        Returns:
+            The projection, or None if the version does not exist
+        """
+        if version in self._cache:
+            return self._cache[version]
+        row = session.get(EmbeddingProjections, version)
+        if row is None:
+            return None
+        import numpy as np  # noqa: PLC0415
+
+        projection = EmbeddingProjection(
+            version=row.version,
+            method=row.method,
+            mean=np.frombuffer(row.mean, dtype=MATRIX_DTYPE),
+            components=np.frombuffer(row.components, dtype=MATRIX_DTYPE).reshape(
+                row.dimensions, row.source_dimensions
+            ),
+            slot=row.slot,
+        )
+        self._cache[version] = projection
+        return projection
+
+    def get_active(self, session: Session) -> EmbeddingProjection | None:
+        """Get the projection used to reduce queries.
+
+        Only the version is queried unless the projection is not cached.
+
+        Args:
+            session: Database session
+
+        Returns:
+            The active projection, or None if there is none
+        """
+        statement = select(EmbeddingProjections.version).where(
+            col(EmbeddingProjections.active)
+        )
+        version = session.exec(statement).first()
+        return None if version is None else self.get(version, session)
+
+    def get_latest(self, session: Session) -> EmbeddingProjection | None:
+        """Get the newest projection, active or not.
+
+        Reprojection for an older version stops once a newer one exists.
+
+        Args:
+            session: Database session
+
+        Returns:
+            The newest projection, or None if there is none
+        """
+        statement = select(func.max(EmbeddingProjections.version))
+        version = session.exec(statement).one()
+        return None if version is None else self.get(version, session)
+
+    def get_current(self, session: Session) -> list[EmbeddingProjection]:
+        """Get the projections new embeddings are reduced with.
+
+        These are the active version and a newer version being reprojected,
+        if any, so new embeddings stay searchable before and after the
+        newer version is activated.
+
+        Args:
+            session: Database session
+
+        Returns:
+            The current projections, oldest first
+        """
+        newest = select(func.max(EmbeddingProjections.version)).scalar_subquery()
+        statement = (
+            select(EmbeddingProjections.version)
+            .where(
+                or_(
+                    col(EmbeddingProjections.active),
+                    col(EmbeddingProjections.version) == newest,
+                )
+            )
+            .order_by(col(EmbeddingProjections.version))
+        )
+        projections = (
+            self.get(version, session) for version in session.exec(statement).all()
+        )
+        return [projection for projection in projections if projection is not None]
+
+    def activate(self, version: int, session: Session) -> None:
+        """Make a version the active one without committing.
+
+        Args:
+            version: Projection version
+            session: Database session
+        """
+        # Unique indexes are checked row by row, so the old version is
+        # deactivated first
+        session.exec(
+            update(EmbeddingProjections)
+            .where(
+                col(EmbeddingProjections.active),
+                col(EmbeddingProjections.version) != version,
+            )
+            .values(active=False)
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(
+            update(EmbeddingProjections)
+            .where(
+                col(EmbeddingProjections.version) == version,
+                ~col(EmbeddingProjections.active),
+            )
+            .values(active=True, activated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
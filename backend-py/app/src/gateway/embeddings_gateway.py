@@ -1,10 +1,59 @@
 """Embeddings Gateway for vector search."""
 
-from sqlmodel import Session, func, select
+from collections.abc import Collection, Sequence
+from typing import Any
+
+from pgvector.sqlalchemy import VECTOR
+from sqlalchemy import (
+    Float,
+    Integer,
+    LargeBinary,
+    Text,
+    cast,
+    column,
+    delete,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, func, select
 
 from domain.entity.models import Embeddings
+from domain.entity.projection import (
+    REDUCED_DIMENSIONS,
+    REDUCTION_SLOTS,
+    EmbeddingProjection,
+)
+from infra.db_routing import read_only
+from util.tracing import trace_methods
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Candidates taken from the binary-quantized index per requested result;
+# 1-bit codes lose the magnitudes, so the shortlist must be generous
+RERANK_FACTOR = 10
+MIN_CANDIDATES = 100
+
+# pgvector distance operators, for the nullable columns that the generated
+# model does not type as vectors
+COSINE_DISTANCE = "<=>"
+HAMMING_DISTANCE = "<~>"
+
+# Sources of embeddings that may be shared between users; message
+# embeddings hold a user's private conversations
+SHARED_SOURCES = ("document", "text")
+
+
+def _reduced_column(slot: str) -> Any:  # noqa: ANN401
+    return col(getattr(Embeddings, f"embedding_reduced_{slot}"))
 
 
+def _version_column(slot: str) -> Any:  # noqa: ANN401
+    return col(getattr(Embeddings, f"reduction_version_{slot}"))
+
+
+@trace_methods("gateway.EmbeddingsGateway")
 class EmbeddingsGateway:
     """Gateway for embeddings operations."""
 
@@ -25,28 +74,386 @@ class EmbeddingsGateway:
         )
         return session.exec(statement).one()
 
-    def search_similar(
+    def search_similar(  # noqa: PLR0913
         self,
-        _query: str,
+        query_embedding: Sequence[float],
         limit: int,
         session: Session,
+        user_id: str | None = None,
+        *,
+        candidates: int | None = None,
+        exact: bool = False,
+        projection: EmbeddingProjection | None = None,
+        shared: bool = False,
     ) -> list[Embeddings]:
-        """Search for similar embeddings.
+        """Search for the embeddings closest to a query by cosine distance.
+
+        Runs in two stages: candidates are taken from a compact HNSW-indexed
+        copy of each embedding, and only the candidates' float vectors are
+        read to rerank them exactly. The copy is the embedding reduced by
+        ``projection``, in its slot, if a projection is given, and
+        embedding_bit (1 bit per dimension) otherwise. See
+        benchmarks/vector_search.py for recall and latency against the
+        exact search. Runs on a read replica if the session has one and has
+        not written yet.
 
         Args:
-            query: Search query
+            query_embedding: Embedding of the search query
             limit: Maximum number of results
             session: Database session
+            user_id: Only search this user's embeddings (e.g. their past
+                conversations); all embeddings if omitted
+            candidates: Candidates to rerank (default: RERANK_FACTOR times
+                ``limit``, at least MIN_CANDIDATES)
+            exact: Compare the query with every float vector instead
+            projection: Reduction to shortlist with; only embeddings reduced
+                by the same version are searched
+            shared: Without ``user_id``, only search embeddings of
+                SHARED_SOURCES that no user owns
 
         Returns:
-            List of similar embeddings
+            List of similar embeddings, closest first
         """
-        # Simplified implementation - in production, you would:
-        # 1. Generate embedding for query using OpenAI embeddings API
-        # 2. Use pgvector similarity search
-        # For now, just return the most recent embeddings
-        statement = select(Embeddings).limit(limit)
-        return list(session.exec(statement).all())
+        filters = []
+        if user_id is not None:
+            filters.append(Embeddings.metadata_["user_id"].astext == user_id)
+        elif shared:
+            filters.append(Embeddings.metadata_["source"].astext.in_(SHARED_SOURCES))
+            filters.append(Embeddings.metadata_["user_id"].astext.is_(None))
+        distance = Embeddings.embedding.cosine_distance(query_embedding)
+        if exact:
+            statement = select(Embeddings).where(*filters)
+            statement = read_only(statement.order_by(distance).limit(limit))
+            return list(session.exec(statement).all())
+
+        if candidates is None:
+            candidates = max(limit * RERANK_FACTOR, MIN_CANDIDATES)
+        # An HNSW scan returns at most ef_search rows, before the filters. An
+        # iterative scan (pgvector 0.8+) goes on searching the index until
+        # enough rows pass them, so a user owning few rows still gets
+        # candidates; relaxed order suffices as they are reranked. Set on
+        # the connection the search runs on.
+        session.exec(
+            read_only(
+                select(
+                    func.set_config("hnsw.ef_search", str(candidates), true()),
+                    func.set_config("hnsw.iterative_scan", "relaxed_order", true()),
+                )
+            )
+        )
+        if projection is not None:
+            reduced_query = projection.project([query_embedding])[0].tolist()
+            filters.append(_version_column(projection.slot) == projection.version)
+            shortlist_distance = _reduced_column(projection.slot).op(
+                COSINE_DISTANCE, return_type=Float
+            )(reduced_query)
+        else:
+            query_bits = func.binary_quantize(
+                cast(query_embedding, VECTOR(EMBEDDING_DIMENSIONS))
+            )
+            shortlist_distance = col(Embeddings.embedding_bit).op(
+                HAMMING_DISTANCE, return_type=Float
+            )(query_bits)
+        shortlist = (
+            select(Embeddings.id)
+            .where(*filters)
+            .order_by(shortlist_distance)
+            .limit(candidates)
+            .subquery()
+        )
+        statement = (
+            select(Embeddings)
+            .join(shortlist, col(Embeddings.id) == shortlist.c.id)
+            .order_by(distance)
+            .limit(limit)
+        )
+        return list(session.exec(read_only(statement)).all())
+
+    def sample_embeddings(self, limit: int, session: Session) -> list[list[float]]:
+        """Get the vectors of randomly chosen embeddings.
+
+        Args:
+            limit: Maximum number of vectors
+            session: Database session
+
+        Returns:
+            Embedding vectors
+        """
+        statement = select(Embeddings.embedding).order_by(func.random()).limit(limit)
+        return [vector.tolist() for vector in session.exec(statement).all()]
+
+    def get_unreduced(
+        self, projection: EmbeddingProjection, limit: int, session: Session
+    ) -> list[tuple[str, list[float]]]:
+        """Get embeddings not reduced by a projection version yet.
+
+        Args:
+            projection: Projection version
+            limit: Maximum number of embeddings
+            session: Database session
+
+        Returns:
+            ID and vector of each embedding, in ID order
+        """
+        statement = (
+            select(Embeddings.id, Embeddings.embedding)
+            .where(
+                _version_column(projection.slot).is_distinct_from(projection.version)
+            )
+            .order_by(col(Embeddings.id))
+            .limit(limit)
+        )
+        return [(id_, embedding.tolist()) for id_, embedding in session.exec(statement)]
+
+    def set_reduced(
+        self,
+        reduced: Sequence[tuple[str, Sequence[float]]],
+        projection: EmbeddingProjection,
+        session: Session,
+    ) -> None:
+        """Store reduced vectors in one statement without committing.
+
+        Only the projection's slot is written; the other slot keeps the
+        vectors of the version searched meanwhile.
+
+        Args:
+            reduced: ID and reduced vector of each embedding
+            projection: Projection version the vectors were reduced by
+            session: Database session
+        """
+        if not reduced:
+            return
+        rows = values(
+            column("id", Text),
+            column("reduced", VECTOR(REDUCED_DIMENSIONS)),
+            column("version", Integer),
+            name="reduced",
+        ).data([(id_, list(vector), projection.version) for id_, vector in reduced])
+        statement = (
+            update(Embeddings)
+            .where(col(Embeddings.id) == rows.c.id)
+            .values(
+                {
+                    # VALUES parameters are untyped and would be read as text
+                    _reduced_column(projection.slot): cast(
+                        rows.c.reduced, VECTOR(REDUCED_DIMENSIONS)
+                    ),
+                    _version_column(projection.slot): rows.c.version,
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(statement)
+
+    def get_signatures(
+        self,
+        session: Session,
+        *,
+        source: str | None = None,
+        exclude_document_id: str | None = None,
+    ) -> list[tuple[str, str | None, bytes]]:
+        """Get the near-duplicate signatures of embeddings, oldest first.
+
+        Embeddings without a signature are left out.
+
+        Args:
+            session: Database session
+            source: Only embeddings with this metadata source (e.g. "document")
+            exclude_document_id: Leave out this document's chunks
+
+        Returns:
+            ID, metadata user_id and signature of each embedding
+        """
+        filters = [col(Embeddings.content_minhash).is_not(None)]
+        if source is not None:
+            filters.append(Embeddings.metadata_["source"].astext == source)
+        if exclude_document_id is not None:
+            filters.append(
+                Embeddings.metadata_["document_id"].astext.is_distinct_from(
+                    exclude_document_id
+                )
+            )
+        statement = (
+            select(
+                Embeddings.id,
+                Embeddings.metadata_["user_id"].astext,
+                Embeddings.content_minhash,
+            )
+            .where(*filters)
+            .order_by(col(Embeddings.created_at), col(Embeddings.id))
+        )
+        # psycopg2 returns bytea as memoryview; the filter excludes NULL
+        return [
+            (id_, user_id, bytes(signature))  # type: ignore[arg-type]
+            for id_, user_id, signature in session.exec(statement)
+        ]
+
+    def get_unsigned(self, limit: int, session: Session) -> list[tuple[str, str]]:
+        """Get embeddings without a near-duplicate signature.
+
+        Args:
+            limit: Maximum number of embeddings
+            session: Database session
+
+        Returns:
+            ID and content of each embedding, in ID order
+        """
+        statement = (
+            select(Embeddings.id, Embeddings.content)
+            .where(col(Embeddings.content_minhash).is_(None))
+            .order_by(col(Embeddings.id))
+            .limit(limit)
+        )
+        return [(id_, content) for id_, content in session.exec(statement)]
+
+    def set_signatures(
+        self, signatures: Sequence[tuple[str, bytes]], session: Session
+    ) -> None:
+        """Store near-duplicate signatures in one statement without committing.
+
+        Args:
+            signatures: ID and signature of each embedding
+            session: Database session
+        """
+        if not signatures:
+            return
+        rows = values(
+            column("id", Text),
+            column("signature", LargeBinary),
+            name="signatures",
+        ).data(list(signatures))
+        statement = (
+            update(Embeddings)
+            .where(col(Embeddings.id) == rows.c.id)
+            .values(content_minhash=rows.c.signature)
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(statement)
+
+    def delete_by_ids(self, ids: Sequence[str], session: Session) -> int:
+        """Delete embeddings without committing.
+
+        Args:
+            ids: Embedding IDs
+            session: Database session
+
+        Returns:
+            Number of deleted embeddings
+        """
+        statement = (
+            delete(Embeddings)
+            .where(col(Embeddings.id).in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        result = session.exec(statement)
+        return result.rowcount
+
+    def get_content_hashes(
+        self, ids: Sequence[str], session: Session
+    ) -> dict[str, str | None]:
+        """Get the content hashes stored with embeddings.
+
+        Args:
+            ids: Embedding IDs
+            session: Database session
+
+        Returns:
+            Content hash by ID, for the IDs that exist
+        """
+        statement = select(
+            Embeddings.id, Embeddings.metadata_["content_hash"].astext
+        ).where(col(Embeddings.id).in_(ids))
+        return dict(session.exec(statement).all())
+
+    def delete_document_chunks(
+        self, document_id: str, keep_ids: Collection[str], session: Session
+    ) -> int:
+        """Delete a document's chunks except the given ones without committing.
+
+        Args:
+            document_id: Document whose chunks to delete
+            keep_ids: Embedding IDs of the chunks to keep
+            session: Database session
+
+        Returns:
+            Number of deleted chunks
+        """
+        statement = (
+            delete(Embeddings)
+            .where(
+                Embeddings.metadata_["document_id"].astext == document_id,
+                col(Embeddings.id).not_in(list(keep_ids)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = session.exec(statement)
+        return result.rowcount
+
+    def reduced_columns(
+        self,
+        vectors: Sequence[Sequence[float]],
+        projections: Sequence[EmbeddingProjection],
+    ) -> list[dict[str, Any]]:
+        """Reduce embeddings into the columns of every slot.
+
+        Args:
+            vectors: Embedding vectors
+            projections: Projections to reduce with, at most one per slot
+                (see EmbeddingProjectionGateway.get_current)
+
+        Returns:
+            Per vector, the reduced vector and version of each slot (None
+            for slots without a projection), to add to its upsert row
+        """
+        columns: list[dict[str, Any]] = [
+            {
+                f"{prefix}_{slot}": None
+                for slot in REDUCTION_SLOTS
+                for prefix in ("embedding_reduced", "reduction_version")
+            }
+            for _ in vectors
+        ]
+        if not vectors:
+            return columns
+        for projection in projections:
+            reduced = projection.project(vectors).tolist()
+            for row, reduced_vector in zip(columns, reduced, strict=True):
+                row[f"embedding_reduced_{projection.slot}"] = reduced_vector
+                row[f"reduction_version_{projection.slot}"] = projection.version
+        return columns
+
+    def upsert(self, rows: Sequence[dict[str, Any]], session: Session) -> None:
+        """Insert or replace embeddings in one statement without committing.
+
+        Args:
+            rows: Rows with id, embedding, content and metadata_, and
+                optionally content_minhash and the columns of
+                reduced_columns
+            session: Database session
+        """
+        if not rows:
+            return
+        statement = insert(Embeddings).values(list(rows))
+        statement = statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                "embedding": statement.excluded.embedding,
+                "content": statement.excluded.content,
+                "metadata": statement.excluded["metadata"],
+                # A changed embedding's old reductions are stale
+                **{
+                    name: statement.excluded[name]
+                    for slot in REDUCTION_SLOTS
+                    for name in (
+                        f"embedding_reduced_{slot}",
+                        f"reduction_version_{slot}",
+                    )
+                },
+                "content_minhash": statement.excluded.content_minhash,
+                "updated_at": func.now(),
+            },
+        )
+        session.exec(statement)
 
     def get_all(self, session: Session) -> list[Embeddings]:
         """Get all embeddings.
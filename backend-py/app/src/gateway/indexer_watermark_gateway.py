@@ -0,0 +1,85 @@
+"""Indexer Watermark Gateway for incremental indexers."""
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, select
+
+from domain.entity.memory import IndexerPosition
+from domain.entity.models import IndexerWatermarks
+from util.tracing import trace_methods
+
+
+@trace_methods("gateway.IndexerWatermarkGateway")
+class IndexerWatermarkGateway:
+    """Gateway for the indexer_watermarks table.
+
+    Indexers read the watermark without a lock, do their slow work outside
+    any transaction, then lock the row to store their results and advance
+    it, so only one indexer process advances it at a time.
+    """
+
+    def get(self, name: str, session: Session) -> IndexerPosition:
+        """Read the indexer's watermark without locking it.
+
+        Args:
+            name: Indexer name
+            session: Database session
+
+        Returns:
+            Position indexed so far (the start if the watermark is missing)
+        """
+        statement = select(IndexerWatermarks.xact_id, IndexerWatermarks.position).where(
+            IndexerWatermarks.name == name
+        )
+        row = session.exec(statement).first()
+        if row is None:
+            return IndexerPosition()
+        return IndexerPosition(xact_id=row[0], id=row[1])
+
+    def lock(self, name: str, session: Session) -> IndexerPosition | None:
+        """Lock the indexer's watermark without waiting.
+
+        Creates the watermark at the start on first use. The lock is held
+        until the session commits or rolls back.
+
+        Args:
+            name: Indexer name
+            session: Database session of the indexing transaction
+
+        Returns:
+            Position indexed so far, or None if another indexer holds the lock
+        """
+        session.exec(
+            insert(IndexerWatermarks)
+            .values(name=name)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        statement = (
+            select(IndexerWatermarks.xact_id, IndexerWatermarks.position)
+            .where(IndexerWatermarks.name == name)
+            .with_for_update(skip_locked=True)
+        )
+        row = session.exec(statement).first()
+        if row is None:
+            return None
+        return IndexerPosition(xact_id=row[0], id=row[1])
+
+    def advance(self, name: str, position: IndexerPosition, session: Session) -> None:
+        """Move a locked watermark forward without committing.
+
+        Args:
+            name: Indexer name
+            position: New position
+            session: Database session holding the lock
+        """
+        statement = (
+            update(IndexerWatermarks)
+            .where(col(IndexerWatermarks.name) == name)
+            .values(
+                xact_id=position.xact_id,
+                position=position.id,
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(statement)
@@ -0,0 +1,241 @@
+"""Job Gateway for the Postgres-backed background job queue."""
+
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlmodel import Session, col, select
+
+from domain.entity.job import ClaimedJob
+from domain.entity.models import Jobs
+from util.tracing import trace_methods
+
+# Channel notified by the jobs_notify trigger (post-migration/02_jobs.sql)
+NOTIFY_CHANNEL = "jobs"
+
+# last_error is truncated so a huge traceback cannot bloat the row
+MAX_ERROR_LENGTH = 4000
+
+
+@trace_methods("gateway.JobGateway")
+class JobGateway:
+    """Gateway for the jobs table.
+
+    Workers claim due jobs with ``FOR UPDATE SKIP LOCKED`` and lease them
+    until a visibility timeout. Updates after the claim are fenced on the
+    attempt number, so a worker whose lease expired and whose job was
+    reclaimed cannot overwrite the new attempt's outcome.
+    """
+
+    def enqueue(  # noqa: PLR0913
+        self,
+        kind: str,
+        payload: dict[str, Any],
+        session: Session,
+        *,
+        queue: str = "default",
+        delay: timedelta | None = None,
+        max_attempts: int = 5,
+    ) -> Jobs:
+        """Add a job to the session without committing.
+
+        The job is committed, and workers are notified, together with the
+        caller's next commit, so it runs only if the domain write it belongs
+        to is committed.
+
+        Args:
+            kind: Name of the handler to run
+            payload: JSON arguments of the handler
+            session: Database session of the domain write
+            queue: Queue the job is claimed from
+            delay: Run the job no earlier than this from now
+            max_attempts: Attempts before the job is marked failed
+
+        Returns:
+            The pending job
+        """
+        job = Jobs(
+            queue=queue,
+            kind=kind,
+            payload=payload,
+            max_attempts=max_attempts,
+        )
+        if delay is not None:
+            job.run_at = datetime.now(UTC) + delay
+        session.add(job)
+        return job
+
+    def claim(
+        self,
+        queue: str,
+        limit: int,
+        visibility_timeout: timedelta,
+        session: Session,
+    ) -> list[ClaimedJob]:
+        """Lease up to ``limit`` due jobs and commit.
+
+        Due jobs are queued jobs whose run_at has passed and running jobs
+        whose lease expired (their worker died or stalled). Rows locked by
+        other workers are skipped instead of waited for.
+
+        Args:
+            queue: Queue to claim from
+            limit: Maximum number of jobs
+            visibility_timeout: Lease duration
+            session: Database session
+
+        Returns:
+            Claimed jobs in enqueue order
+        """
+        now = func.now()
+        due = (
+            select(Jobs.id)
+            .where(
+                Jobs.queue == queue,
+                or_(
+                    and_(col(Jobs.status) == "queued", col(Jobs.run_at) <= now),
+                    and_(col(Jobs.status) == "running", col(Jobs.locked_until) < now),
+                ),
+            )
+            .order_by(col(Jobs.run_at))
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(Jobs)
+            .where(col(Jobs.id).in_(due.scalar_subquery()))
+            .values(
+                status="running",
+                attempts=Jobs.attempts + 1,
+                locked_until=now + visibility_timeout,
+                updated_at=now,
+            )
+            .returning(
+                col(Jobs.id),
+                col(Jobs.kind),
+                col(Jobs.payload),
+                col(Jobs.attempts),
+                col(Jobs.max_attempts),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = session.exec(statement).all()
+        session.commit()
+        jobs = [
+            ClaimedJob(
+                id=row.id,
+                kind=row.kind,
+                payload=row.payload,
+                attempts=row.attempts,
+                max_attempts=row.max_attempts,
+            )
+            for row in rows
+        ]
+        return sorted(jobs, key=lambda job: job.id)
+
+    def extend(
+        self,
+        job: ClaimedJob,
+        visibility_timeout: timedelta,
+        session: Session,
+    ) -> bool:
+        """Renew the lease of a running job and commit.
+
+        Args:
+            job: Claimed job
+            visibility_timeout: New lease duration from now
+            session: Database session
+
+        Returns:
+            False if the lease was lost to another worker
+        """
+        statement = (
+            update(Jobs)
+            .where(*self._owned(job))
+            .values(locked_until=func.now() + visibility_timeout, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        result = session.exec(statement)
+        session.commit()
+        return bool(result.rowcount)
+
+    def complete(self, job: ClaimedJob, session: Session) -> bool:
+        """Delete a finished job without committing.
+
+        Committed together with the handler's writes.
+
+        Args:
+            job: Claimed job
+            session: Database session of the handler
+
+        Returns:
+            False if the lease was lost to another worker
+        """
+        statement = (
+            delete(Jobs)
+            .where(*self._owned(job))
+            .execution_options(synchronize_session=False)
+        )
+        result = session.exec(statement)
+        return bool(result.rowcount)
+
+    def retry(
+        self,
+        job: ClaimedJob,
+        error: str,
+        delay: timedelta,
+        session: Session,
+    ) -> None:
+        """Requeue a failed attempt to run again after ``delay`` and commit.
+
+        Args:
+            job: Claimed job
+            error: Error of the failed attempt
+            delay: Backoff until the next attempt
+            session: Database session
+        """
+        statement = (
+            update(Jobs)
+            .where(*self._owned(job))
+            .values(
+                status="queued",
+                run_at=func.now() + delay,
+                locked_until=None,
+                last_error=error[:MAX_ERROR_LENGTH],
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(statement)
+        session.commit()
+
+    def fail(self, job: ClaimedJob, error: str, session: Session) -> None:
+        """Mark a job as permanently failed and commit.
+
+        Failed jobs stay in the table for inspection and are never claimed.
+
+        Args:
+            job: Claimed job
+            error: Error of the last attempt
+            session: Database session
+        """
+        statement = (
+            update(Jobs)
+            .where(*self._owned(job))
+            .values(
+                status="failed",
+                locked_until=None,
+                last_error=error[:MAX_ERROR_LENGTH],
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.exec(statement)
+        session.commit()
+
+    def _owned(self, job: ClaimedJob) -> tuple[Any, ...]:
+        return (
+            Jobs.id == job.id,
+            Jobs.attempts == job.attempts,
+            Jobs.status == "running",
+        )
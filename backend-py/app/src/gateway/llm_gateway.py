@@ -0,0 +1,139 @@
+"""LLM Gateway for retrieval-augmented generation.
+
+Answers prompts with the chat model of an OpenAIGateway, optionally with
+context from a retriever (see vectorstore_gateway). The RAG prompt is
+gateway.const.rag_template. The batch methods retrieve the context of all
+prompts in one round and send the completions concurrently.
+"""
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, TypeVar
+
+from pydantic import BaseModel
+
+from gateway.const.rag_template import rag_template_raw
+from gateway.openai_gateway import OpenAIGateway, content_text
+from gateway.vectorstore_gateway import Retriever
+from util.metrics import track_external_call
+from util.tracing import trace_methods
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import LanguageModelInput
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+@trace_methods("gateway.LLMGateway")
+class LLMGateway:
+    """Gateway for LLM text and structured generation."""
+
+    def __init__(self, openai_gateway: OpenAIGateway | None = None) -> None:
+        """Initialize LLM Gateway.
+
+        Args:
+            openai_gateway: Gateway whose chat model answers (default: a new
+                OpenAIGateway with its default model)
+        """
+        self.openai_gateway = openai_gateway or OpenAIGateway()
+
+    def generate_text(self, prompt: str, system_prompt: str | None = None) -> str:
+        """Generate text without retrieval.
+
+        Args:
+            prompt: User's prompt
+            system_prompt: System prompt (optional)
+
+        Returns:
+            AI response text
+        """
+        return self.openai_gateway.chat_completion(prompt, system_prompt)
+
+    def generate_text_from_rag(self, prompt: str, retriever: Retriever) -> str:
+        """Generate text from a prompt and its retrieved context.
+
+        Args:
+            prompt: User's prompt, also the retrieval query
+            retriever: Retriever for the context
+
+        Returns:
+            AI response text
+        """
+        return self.generate_texts_from_rag([prompt], retriever)[0]
+
+    def generate_texts_from_rag(
+        self, prompts: Sequence[str], retriever: Retriever
+    ) -> list[str]:
+        """Generate text for many prompts with one retrieval round.
+
+        Args:
+            prompts: User's prompts, also the retrieval queries
+            retriever: Retriever for the context
+
+        Returns:
+            AI response text per prompt
+        """
+        if not prompts:
+            return []
+        messages = self._build_rag_messages(prompts, retriever)
+        with track_external_call("openai", "rag_completion"):
+            responses = self.openai_gateway.llm.batch(messages)
+        return [content_text(response.content) for response in responses]
+
+    def generate_model_from_rag(
+        self, prompt: str, pydantic_model: type[ModelT], retriever: Retriever
+    ) -> ModelT:
+        """Generate a structured response from a prompt and its context.
+
+        Args:
+            prompt: User's prompt, also the retrieval query
+            pydantic_model: Model of the response
+            retriever: Retriever for the context
+
+        Returns:
+            Response parsed into the model
+        """
+        return self.generate_models_from_rag([prompt], pydantic_model, retriever)[0]
+
+    def generate_models_from_rag(
+        self,
+        prompts: Sequence[str],
+        pydantic_model: type[ModelT],
+        retriever: Retriever,
+    ) -> list[ModelT]:
+        """Generate structured responses for many prompts with one retrieval.
+
+        Args:
+            prompts: User's prompts, also the retrieval queries
+            pydantic_model: Model of the responses
+            retriever: Retriever for the context
+
+        Returns:
+            Response parsed into the model per prompt
+        """
+        if not prompts:
+            return []
+        messages = self._build_rag_messages(prompts, retriever)
+        structured = self.openai_gateway.llm.with_structured_output(pydantic_model)
+        with track_external_call("openai", "rag_structured_completion"):
+            results = structured.batch(messages)
+        return [pydantic_model.model_validate(result) for result in results]
+
+    def _build_rag_messages(
+        self, prompts: Sequence[str], retriever: Retriever
+    ) -> list["LanguageModelInput"]:
+        from langchain_core.messages import HumanMessage  # noqa: PLC0415
+
+        contexts = retriever.batch(prompts)
+        return [
+            [
+                HumanMessage(
+                    content=rag_template_raw.format(
+                        question=prompt,
+                        context="\n\n".join(
+                            embedding.content for embedding in embeddings
+                        ),
+                    )
+                )
+            ]
+            for prompt, embeddings in zip(prompts, contexts, strict=True)
+        ]
@@ -1,10 +1,21 @@
+from collections.abc import Sequence
 from uuid import UUID
 
-from sqlmodel import Session, select
+from sqlalchemy import BigInteger, Text, cast, func, literal, tuple_
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, select
 
-from domain.entity.models import Messages
+from domain.entity.memory import IndexerPosition, MessageDocument
+from domain.entity.models import Messages, VirtualUsers
+from infra.db_routing import read_only
+from util.tracing import trace_methods
 
+# Channel notified by the messages_notify trigger
+# (post-migration/03_message_index.sql)
+NOTIFY_CHANNEL = "messages"
 
+
+@trace_methods("gateway.MessageGateway")
 class MessageGateway:
     def create(
         self,
@@ -23,6 +34,34 @@ class MessageGateway:
         session.refresh(message)
         return message
 
+    def create_from_user(
+        self,
+        chat_room_id: int,
+        sender_id: UUID,
+        content: str,
+        session: Session,
+    ) -> Messages:
+        """Save a message written by a user.
+
+        Args:
+            chat_room_id: Chat room ID
+            sender_id: ID of the user who wrote the message
+            content: Message text
+            session: Database session
+
+        Returns:
+            The saved message
+        """
+        message = Messages(
+            chat_room_id=chat_room_id,
+            sender_id=sender_id,
+            content=content,
+        )
+        session.add(message)
+        session.commit()
+        session.refresh(message)
+        return message
+
     def get_by_id(
         self,
         message_id: int,
@@ -36,9 +75,152 @@ class MessageGateway:
         chat_room_id: int,
         session: Session,
     ) -> list[Messages]:
+        """Get all messages of a chat room (from a read replica if any)."""
         statement = select(Messages).where(Messages.chat_room_id == chat_room_id)
+        return list(session.exec(read_only(statement)).all())
+
+    def get_recent_by_chat_room_id(
+        self,
+        chat_room_id: int,
+        limit: int,
+        session: Session,
+    ) -> list[Messages]:
+        """Get the latest messages of a chat room in chronological order."""
+        statement = (
+            select(Messages)
+            .where(Messages.chat_room_id == chat_room_id)
+            .order_by(col(Messages.id).desc())
+            .limit(limit)
+        )
+        return list(reversed(session.exec(statement).all()))
+
+    def get_recent_and_count_by_chat_room_id(
+        self,
+        chat_room_id: int,
+        limit: int,
+        session: Session,
+    ) -> tuple[list[Messages], int]:
+        """Get the latest messages of a chat room and its message count.
+
+        The messages and the count are both read from the
+        (chat_room_id, id) index in the same statement.
+
+        Args:
+            chat_room_id: Chat room ID
+            limit: Maximum number of messages
+            session: Database session
+
+        Returns:
+            Messages in chronological order, and the number of messages in
+            the chat room
+        """
+        count = (
+            select(func.count())
+            .select_from(Messages)
+            .where(Messages.chat_room_id == chat_room_id)
+            .scalar_subquery()
+        )
+        statement = (
+            select(Messages, count)
+            .where(Messages.chat_room_id == chat_room_id)
+            .order_by(col(Messages.id).desc())
+            .limit(limit)
+        )
+        rows = session.exec(statement).all()
+        if not rows:
+            return [], 0
+        return [message for message, _ in reversed(rows)], rows[0][1]
+
+    def get_recent_by_chat_room_ids(
+        self,
+        chat_room_ids: Sequence[int],
+        limit: int,
+        session: Session,
+    ) -> list[Messages]:
+        """Get the latest messages of several chat rooms in one statement.
+
+        Args:
+            chat_room_ids: Chat room IDs
+            limit: Maximum number of messages per chat room
+            session: Database session
+
+        Returns:
+            Messages ordered by chat room, then chronologically
+        """
+        ranked = (
+            select(
+                Messages,
+                func.row_number()
+                .over(
+                    partition_by=col(Messages.chat_room_id),
+                    order_by=col(Messages.id).desc(),
+                )
+                .label("rank"),
+            )
+            .where(col(Messages.chat_room_id).in_(chat_room_ids))
+            .subquery()
+        )
+        message = aliased(Messages, ranked)
+        statement = (
+            select(message)
+            .where(ranked.c.rank <= limit)
+            .order_by(ranked.c.chat_room_id, ranked.c.id)
+        )
         return list(session.exec(statement).all())
 
+    def get_indexable_after(
+        self,
+        after: IndexerPosition,
+        limit: int,
+        session: Session,
+    ) -> list[MessageDocument]:
+        """Get committed messages for the indexer in commit order.
+
+        IDs are assigned at insert, so a lower ID can commit after a higher
+        one. Messages are therefore ordered by their inserting transaction,
+        and only transactions older than every running one are read: none
+        of those can still commit, and every later transaction sorts after
+        them, so no message can appear behind the returned position.
+
+        Args:
+            after: Indexer position; only messages after it are returned
+            limit: Maximum number of messages
+            session: Database session
+
+        Returns:
+            Messages with the user whose memory they belong to
+        """
+        # Oldest transaction still running (xid8, as Messages.xact_id stores it)
+        horizon = cast(
+            cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger
+        )
+        statement = (
+            select(Messages, VirtualUsers.owner_id)
+            .outerjoin(
+                VirtualUsers, col(VirtualUsers.id) == col(Messages.virtual_user_id)
+            )
+            .where(
+                tuple_(col(Messages.xact_id), col(Messages.id))
+                > tuple_(literal(after.xact_id), literal(after.id)),
+                col(Messages.xact_id) < horizon,
+            )
+            .order_by(col(Messages.xact_id), col(Messages.id))
+            .limit(limit)
+        )
+        return [
+            MessageDocument(
+                id=message.id,
+                chat_room_id=message.chat_room_id,
+                user_id=message.sender_id or owner_id,
+                sender_id=message.sender_id,
+                virtual_user_id=message.virtual_user_id,
+                content=message.content,
+                created_at=message.created_at,
+                xact_id=message.xact_id,
+            )
+            for message, owner_id in session.exec(statement).all()
+        ]
+
     def update(
         self,
         message_id: int,
@@ -1,38 +1,136 @@
-"""OpenAI Gateway using LangChain."""
+"""OpenAI Gateway using LangChain.
+
+Chat prompts are laid out for the provider's prompt cache (see
+domain.service.prompt_service): the system message comes first, then the
+conversation so far, the retrieved context and the user's message. The
+share of prompt tokens served from the cache is recorded per call.
+"""
 
 import os
-from typing import Any
+from collections.abc import AsyncGenerator, Sequence
+from typing import TYPE_CHECKING, Any
+
+from domain.entity.chat import HistoryMessage
+from util.metrics import (
+    LLM_PROMPT_CACHE_RATIO,
+    LLM_PROMPT_TOKENS,
+    track_external_call,
+)
+from util.tokenizer import CHAT_ENCODING, count_tokens, get_encoding
+from util.tracing import trace_methods
 
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+    from langchain_core.messages.ai import UsageMetadata
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+# Texts longer than this are truncated before embedding so a single request
+# stays within the embedding model's 8191-token input limit
+MAX_EMBEDDING_CHARS = 6000
 
+
+@trace_methods("gateway.OpenAIGateway")
 class OpenAIGateway:
     """Gateway for OpenAI API calls using LangChain."""
 
-    def __init__(self, model: str = "gpt-5.2-mini", temperature: float = 0.7) -> None:
+    def __init__(
+        self,
+        model: str = "gpt-5.2-mini",
+        temperature: float = 0.7,
+        embedding_model: str = "text-embedding-3-small",
+    ) -> None:
         """Initialize OpenAI Gateway.
 
         Args:
             model: OpenAI model name (default: gpt-5.2-mini)
             temperature: Response randomness (0.0-1.0)
+            embedding_model: Embedding model name; its dimensions must match
+                the embeddings.embedding column (default: text-embedding-3-small)
         """
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             msg = "OPENAI_API_KEY environment variable is not set"
             raise ValueError(msg)
 
-        # ChatOpenAI automatically reads OPENAI_API_KEY from environment
-        self.llm = ChatOpenAI(
-            model=model,
-            temperature=temperature,
+        self.model = model
+        self.temperature = temperature
+        self.embedding_model = embedding_model
+        self._llm: ChatOpenAI | None = None
+        self._embeddings: OpenAIEmbeddings | None = None
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """LangChain chat model, built on first use.
+
+        langchain_openai takes about a second to import, so it is loaded on
+        the first LLM call instead of at application import.
+        """
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI  # noqa: PLC0415
+
+            # ChatOpenAI automatically reads OPENAI_API_KEY from environment
+            self._llm = ChatOpenAI(
+                model=self.model,
+                temperature=self.temperature,
+            )
+        return self._llm
+
+    @property
+    def embeddings(self) -> "OpenAIEmbeddings":
+        """LangChain embedding model, built on first use."""
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings  # noqa: PLC0415
+
+            # Texts are sent as-is instead of being split with tiktoken, which
+            # would download its encodings on first use
+            self._embeddings = OpenAIEmbeddings(
+                model=self.embedding_model,
+                check_embedding_ctx_length=False,
+            )
+        return self._embeddings
+
+    def warm_up(self) -> None:
+        """Build the models, load the message classes and the tokenizer."""
+        from langchain_core.messages import (  # noqa: PLC0415
+            AIMessage,
+            HumanMessage,
+            SystemMessage,
         )
 
+        _ = self.llm
+        _ = self.embeddings
+        SystemMessage(content="")
+        HumanMessage(content="")
+        AIMessage(content="")
+        get_encoding(CHAT_ENCODING)
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text with the chat model's tokenizer.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Number of tokens
+        """
+        return count_tokens(text, CHAT_ENCODING)
+
+    def close(self) -> None:
+        """Close the HTTP client of the chat model, if it was built."""
+        if self._llm is not None:
+            self._llm.root_client.close()
+            self._llm = None
+        if self._embeddings is not None:
+            self._embeddings.client._client.close()  # noqa: SLF001
+            self._embeddings = None
+
     def chat_completion(
         self,
         user_message: str,
         system_prompt: str | None = None,
         context: str | None = None,
+        history: Sequence[HistoryMessage] = (),
+        prompt_cache_key: str | None = None,
     ) -> str:
         """Generate chat completion.
 
@@ -40,30 +138,143 @@ class OpenAIGateway:
             user_message: User's message
             system_prompt: System prompt (optional)
             context: Additional context from embeddings (optional)
+            history: Recent messages of the conversation, oldest first
+            prompt_cache_key: Key shared by requests with the same system
+                prompt, so they hit the same prompt cache (optional)
 
         Returns:
             AI response text
         """
+        messages = self._build_messages(user_message, system_prompt, context, history)
+
+        # Get response from OpenAI
+        with track_external_call("openai", "chat_completion"):
+            response = self.llm.invoke(messages, **_cache_kwargs(prompt_cache_key))
+        _record_prompt_usage("chat_completion", response.usage_metadata)
+
+        return content_text(response.content)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in one request per chunk of the embedding model.
+
+        Args:
+            texts: Texts to embed (at most MAX_EMBEDDING_CHARS characters each)
+
+        Returns:
+            One vector per text, in order
+        """
+        if not texts:
+            return []
+        with track_external_call("openai", "embeddings"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a search query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Query vector
+        """
+        with track_external_call("openai", "embed_query"):
+            return self.embeddings.embed_query(text[:MAX_EMBEDDING_CHARS])
+
+    async def stream_chat_completion(
+        self,
+        user_message: str,
+        system_prompt: str | None = None,
+        context: str | None = None,
+        history: Sequence[HistoryMessage] = (),
+        prompt_cache_key: str | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """Generate chat completion as a stream of text chunks.
+
+        Close the iterator (e.g. with contextlib.aclosing) to stop early;
+        the request to OpenAI is cancelled with it.
+
+        Args:
+            user_message: User's message
+            system_prompt: System prompt (optional)
+            context: Additional context from embeddings (optional)
+            history: Recent messages of the conversation, oldest first
+            prompt_cache_key: Key shared by requests with the same system
+                prompt, so they hit the same prompt cache (optional)
+
+        Yields:
+            AI response text chunks in order
+        """
+        messages = self._build_messages(user_message, system_prompt, context, history)
+
+        with track_external_call("openai", "chat_completion_stream"):
+            # The usage arrives with the last chunk
+            async for chunk in self.llm.astream(
+                messages, stream_usage=True, **_cache_kwargs(prompt_cache_key)
+            ):
+                if chunk.usage_metadata:
+                    _record_prompt_usage("chat_completion_stream", chunk.usage_metadata)
+                text = content_text(chunk.content)
+                if text:
+                    yield text
+
+    def _build_messages(
+        self,
+        user_message: str,
+        system_prompt: str | None,
+        context: str | None,
+        history: Sequence[HistoryMessage],
+    ) -> list["BaseMessage"]:
+        from langchain_core.messages import (  # noqa: PLC0415
+            AIMessage,
+            HumanMessage,
+            SystemMessage,
+        )
+
         messages: list[BaseMessage] = []
 
-        # Add system prompt
+        # Add system prompt, the prefix shared by every turn of a persona
         if system_prompt:
             messages.append(SystemMessage(content=system_prompt))
 
-        # Add context from embeddings if available
+        # One message per earlier message of the conversation, in the role
+        # of its writer: the next turn sends the same messages first and
+        # only appends to them, so they stay in the cached prefix
+        messages.extend(
+            HumanMessage(content=message.content)
+            if message.from_user
+            else AIMessage(content=message.content)
+            for message in history
+        )
+
+        # Context from embeddings varies per turn, so it goes last with the
+        # message itself
+        parts: list[str] = []
         if context:
-            context_message = f"参考情報:\n{context}\n\n"
-            user_message = context_message + user_message
+            parts.append(f"参考情報:\n{context}")
+        parts.append(user_message)
+        messages.append(HumanMessage(content="\n\n".join(parts)))
+        return messages
 
-        # Add user message
-        messages.append(HumanMessage(content=user_message))
 
-        # Get response from OpenAI
-        response = self.llm.invoke(messages)
-
-        # response.content can be str or list, so we need to handle both
-        content: str | list[str | dict[str, Any]] = response.content
-        if isinstance(content, str):
-            return content
-        # If content is a list, join it into a string
-        return "".join(str(item) for item in content)
+def _cache_kwargs(prompt_cache_key: str | None) -> dict[str, Any]:
+    return {} if prompt_cache_key is None else {"prompt_cache_key": prompt_cache_key}
+
+
+def _record_prompt_usage(operation: str, usage: "UsageMetadata | None") -> None:
+    """Record how many prompt tokens the provider read from its cache."""
+    if not usage or not usage["input_tokens"]:
+        return
+    prompt_tokens = usage["input_tokens"]
+    cached = usage.get("input_token_details", {}).get("cache_read", 0)
+    LLM_PROMPT_TOKENS.labels(operation, "cached").inc(cached)
+    LLM_PROMPT_TOKENS.labels(operation, "uncached").inc(prompt_tokens - cached)
+    LLM_PROMPT_CACHE_RATIO.labels(operation).observe(cached / prompt_tokens)
+
+
+def content_text(content: str | list[str | dict[str, Any]]) -> str:
+    """Get the text of a LangChain message's content."""
+    # response.content can be str or list, so we need to handle both
+    if isinstance(content, str):
+        return content
+    # If content is a list, join it into a string
+    return "".join(str(item) for item in content)
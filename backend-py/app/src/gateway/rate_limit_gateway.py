@@ -0,0 +1,39 @@
+"""Rate Limit Gateway for the token buckets shared by all workers."""
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from domain.entity.rate_limit import RateLimitGrant, RateLimitTier
+from util.tracing import trace_methods
+
+
+@trace_methods("gateway.RateLimitGateway")
+class RateLimitGateway:
+    """Gateway for the rate_limit_buckets table.
+
+    Buckets are refilled and drawn down atomically by the rate_limit_acquire
+    database function (drizzle/config/post-migration/01_rate_limit.sql).
+    """
+
+    def acquire(
+        self, key: str, tier: RateLimitTier, requested: int, session: Session
+    ) -> RateLimitGrant:
+        """Take up to ``requested`` tokens from the shared bucket.
+
+        Args:
+            key: Bucket key, e.g. "chat:<user_id>"
+            tier: Tier defining the bucket's capacity and refill rate
+            requested: Maximum number of tokens to take
+            session: Database session of the lease alone; it is committed to
+                release the bucket's row lock
+
+        Returns:
+            Number of granted tokens and, if none, the wait for the next one
+        """
+        bucket = func.rate_limit_acquire(
+            key, float(tier.burst), tier.refill_per_second, requested
+        ).table_valued("granted", "retry_after_seconds")
+        statement = select(bucket.c.granted, bucket.c.retry_after_seconds)
+        granted, retry_after_seconds = session.exec(statement).one()
+        session.commit()
+        return RateLimitGrant(granted=granted, retry_after_seconds=retry_after_seconds)
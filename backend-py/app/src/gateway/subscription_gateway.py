@@ -0,0 +1,32 @@
+"""Subscription Gateway for reading users' Polar subscriptions."""
+
+from uuid import UUID
+
+from sqlmodel import Session, col, select
+
+from domain.entity.models import Subscriptions
+from util.tracing import trace_methods
+
+# Subscription statuses that grant access to the subscribed product
+ACTIVE_STATUSES = ("active", "trialing")
+
+
+@trace_methods("gateway.SubscriptionGateway")
+class SubscriptionGateway:
+    """Gateway for subscription operations."""
+
+    def get_active_product_ids(self, user_id: UUID, session: Session) -> list[str]:
+        """Get the Polar product IDs of the user's active subscriptions.
+
+        Args:
+            user_id: User ID
+            session: Database session
+
+        Returns:
+            Product IDs of active or trialing subscriptions
+        """
+        statement = select(Subscriptions.polar_product_id).where(
+            Subscriptions.user_id == user_id,
+            col(Subscriptions.status).in_(ACTIVE_STATUSES),
+        )
+        return list(session.exec(statement).all())
@@ -5,8 +5,10 @@ from uuid import UUID
 from sqlmodel import Session, select
 
 from domain.entity.models import UserProfiles
+from util.tracing import trace_methods
 
 
+@trace_methods("gateway.UserProfileGateway")
 class UserProfileGateway:
     """Gateway for user profile operations."""
 
@@ -0,0 +1,246 @@
+"""Vector Store Gateway for retrieval-augmented generation.
+
+Wraps the embeddings table as a vector store: texts are embedded and
+stored with add_texts, and retrievers search it by text. A search takes
+``fetch_k`` candidates per query from EmbeddingsGateway.search_similar and
+reranks them by max marginal relevance (see mmr_service), so the context
+handed to the LLM is not several copies of the same passage.
+
+A search without a user only sees documents and texts that no user owns,
+never the users' indexed chat messages.
+
+Queries are searched in batches: a batch is embedded in one request, its
+candidates are read in one session, and all of them are reranked in one
+NumPy computation.
+"""
+
+import hashlib
+from collections.abc import Callable, Sequence
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Any
+
+from sqlmodel import Session
+
+from domain.entity.models import Embeddings
+from domain.service.mmr_service import LAMBDA_MULT, max_marginal_relevance
+from domain.service.near_duplicate_service import minhash
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.openai_gateway import MAX_EMBEDDING_CHARS, OpenAIGateway
+from util.tracing import trace_methods
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+# Embedding IDs of added texts are "text:<user_id>:<content hash>"
+TEXT_EMBEDDING_PREFIX = "text:"
+
+# Results per query and candidates reranked for them
+RETRIEVER_K = 4
+RETRIEVER_FETCH_K = 20
+
+
+@trace_methods("gateway.VectorStoreGateway")
+class VectorStoreGateway:
+    """Gateway for storing and retrieving texts by embedding."""
+
+    def __init__(
+        self,
+        *,
+        embeddings_gateway: EmbeddingsGateway,
+        openai_gateway: OpenAIGateway,
+        session_factory: SessionFactory,
+        projection_gateway: EmbeddingProjectionGateway | None = None,
+    ) -> None:
+        """Initialize the gateway.
+
+        Args:
+            embeddings_gateway: Gateway for the embeddings table
+            openai_gateway: Gateway for the embedding model
+            session_factory: Opens a new session per batch
+            projection_gateway: Gateway for embedding reductions (stored
+                unreduced and searched binary-quantized if omitted)
+        """
+        self.embeddings_gateway = embeddings_gateway
+        self.openai_gateway = openai_gateway
+        self.session_factory = session_factory
+        self.projection_gateway = projection_gateway
+
+    def add_texts(
+        self,
+        texts: Sequence[str],
+        user_id: str | None = None,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> list[str]:
+        """Embed and store texts in one request and one transaction.
+
+        Args:
+            texts: Texts to store (at most MAX_EMBEDDING_CHARS characters each)
+            user_id: Owner of the texts, searched with ``user_id``
+            metadatas: Extra metadata per text
+
+        Returns:
+            Embedding ID of each text; storing a text again replaces its row
+        """
+        if not texts:
+            return []
+        vectors = self.openai_gateway.embed_texts(list(texts))
+        rows: list[dict[str, Any]] = []
+        for index, (text, vector) in enumerate(zip(texts, vectors, strict=True)):
+            content_hash = hashlib.sha256(text.encode()).hexdigest()
+            metadata = {
+                **(metadatas[index] if metadatas is not None else {}),
+                "source": "text",
+                "content_hash": content_hash,
+            }
+            if user_id is not None:
+                metadata["user_id"] = user_id
+            rows.append(
+                {
+                    "id": f"{TEXT_EMBEDDING_PREFIX}{user_id or ''}:{content_hash}",
+                    "embedding": vector,
+                    "content_minhash": minhash(text),
+                    "content": text,
+                    "metadata_": metadata,
+                }
+            )
+        with self.session_factory() as session:
+            projections = (
+                self.projection_gateway.get_current(session)
+                if self.projection_gateway is not None
+                else []
+            )
+            reduced = self.embeddings_gateway.reduced_columns(vectors, projections)
+            for row, reduced_columns in zip(rows, reduced, strict=True):
+                row.update(reduced_columns)
+            self.embeddings_gateway.upsert(rows, session)
+            session.commit()
+        return [str(row["id"]) for row in rows]
+
+    def search(
+        self,
+        queries: Sequence[str],
+        *,
+        k: int = RETRIEVER_K,
+        fetch_k: int = RETRIEVER_FETCH_K,
+        lambda_mult: float = LAMBDA_MULT,
+        user_id: str | None = None,
+    ) -> list[list[Embeddings]]:
+        """Search relevant, diverse embeddings for a batch of queries.
+
+        Args:
+            queries: Query texts; repeated queries are searched once
+            k: Results per query
+            fetch_k: Closest candidates reranked per query
+            lambda_mult: Weight of relevance against diversity, in [0, 1]
+            user_id: Only search this user's embeddings (only shared
+                documents and texts if omitted)
+
+        Returns:
+            Up to ``k`` embeddings per query, in pick order
+        """
+        import numpy as np  # noqa: PLC0415
+
+        unique = list(dict.fromkeys(query[:MAX_EMBEDDING_CHARS] for query in queries))
+        if not unique:
+            return []
+        query_vectors = self.openai_gateway.embed_texts(unique)
+        with self.session_factory() as session:
+            projection = (
+                self.projection_gateway.get_active(session)
+                if self.projection_gateway is not None
+                else None
+            )
+            candidates = [
+                self.embeddings_gateway.search_similar(
+                    vector,
+                    limit=max(fetch_k, k),
+                    session=session,
+                    user_id=user_id,
+                    projection=projection,
+                    shared=user_id is None,
+                )
+                for vector in query_vectors
+            ]
+        width = max(len(found) for found in candidates)
+        padded = np.zeros((len(unique), width, len(query_vectors[0])), np.float32)
+        mask = np.zeros((len(unique), width), dtype=bool)
+        for row, found in enumerate(candidates):
+            if found:
+                padded[row, : len(found)] = [embedding.embedding for embedding in found]
+                mask[row, : len(found)] = True
+        picks = max_marginal_relevance(
+            query_vectors, padded, k, lambda_mult=lambda_mult, mask=mask
+        )
+        results = {
+            query: [candidates[row][pick] for pick in picks[row] if pick >= 0]
+            for row, query in enumerate(unique)
+        }
+        return [results[query[:MAX_EMBEDDING_CHARS]] for query in queries]
+
+    def as_retriever(
+        self,
+        *,
+        k: int = RETRIEVER_K,
+        fetch_k: int = RETRIEVER_FETCH_K,
+        lambda_mult: float = LAMBDA_MULT,
+        user_id: str | None = None,
+    ) -> "Retriever":
+        """Get a retriever that searches with fixed settings.
+
+        Args:
+            k: Results per query
+            fetch_k: Closest candidates reranked per query
+            lambda_mult: Weight of relevance against diversity, in [0, 1]
+            user_id: Only search this user's embeddings (only shared
+                documents and texts if omitted)
+
+        Returns:
+            Retriever for LLMGateway's RAG methods
+        """
+        return Retriever(
+            vector_store=self,
+            k=k,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            user_id=user_id,
+        )
+
+
+@dataclass(frozen=True)
+class Retriever:
+    """Search settings bound to a vector store."""
+
+    vector_store: VectorStoreGateway
+    k: int = RETRIEVER_K
+    fetch_k: int = RETRIEVER_FETCH_K
+    lambda_mult: float = LAMBDA_MULT
+    user_id: str | None = None
+
+    def invoke(self, query: str) -> list[Embeddings]:
+        """Retrieve the embeddings for one query.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Relevant, diverse embeddings
+        """
+        return self.batch([query])[0]
+
+    def batch(self, queries: Sequence[str]) -> list[list[Embeddings]]:
+        """Retrieve the embeddings for many queries in one round.
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            Relevant, diverse embeddings per query
+        """
+        return self.vector_store.search(
+            queries,
+            k=self.k,
+            fetch_k=self.fetch_k,
+            lambda_mult=self.lambda_mult,
+            user_id=self.user_id,
+        )
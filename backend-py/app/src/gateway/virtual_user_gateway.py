@@ -1,12 +1,16 @@
 import uuid
+from collections.abc import Sequence
 from datetime import UTC, datetime
 from uuid import UUID
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
-from domain.entity.models import VirtualUsers
+from domain.entity.models import VirtualUserChats, VirtualUsers
+from infra.db_routing import read_only
+from util.tracing import trace_methods
 
 
+@trace_methods("gateway.VirtualUserGateway")
 class VirtualUserGateway:
     def create(
         self,
@@ -34,9 +38,45 @@ class VirtualUserGateway:
         statement = select(VirtualUsers).where(VirtualUsers.id == virtual_user_id)
         return session.exec(statement).first()
 
+    def get_by_ids(
+        self,
+        virtual_user_ids: Sequence[UUID],
+        session: Session,
+    ) -> list[VirtualUsers]:
+        """Get virtual users by ID in one statement (missing IDs are skipped)."""
+        statement = select(VirtualUsers).where(
+            col(VirtualUsers.id).in_(virtual_user_ids)
+        )
+        return list(session.exec(statement).all())
+
+    def get_by_chat_room_ids(
+        self,
+        chat_room_ids: Sequence[int],
+        session: Session,
+    ) -> list[tuple[int, VirtualUsers]]:
+        """Get the virtual users linked to several chat rooms in one statement.
+
+        Args:
+            chat_room_ids: Chat room IDs
+            session: Database session
+
+        Returns:
+            (chat room ID, virtual user) pairs
+        """
+        statement = (
+            select(VirtualUserChats.chat_room_id, VirtualUsers)
+            .join(
+                VirtualUsers, col(VirtualUsers.id) == VirtualUserChats.virtual_user_id
+            )
+            .where(col(VirtualUserChats.chat_room_id).in_(chat_room_ids))
+            .order_by(col(VirtualUserChats.id))
+        )
+        return [(chat_room_id, user) for chat_room_id, user in session.exec(statement)]
+
     def get_all(self, session: Session) -> list[VirtualUsers]:
+        """Get all virtual users (from a read replica if any)."""
         statement = select(VirtualUsers)
-        return list(session.exec(statement).all())
+        return list(session.exec(read_only(statement)).all())
 
     def get_by_owner_id(
         self,
@@ -0,0 +1,31 @@
+"""Virtual User Profile Gateway for reading virtual users' personas."""
+
+from collections.abc import Sequence
+from uuid import UUID
+
+from sqlmodel import Session, col, select
+
+from domain.entity.models import VirtualUserProfiles
+from util.tracing import trace_methods
+
+
+@trace_methods("gateway.VirtualUserProfileGateway")
+class VirtualUserProfileGateway:
+    """Gateway for virtual user profile operations."""
+
+    def get_by_virtual_user_ids(
+        self, virtual_user_ids: Sequence[UUID], session: Session
+    ) -> list[VirtualUserProfiles]:
+        """Get the profiles of several virtual users in one statement.
+
+        Args:
+            virtual_user_ids: Virtual user IDs
+            session: Database session
+
+        Returns:
+            Profiles of the virtual users that have one
+        """
+        statement = select(VirtualUserProfiles).where(
+            col(VirtualUserProfiles.virtual_user_id).in_(virtual_user_ids)
+        )
+        return list(session.exec(statement).all())
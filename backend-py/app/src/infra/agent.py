@@ -6,6 +6,15 @@ UserProxyAgentは、ユーザーの要求をAssistantAgentに転送するエー
 
 import os
 
-config_list = [
-    {"model": "gpt-5-mini", "api_key": os.environ["OPENAI_API_KEY"]},
-]
+
+def get_config_list() -> list[dict[str, str]]:
+    """エージェントのLLM設定を返す.
+
+    APIキーはインポート時ではなく呼び出し時に読み込む。
+
+    Returns:
+        list[dict[str, str]]: モデル名とAPIキーの設定リスト
+    """
+    return [
+        {"model": "gpt-5-mini", "api_key": os.environ["OPENAI_API_KEY"]},
+    ]
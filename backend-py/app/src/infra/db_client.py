@@ -2,24 +2,120 @@
 
 FastAPIの依存性注入システムと統合し、リクエストごとに安全なデータベースセッションを提供します。
 SQLModelの公式パターンに従った同期処理の実装です。
+DATABASE_REPLICA_URLSを設定すると、read_only()で印を付けた読み取りをリードレプリカで
+実行します(infra.db_routingを参照)。
 """
 
 import os
-from collections.abc import Generator
+import time
+from collections.abc import Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from functools import cache
 
+from sqlalchemy import Engine, QueuePool
 from sqlmodel import Session, create_engine
 
-# 環境変数からデータベースURLを取得
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    msg = "DATABASE_URL environment variable is not set"
-    raise ValueError(msg)
+from infra.db_instrumentation import instrument_engine
+from infra.db_routing import ReplicaRouter, RoutingSession
+from util.metrics import DB_POOL_CHECKOUT_WAIT
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,  # 接続の健全性チェック
-)
+
+@cache
+def get_engine() -> Engine:
+    """初回利用時にエンジンを生成して返す.
+
+    インポート時に接続設定を読まないことで、ワーカー起動とテストの収集を軽くする。
+
+    Returns:
+        Engine: プロセス共有のSQLAlchemyエンジン
+
+    Raises:
+        ValueError: DATABASE_URLが設定されていない場合
+    """
+    # 環境変数からデータベースURLを取得
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        msg = "DATABASE_URL environment variable is not set"
+        raise ValueError(msg)
+    return _create_engine(database_url)
+
+
+@cache
+def get_replica_router() -> ReplicaRouter | None:
+    """初回利用時にリードレプリカのルーターを生成して返す.
+
+    DATABASE_REPLICA_URLS(カンマ区切り)のレプリカのうち、遅延が
+    DATABASE_REPLICA_MAX_LAG秒以内のものから読む。遅延は
+    DATABASE_REPLICA_CHECK_INTERVAL秒ごとに確認する。遅延の確認はリクエスト内で
+    行うため、レプリカへの接続はDATABASE_REPLICA_CONNECT_TIMEOUT秒で打ち切り、
+    到達できないレプリカでリクエストを止めない。
+
+    Returns:
+        ReplicaRouter | None: レプリカが設定されていない場合はNone
+    """
+    urls = [
+        url.strip()
+        for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+        if url.strip()
+    ]
+    if not urls:
+        return None
+    connect_timeout = int(os.getenv("DATABASE_REPLICA_CONNECT_TIMEOUT", "2"))
+    return ReplicaRouter(
+        [
+            _create_engine(url, connect_args={"connect_timeout": connect_timeout})
+            for url in urls
+        ],
+        max_lag=float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5")),
+        check_interval=float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "5")),
+    )
+
+
+def _create_engine(
+    database_url: str, connect_args: dict[str, object] | None = None
+) -> Engine:
+    engine = create_engine(
+        database_url,
+        connect_args=connect_args or {},
+        # SQLログは開発用。負荷試験や本番ではSQL_ECHO=falseで無効化する
+        echo=os.getenv("SQL_ECHO", "true").lower() != "false",
+        pool_pre_ping=True,  # 接続の健全性チェック
+    )
+    # リクエスト単位のSQL統計(ステートメント数・DB時間・N+1検出)を収集
+    instrument_engine(engine)
+    return engine
+
+
+def warm_up_engine() -> None:
+    """プールの接続を事前に確立する.
+
+    最初のリクエストが接続確立(TCP/TLS/認証)の待ち時間を負担しないようにする。
+    レプリカのプールも同様に確立する。
+    """
+    router = get_replica_router()
+    engines = [get_engine()]
+    if router is not None:
+        engines.extend(replica.engine for replica in router.replicas)
+    for engine in engines:
+        pool_size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+        connections = [engine.connect() for _ in range(pool_size)]
+        for connection in connections:
+            connection.close()
+
+
+def dispose_engine() -> None:
+    """生成済みのエンジンの接続プールを閉じる.
+
+    シャットダウン時に呼び出す。エンジン未生成の場合は何もしない。
+    """
+    if get_engine.cache_info().currsize > 0:
+        get_engine().dispose()
+        get_engine.cache_clear()
+    if get_replica_router.cache_info().currsize > 0:
+        router = get_replica_router()
+        if router is not None:
+            router.dispose()
+        get_replica_router.cache_clear()
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -35,8 +131,37 @@ def get_session() -> Generator[Session, None, None]:
             items = session.exec(statement).all()
             return items
 
+    read_only()の読み取りはレプリカで、それ以外とセッション内の書き込み後の読み取りは
+    プライマリで実行される。
+
     Yields:
         Session: データベースセッション
     """
-    with Session(engine) as session:
+    with RoutingSession(get_engine(), router=get_replica_router()) as session:
+        # プール枯渇時の待ち時間を計測するため、接続を先に取得する
+        start_time = time.perf_counter()
+        session.connection()
+        DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start_time)
         yield session
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """get_sessionと同じセッションをwith文で取得する.
+
+    Yields:
+        Session: データベースセッション
+    """
+    yield from get_session()
+
+
+def get_session_factory() -> Callable[[], AbstractContextManager[Session]]:
+    """FastAPI依存性注入用のセッションファクトリ取得関数.
+
+    WebSocketのような長時間の接続で、接続全体ではなく処理単位でセッションを開くために使う。
+    接続中ずっとセッションを保持すると、LLMの応答待ちの間もプールの接続を占有してしまう。
+
+    Returns:
+        呼び出すたびに新しいセッションを開くコンテキストマネージャのファクトリ
+    """
+    return session_scope
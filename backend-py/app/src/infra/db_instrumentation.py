@@ -0,0 +1,203 @@
+"""このモジュールは、SQLAlchemyのイベントフックでリクエスト単位のSQL統計を収集します.
+
+各リクエストの発行ステートメント数・DB合計時間・最も遅いステートメントを記録し、
+同一ステートメントが異なるパラメータで繰り返し実行された場合(N+1)を検出します。
+統計はContextVarでリクエストに紐付けられ、LoggingMiddlewareのログ行に付与されます。
+あわせて、ステートメント実行時間と接続プールの状態をPrometheusメトリクスに記録します。
+"""
+
+import os
+import time
+from collections.abc import Generator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine.interfaces import DBAPICursor, ExecutionContext
+
+from util.logging import get_logger
+from util.metrics import DB_POOL_CONNECTIONS, DB_QUERY_DURATION
+
+logger = get_logger(__name__)
+
+_START_TIMES_KEY = "query_start_times"
+_MAX_STATEMENT_LENGTH = 500
+
+
+def get_n_plus_one_threshold() -> int:
+    """Get the N+1 detection threshold from environment variable."""
+    return int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "3"))
+
+
+@dataclass
+class QueryStats:
+    """Statement statistics collected for one request."""
+
+    n_plus_one_threshold: int = field(default_factory=get_n_plus_one_threshold)
+    statement_count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+    n_plus_one: list[str] = field(default_factory=list)
+    _parameter_sets: dict[str, set[int]] = field(default_factory=dict, repr=False)
+
+    def record(self, statement: str, parameters: object, duration_ms: float) -> None:
+        """Record one executed statement.
+
+        Args:
+            statement: SQL statement with bind placeholders.
+            parameters: Bind parameters the statement was executed with.
+            duration_ms: Execution time in milliseconds.
+        """
+        self.statement_count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_statement = statement[:_MAX_STATEMENT_LENGTH]
+
+        parameter_sets = self._parameter_sets.setdefault(statement, set())
+        parameter_sets.add(_parameters_key(parameters))
+        # しきい値に達した時点で一度だけ記録する
+        if len(parameter_sets) == self.n_plus_one_threshold:
+            self.n_plus_one.append(statement[:_MAX_STATEMENT_LENGTH])
+            logger.warning(
+                "Possible N+1 query detected",
+                statement=statement[:_MAX_STATEMENT_LENGTH],
+                executions=len(parameter_sets),
+            )
+
+    def as_log_fields(self) -> dict[str, Any]:
+        """Return the statistics as structured log fields."""
+        fields: dict[str, Any] = {
+            "db_statements": self.statement_count,
+            "db_time_ms": round(self.total_ms, 2),
+        }
+        if self.slowest_statement is not None:
+            fields["db_slowest_ms"] = round(self.slowest_ms, 2)
+            fields["db_slowest_statement"] = self.slowest_statement
+        if self.n_plus_one:
+            fields["db_n_plus_one"] = self.n_plus_one
+        return fields
+
+
+query_stats_var: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+# capture_queries()で登録された、コンテキストに依存しない収集先
+_captures: list[QueryStats] = []
+
+
+def _parameters_key(parameters: object) -> int:
+    """Build a hashable key for bind parameters."""
+    if isinstance(parameters, Mapping):
+        return hash(repr(sorted(parameters.items(), key=lambda item: str(item[0]))))
+    if isinstance(parameters, Sequence) and not isinstance(parameters, str):
+        return hash(repr(tuple(parameters)))
+    return hash(repr(parameters))
+
+
+def start_query_stats() -> Token[QueryStats | None]:
+    """Start collecting statistics for the current request.
+
+    Returns:
+        Token to pass to reset_query_stats() when the request ends.
+    """
+    return query_stats_var.set(QueryStats())
+
+
+def reset_query_stats(token: Token[QueryStats | None]) -> None:
+    """Stop collecting statistics for the current request."""
+    query_stats_var.reset(token)
+
+
+def get_query_stats() -> QueryStats | None:
+    """Get statistics collected for the current request."""
+    return query_stats_var.get()
+
+
+@contextmanager
+def capture_queries() -> Generator[QueryStats, None, None]:
+    """Collect statistics for every statement executed inside the block.
+
+    Unlike the request-scoped statistics, this captures statements from any
+    thread or task, which is what tests and benchmarks driving the app through
+    a client need.
+
+    Yields:
+        QueryStats: Statistics updated as statements execute.
+    """
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+
+def _before_cursor_execute(  # noqa: PLR0913
+    conn: Connection,
+    cursor: DBAPICursor,  # noqa: ARG001
+    statement: str,  # noqa: ARG001
+    parameters: object,  # noqa: ARG001
+    context: ExecutionContext | None,  # noqa: ARG001
+    executemany: bool,  # noqa: ARG001, FBT001
+) -> None:
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(  # noqa: PLR0913
+    conn: Connection,
+    cursor: DBAPICursor,  # noqa: ARG001
+    statement: str,
+    parameters: object,
+    context: ExecutionContext | None,  # noqa: ARG001
+    executemany: bool,  # noqa: ARG001, FBT001
+) -> None:
+    start_times: list[float] = conn.info.get(_START_TIMES_KEY, [])
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+    DB_QUERY_DURATION.observe(duration_ms / 1000)
+
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.record(statement, parameters, duration_ms)
+    for capture in _captures:
+        capture.record(statement, parameters, duration_ms)
+
+
+def _on_pool_connect(*_args: object) -> None:
+    DB_POOL_CONNECTIONS.labels("open").inc()
+
+
+def _on_pool_close(*_args: object) -> None:
+    DB_POOL_CONNECTIONS.labels("open").dec()
+
+
+def _on_pool_checkout(*_args: object) -> None:
+    DB_POOL_CONNECTIONS.labels("checked_out").inc()
+
+
+def _on_pool_checkin(*_args: object) -> None:
+    DB_POOL_CONNECTIONS.labels("checked_out").dec()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach statement statistics and pool metrics hooks to an engine.
+
+    Args:
+        engine: Engine to instrument.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    # プールから切り離された(detach)接続はオープン数から除外する
+    event.listen(engine.pool, "connect", _on_pool_connect)
+    event.listen(engine.pool, "close", _on_pool_close)
+    event.listen(engine.pool, "detach", _on_pool_close)
+    event.listen(engine.pool, "checkout", _on_pool_checkout)
+    event.listen(engine.pool, "checkin", _on_pool_checkin)
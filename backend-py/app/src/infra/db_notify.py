@@ -0,0 +1,149 @@
+"""このモジュールは、PostgreSQLのLISTEN/NOTIFYをasyncioで待ち受ける機能を提供します.
+
+通知用の接続はプールから切り離した専用の接続で、自動コミットモードでLISTENします。
+接続が切れた場合はバックオフしながら再接続し、LISTENし直します。
+ソケットをイベントループのリーダーに登録するため、待機中にスレッドを占有しません。
+"""
+
+import asyncio
+from typing import Any, Self
+
+from sqlalchemy import Engine
+
+from infra.db_client import get_engine
+from util.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class NotificationListener:
+    """1つのチャネルの通知を待ち受ける.
+
+    Usage:
+        async with NotificationListener("jobs") as listener:
+            while True:
+                await listener.wait()
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        engine: Engine | None = None,
+        *,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ) -> None:
+        """初期化する.
+
+        Args:
+            channel: LISTENするチャネル名
+            engine: 接続元のエンジン(省略時はプロセス共有のエンジン)
+            reconnect_delay: 再接続の初回の待ち時間(秒)
+            max_reconnect_delay: 再接続の待ち時間の上限(秒)
+        """
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._engine = engine
+        self._connection: Any = None
+        # リーダーに登録中のソケット(切断後はfileno()が例外を送出するため保持する)
+        self._fd: int | None = None
+        self._notified = asyncio.Event()
+        self._lost = False
+
+    async def __aenter__(self) -> Self:
+        """専用の接続を開いてLISTENを開始する.
+
+        接続できない場合は最初のwaitから再接続を試みる。
+        """
+        try:
+            await self._open()
+        except Exception:  # noqa: BLE001
+            logger.warning(
+                "Failed to listen for notifications",
+                channel=self.channel,
+                exc_info=True,
+            )
+            self._lost = True
+            self._notified.set()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        """リーダー登録を解除して接続を閉じる."""
+        self._close()
+
+    async def wait(self) -> None:
+        """次の通知まで待つ.
+
+        前回の待機以降に届いた通知はまとめて1回として扱う。
+        接続が切れた場合は待ち時間を倍にしながら再接続してLISTENし直し、
+        通知があったものとして戻る(切断中の通知は受け取れないため)。
+        """
+        await self._notified.wait()
+        self._notified.clear()
+        if self._lost:
+            await self._reconnect()
+
+    async def _open(self) -> None:
+        self._connection = await asyncio.to_thread(self._connect)
+        self._fd = self._connection.fileno()
+        asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+        self._lost = False
+
+    def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        self._remove_reader()
+        if connection is not None:
+            connection.close()
+
+    async def _reconnect(self) -> None:
+        self._close()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self._open()
+            except Exception:  # noqa: BLE001
+                logger.warning(
+                    "Failed to reconnect the notification connection",
+                    channel=self.channel,
+                    retry_in=delay,
+                    exc_info=True,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            else:
+                logger.info("Notification connection restored", channel=self.channel)
+                return
+
+    def _connect(self) -> Any:  # noqa: ANN401
+        engine = self._engine or get_engine()
+        pooled = engine.raw_connection()
+        # プールに返却されないよう切り離し、psycopg2の接続を直接使う
+        pooled.detach()
+        connection: Any = pooled.driver_connection
+        # pool_pre_pingで開始されたトランザクションを閉じてから自動コミットにする
+        connection.rollback()
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _on_readable(self) -> None:
+        try:
+            self._connection.poll()
+        except Exception:  # noqa: BLE001
+            # 切断時はwaitで再接続する
+            logger.warning("Notification connection lost", channel=self.channel)
+            self._remove_reader()
+            self._lost = True
+            self._notified.set()
+            return
+        if self._connection.notifies:
+            self._connection.notifies.clear()
+            self._notified.set()
+
+    def _remove_reader(self) -> None:
+        # 切断時に解除済みなら何もしない
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            asyncio.get_running_loop().remove_reader(fd)
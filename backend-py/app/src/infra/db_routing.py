@@ -0,0 +1,232 @@
+"""このモジュールは、読み取り専用のクエリをリードレプリカに振り分けます.
+
+read_only()で印を付けたステートメントだけがレプリカで実行され、それ以外は
+すべてプライマリで実行されます。振り分けはセッション単位で決まります。
+
+- セッションが最初に使うレプリカを以後も使い続ける(SET LOCALなどの設定が
+  同じ接続に効くようにするため)
+- セッションが一度でも書き込んだら、以後の読み取りはプライマリで行う
+  (レプリカに反映される前の自分の書き込みを読めるようにするため)
+- 遅延がしきい値を超えたレプリカ、または遅延を確認できないレプリカは
+  使わず、使えるレプリカがなければプライマリで読む
+
+レプリカの遅延は一定間隔ごとに確認し、その間は前回の結果を使います。
+"""
+
+import itertools
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event, text
+from sqlalchemy.orm import UOWTransaction
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.base import Executable
+from sqlmodel import Session
+
+from util.logging import get_logger
+from util.metrics import DB_READ_ROUTES
+
+logger = get_logger(__name__)
+
+# Execution option marking a statement as safe to run on a replica
+READ_ONLY_OPTION = "read_only"
+
+# Seconds the replica is behind the primary, or NULL if it is not streaming
+# WAL from the primary (its replayed WAL may then be arbitrarily old). A
+# streaming replica that has replayed all WAL it received is not behind, even
+# if the primary has been idle since. Reading the receiver status needs the
+# pg_read_all_stats role; without it the replica reads as not streaming.
+_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN NOT EXISTS ("
+    "SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+def read_only[ExecutableT: Executable](statement: ExecutableT) -> ExecutableT:
+    """Mark a statement as safe to run on a read replica.
+
+    Args:
+        statement: Statement that writes nothing
+
+    Returns:
+        The statement with the read-only execution option
+    """
+    return statement.execution_options(**{READ_ONLY_OPTION: True})
+
+
+def replica_lag(engine: Engine) -> float:
+    """Measure how far a replica is behind its primary.
+
+    Args:
+        engine: Engine of the replica
+
+    Returns:
+        Lag in seconds (0 for a server that is not replicating, infinity for
+        a replica that is not streaming from its primary)
+    """
+    with engine.connect() as connection:
+        lag = connection.execute(_LAG_QUERY).scalar_one()
+    return float("inf") if lag is None else float(lag)
+
+
+@dataclass
+class _Replica:
+    engine: Engine
+    healthy: bool = False
+    checked_at: float = float("-inf")
+
+
+class ReplicaRouter:
+    """Picks a replica that is close enough to the primary."""
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        *,
+        max_lag: float,
+        check_interval: float,
+        lag_probe: Callable[[Engine], float] = replica_lag,
+    ) -> None:
+        """Initialize the router.
+
+        Args:
+            engines: Engines of the replicas
+            max_lag: Seconds a replica may be behind and still be read from
+            check_interval: Seconds between lag checks of a replica
+            lag_probe: Measures the lag of a replica in seconds
+        """
+        self.replicas = [_Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+
+    def pick(self) -> Engine | None:
+        """Pick a replica in turn among those within the lag limit.
+
+        Returns:
+            Engine of the replica, or None if no replica is usable
+        """
+        count = len(self.replicas)
+        start = next(self._next)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if self._is_healthy(replica):
+                return replica.engine
+        return None
+
+    def dispose(self) -> None:
+        """Close the connection pools of the replicas."""
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def _is_healthy(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        if now - replica.checked_at < self.check_interval:
+            return replica.healthy
+        # One request checks a replica at a time; the others use the last result
+        if not self._lock.acquire(blocking=False):
+            return replica.healthy
+        try:
+            try:
+                lag = self.lag_probe(replica.engine)
+            except Exception:  # noqa: BLE001
+                logger.warning(
+                    "Read replica is unreachable",
+                    replica=replica.engine.url.render_as_string(),
+                    exc_info=True,
+                )
+                healthy = False
+            else:
+                healthy = lag <= self.max_lag
+                if not healthy:
+                    logger.warning(
+                        "Read replica is lagging",
+                        replica=replica.engine.url.render_as_string(),
+                        lag=lag,
+                    )
+            replica.healthy = healthy
+            replica.checked_at = now
+        finally:
+            self._lock.release()
+        return replica.healthy
+
+
+class RoutingSession(Session):
+    """Session that runs read-only statements on a replica."""
+
+    def __init__(
+        self,
+        bind: Engine,
+        *,
+        router: ReplicaRouter | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the session.
+
+        Args:
+            bind: Engine of the primary
+            router: Replicas to read from (everything runs on the primary
+                if omitted)
+            **kwargs: Other Session arguments
+        """
+        super().__init__(bind, **kwargs)
+        self.router = router
+        # Once set, reads go to the primary to see this session's writes
+        self.has_written = False
+        self._replica: Engine | None = None
+
+    def get_bind(
+        self,
+        mapper: Any = None,  # noqa: ANN401
+        *,
+        clause: ClauseElement | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Engine | Connection:
+        """Get the engine to run a statement on.
+
+        Args:
+            mapper: Mapper of the statement, if any
+            clause: Statement to run, if known
+            **kwargs: Other get_bind arguments
+
+        Returns:
+            A replica for read-only statements, the primary otherwise
+        """
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if not (
+            isinstance(clause, Executable)
+            and clause.get_execution_options().get(READ_ONLY_OPTION)
+        ):
+            # Statements other than queries may write (e.g. text() or DML)
+            if clause is not None and not getattr(clause, "is_select", False):
+                self.has_written = True
+            return primary
+        if self.router is None:
+            return primary
+        if self.has_written:
+            DB_READ_ROUTES.labels("primary_after_write").inc()
+            return primary
+        if self._replica is None:
+            self._replica = self.router.pick()
+        if self._replica is None:
+            DB_READ_ROUTES.labels("primary_fallback").inc()
+            return primary
+        DB_READ_ROUTES.labels("replica").inc()
+        return self._replica
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session: Session, _flush_context: UOWTransaction) -> None:
+    if isinstance(session, RoutingSession):
+        session.has_written = True
@@ -2,48 +2,88 @@
 
 import contextlib
 import os
+from typing import TYPE_CHECKING
 
-from supabase import Client, create_client
+from supabase_auth.http_clients import SyncClient
 from supabase_auth.types import User
 
 from domain.exceptions import AuthenticationError, ConfigurationError
 from util.logging import get_logger
+from util.metrics import track_external_call
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = get_logger(__name__)
 
 
 class SupabaseClient:
-    def __init__(self, access_token: str | None = None) -> None:
-        self.url: str | None = os.getenv("SUPABASE_URL")
-        self.key: str | None = os.getenv("SUPABASE_PUBLISHABLE_KEY")
-        self.user = None
+    """ワーカー内で共有するSupabaseクライアント.
+
+    HTTPクライアントと接続プールを再利用するため、アプリのライフスパンで一度だけ生成する。
+    リクエストごとのアクセストークンはクライアントに保持せず、呼び出しごとに渡す。
+    """
+
+    def __init__(self) -> None:
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_PUBLISHABLE_KEY")
 
-        if self.url is None or self.key is None:
+        if url is None or key is None:
             msg = "supabase url or publishable key is not set"
             raise ConfigurationError(msg)
+        self.url: str = url
+        self.key: str = key
 
+        # supabaseパッケージは初回のクライアント生成時に読み込む
+        from supabase import ClientOptions, create_client  # noqa: PLC0415
+
+        # 認証APIのHTTPクライアントを自前で生成して渡し、warm_upで同じ接続プールを使う。
+        # 設定はsupabase_authが自前で生成する場合と同じにする
+        self.http_client = SyncClient(follow_redirects=True, http2=True)
         self.client: Client = create_client(
             self.url,
             self.key,
+            options=ClientOptions(httpx_client=self.http_client),
         )
 
-        if access_token is not None:
-            logger.info("access token: %s", access_token)
-            try:
+    def get_user(self, access_token: str) -> User | None:
+        """アクセストークンに対応するユーザーを取得する.
+
+        Args:
+            access_token: Supabaseのアクセストークン
+
+        Returns:
+            User | None: 認証済みユーザー
+
+        Raises:
+            AuthenticationError: トークンの検証に失敗した場合
+        """
+        try:
+            with track_external_call("supabase", "auth.get_user"):
                 user_response = self.client.auth.get_user(access_token)
-            except Exception as e:
-                msg = "Failed to get user"
-                raise AuthenticationError(msg) from e
-            if user_response is None:
-                msg = "User response is None"
-                raise AuthenticationError(msg)
-            self.user = user_response.user
-            if self.user is None:
-                return
-            self.client.postgrest.auth(token=access_token)
-
-    def get_user(self) -> User | None:
-        return self.user
+        except Exception as e:
+            msg = "Failed to get user"
+            raise AuthenticationError(msg) from e
+        if user_response is None:
+            msg = "User response is None"
+            raise AuthenticationError(msg)
+        return user_response.user
+
+    def warm_up(self) -> None:
+        """認証APIのヘルスチェックを呼び、HTTP接続(TCP/TLS)を確立する.
+
+        ヘルスチェックはトークンのいらない公開エンドポイントで、確立した接続は
+        プールに残り、以降のget_userが再利用する。失敗した場合の例外はそのまま送出する。
+        """
+        with track_external_call("supabase", "auth.warm_up"):
+            response = self.http_client.get(
+                f"{self.client.auth_url}/health", headers={"apikey": self.key}
+            )
+            response.raise_for_status()
+
+    def close(self) -> None:
+        """認証APIのHTTPクライアントを閉じる."""
+        self.client.auth.close()
 
 
 # クライアントのインスタンス化と利用例
@@ -0,0 +1,62 @@
+"""Document ingestion command.
+
+Chunks UTF-8 text files and embeds their new chunks into the embeddings
+table. Each file's path (as given) is its document ID, so run the command
+from the same directory each time; chunks a file no longer produces are
+deleted, and unchanged ones are not embedded again. New chunks that are
+near-duplicates of another document's chunk are not embedded.
+
+Usage:
+    cd src && python ingest.py ../docs/manual.md ../docs/faq.md
+
+Settings (environment variables):
+    DOCUMENT_INGESTION_CHUNK_TOKENS: Tokens per chunk (default 512)
+    DOCUMENT_INGESTION_OVERLAP_TOKENS: Tokens repeated from the previous
+        chunk (default 64)
+    DOCUMENT_INGESTION_BATCH_SIZE: Chunks per embedding request (default 128)
+    NEAR_DUPLICATE_THRESHOLD: Estimated 3-gram Jaccard similarity from which
+        chunks are near-duplicates (default 0.8)
+"""
+
+import argparse
+from pathlib import Path
+
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.openai_gateway import OpenAIGateway
+from infra.db_client import dispose_engine, session_scope
+from usecase.document_ingestion_usecase import DocumentIngestionUseCase
+from usecase.near_duplicate_usecase import NearDuplicateUseCase
+from util.logging import configure_logging
+
+
+def main() -> None:
+    """Ingest the files given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Ingest text files into the embeddings table."
+    )
+    parser.add_argument("paths", nargs="+", type=Path, help="UTF-8 text files")
+    args = parser.parse_args()
+
+    configure_logging()
+    openai_gateway = OpenAIGateway()
+    embeddings_gateway = EmbeddingsGateway()
+    usecase = DocumentIngestionUseCase(
+        embeddings_gateway=embeddings_gateway,
+        openai_gateway=openai_gateway,
+        session_factory=session_scope,
+        projection_gateway=EmbeddingProjectionGateway(),
+        near_duplicate_usecase=NearDuplicateUseCase(
+            embeddings_gateway=embeddings_gateway, session_factory=session_scope
+        ),
+    )
+    try:
+        for path in args.paths:
+            usecase.ingest_file(path)
+    finally:
+        openai_gateway.close()
+        dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
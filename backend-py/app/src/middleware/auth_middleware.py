@@ -1,9 +1,10 @@
-from typing import NoReturn
+from typing import Annotated, NoReturn
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyHeader
 from supabase_auth.types import User
 
+from container import get_supabase_client
 from infra.supabase_client import SupabaseClient
 from util.logging import get_logger
 
@@ -20,7 +21,10 @@ def _raise_unauthorized(detail: str) -> NoReturn:
     )
 
 
-async def verify_token(auth_header: str = Depends(authorization_header)) -> User:
+async def verify_token(
+    supabase_client: Annotated[SupabaseClient, Depends(get_supabase_client)],
+    auth_header: str = Depends(authorization_header),
+) -> User:
     if not auth_header.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -30,10 +34,9 @@ async def verify_token(auth_header: str = Depends(authorization_header)) -> User
     token = auth_header.split(" ")[1]
 
     try:
-        supabase_client = SupabaseClient(access_token=token)
-        user: User | None = supabase_client.get_user()
-        logger.info("user: %s", user)
+        user: User | None = supabase_client.get_user(token)
         if user is not None:
+            logger.debug("Authenticated user", user_id=user.id)
             return user
         _raise_unauthorized("Unauthorized")
     except Exception as e:
@@ -2,60 +2,104 @@
 
 import time
 import uuid
-from collections.abc import Awaitable, Callable
+from typing import Any
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from infra.db_instrumentation import (
+    get_query_stats,
+    reset_query_stats,
+    start_query_stats,
+)
 from util.logging import clear_request_context, get_logger, set_request_context
 
 logger = get_logger(__name__)
 
+REQUEST_ID_HEADER = "x-request-id"
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Request logging middleware."""
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
+class LoggingMiddleware:
+    """Request logging middleware.
+
+    Implemented as a plain ASGI middleware: the downstream app runs in the
+    caller's task and response bodies are passed through unbuffered, so
+    streaming and SSE responses are not delayed. "Request completed" is
+    logged once the response body has been fully sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and output logs."""
-        request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
-        user_id = getattr(request.state, "user_id", None)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        set_request_context(request_id, user_id)
+        request_id = _header(scope, REQUEST_ID_HEADER) or str(uuid.uuid4())
+        user_id = scope.get("state", {}).get("user_id")
+
+        set_request_context(request_id, user_id, scope["path"])
+        query_stats_token = start_query_stats()
 
         logger.info(
             "Request started",
-            method=request.method,
-            path=request.url.path,
-            query=str(request.query_params),
+            method=scope["method"],
+            path=scope["path"],
+            query=scope.get("query_string", b"").decode("latin-1"),
         )
 
         start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers[REQUEST_ID_HEADER] = request_id
+            await send(message)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
             duration_ms = (time.perf_counter() - start_time) * 1000
 
             logger.info(
                 "Request completed",
-                status_code=response.status_code,
+                status_code=status_code,
                 duration_ms=round(duration_ms, 2),
+                **_query_stats_fields(),
             )
 
-            response.headers["x-request-id"] = request_id
-            return response  # noqa: TRY300
-
         except Exception as e:
             duration_ms = (time.perf_counter() - start_time) * 1000
             logger.exception(
                 "Request failed",
                 error=str(e),
                 duration_ms=round(duration_ms, 2),
+                **_query_stats_fields(),
             )
             raise
 
         finally:
+            reset_query_stats(query_stats_token)
             clear_request_context()
+
+
+def _header(scope: Scope, name: str) -> str | None:
+    """Get a request header value from the ASGI scope."""
+    key = name.encode("latin-1")
+    for header_name, value in scope["headers"]:
+        if header_name == key:
+            decoded: str = value.decode("latin-1")
+            return decoded
+    return None
+
+
+def _query_stats_fields() -> dict[str, Any]:
+    """Get SQL statistics of the current request as log fields."""
+    stats = get_query_stats()
+    if stats is None:
+        return {}
+    return stats.as_log_fields()
@@ -0,0 +1,48 @@
+"""Request tracing middleware."""
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from util.logging import get_request_id
+from util.tracing import SpanKind, start_span
+
+
+class TracingMiddleware:
+    """Open the root span of each request.
+
+    Must run inside LoggingMiddleware so the request ID is already set; the
+    trace ID is derived from it, which lets log lines and spans be joined.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request inside a server span."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with start_span(
+            f"{scope['method']} {scope['path']}",
+            kind=SpanKind.SERVER,
+            request_id=get_request_id(),
+        ) as span:
+            if not span.sampled:
+                await self.app(scope, receive, send)
+                return
+
+            span.set_attribute("http.request.method", scope["method"])
+            span.set_attribute("url.path", scope["path"])
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status_code: int = message["status"]
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:  # noqa: PLR2004
+                        span.set_error(f"HTTP {status_code}")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                span.set_attribute("http.route", route)
@@ -0,0 +1,146 @@
+"""Production server launcher.
+
+Runs the app under uvicorn with one worker per available CPU, the fastest
+installed event loop and HTTP parser, and connection limits tuned for running
+behind a load balancer. On SIGTERM uvicorn stops accepting connections and
+waits up to GRACEFUL_SHUTDOWN_TIMEOUT seconds for in-flight requests before
+the lifespan shutdown closes clients.
+
+Usage:
+    cd src && python server.py
+
+Settings (environment variables):
+    HOST / PORT: Bind address (default 0.0.0.0:8000)
+    WEB_CONCURRENCY: Worker processes (default: available CPUs)
+    KEEP_ALIVE_TIMEOUT: Idle keep-alive seconds; keep it above the load
+        balancer's idle timeout (default 65)
+    BACKLOG: Listen backlog (default 2048)
+    LIMIT_CONCURRENCY: Max connections per worker before 503 (default: none)
+    LIMIT_MAX_REQUESTS: Recycle a worker after this many requests (default: none)
+    GRACEFUL_SHUTDOWN_TIMEOUT: Seconds to drain on SIGTERM (default 30)
+    FORWARDED_ALLOW_IPS: Proxies trusted for X-Forwarded-* (default 127.0.0.1)
+"""
+
+import importlib.util
+import math
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+
+
+def available_cpus() -> int:
+    """Count the CPUs this process may use.
+
+    Honors CPU affinity and, inside containers, the cgroup v2 CPU quota, which
+    os.cpu_count() ignores.
+
+    Returns:
+        Number of usable CPUs (at least 1)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()
+    except (OSError, ValueError):
+        return max(cpus, 1)
+    if quota != "max":
+        cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    return max(cpus, 1)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def select_loop() -> str:
+    """Use uvloop when it is installed (not available on Windows)."""
+    return "uvloop" if sys.platform != "win32" and _installed("uvloop") else "asyncio"
+
+
+def select_http() -> str:
+    """Use the httptools parser when it is installed."""
+    return "httptools" if _installed("httptools") else "h11"
+
+
+def _optional_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    """uvicorn options for production."""
+
+    host: str
+    port: int
+    workers: int
+    loop: str
+    http: str
+    backlog: int
+    timeout_keep_alive: int
+    limit_concurrency: int | None
+    limit_max_requests: int | None
+    timeout_graceful_shutdown: int
+    forwarded_allow_ips: str
+    proxy_headers: bool = True
+    access_log: bool = False  # LoggingMiddleware already logs each request
+
+    @classmethod
+    def from_env(cls) -> "ServerSettings":
+        """Read settings from environment variables."""
+        return cls(
+            host=os.getenv("HOST", "0.0.0.0"),  # noqa: S104
+            port=int(os.getenv("PORT", "8000")),
+            workers=_optional_int("WEB_CONCURRENCY") or available_cpus(),
+            loop=select_loop(),
+            http=select_http(),
+            backlog=int(os.getenv("BACKLOG", "2048")),
+            timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", "65")),
+            limit_concurrency=_optional_int("LIMIT_CONCURRENCY"),
+            limit_max_requests=_optional_int("LIMIT_MAX_REQUESTS"),
+            timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30")),
+            forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        )
+
+    def uvicorn_options(self) -> dict[str, Any]:
+        """Get keyword arguments for uvicorn.run."""
+        return asdict(self)
+
+
+def prepare_multiprocess_metrics(workers: int) -> None:
+    """Share Prometheus metrics between workers through a fresh directory.
+
+    Must run before any worker imports prometheus_client. An explicitly
+    configured PROMETHEUS_MULTIPROC_DIR is emptied, since files of a previous
+    run would be aggregated into /metrics.
+    """
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory is None:
+        if workers <= 1:
+            return
+        directory = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("*.db"):
+        stale.unlink()
+
+
+def main() -> None:
+    """Start uvicorn with the production settings."""
+    import uvicorn  # noqa: PLC0415
+
+    settings = ServerSettings.from_env()
+    prepare_multiprocess_metrics(settings.workers)
+    uvicorn.run("app:app", **settings.uvicorn_options())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Chat graph use case backing the GraphQL API.
+
+Relations are read in batches: each ``load_*`` method takes the keys
+collected by a DataLoader and returns one result per key in the same order,
+using a single statement for all keys.
+"""
+
+from collections import defaultdict
+from collections.abc import Sequence
+from uuid import UUID
+
+from sqlmodel import Session
+
+from domain.entity.models import (
+    ChatRooms,
+    Messages,
+    VirtualUserProfiles,
+    VirtualUsers,
+)
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.message_gateway import MessageGateway
+from gateway.virtual_user_gateway import VirtualUserGateway
+from gateway.virtual_user_profile_gateway import VirtualUserProfileGateway
+from util.tracing import traced
+
+
+class ChatGraphUseCase:
+    """Use case for reading chat rooms with their nested relations."""
+
+    def __init__(
+        self,
+        *,
+        chat_room_gateway: ChatRoomGateway,
+        message_gateway: MessageGateway,
+        virtual_user_gateway: VirtualUserGateway,
+        virtual_user_profile_gateway: VirtualUserProfileGateway,
+    ) -> None:
+        """Initialize use case with gateways.
+
+        Args:
+            chat_room_gateway: Gateway for chat rooms
+            message_gateway: Gateway for messages
+            virtual_user_gateway: Gateway for virtual users
+            virtual_user_profile_gateway: Gateway for virtual user profiles
+        """
+        self.chat_room_gateway = chat_room_gateway
+        self.message_gateway = message_gateway
+        self.virtual_user_gateway = virtual_user_gateway
+        self.virtual_user_profile_gateway = virtual_user_profile_gateway
+
+    @traced("ChatGraphUseCase.get_chat_rooms")
+    def get_chat_rooms(
+        self, user_id: UUID, limit: int, session: Session
+    ) -> list[ChatRooms]:
+        """Get the user's chat rooms, newest first.
+
+        Args:
+            user_id: ID of the requesting user
+            limit: Maximum number of chat rooms
+            session: Database session
+
+        Returns:
+            Chat rooms the user belongs to
+        """
+        return self.chat_room_gateway.get_by_user_id(user_id, limit, session)
+
+    @traced("ChatGraphUseCase.get_chat_room")
+    def get_chat_room(
+        self, chat_room_id: int, user_id: UUID, session: Session
+    ) -> ChatRooms | None:
+        """Get a chat room if the user belongs to it.
+
+        Args:
+            chat_room_id: Chat room ID
+            user_id: ID of the requesting user
+            session: Database session
+
+        Returns:
+            The chat room, or None if it does not exist or the user is not
+            a member
+        """
+        if not self.chat_room_gateway.is_member(chat_room_id, user_id, session):
+            return None
+        return self.chat_room_gateway.get_by_id(chat_room_id, session)
+
+    @traced("ChatGraphUseCase.load_messages")
+    def load_messages(
+        self, keys: Sequence[tuple[int, int]], session: Session
+    ) -> list[list[Messages]]:
+        """Get the latest messages of chat rooms.
+
+        Keys with the same limit share one statement, so a query that asks
+        for the same number of messages in every room costs one statement.
+
+        Args:
+            keys: (chat room ID, message limit) pairs
+            session: Database session
+
+        Returns:
+            Messages of each key's room in chronological order
+        """
+        by_room: dict[tuple[int, int], list[Messages]] = defaultdict(list)
+        room_ids_by_limit: dict[int, list[int]] = defaultdict(list)
+        for chat_room_id, limit in keys:
+            room_ids_by_limit[limit].append(chat_room_id)
+        for limit, chat_room_ids in room_ids_by_limit.items():
+            for message in self.message_gateway.get_recent_by_chat_room_ids(
+                chat_room_ids, limit, session
+            ):
+                by_room[message.chat_room_id, limit].append(message)
+        return [by_room[key] for key in keys]
+
+    @traced("ChatGraphUseCase.load_chat_room_virtual_users")
+    def load_chat_room_virtual_users(
+        self, chat_room_ids: Sequence[int], session: Session
+    ) -> list[list[VirtualUsers]]:
+        """Get the virtual users linked to chat rooms.
+
+        Args:
+            chat_room_ids: Chat room IDs
+            session: Database session
+
+        Returns:
+            Virtual users of each chat room
+        """
+        by_room: dict[int, list[VirtualUsers]] = defaultdict(list)
+        pairs = self.virtual_user_gateway.get_by_chat_room_ids(chat_room_ids, session)
+        for chat_room_id, virtual_user in pairs:
+            by_room[chat_room_id].append(virtual_user)
+        return [by_room[chat_room_id] for chat_room_id in chat_room_ids]
+
+    @traced("ChatGraphUseCase.load_virtual_users")
+    def load_virtual_users(
+        self, virtual_user_ids: Sequence[UUID], session: Session
+    ) -> list[VirtualUsers | None]:
+        """Get virtual users by ID.
+
+        Args:
+            virtual_user_ids: Virtual user IDs
+            session: Database session
+
+        Returns:
+            Each virtual user, or None if it does not exist
+        """
+        by_id = {
+            virtual_user.id: virtual_user
+            for virtual_user in self.virtual_user_gateway.get_by_ids(
+                virtual_user_ids, session
+            )
+        }
+        return [by_id.get(virtual_user_id) for virtual_user_id in virtual_user_ids]
+
+    @traced("ChatGraphUseCase.load_virtual_user_profiles")
+    def load_virtual_user_profiles(
+        self, virtual_user_ids: Sequence[UUID], session: Session
+    ) -> list[VirtualUserProfiles | None]:
+        """Get the profiles of virtual users.
+
+        Args:
+            virtual_user_ids: Virtual user IDs
+            session: Database session
+
+        Returns:
+            Each virtual user's profile, or None if it has none
+        """
+        by_id = {
+            profile.virtual_user_id: profile
+            for profile in self.virtual_user_profile_gateway.get_by_virtual_user_ids(
+                virtual_user_ids, session
+            )
+        }
+        return [by_id.get(virtual_user_id) for virtual_user_id in virtual_user_ids]
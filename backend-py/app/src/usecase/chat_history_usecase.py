@@ -0,0 +1,65 @@
+"""Chat history use case."""
+
+from uuid import UUID
+
+from sqlmodel import Session
+
+from domain.entity.chat import ChatHistoryResponse, ChatMessage
+from domain.exceptions import ResourceNotFoundError
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.message_gateway import MessageGateway
+from util.tracing import traced
+
+
+class ChatHistoryUseCase:
+    """Use case for reading the messages of a chat room."""
+
+    def __init__(
+        self,
+        *,
+        chat_room_gateway: ChatRoomGateway,
+        message_gateway: MessageGateway,
+    ) -> None:
+        """Initialize use case with gateways.
+
+        Args:
+            chat_room_gateway: Gateway for chat rooms
+            message_gateway: Gateway for messages
+        """
+        self.chat_room_gateway = chat_room_gateway
+        self.message_gateway = message_gateway
+
+    @traced("ChatHistoryUseCase.execute")
+    def execute(
+        self,
+        chat_room_id: int,
+        user_id: UUID,
+        session: Session,
+        limit: int = 100,
+    ) -> ChatHistoryResponse:
+        """Get the latest messages of a chat room the user belongs to.
+
+        Args:
+            chat_room_id: Chat room ID
+            user_id: ID of the requesting user
+            session: Database session
+            limit: Maximum number of messages
+
+        Returns:
+            Messages in chronological order
+
+        Raises:
+            ResourceNotFoundError: If the room does not exist or the user is
+                not a member
+        """
+        if not self.chat_room_gateway.is_member(chat_room_id, user_id, session):
+            msg = "Chat room not found"
+            raise ResourceNotFoundError(msg)
+
+        messages = self.message_gateway.get_recent_by_chat_room_id(
+            chat_room_id, limit, session
+        )
+        return ChatHistoryResponse(
+            chat_room_id=chat_room_id,
+            messages=[ChatMessage.model_validate(message) for message in messages],
+        )
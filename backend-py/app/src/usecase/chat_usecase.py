@@ -1,163 +1,550 @@
-"""Chat use case for handling chat interactions."""
+"""Chat use case for handling chat interactions.
 
+A chat interaction is split into steps so that transports can share them:
+the HTTP endpoint runs them all per request, while a WebSocket connection
+opens one context and runs a prepare/stream/complete cycle per message.
+"""
+
+import os
 import uuid
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+from typing import Self
 
 from sqlmodel import Session, select
 
-from domain.entity.chat import ChatRequest, ChatResponse
+from domain.entity.chat import (
+    ChatRequest,
+    ChatResponse,
+    HistoryMessage,
+    VirtualUserProfileSummary,
+    VirtualUserSummary,
+)
 from domain.entity.models import VirtualUserChats, VirtualUserProfiles
+from domain.exceptions import ResourceNotFoundError
+from domain.service.chunking_service import TokenCounter
+from domain.service.context_packing_service import pack_context
+from domain.service.prompt_service import Persona, PromptPrefix, compile_prefix
 from gateway.chat_room_gateway import ChatRoomGateway
 from gateway.current_user_gateway import CurrentUserGateway
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
 from gateway.embeddings_gateway import EmbeddingsGateway
 from gateway.message_gateway import MessageGateway
 from gateway.openai_gateway import OpenAIGateway
 from gateway.user_profile_gateway import UserProfileGateway
 from gateway.virtual_user_gateway import VirtualUserGateway
+from usecase.rate_limit_usecase import RateLimitUseCase
+from util.logging import get_logger
+from util.metrics import CHAT_CONTEXT_TEXTS, CHAT_CONTEXT_TOKENS
+from util.tracing import start_span, traced
+
+logger = get_logger(__name__)
+
+# Name of the virtual user created for a user on their first chat
+DEFAULT_VIRTUAL_USER_NAME = "AI Assistant"
+
+
+@dataclass(frozen=True)
+class ChatSettings:
+    """Sizes of the history and recalled context sent with a turn."""
+
+    # Recent messages of the chat room sent as history
+    history_messages: int = 10
+    # Tokens of history; older messages are left out first
+    history_tokens: int = 2000
+    # Messages the start of the history moves by at once; in between, each
+    # turn's prompt begins with the previous turn's (see prompt_service)
+    history_block: int = 6
+    # Past messages recalled as candidates for the context
+    memory_candidates: int = 8
+    # Tokens of recalled context, packed by relevance
+    context_tokens: int = 1000
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from CHAT_* environment variables.
+
+        Returns:
+            Chat settings
+        """
+        return cls(
+            history_messages=int(os.getenv("CHAT_HISTORY_MESSAGES", "10")),
+            history_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "2000")),
+            history_block=int(os.getenv("CHAT_HISTORY_BLOCK", "6")),
+            memory_candidates=int(os.getenv("CHAT_MEMORY_CANDIDATES", "8")),
+            context_tokens=int(os.getenv("CHAT_CONTEXT_TOKENS", "1000")),
+        )
+
+
+@dataclass
+class ChatContext:
+    """What is known about the chatting user across turns."""
+
+    user_id: uuid.UUID
+    # Resolved on the first turn
+    virtual_user: VirtualUserSummary | None = None
+    persona: Persona | None = None
+    # Rooms the virtual user is known to be linked to
+    linked_chat_room_ids: set[int] = field(default_factory=set)
+
+
+@dataclass(frozen=True)
+class ChatTurn:
+    """A saved user message waiting for the AI reply."""
+
+    chat_room_id: int
+    user_message_id: int
+    user_message: str
+    prompt_context: str | None
+    # System message of the virtual user's persona
+    prompt_prefix: PromptPrefix
+    # Recent messages of the chat room, oldest first
+    history: tuple[HistoryMessage, ...] = ()
 
 
 class ChatUseCase:
     """Use case for chat operations."""
 
-    def __init__(self, access_token: str | None = None) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        current_user_gateway: CurrentUserGateway,
+        user_profile_gateway: UserProfileGateway,
+        chat_room_gateway: ChatRoomGateway,
+        message_gateway: MessageGateway,
+        virtual_user_gateway: VirtualUserGateway,
+        embeddings_gateway: EmbeddingsGateway,
+        openai_gateway: OpenAIGateway,
+        rate_limit_usecase: RateLimitUseCase | None = None,
+        projection_gateway: EmbeddingProjectionGateway | None = None,
+        settings: ChatSettings | None = None,
+        token_counter: TokenCounter | None = None,
+    ) -> None:
         """Initialize use case with gateways.
 
+        The gateways are shared by all requests of a worker; only the
+        access token and session passed to execute vary per request.
+
         Args:
-            access_token: Supabase access token for authentication
+            current_user_gateway: Gateway resolving the authenticated user
+            user_profile_gateway: Gateway for user profiles
+            chat_room_gateway: Gateway for chat rooms
+            message_gateway: Gateway for messages
+            virtual_user_gateway: Gateway for virtual users
+            embeddings_gateway: Gateway for embeddings search
+            openai_gateway: Gateway for OpenAI chat completions
+            rate_limit_usecase: Per-user quota checked before any work is done
+                (no limit if omitted)
+            projection_gateway: Gateway for the active embedding reduction
+                searched first (binary-quantized search if omitted)
+            settings: History and context sizes (default: from the environment)
+            token_counter: Token counter of the chat model (default: the
+                OpenAI gateway's)
         """
-        self.current_user_gateway = CurrentUserGateway(access_token)
-        self.user_profile_gateway = UserProfileGateway()
-        self.chat_room_gateway = ChatRoomGateway()
-        self.message_gateway = MessageGateway()
-        self.virtual_user_gateway = VirtualUserGateway()
-        self.embeddings_gateway = EmbeddingsGateway()
-        self.openai_gateway = OpenAIGateway()
-
-    def execute(self, request: ChatRequest, session: Session) -> ChatResponse:
+        self.current_user_gateway = current_user_gateway
+        self.user_profile_gateway = user_profile_gateway
+        self.chat_room_gateway = chat_room_gateway
+        self.message_gateway = message_gateway
+        self.virtual_user_gateway = virtual_user_gateway
+        self.embeddings_gateway = embeddings_gateway
+        self.openai_gateway = openai_gateway
+        self.rate_limit_usecase = rate_limit_usecase
+        self.projection_gateway = projection_gateway
+        self.settings = settings or ChatSettings.from_env()
+        self.token_counter = token_counter or openai_gateway.count_tokens
+
+    def warm_up(self) -> None:
+        """Compile the prompt prefix of the default virtual user.
+
+        Virtual users without a profile share this prefix, so their first
+        turns skip compiling it.
+        """
+        compile_prefix(Persona(name=DEFAULT_VIRTUAL_USER_NAME))
+
+    @traced("ChatUseCase.execute")
+    def execute(
+        self, request: ChatRequest, session: Session, access_token: str
+    ) -> ChatResponse:
         """Execute chat interaction.
 
         Args:
             request: Chat request
             session: Database session
+            access_token: Supabase access token of the requesting user
 
         Returns:
             Chat response with AI message
+
+        Raises:
+            RateLimitExceededError: If the user has used up their quota
+            ResourceNotFoundError: If the chat room does not exist or the user
+                is not a member
+        """
+        context = self.open_context(access_token, session)
+        self.admit_turn(context, session)
+        turn = self.prepare_turn(
+            context, request, self.embed_query(request.message), session
+        )
+
+        # 9. Call OpenAI API
+        ai_response = self.openai_gateway.chat_completion(
+            user_message=request.message,
+            context=turn.prompt_context,
+            history=turn.history,
+            system_prompt=turn.prompt_prefix.system_prompt,
+            prompt_cache_key=turn.prompt_prefix.cache_key,
+        )
+        return self.complete_turn(context, turn, ai_response, session)
+
+    def open_context(self, access_token: str, session: Session) -> ChatContext:
+        """Authenticate the user of a request or connection.
+
+        Args:
+            access_token: Supabase access token of the requesting user
+            session: Database session
+
+        Returns:
+            Context to pass to every turn of the request or connection
+
+        Raises:
+            ValueError: If the access token does not belong to a user
         """
         # 1. Get current user (Users)
-        current_user = self.current_user_gateway.get_current_user(session)
+        current_user = self.current_user_gateway.get_current_user(access_token, session)
         if current_user is None:
             msg = "User not authenticated"
             raise ValueError(msg)
 
         # Cast SQLAlchemy UUID to Python uuid.UUID for type checking
-        user_uuid = uuid.UUID(str(current_user.id))
+        return ChatContext(user_id=uuid.UUID(str(current_user.id)))
 
-        # 2. Get user profile (UserProfiles)
-        _user_profile = self.user_profile_gateway.get_or_create(user_uuid, session)
+    def admit_turn(self, context: ChatContext, session: Session) -> None:
+        """Take a turn from the user's quota before any work is done for it.
 
-        # 3. Get or create chat room (ChatRooms, UserChats)
-        if request.chat_room_id is not None:
-            chat_room = self.chat_room_gateway.get_by_id(request.chat_room_id, session)
-            if chat_room is None:
-                msg = "Chat room not found"
-                raise ValueError(msg)
-        else:
-            chat_room = self.chat_room_gateway.create(user_uuid, session)
+        Args:
+            context: Context from open_context
+            session: Database session
 
-        # 4. Get or create virtual user (VirtualUsers)
-        virtual_users = self.virtual_user_gateway.get_by_owner_id(user_uuid, session)
-        if len(virtual_users) == 0:
-            virtual_user = self.virtual_user_gateway.create(
-                name="AI Assistant",
-                owner_id=user_uuid,
-                session=session,
-            )
-        else:
-            virtual_user = virtual_users[0]
+        Raises:
+            RateLimitExceededError: If the user has used up their quota
+        """
+        # Reject over-quota users before any writes or the LLM call
+        if self.rate_limit_usecase is not None:
+            self.rate_limit_usecase.execute(context.user_id, session)
 
-        # 5. Link virtual user to chat room (VirtualUserChats)
-        virtual_user_chat_statement = select(VirtualUserChats).where(
-            VirtualUserChats.virtual_user_id == virtual_user.id,
-            VirtualUserChats.chat_room_id == chat_room.id,
-        )
-        virtual_user_chat = session.exec(virtual_user_chat_statement).first()
-        if virtual_user_chat is None:
-            virtual_user_chat = VirtualUserChats(
-                virtual_user_id=virtual_user.id,
-                chat_room_id=chat_room.id,
-            )
-            session.add(virtual_user_chat)
-            session.commit()
+    def embed_query(self, message: str) -> list[float] | None:
+        """Embed a user's message to search their past conversations with.
 
-        # 6. Get virtual user profile (VirtualUserProfiles)
-        profile_statement = select(VirtualUserProfiles).where(
-            VirtualUserProfiles.virtual_user_id == virtual_user.id
+        Uses no database session, so callers can run it without holding a
+        connection.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            The query embedding, or None if the message could not be embedded
+        """
+        try:
+            return self.openai_gateway.embed_query(message)
+        except Exception:  # noqa: BLE001
+            # Memory only adds context; answer without it rather than fail
+            logger.warning("Failed to embed the chat query", exc_info=True)
+            return None
+
+    @traced("ChatUseCase.prepare_turn")
+    def prepare_turn(
+        self,
+        context: ChatContext,
+        request: ChatRequest,
+        query_embedding: list[float] | None,
+        session: Session,
+    ) -> ChatTurn:
+        """Save the user's message and collect context for the AI reply.
+
+        The virtual user and the rooms it is linked to are cached in the
+        context, so later turns of a connection skip those lookups.
+
+        Args:
+            context: Context from open_context, admitted by admit_turn
+            request: Chat request
+            query_embedding: Embedding of the message from embed_query (no
+                memory is recalled if None)
+            session: Database session
+
+        Returns:
+            The turn to stream or complete the AI reply for
+
+        Raises:
+            ResourceNotFoundError: If the chat room does not exist or the user
+                is not a member
+        """
+        user_uuid = context.user_id
+
+        # Search the user's past conversations before this turn writes
+        # anything: the session reads from the primary once it has written,
+        # and memory is fine to read from a replica (Embeddings)
+        memories = (
+            self._search_memory(user_uuid, query_embedding, session)
+            if query_embedding is not None
+            else []
         )
-        virtual_user_profile = session.exec(profile_statement).first()
 
-        # 7. Save user message (Messages)
-        # chat_room.idはcreate直後にrefreshされているため必ず値がある
-        if chat_room.id is None:
-            msg = "Chat room ID is None"
-            raise ValueError(msg)
+        if context.virtual_user is None:
+            context.virtual_user, context.persona = self._resolve_virtual_user(
+                user_uuid, session
+            )
+        virtual_user = context.virtual_user
 
-        # Cast virtual_user.id to Python uuid.UUID
-        virtual_user_uuid = uuid.UUID(str(virtual_user.id))
+        # 3. Get or create chat room (ChatRooms, UserChats)
+        chat_room_id = request.chat_room_id
+        if chat_room_id is None:
+            chat_room = self.chat_room_gateway.create(user_uuid, session)
+            # chat_room.idはcreate直後にrefreshされているため必ず値がある
+            if chat_room.id is None:
+                msg = "Chat room ID is None"
+                raise ValueError(msg)
+            chat_room_id = chat_room.id
+        elif chat_room_id not in context.linked_chat_room_ids and (
+            not self.chat_room_gateway.is_member(chat_room_id, user_uuid, session)
+        ):
+            msg = "Chat room not found"
+            raise ResourceNotFoundError(msg)
+
+        # 5. Link virtual user to chat room (VirtualUserChats)
+        if chat_room_id not in context.linked_chat_room_ids:
+            self._link_virtual_user(virtual_user.id, chat_room_id, session)
+            context.linked_chat_room_ids.add(chat_room_id)
 
-        user_message = self.message_gateway.create(
-            chat_room_id=chat_room.id,
-            virtual_sender_id=virtual_user_uuid,
+        # 7. Save user message (Messages)
+        user_message = self.message_gateway.create_from_user(
+            chat_room_id=chat_room_id,
+            sender_id=user_uuid,
             content=request.message,
             session=session,
         )
+        if user_message.id is None:
+            msg = "Message IDs are None"
+            raise ValueError(msg)
 
-        # 8. Search embeddings for context (Embeddings)
-        embeddings = self.embeddings_gateway.search_similar(
-            _query=request.message,
-            limit=3,
-            session=session,
+        # 8. Get the room's recent messages and pack the recalled
+        # conversations around them for context (Messages)
+        history = self._history(chat_room_id, user_message.id, session)
+        prompt_context = self._pack_memory(
+            memories, (*(message.content for message in history), request.message)
         )
 
-        # Build context from embeddings
-        context = None
-        if len(embeddings) > 0:
-            context = "\n".join([emb.content for emb in embeddings])
-
-        # 9. Call OpenAI API
-        system_prompt = (
-            "あなたは親切なAIアシスタントです。ユーザーの質問に丁寧に答えてください。"
-        )
-        ai_response = self.openai_gateway.chat_completion(
+        return ChatTurn(
+            chat_room_id=chat_room_id,
+            user_message_id=user_message.id,
             user_message=request.message,
-            system_prompt=system_prompt,
-            context=context,
+            prompt_context=prompt_context,
+            # Compiled once per persona; equal personas share the prefix
+            prompt_prefix=compile_prefix(
+                context.persona or Persona(name=virtual_user.name)
+            ),
+            history=history,
+        )
+
+    def stream_reply(self, turn: ChatTurn) -> AsyncGenerator[str, None]:
+        """Stream the AI reply to a prepared turn.
+
+        Args:
+            turn: Turn from prepare_turn
+
+        Returns:
+            Reply text chunks (close the generator to stop early)
+        """
+        return self.openai_gateway.stream_chat_completion(
+            user_message=turn.user_message,
+            context=turn.prompt_context,
+            history=turn.history,
+            system_prompt=turn.prompt_prefix.system_prompt,
+            prompt_cache_key=turn.prompt_prefix.cache_key,
         )
 
+    @traced("ChatUseCase.complete_turn")
+    def complete_turn(
+        self,
+        context: ChatContext,
+        turn: ChatTurn,
+        ai_response: str,
+        session: Session,
+    ) -> ChatResponse:
+        """Save the AI reply of a turn.
+
+        Args:
+            context: Context the turn was prepared with
+            turn: Turn from prepare_turn
+            ai_response: Full AI reply text
+            session: Database session
+
+        Returns:
+            Chat response with AI message
+        """
+        virtual_user = context.virtual_user
+        if virtual_user is None:
+            msg = "Turn was not prepared"
+            raise ValueError(msg)
+
         # 10. Save AI response message (Messages)
         ai_message = self.message_gateway.create(
-            chat_room_id=chat_room.id,
-            virtual_sender_id=virtual_user_uuid,
+            chat_room_id=turn.chat_room_id,
+            virtual_sender_id=virtual_user.id,
             content=ai_response,
             session=session,
         )
 
         # 11. Return response
         # Message IDsはcreate直後にrefreshされているため必ず値がある
-        if user_message.id is None or ai_message.id is None:
+        if ai_message.id is None:
             msg = "Message IDs are None"
             raise ValueError(msg)
 
         return ChatResponse(
-            chat_room_id=chat_room.id,
-            user_message_id=user_message.id,
+            chat_room_id=turn.chat_room_id,
+            user_message_id=turn.user_message_id,
             ai_message_id=ai_message.id,
             ai_response=ai_response,
-            virtual_user={
-                "id": str(virtual_user.id),
-                "name": virtual_user.name,
-                "profile": {
-                    "backstory": (
-                        virtual_user_profile.backstory if virtual_user_profile else None
-                    )
-                },
-            },
+            virtual_user=virtual_user,
+        )
+
+    def _resolve_virtual_user(
+        self, user_uuid: uuid.UUID, session: Session
+    ) -> tuple[VirtualUserSummary, Persona]:
+        # 2. Get user profile (UserProfiles)
+        _user_profile = self.user_profile_gateway.get_or_create(user_uuid, session)
+
+        # 4. Get or create virtual user (VirtualUsers)
+        virtual_users = self.virtual_user_gateway.get_by_owner_id(user_uuid, session)
+        if len(virtual_users) == 0:
+            virtual_user = self.virtual_user_gateway.create(
+                name=DEFAULT_VIRTUAL_USER_NAME,
+                owner_id=user_uuid,
+                session=session,
+            )
+        else:
+            virtual_user = virtual_users[0]
+
+        # 6. Get virtual user profile (VirtualUserProfiles)
+        with start_span("ChatUseCase.get_virtual_user_profile"):
+            profile_statement = select(VirtualUserProfiles).where(
+                VirtualUserProfiles.virtual_user_id == virtual_user.id
+            )
+            virtual_user_profile = session.exec(profile_statement).first()
+
+        # Cast virtual_user.id to Python uuid.UUID
+        summary = VirtualUserSummary(
+            id=uuid.UUID(str(virtual_user.id)),
+            name=virtual_user.name,
+            profile=VirtualUserProfileSummary(
+                backstory=(
+                    virtual_user_profile.backstory if virtual_user_profile else None
+                )
+            ),
+        )
+        return summary, Persona.from_profile(virtual_user.name, virtual_user_profile)
+
+    def _history(
+        self, chat_room_id: int, user_message_id: int, session: Session
+    ) -> tuple[HistoryMessage, ...]:
+        """Get the room's latest messages that fit the history budget.
+
+        The history starts at a multiple of history_block messages into the
+        room, so it only grows from one turn to the next until its start
+        moves on by a whole block.
+        """
+        settings = self.settings
+        if settings.history_messages <= 0:
+            return ()
+        messages, count = self.message_gateway.get_recent_and_count_by_chat_room_id(
+            chat_room_id, settings.history_messages + 1, session
+        )
+        # Position of each message in the room
+        first = count - len(messages)
+        history = [
+            (
+                first + index,
+                HistoryMessage(
+                    content=message.content, from_user=message.sender_id is not None
+                ),
+            )
+            for index, message in enumerate(messages)
+            if message.id != user_message_id
+        ]
+        if not history:
+            return ()
+        block = max(settings.history_block, 1)
+        end = history[-1][0] + 1
+        start = max(-(-(end - settings.history_messages) // block) * block, 0)
+        history = [
+            (position, message) for position, message in history if position >= start
+        ]
+        # Over the token budget, the oldest messages are left out a block at once
+        while sum(self.token_counter(message.content) for _, message in history) > (
+            settings.history_tokens
+        ):
+            start += block
+            history = [
+                (position, message)
+                for position, message in history
+                if position >= start
+            ]
+        return tuple(message for _, message in history)
+
+    def _search_memory(
+        self, user_uuid: uuid.UUID, query_embedding: list[float], session: Session
+    ) -> list[str]:
+        # Messages are indexed into embeddings by MessageIndexerUseCase
+        embeddings = self.embeddings_gateway.search_similar(
+            query_embedding,
+            limit=self.settings.memory_candidates,
+            session=session,
+            user_id=str(user_uuid),
+            projection=(
+                self.projection_gateway.get_active(session)
+                if self.projection_gateway is not None
+                else None
+            ),
         )
+        return [emb.content for emb in embeddings]
+
+    def _pack_memory(self, memories: list[str], history: tuple[str, ...]) -> str | None:
+        if not memories:
+            return None
+        packed = pack_context(
+            memories,
+            self.token_counter,
+            budget=self.settings.context_tokens,
+            history=history,
+        )
+        CHAT_CONTEXT_TOKENS.labels("sent").inc(packed.tokens)
+        CHAT_CONTEXT_TOKENS.labels("saved").inc(packed.tokens_saved)
+        for outcome in ("packed", "truncated", "covered", "over_budget"):
+            CHAT_CONTEXT_TEXTS.labels(outcome).inc(getattr(packed, outcome))
+        logger.info(
+            "Packed chat context",
+            tokens=packed.tokens,
+            tokens_saved=packed.tokens_saved,
+            packed=packed.packed,
+            truncated=packed.truncated,
+            covered=packed.covered,
+            over_budget=packed.over_budget,
+        )
+        return packed.text
+
+    def _link_virtual_user(
+        self, virtual_user_id: uuid.UUID, chat_room_id: int, session: Session
+    ) -> None:
+        with start_span("ChatUseCase.link_virtual_user"):
+            virtual_user_chat_statement = select(VirtualUserChats).where(
+                VirtualUserChats.virtual_user_id == virtual_user_id,
+                VirtualUserChats.chat_room_id == chat_room_id,
+            )
+            virtual_user_chat = session.exec(virtual_user_chat_statement).first()
+            if virtual_user_chat is None:
+                virtual_user_chat = VirtualUserChats(
+                    virtual_user_id=virtual_user_id,
+                    chat_room_id=chat_room_id,
+                )
+                session.add(virtual_user_chat)
+                session.commit()
@@ -0,0 +1,265 @@
+"""Ingestion of documents into the embeddings table.
+
+A document is streamed through the chunker (see chunking_service), so a
+large file is never held in memory. Chunks are processed in batches, one
+embedding request and one transaction per batch. Each chunk's embedding ID
+contains the hash of its text: chunks that already have a row are skipped,
+so ingesting a changed document again only embeds the chunks whose text
+changed. Once the whole document is read, the rows of chunks it no longer
+produces are deleted.
+
+With a NearDuplicateUseCase, new chunks that are near-duplicates of another
+document's chunk (e.g. templated boilerplate) are rejected before they are
+embedded. The signature of each embedded chunk is stored either way.
+
+An interrupted ingestion leaves its committed batches in place, and running
+it again resumes by skipping them.
+"""
+
+import os
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from itertools import batched
+from pathlib import Path
+from typing import Self
+
+from sqlmodel import Session
+
+from domain.entity.document import DocumentChunk
+from domain.service.chunking_service import TokenCounter, chunk_text, read_blocks
+from domain.service.near_duplicate_service import NearDuplicateIndex, minhash
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.openai_gateway import OpenAIGateway
+from usecase.near_duplicate_usecase import NearDuplicateUseCase
+from util.logging import get_logger
+from util.metrics import DOCUMENT_CHUNKS_INGESTED
+from util.tokenizer import count_tokens
+
+logger = get_logger(__name__)
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+
+@dataclass(frozen=True)
+class DocumentIngestionSettings:
+    """Chunk sizes and batching of document ingestion."""
+
+    # Tokens per chunk, counted with the embedding model's tokenizer
+    chunk_tokens: int = 512
+    # Tokens repeated from the end of the previous chunk
+    overlap_tokens: int = 64
+    # Chunks per embedding request and transaction
+    batch_size: int = 128
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from DOCUMENT_INGESTION_* environment variables.
+
+        Returns:
+            Ingestion settings
+        """
+        return cls(
+            chunk_tokens=int(os.getenv("DOCUMENT_INGESTION_CHUNK_TOKENS", "512")),
+            overlap_tokens=int(os.getenv("DOCUMENT_INGESTION_OVERLAP_TOKENS", "64")),
+            batch_size=int(os.getenv("DOCUMENT_INGESTION_BATCH_SIZE", "128")),
+        )
+
+
+@dataclass(frozen=True)
+class IngestionResult:
+    """Chunk counts of one ingested document."""
+
+    document_id: str
+    chunks: int
+    # Chunks embedded because no row had their text
+    embedded: int
+    # Chunks rejected as near-duplicates of another document's chunk
+    near_duplicates: int
+    # Rows of chunks the document no longer produces
+    deleted: int
+
+    @property
+    def unchanged(self) -> int:
+        """Chunks skipped because their row already existed."""
+        return self.chunks - self.embedded - self.near_duplicates
+
+
+class DocumentIngestionUseCase:
+    """Chunk documents and embed the new chunks."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        embeddings_gateway: EmbeddingsGateway,
+        openai_gateway: OpenAIGateway,
+        session_factory: SessionFactory,
+        settings: DocumentIngestionSettings | None = None,
+        projection_gateway: EmbeddingProjectionGateway | None = None,
+        token_counter: TokenCounter = count_tokens,
+        near_duplicate_usecase: NearDuplicateUseCase | None = None,
+    ) -> None:
+        """Initialize the use case.
+
+        Args:
+            embeddings_gateway: Gateway for embeddings
+            openai_gateway: Gateway for the embedding model
+            session_factory: Opens a new session per batch
+            settings: Ingestion settings (default: from the environment)
+            projection_gateway: Gateway for embedding reductions (embeddings
+                are stored unreduced if omitted)
+            token_counter: Token counter of the embedding model
+            near_duplicate_usecase: Rejects near-duplicate chunks (all new
+                chunks are embedded if omitted)
+        """
+        self.embeddings_gateway = embeddings_gateway
+        self.openai_gateway = openai_gateway
+        self.session_factory = session_factory
+        self.settings = settings or DocumentIngestionSettings.from_env()
+        self.projection_gateway = projection_gateway
+        self.token_counter = token_counter
+        self.near_duplicate_usecase = near_duplicate_usecase
+
+    def ingest_file(
+        self, path: Path, document_id: str | None = None
+    ) -> IngestionResult:
+        """Ingest a UTF-8 text file, reading it in blocks.
+
+        Args:
+            path: File to ingest
+            document_id: Document key (default: the path as given)
+
+        Returns:
+            Chunk counts of the document
+        """
+        with path.open(encoding="utf-8") as file:
+            return self.ingest(document_id or str(path), read_blocks(file))
+
+    def ingest(self, document_id: str, blocks: Iterable[str]) -> IngestionResult:
+        """Ingest a document's text, committing once per batch of chunks.
+
+        Args:
+            document_id: Document key; its chunks from earlier ingestions are
+                kept if unchanged and deleted otherwise
+            blocks: Consecutive pieces of the text
+
+        Returns:
+            Chunk counts of the document
+        """
+        chunks = (
+            DocumentChunk(document_id=document_id, content=text)
+            for text in chunk_text(
+                blocks,
+                self.token_counter,
+                max_tokens=self.settings.chunk_tokens,
+                overlap_tokens=self.settings.overlap_tokens,
+            )
+        )
+        index = (
+            self.near_duplicate_usecase.document_index(document_id)
+            if self.near_duplicate_usecase is not None
+            else None
+        )
+        # Only IDs are kept, so memory grows with the chunk count, not the text
+        ingested: set[str] = set()
+        embedded = near_duplicates = 0
+        for batch in batched(chunks, self.settings.batch_size):
+            with self.session_factory() as session:
+                count, rejected = self._upsert(batch, index, session)
+                session.commit()
+            embedded += count
+            near_duplicates += rejected
+            ingested.update(chunk.embedding_id for chunk in batch)
+            DOCUMENT_CHUNKS_INGESTED.labels("embedded").inc(count)
+            DOCUMENT_CHUNKS_INGESTED.labels("near_duplicate").inc(rejected)
+            DOCUMENT_CHUNKS_INGESTED.labels("unchanged").inc(
+                len(batch) - count - rejected
+            )
+        with self.session_factory() as session:
+            deleted = self.embeddings_gateway.delete_document_chunks(
+                document_id, ingested, session
+            )
+            session.commit()
+        result = IngestionResult(
+            document_id=document_id,
+            chunks=len(ingested),
+            embedded=embedded,
+            near_duplicates=near_duplicates,
+            deleted=deleted,
+        )
+        logger.info(
+            "Ingested document",
+            document_id=document_id,
+            chunks=result.chunks,
+            embedded=result.embedded,
+            unchanged=result.unchanged,
+            near_duplicates=result.near_duplicates,
+            deleted=result.deleted,
+        )
+        return result
+
+    def _upsert(
+        self,
+        batch: Sequence[DocumentChunk],
+        index: NearDuplicateIndex | None,
+        session: Session,
+    ) -> tuple[int, int]:
+        """Embed a batch's new chunks.
+
+        Returns:
+            Numbers of chunks embedded and rejected as near-duplicates
+        """
+        # A chunk repeated in the document maps to one row
+        unique = list({chunk.embedding_id: chunk for chunk in batch}.values())
+        stored = self.embeddings_gateway.get_content_hashes(
+            [chunk.embedding_id for chunk in unique], session
+        )
+        new: list[DocumentChunk] = []
+        signatures: dict[str, bytes] = {}
+        for chunk in unique:
+            if chunk.embedding_id in stored:
+                continue
+            signature = minhash(chunk.content)
+            if index is not None:
+                duplicate_of = index.find(signature)
+                if duplicate_of is not None:
+                    logger.debug(
+                        "Rejected near-duplicate chunk",
+                        id=chunk.embedding_id,
+                        duplicate_of=duplicate_of,
+                    )
+                    continue
+                # Later chunks of this run are checked against it too
+                index.add(signature, chunk.embedding_id)
+            signatures[chunk.embedding_id] = signature
+            new.append(chunk)
+        rejected = len(unique) - len(stored) - len(new)
+        if not new:
+            return 0, rejected
+        vectors = self.openai_gateway.embed_texts([chunk.content for chunk in new])
+        # The active reduction and the one being reprojected, so the rows
+        # are searchable before and after it is activated
+        projections = (
+            self.projection_gateway.get_current(session)
+            if self.projection_gateway is not None
+            else []
+        )
+        reduced = self.embeddings_gateway.reduced_columns(vectors, projections)
+        self.embeddings_gateway.upsert(
+            [
+                {
+                    "id": chunk.embedding_id,
+                    "embedding": vector,
+                    **reduced_columns,
+                    "content_minhash": signatures[chunk.embedding_id],
+                    "content": chunk.content,
+                    "metadata_": chunk.metadata(),
+                }
+                for chunk, vector, reduced_columns in zip(
+                    new, vectors, reduced, strict=True
+                )
+            ],
+            session,
+        )
+        return len(new), rejected
@@ -0,0 +1,147 @@
+"""Versioned dimensionality reduction of the embeddings.
+
+The first search stage reads an HNSW index over a reduced copy of each
+embedding (REDUCED_DIMENSIONS dimensions), which is a sixth of the float
+vectors' size and stays in memory where the full index would not.
+Candidates are reranked with the full vectors.
+
+A reduction is fitted by the fit_embedding_projection job: a PCA of a random
+sample of the stored embeddings, or a random orthonormal projection while
+there are too few embeddings for PCA. The fit is stored as a new projection
+version in the slot (pair of reduced vector and version columns) that the
+active version does not use, and reproject_embeddings jobs reduce the
+existing embeddings into it batch by batch. Only when all embeddings are
+reduced is the version activated and used to reduce queries, so a query is
+always compared with vectors reduced by the same matrix, and the active
+version's slot is searched unchanged until then. Writers of embeddings
+reduce new ones with both versions in the meantime.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Self
+
+from sqlmodel import Session
+
+from domain.entity.projection import REDUCED_DIMENSIONS
+from domain.service.projection_service import fit_pca, fit_random_projection
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EMBEDDING_DIMENSIONS, EmbeddingsGateway
+from gateway.job_gateway import JobGateway
+from usecase.job_worker_usecase import JobHandler
+from util.logging import get_logger
+
+logger = get_logger(__name__)
+
+FIT_JOB = "fit_embedding_projection"
+REPROJECT_JOB = "reproject_embeddings"
+
+
+@dataclass(frozen=True)
+class EmbeddingReductionSettings:
+    """Sampling and batching of the reduction jobs."""
+
+    # Embeddings the PCA is fitted on
+    sample_size: int = 20_000
+    # Embeddings reprojected per job (and transaction)
+    batch_size: int = 2_000
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from EMBEDDING_REDUCTION_* environment variables.
+
+        Returns:
+            Reduction settings
+        """
+        return cls(
+            sample_size=int(os.getenv("EMBEDDING_REDUCTION_SAMPLE_SIZE", "20000")),
+            batch_size=int(os.getenv("EMBEDDING_REDUCTION_BATCH_SIZE", "2000")),
+        )
+
+
+class EmbeddingReductionUseCase:
+    """Fit embedding reductions and reproject the embeddings."""
+
+    def __init__(
+        self,
+        *,
+        embeddings_gateway: EmbeddingsGateway,
+        projection_gateway: EmbeddingProjectionGateway,
+        job_gateway: JobGateway,
+        settings: EmbeddingReductionSettings | None = None,
+    ) -> None:
+        """Initialize the use case.
+
+        Args:
+            embeddings_gateway: Gateway for embeddings
+            projection_gateway: Gateway for embedding projections
+            job_gateway: Gateway for enqueueing follow-up jobs
+            settings: Reduction settings (default: from the environment)
+        """
+        self.embeddings_gateway = embeddings_gateway
+        self.projection_gateway = projection_gateway
+        self.job_gateway = job_gateway
+        self.settings = settings or EmbeddingReductionSettings.from_env()
+
+    def job_handlers(self) -> dict[str, JobHandler]:
+        """Get the background job handlers of the use case.
+
+        Returns:
+            Handlers by job kind
+        """
+        return {FIT_JOB: self.fit, REPROJECT_JOB: self.reproject}
+
+    def fit(self, payload: dict[str, Any], session: Session) -> None:
+        """Fit a new projection version and start reprojecting.
+
+        Args:
+            payload: Optional ``seed`` of the random projection
+            session: Database session of the job
+        """
+        sample = self.embeddings_gateway.sample_embeddings(
+            self.settings.sample_size, session
+        )
+        if len(sample) > REDUCED_DIMENSIONS:
+            fit = fit_pca(sample, REDUCED_DIMENSIONS)
+        else:
+            fit = fit_random_projection(
+                EMBEDDING_DIMENSIONS, REDUCED_DIMENSIONS, payload.get("seed")
+            )
+        version = self.projection_gateway.create(fit, session)
+        self.job_gateway.enqueue(REPROJECT_JOB, {"version": version}, session)
+        logger.info(
+            "Fitted embedding projection",
+            version=version,
+            method=fit.method,
+            sample_size=fit.sample_size,
+            explained_variance=fit.explained_variance,
+        )
+
+    def reproject(self, payload: dict[str, Any], session: Session) -> None:
+        """Reduce a batch of embeddings, then continue or activate.
+
+        Args:
+            payload: ``version`` of the projection
+            session: Database session of the job
+        """
+        version: int = payload["version"]
+        latest = self.projection_gateway.get_latest(session)
+        if latest is None or latest.version != version:
+            # A newer fit replaces this one; its own jobs reproject everything
+            logger.info("Skipped superseded embedding projection", version=version)
+            return
+        rows = self.embeddings_gateway.get_unreduced(
+            latest, self.settings.batch_size, session
+        )
+        if rows:
+            reduced = latest.project([vector for _, vector in rows]).tolist()
+            self.embeddings_gateway.set_reduced(
+                [(id_, vector) for (id_, _), vector in zip(rows, reduced, strict=True)],
+                latest,
+                session,
+            )
+        if len(rows) == self.settings.batch_size:
+            self.job_gateway.enqueue(REPROJECT_JOB, {"version": version}, session)
+            return
+        self.projection_gateway.activate(version, session)
+        logger.info("Activated embedding projection", version=version)
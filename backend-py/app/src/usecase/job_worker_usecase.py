@@ -0,0 +1,255 @@
+"""Background job worker pool.
+
+Jobs are rows of the jobs table (see JobGateway). A worker claims due jobs
+into free slots, runs each job's handler in a thread with its own session,
+and deletes the job in the same transaction as the handler's writes, so
+the writes of an attempt whose lease was lost are rolled back.
+Failed attempts are retried with exponential backoff until max_attempts.
+
+Workers sleep until a LISTEN/NOTIFY wake-up, a slot frees up, or the poll
+interval passes. Polling only picks up delayed retries and jobs whose lease
+expired, so the interval can be long.
+"""
+
+import asyncio
+import os
+import random
+from collections.abc import Callable, Mapping
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Protocol, Self
+
+from sqlmodel import Session
+
+from domain.entity.job import ClaimedJob
+from gateway.job_gateway import JobGateway
+from util.logging import get_logger
+from util.metrics import JOB_DURATION, JOBS_PROCESSED
+
+logger = get_logger(__name__)
+
+# Handlers take the job's payload and a session whose commit also removes
+# the job; they must not commit it themselves
+JobHandler = Callable[[dict[str, Any], Session], None]
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+
+class Notifications(Protocol):
+    """Source of wake-ups for new jobs (e.g. NotificationListener)."""
+
+    async def wait(self) -> None:
+        """Wait for the next notification."""
+
+
+@dataclass(frozen=True)
+class JobWorkerSettings:
+    """Concurrency, leases and retry policy of a worker."""
+
+    queue: str = "default"
+    concurrency: int = 4
+    # Lease of a claimed job; renewed while its handler runs
+    visibility_timeout: float = 60.0
+    # Fallback poll for delayed retries and expired leases
+    poll_interval: float = 30.0
+    retry_base_delay: float = 2.0
+    retry_max_delay: float = 600.0
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Backoff before the next attempt.
+
+        Exponential in the number of attempts so far, capped at
+        retry_max_delay, with jitter so failed jobs do not retry in lockstep.
+
+        Args:
+            attempts: Attempts made so far (at least 1)
+
+        Returns:
+            Delay until the job may be claimed again
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))  # noqa: S311
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from JOBS_* environment variables.
+
+        Returns:
+            Worker settings
+        """
+        return cls(
+            queue=os.getenv("JOBS_QUEUE", "default"),
+            concurrency=int(os.getenv("JOBS_CONCURRENCY", "4")),
+            visibility_timeout=float(os.getenv("JOBS_VISIBILITY_TIMEOUT", "60")),
+            poll_interval=float(os.getenv("JOBS_POLL_INTERVAL", "30")),
+            retry_base_delay=float(os.getenv("JOBS_RETRY_BASE_DELAY", "2")),
+            retry_max_delay=float(os.getenv("JOBS_RETRY_MAX_DELAY", "600")),
+        )
+
+
+class JobWorkerUseCase:
+    """Run jobs from one queue with a bounded number of concurrent jobs."""
+
+    def __init__(
+        self,
+        *,
+        job_gateway: JobGateway,
+        handlers: Mapping[str, JobHandler],
+        session_factory: SessionFactory,
+        settings: JobWorkerSettings | None = None,
+    ) -> None:
+        """Initialize the worker.
+
+        Args:
+            job_gateway: Gateway for the jobs table
+            handlers: Handlers by job kind
+            session_factory: Opens a new session (called from worker threads)
+            settings: Worker settings (default: from the environment)
+        """
+        self.job_gateway = job_gateway
+        self.handlers = handlers
+        self.session_factory = session_factory
+        self.settings = settings or JobWorkerSettings.from_env()
+        self._running: set[asyncio.Task[None]] = set()
+        self._wakeup = asyncio.Event()
+
+    async def run(
+        self, stop: asyncio.Event, notifications: Notifications | None = None
+    ) -> None:
+        """Claim and run jobs until ``stop`` is set.
+
+        Running jobs are finished before returning; their leases would
+        otherwise have to expire before another worker retries them.
+
+        Args:
+            stop: Set to stop claiming jobs
+            notifications: Wake-ups for new jobs (poll only if omitted)
+        """
+        listener = (
+            asyncio.create_task(self._listen(notifications))
+            if notifications is not None
+            else None
+        )
+        try:
+            while not stop.is_set():
+                # Cleared before claiming so no wake-up during the claim is lost
+                self._wakeup.clear()
+                free = self.settings.concurrency - len(self._running)
+                claimed = await self._claim(free) if free > 0 else 0
+                # A full batch may mean more jobs are due, so claim again
+                if free == 0 or claimed < free:
+                    await self._sleep(stop)
+        finally:
+            if listener is not None:
+                listener.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _claim(self, limit: int) -> int:
+        visibility_timeout = timedelta(seconds=self.settings.visibility_timeout)
+
+        def claim() -> list[ClaimedJob]:
+            with self.session_factory() as session:
+                return self.job_gateway.claim(
+                    self.settings.queue, limit, visibility_timeout, session
+                )
+
+        try:
+            jobs = await asyncio.to_thread(claim)
+        except Exception:
+            logger.exception("Failed to claim jobs", queue=self.settings.queue)
+            return 0
+        for job in jobs:
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+        return len(jobs)
+
+    def _on_done(self, task: asyncio.Task[None]) -> None:
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _sleep(self, stop: asyncio.Event) -> None:
+        waiters = [
+            asyncio.create_task(self._wakeup.wait()),
+            asyncio.create_task(stop.wait()),
+        ]
+        await asyncio.wait(
+            waiters,
+            timeout=self.settings.poll_interval,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for waiter in waiters:
+            waiter.cancel()
+
+    async def _listen(self, notifications: Notifications) -> None:
+        try:
+            while True:
+                await notifications.wait()
+                self._wakeup.set()
+        except Exception:
+            logger.exception("Job notifications stopped; polling only")
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        try:
+            outcome = await asyncio.to_thread(self._run_job, job)
+        except Exception:
+            # The lease expires and another attempt picks the job up
+            logger.exception("Failed to record job outcome", job_id=job.id)
+            outcome = "error"
+        finally:
+            heartbeat.cancel()
+        JOBS_PROCESSED.labels(job.kind, outcome).inc()
+        JOB_DURATION.labels(job.kind).observe(loop.time() - start_time)
+
+    async def _heartbeat(self, job: ClaimedJob) -> None:
+        visibility_timeout = timedelta(seconds=self.settings.visibility_timeout)
+
+        def extend() -> bool:
+            with self.session_factory() as session:
+                return self.job_gateway.extend(job, visibility_timeout, session)
+
+        while True:
+            await asyncio.sleep(self.settings.visibility_timeout / 3)
+            try:
+                owned = await asyncio.to_thread(extend)
+            except Exception:
+                logger.exception("Failed to extend job lease", job_id=job.id)
+                continue
+            if not owned:
+                logger.warning("Job lease lost", job_id=job.id, kind=job.kind)
+                return
+
+    def _run_job(self, job: ClaimedJob) -> str:
+        handler = self.handlers.get(job.kind)
+        with self.session_factory() as session:
+            if job.attempts > job.max_attempts:
+                # The last attempt's worker died or stalled past its lease
+                self.job_gateway.fail(job, "Lease expired on the last attempt", session)
+                return "failed"
+            if handler is None:
+                self.job_gateway.fail(job, f"Unknown job kind: {job.kind}", session)
+                return "failed"
+            try:
+                handler(job.payload, session)
+                if not self.job_gateway.complete(job, session):
+                    # Another worker reclaimed the job after the lease
+                    # expired; its attempt's writes are the ones that count
+                    session.rollback()
+                    logger.warning("Job lease lost", job_id=job.id, kind=job.kind)
+                    return "lost"
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                error = f"{type(e).__name__}: {e}"
+                logger.exception("Job failed", job_id=job.id, kind=job.kind)
+                if job.exhausted:
+                    self.job_gateway.fail(job, error, session)
+                    return "failed"
+                delay = self.settings.retry_delay(job.attempts)
+                self.job_gateway.retry(job, error, delay, session)
+                return "retried"
+        return "succeeded"
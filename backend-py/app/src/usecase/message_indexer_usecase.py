@@ -0,0 +1,278 @@
+"""Incremental indexer of chat messages into the embeddings table.
+
+Messages become long-term memory: each is embedded and upserted into
+embeddings with its user and chat room as metadata, so retrieval can search
+a user's past conversations. The indexer resumes from a watermark (the
+highest indexed message ID) and processes messages in batches, one
+embedding request per batch. A content hash is stored with each embedding,
+and messages whose text was already embedded are skipped. If an embedding
+reduction exists, each embedding is stored reduced by the current ones too
+(see EmbeddingReductionUseCase).
+
+Indexers wake up on the messages NOTIFY, wait ``settle`` seconds so bursts
+are indexed together, and index until they have caught up. Polling is a
+fallback for missed notifications. Messages are read in commit order (see
+MessageGateway.get_indexable_after), and embedding requests run outside any
+transaction.
+"""
+
+import asyncio
+import os
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Self
+
+from sqlmodel import Session
+
+from domain.entity.memory import MessageDocument
+from domain.service.near_duplicate_service import minhash
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.indexer_watermark_gateway import IndexerWatermarkGateway
+from gateway.message_gateway import MessageGateway
+from gateway.openai_gateway import MAX_EMBEDDING_CHARS, OpenAIGateway
+from usecase.job_worker_usecase import Notifications
+from util.logging import get_logger
+from util.metrics import MESSAGES_INDEXED
+
+logger = get_logger(__name__)
+
+# Name of the watermark in indexer_watermarks
+WATERMARK_NAME = "messages"
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+
+class IndexStatus(StrEnum):
+    """Outcome of one indexing pass."""
+
+    # More messages are waiting; index again right away
+    MORE = "more"
+    CAUGHT_UP = "caught_up"
+    # Another indexer holds the watermark
+    BUSY = "busy"
+
+
+@dataclass(frozen=True)
+class MessageIndexerSettings:
+    """Batching and scheduling of the message indexer."""
+
+    # Messages per pass and per embedding request
+    batch_size: int = 256
+    # Wait after a notification, so bursts are indexed together
+    settle: float = 2.0
+    # Fallback poll for missed notifications
+    poll_interval: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from MESSAGE_INDEXER_* environment variables.
+
+        Returns:
+            Indexer settings
+        """
+        return cls(
+            batch_size=int(os.getenv("MESSAGE_INDEXER_BATCH_SIZE", "256")),
+            settle=float(os.getenv("MESSAGE_INDEXER_SETTLE", "2")),
+            poll_interval=float(os.getenv("MESSAGE_INDEXER_POLL_INTERVAL", "60")),
+        )
+
+
+class MessageIndexerUseCase:
+    """Embed new chat messages into the embeddings table."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        message_gateway: MessageGateway,
+        embeddings_gateway: EmbeddingsGateway,
+        watermark_gateway: IndexerWatermarkGateway,
+        openai_gateway: OpenAIGateway,
+        session_factory: SessionFactory,
+        settings: MessageIndexerSettings | None = None,
+        projection_gateway: EmbeddingProjectionGateway | None = None,
+    ) -> None:
+        """Initialize the indexer.
+
+        Args:
+            message_gateway: Gateway for messages
+            embeddings_gateway: Gateway for embeddings
+            watermark_gateway: Gateway for indexer watermarks
+            openai_gateway: Gateway for the embedding model
+            session_factory: Opens a new session (called from worker threads)
+            settings: Indexer settings (default: from the environment)
+            projection_gateway: Gateway for embedding reductions (embeddings
+                are stored unreduced if omitted)
+        """
+        self.message_gateway = message_gateway
+        self.embeddings_gateway = embeddings_gateway
+        self.watermark_gateway = watermark_gateway
+        self.openai_gateway = openai_gateway
+        self.session_factory = session_factory
+        self.settings = settings or MessageIndexerSettings.from_env()
+        self.projection_gateway = projection_gateway
+
+    async def run(
+        self, stop: asyncio.Event, notifications: Notifications | None = None
+    ) -> None:
+        """Index messages until ``stop`` is set.
+
+        Args:
+            stop: Set to stop indexing
+            notifications: Wake-ups for new messages (poll only if omitted)
+        """
+        wakeup = asyncio.Event()
+        listener = (
+            asyncio.create_task(self._listen(notifications, wakeup))
+            if notifications is not None
+            else None
+        )
+        try:
+            while not stop.is_set():
+                # Cleared before indexing so no wake-up during the pass is lost
+                wakeup.clear()
+                try:
+                    status = await asyncio.to_thread(self.index_batch)
+                except Exception:
+                    logger.exception("Failed to index messages")
+                    status = IndexStatus.CAUGHT_UP
+                if status is IndexStatus.MORE:
+                    continue
+                if status is IndexStatus.CAUGHT_UP:
+                    await _wait_any(self.settings.poll_interval, wakeup, stop)
+                # Let the notifying transaction's batch settle; if busy, let
+                # the other indexer finish before checking what it left
+                await _wait_any(self.settings.settle, stop)
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+    def index_batch(self) -> IndexStatus:
+        """Index the next batch of messages after the watermark and commit.
+
+        The batch is read and embedded without holding a transaction open;
+        the watermark is locked only to upsert the embeddings and advance
+        it. If another indexer has advanced it in the meantime, the batch
+        is discarded and read again.
+
+        Returns:
+            Whether more messages are waiting, the indexer has caught up, or
+            another indexer holds the watermark
+        """
+        with self.session_factory() as session:
+            position = self.watermark_gateway.get(WATERMARK_NAME, session)
+            messages = self.message_gateway.get_indexable_after(
+                position, self.settings.batch_size, session
+            )
+            if not messages:
+                return IndexStatus.CAUGHT_UP
+            stored = self.embeddings_gateway.get_content_hashes(
+                [message.embedding_id for message in messages], session
+            )
+        changed = [
+            message
+            for message in messages
+            if stored.get(message.embedding_id) != message.content_hash
+        ]
+        vectors = self._embed(changed)
+        with self.session_factory() as session:
+            locked = self.watermark_gateway.lock(WATERMARK_NAME, session)
+            if locked is None:
+                session.rollback()
+                return IndexStatus.BUSY
+            if locked != position:
+                session.rollback()
+                return IndexStatus.MORE
+            self._upsert(changed, vectors, session)
+            self.watermark_gateway.advance(
+                WATERMARK_NAME, messages[-1].position, session
+            )
+            session.commit()
+        embedded = len(changed)
+        MESSAGES_INDEXED.labels("embedded").inc(embedded)
+        MESSAGES_INDEXED.labels("unchanged").inc(len(messages) - embedded)
+        logger.debug(
+            "Indexed messages",
+            embedded=embedded,
+            unchanged=len(messages) - embedded,
+            position=messages[-1].id,
+        )
+        if len(messages) < self.settings.batch_size:
+            return IndexStatus.CAUGHT_UP
+        return IndexStatus.MORE
+
+    def _embed(self, messages: list[MessageDocument]) -> dict[str, list[float]]:
+        # Identical texts (e.g. repeated short replies) are embedded once
+        texts = list(dict.fromkeys(message.content for message in messages))
+        if not texts:
+            return {}
+        return dict(
+            zip(
+                texts,
+                self.openai_gateway.embed_texts(
+                    [text[:MAX_EMBEDDING_CHARS] for text in texts]
+                ),
+                strict=True,
+            )
+        )
+
+    def _upsert(
+        self,
+        messages: list[MessageDocument],
+        vectors: dict[str, list[float]],
+        session: Session,
+    ) -> None:
+        if not messages:
+            return
+        texts = list(vectors)
+        # The active reduction and the one being reprojected, so the rows
+        # are searchable before and after it is activated
+        projections = (
+            self.projection_gateway.get_current(session)
+            if self.projection_gateway is not None
+            else []
+        )
+        reduced = dict(
+            zip(
+                texts,
+                self.embeddings_gateway.reduced_columns(
+                    list(vectors.values()), projections
+                ),
+                strict=True,
+            )
+        )
+        signatures = {text: minhash(text) for text in texts}
+        self.embeddings_gateway.upsert(
+            [
+                {
+                    "id": message.embedding_id,
+                    "embedding": vectors[message.content],
+                    **reduced[message.content],
+                    # For the near-duplicate pass (see NearDuplicateUseCase)
+                    "content_minhash": signatures[message.content],
+                    "content": message.content,
+                    "metadata_": message.metadata(),
+                }
+                for message in messages
+            ],
+            session,
+        )
+
+    async def _listen(
+        self, notifications: Notifications, wakeup: asyncio.Event
+    ) -> None:
+        try:
+            while True:
+                await notifications.wait()
+                wakeup.set()
+        except Exception:
+            logger.exception("Message notifications stopped; polling only")
+
+
+async def _wait_any(seconds: float, *events: asyncio.Event) -> None:
+    waiters = [asyncio.create_task(event.wait()) for event in events]
+    await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+    for waiter in waiters:
+        waiter.cancel()
@@ -0,0 +1,193 @@
+"""Near-duplicate detection over the embeddings table.
+
+Each embedding stores a MinHash signature of its content (content_minhash,
+see near_duplicate_service). Document ingestion rejects chunks that are
+near-duplicates of another document's chunk, using an index built from the
+stored signatures. The batch pass signs embeddings that have no signature
+yet, groups near-duplicates, and deletes all but the oldest row of each
+group. Messages are only grouped with messages of the same user, so one
+user's memory never replaces another's.
+"""
+
+import os
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from itertools import batched
+from typing import Self
+
+from sqlmodel import Session
+
+from domain.service.near_duplicate_service import (
+    THRESHOLD,
+    NearDuplicateIndex,
+    duplicate_mask,
+    find_duplicate_groups,
+    minhash,
+    signature_matrix,
+)
+from gateway.embeddings_gateway import EmbeddingsGateway
+from util.logging import get_logger
+
+logger = get_logger(__name__)
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+
+@dataclass(frozen=True)
+class NearDuplicateSettings:
+    """Threshold and batching of near-duplicate detection."""
+
+    # Estimated 3-gram Jaccard similarity from which texts are duplicates
+    threshold: float = THRESHOLD
+    # Embeddings signed or deleted per transaction
+    batch_size: int = 5_000
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """Build settings from NEAR_DUPLICATE_* environment variables.
+
+        Returns:
+            Near-duplicate settings
+        """
+        return cls(
+            threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", str(THRESHOLD))),
+            batch_size=int(os.getenv("NEAR_DUPLICATE_BATCH_SIZE", "5000")),
+        )
+
+
+@dataclass(frozen=True)
+class DeduplicationResult:
+    """Outcome of one batch pass."""
+
+    rows: int
+    # Groups with more than one row
+    groups: int
+    duplicates: int
+    # Rows deleted (0 on a dry run)
+    deleted: int
+    # Time spent grouping the signatures
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        """Grouping throughput."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class NearDuplicateUseCase:
+    """Find and remove near-duplicate embeddings."""
+
+    def __init__(
+        self,
+        *,
+        embeddings_gateway: EmbeddingsGateway,
+        session_factory: SessionFactory,
+        settings: NearDuplicateSettings | None = None,
+    ) -> None:
+        """Initialize the use case.
+
+        Args:
+            embeddings_gateway: Gateway for embeddings
+            session_factory: Opens a new session per transaction
+            settings: Near-duplicate settings (default: from the environment)
+        """
+        self.embeddings_gateway = embeddings_gateway
+        self.session_factory = session_factory
+        self.settings = settings or NearDuplicateSettings.from_env()
+
+    def document_index(self, exclude_document_id: str) -> NearDuplicateIndex:
+        """Index the signatures of the other documents' chunks.
+
+        The document's own chunks are left out, so an edited chunk is not
+        rejected as a duplicate of its previous version.
+
+        Args:
+            exclude_document_id: Document being ingested
+
+        Returns:
+            Index of the stored document chunks
+        """
+        with self.session_factory() as session:
+            rows = self.embeddings_gateway.get_signatures(
+                session, source="document", exclude_document_id=exclude_document_id
+            )
+        return NearDuplicateIndex(
+            signature_matrix([signature for _, _, signature in rows]),
+            [id_ for id_, _, _ in rows],
+            self.settings.threshold,
+        )
+
+    def sign_missing(self) -> int:
+        """Store signatures for embeddings that have none, batch by batch.
+
+        Returns:
+            Number of embeddings signed
+        """
+        signed = 0
+        while True:
+            with self.session_factory() as session:
+                rows = self.embeddings_gateway.get_unsigned(
+                    self.settings.batch_size, session
+                )
+                self.embeddings_gateway.set_signatures(
+                    [(id_, minhash(content)) for id_, content in rows], session
+                )
+                session.commit()
+            signed += len(rows)
+            if len(rows) < self.settings.batch_size:
+                logger.info("Signed embeddings", signed=signed)
+                return signed
+
+    def deduplicate(self, *, dry_run: bool = False) -> DeduplicationResult:
+        """Delete all but the oldest embedding of each near-duplicate group.
+
+        Args:
+            dry_run: Only count the duplicates
+
+        Returns:
+            Row, group and duplicate counts and the grouping time
+        """
+        import numpy as np  # noqa: PLC0415
+
+        with self.session_factory() as session:
+            rows = self.embeddings_gateway.get_signatures(session)
+        ids = [id_ for id_, _, _ in rows]
+        # Messages are scoped by user; documents (no user) share one scope
+        _, scopes = np.unique(
+            np.array([user_id or "" for _, user_id, _ in rows], dtype=object),
+            return_inverse=True,
+        )
+        start = time.perf_counter()
+        labels = find_duplicate_groups(
+            signature_matrix([signature for _, _, signature in rows]),
+            scopes.astype(np.int64),
+            self.settings.threshold,
+        )
+        seconds = time.perf_counter() - start
+        mask = duplicate_mask(labels)
+        duplicates = [ids[index] for index in np.flatnonzero(mask)]
+        deleted = 0
+        if not dry_run:
+            for batch in batched(duplicates, self.settings.batch_size):
+                with self.session_factory() as session:
+                    deleted += self.embeddings_gateway.delete_by_ids(batch, session)
+                    session.commit()
+        result = DeduplicationResult(
+            rows=len(rows),
+            groups=len(np.unique(labels[mask])),
+            duplicates=len(duplicates),
+            deleted=deleted,
+            seconds=seconds,
+        )
+        logger.info(
+            "Deduplicated embeddings",
+            rows=result.rows,
+            groups=result.groups,
+            duplicates=result.duplicates,
+            deleted=result.deleted,
+            rows_per_second=round(result.rows_per_second),
+            dry_run=dry_run,
+        )
+        return result
@@ -0,0 +1,301 @@
+"""Per-user rate limiting backed by token buckets shared between workers.
+
+The authoritative bucket of each user lives in the unlogged
+rate_limit_buckets table. A worker does not query it per request: it leases
+a batch of tokens and hands them out from memory, and remembers a rejection
+until the retry time has passed. Only every few requests of a user, and on
+the first request after a rejection has expired, reach the database. A lease
+runs in its own short transaction, so the bucket's row lock is released
+before the request goes on.
+
+Tiers follow the user's active Polar subscriptions and are cached per worker.
+If the shared store is unavailable, each worker falls back to an in-process
+bucket with the same tier limits.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable, Mapping
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from uuid import UUID
+
+import orjson
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from domain.entity.rate_limit import RateLimitTier
+from domain.exceptions import ConfigurationError, RateLimitExceededError
+from gateway.rate_limit_gateway import RateLimitGateway
+from gateway.subscription_gateway import SubscriptionGateway
+from util.logging import get_logger
+from util.metrics import RATE_LIMITED_REQUESTS
+
+logger = get_logger(__name__)
+
+DEFAULT_TIERS: Mapping[str, RateLimitTier] = {
+    "free": RateLimitTier(name="free", requests_per_minute=10, burst=5),
+    "pro": RateLimitTier(name="pro", requests_per_minute=60, burst=20),
+}
+_MAX_USERS = 10000
+
+SessionFactory = Callable[[], AbstractContextManager[Session]]
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    """Tiers and caching behaviour of the rate limiter.
+
+    Users without an active subscription get ``default_tier``. A subscribed
+    user gets the tier mapped to the subscription's Polar product in
+    ``product_tiers``, or ``subscribed_tier`` for unmapped products; with
+    several subscriptions the most generous tier wins.
+    """
+
+    enabled: bool = True
+    tiers: Mapping[str, RateLimitTier] = field(default_factory=lambda: DEFAULT_TIERS)
+    product_tiers: Mapping[str, str] = field(default_factory=dict)
+    default_tier: str = "free"
+    subscribed_tier: str = "pro"
+    # Seconds a user's tier is cached before subscriptions are read again
+    tier_ttl: float = 300.0
+    # Seconds leased tokens stay usable; unused ones are dropped afterwards
+    lease_ttl: float = 10.0
+    # Tokens leased at once = burst // lease_divisor, at least min_lease
+    # (and at most the burst)
+    lease_divisor: int = 4
+    min_lease: int = 3
+
+    def __post_init__(self) -> None:
+        """Check that every referenced tier is defined.
+
+        Raises:
+            ConfigurationError: If a tier name is unknown
+        """
+        referenced = {self.default_tier, self.subscribed_tier}
+        referenced.update(self.product_tiers.values())
+        unknown = referenced - self.tiers.keys()
+        if unknown:
+            msg = f"Unknown rate limit tier(s): {', '.join(sorted(unknown))}"
+            raise ConfigurationError(msg)
+
+    def tier_for(self, product_ids: list[str]) -> RateLimitTier:
+        """Pick the tier granted by a user's active subscriptions.
+
+        Args:
+            product_ids: Polar product IDs of the active subscriptions
+
+        Returns:
+            The most generous matching tier
+        """
+        if not product_ids:
+            return self.tiers[self.default_tier]
+        return max(
+            (
+                self.tiers[self.product_tiers.get(product_id, self.subscribed_tier)]
+                for product_id in product_ids
+            ),
+            key=lambda tier: tier.requests_per_minute,
+        )
+
+    def lease_size(self, tier: RateLimitTier) -> int:
+        """Number of tokens to lease from the shared bucket at once."""
+        return min(tier.burst, max(self.min_lease, tier.burst // self.lease_divisor))
+
+    @classmethod
+    def from_env(cls) -> "RateLimitSettings":
+        """Build settings from RATE_LIMIT_* environment variables.
+
+        Example:
+            RATE_LIMIT_TIERS='{"free": {"requests_per_minute": 10, "burst": 5},
+                               "pro": {"requests_per_minute": 60, "burst": 20}}'
+            RATE_LIMIT_PRODUCT_TIERS='{"<polar_product_id>": "pro"}'
+
+        Returns:
+            Rate limit settings
+        """
+        raw_tiers = os.getenv("RATE_LIMIT_TIERS")
+        tiers = (
+            {
+                name: RateLimitTier(name=name, **limits)
+                for name, limits in orjson.loads(raw_tiers).items()
+            }
+            if raw_tiers
+            else DEFAULT_TIERS
+        )
+        return cls(
+            enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false",
+            tiers=tiers,
+            product_tiers=orjson.loads(os.getenv("RATE_LIMIT_PRODUCT_TIERS", "{}")),
+            default_tier=os.getenv("RATE_LIMIT_DEFAULT_TIER", "free"),
+            subscribed_tier=os.getenv("RATE_LIMIT_SUBSCRIBED_TIER", "pro"),
+            tier_ttl=float(os.getenv("RATE_LIMIT_TIER_TTL", "300")),
+            lease_ttl=float(os.getenv("RATE_LIMIT_LEASE_TTL", "10")),
+            lease_divisor=int(os.getenv("RATE_LIMIT_LEASE_DIVISOR", "4")),
+            min_lease=int(os.getenv("RATE_LIMIT_MIN_LEASE", "3")),
+        )
+
+
+class _LocalBucket:
+    """In-process token bucket used while the shared store is unavailable."""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated_at")
+
+    def __init__(self, tier: RateLimitTier, now: float) -> None:
+        self.capacity = float(tier.burst)
+        self.refill_rate = tier.refill_per_second
+        self.tokens = self.capacity
+        self.updated_at = now
+
+    def consume(self, now: float) -> float:
+        """Take one token and return 0, or return the seconds until one refills."""
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+        if self.tokens < 1.0:
+            return (1.0 - self.tokens) / self.refill_rate
+        self.tokens -= 1.0
+        return 0.0
+
+
+class _UserState:
+    """What one worker knows about a user's quota."""
+
+    __slots__ = (
+        "blocked_until",
+        "fallback",
+        "lease_expires_at",
+        "tier",
+        "tier_expires_at",
+        "tokens",
+    )
+
+    def __init__(self) -> None:
+        self.tier: RateLimitTier | None = None
+        self.tier_expires_at = 0.0
+        self.tokens = 0
+        self.lease_expires_at = 0.0
+        self.blocked_until = 0.0
+        self.fallback: _LocalBucket | None = None
+
+
+class RateLimitUseCase:
+    """Use case enforcing a per-user request quota."""
+
+    def __init__(
+        self,
+        *,
+        rate_limit_gateway: RateLimitGateway,
+        subscription_gateway: SubscriptionGateway,
+        session_factory: SessionFactory,
+        settings: RateLimitSettings | None = None,
+        scope: str = "chat",
+    ) -> None:
+        """Initialize use case with gateways.
+
+        Args:
+            rate_limit_gateway: Gateway for the shared token buckets
+            subscription_gateway: Gateway for the user's subscriptions
+            session_factory: Opens the session of each lease
+            settings: Limits and caching (default: from the environment)
+            scope: Prefix of the bucket keys, separating limited endpoints
+        """
+        self.rate_limit_gateway = rate_limit_gateway
+        self.subscription_gateway = subscription_gateway
+        self.session_factory = session_factory
+        self.settings = settings or RateLimitSettings.from_env()
+        self.scope = scope
+        self._states: dict[UUID, _UserState] = {}
+        self._lock = threading.Lock()
+
+    def execute(self, user_id: UUID, session: Session) -> None:
+        """Consume one request from the user's quota.
+
+        Args:
+            user_id: User ID
+            session: Database session, read only when the user's tier is
+                not cached
+
+        Raises:
+            RateLimitExceededError: If the user has no requests left
+        """
+        if not self.settings.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None:
+                if len(self._states) >= _MAX_USERS:
+                    self._states.clear()
+                state = self._states[user_id] = _UserState()
+            if state.tokens > 0 and now < state.lease_expires_at:
+                state.tokens -= 1
+                return
+            if state.tier is not None and now < state.blocked_until:
+                self._reject(state.tier, state.blocked_until - now)
+
+        tier = self._resolve_tier(user_id, state, now, session)
+        retry_after = self._lease(user_id, state, tier, now)
+        if retry_after > 0:
+            self._reject(tier, retry_after)
+
+    def _resolve_tier(
+        self, user_id: UUID, state: _UserState, now: float, session: Session
+    ) -> RateLimitTier:
+        if state.tier is not None and now < state.tier_expires_at:
+            return state.tier
+        try:
+            product_ids = self.subscription_gateway.get_active_product_ids(
+                user_id, session
+            )
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.warning("Failed to load subscriptions for rate limit", error=str(e))
+            return state.tier or self.settings.tiers[self.settings.default_tier]
+        tier = self.settings.tier_for(product_ids)
+        state.tier = tier
+        state.tier_expires_at = now + self.settings.tier_ttl
+        return tier
+
+    def _lease(
+        self,
+        user_id: UUID,
+        state: _UserState,
+        tier: RateLimitTier,
+        now: float,
+    ) -> float:
+        """Lease tokens for the user and take one of them.
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until it would be
+        """
+        try:
+            with self.session_factory() as session:
+                grant = self.rate_limit_gateway.acquire(
+                    f"{self.scope}:{user_id}",
+                    tier,
+                    self.settings.lease_size(tier),
+                    session,
+                )
+        except SQLAlchemyError as e:
+            logger.warning(
+                "Rate limit store unavailable, limiting locally", error=str(e)
+            )
+            with self._lock:
+                if state.fallback is None:
+                    state.fallback = _LocalBucket(tier, now)
+                return state.fallback.consume(now)
+
+        with self._lock:
+            if grant.granted == 0:
+                state.blocked_until = now + grant.retry_after_seconds
+                return grant.retry_after_seconds
+            state.tokens = grant.granted - 1
+            state.lease_expires_at = now + self.settings.lease_ttl
+            state.fallback = None
+        return 0.0
+
+    def _reject(self, tier: RateLimitTier, retry_after: float) -> None:
+        RATE_LIMITED_REQUESTS.labels(self.scope, tier.name).inc()
+        raise RateLimitExceededError(retry_after)
@@ -2,22 +2,39 @@
 
 Provides structured logging using structlog.
 Development environment uses colored output, production uses JSON output.
+In production, high-volume lines are sampled and rendered lines are handed
+to a background writer thread so a stalled stdout pipe never blocks the
+event loop.
 """
 
+import atexit
 import logging
 import os
+import queue
+import random
 import sys
-from collections.abc import MutableMapping
+import threading
+import time
+import zlib
+from collections.abc import MutableMapping, Sequence
 from contextvars import ContextVar
-from typing import Any
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from enum import StrEnum
+from typing import Any, BinaryIO
 
 import orjson
 import structlog
 from structlog.contextvars import bind_contextvars, clear_contextvars
 
+from util.metrics import LOG_RECORDS_DROPPED
+from util.tracing import get_current_span
+
 # Context variables
 request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
 user_id_var: ContextVar[str | None] = ContextVar("user_id", default=None)
+# Used by the sampler only; not added to log lines
+request_path_var: ContextVar[str | None] = ContextVar("request_path", default=None)
 
 
 def get_log_level() -> int:
@@ -54,9 +71,411 @@ def add_request_context(
     if user_id:
         event_dict["user_id"] = user_id
 
+    span = get_current_span()
+    if span is not None:
+        event_dict["trace_id"] = span.trace_id
+        event_dict["span_id"] = span.span_id
+
     return event_dict
 
 
+@dataclass(frozen=True)
+class SamplingRule:
+    """Keep ``rate`` of the lines matching ``event`` and/or ``path``.
+
+    A rule without ``event`` or ``path`` matches any value for it.
+    """
+
+    rate: float
+    event: str | None = None
+    path: str | None = None
+
+    def matches(self, event: object, path: str | None) -> bool:
+        """Determine if the rule applies to a log line."""
+        return (self.event is None or self.event == event) and (
+            self.path is None or self.path == path
+        )
+
+
+DEFAULT_SAMPLING_RULES = (
+    SamplingRule(rate=0.01, path="/healthcheck"),
+    SamplingRule(rate=0.01, path="/metrics"),
+)
+
+_ALWAYS_KEEP_METHODS = frozenset(
+    {"warning", "warn", "error", "err", "exception", "critical", "fatal", "failure"}
+)
+_SERVER_ERROR_STATUS = 500
+_MAX_BUCKETS = 10000
+
+
+class _TokenBucket:
+    """Token bucket that also tracks its pass ratio in the current second."""
+
+    __slots__ = (
+        "capacity",
+        "kept",
+        "refill_rate",
+        "seen",
+        "tokens",
+        "updated_at",
+        "window_start",
+    )
+
+    def __init__(self, refill_rate: float, capacity: float) -> None:
+        self.refill_rate = refill_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.window_start = self.updated_at
+        self.seen = 0
+        self.kept = 0
+
+    def consume(self) -> bool:
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        if now - self.window_start >= 1.0:
+            self.window_start = now
+            self.seen = 0
+            self.kept = 0
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+        self.seen += 1
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        self.kept += 1
+        return True
+
+    def pass_ratio(self) -> float:
+        return self.kept / self.seen if self.seen else 1.0
+
+
+class LogSampler:
+    """structlog processor that samples high-volume log lines.
+
+    Lines are kept with the rate of the first matching rule, decided by a hash
+    of the request ID so every line of a request is kept or dropped together.
+    Each event key (event + path) is additionally capped by a token bucket.
+    Warnings, errors, 5xx responses and slow requests are always kept.
+
+    Kept lines with an effective rate below 1 carry ``sample_rate`` so counts
+    can be re-weighted downstream (each line stands for 1 / sample_rate lines).
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[SamplingRule] = DEFAULT_SAMPLING_RULES,
+        *,
+        slow_ms: float = 1000.0,
+        max_per_second: float = 100.0,
+    ) -> None:
+        self.rules = tuple(rules)
+        self.slow_ms = slow_ms
+        self.max_per_second = max_per_second
+        self._buckets: dict[tuple[object, str | None], _TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def __call__(
+        self,
+        logger: structlog.types.WrappedLogger,  # noqa: ARG002
+        method_name: str,
+        event_dict: MutableMapping[str, Any],
+    ) -> MutableMapping[str, Any]:
+        """Drop the line (raise DropEvent) or return it with its sample rate."""
+        if self._always_keep(method_name, event_dict):
+            return event_dict
+
+        event = event_dict.get("event")
+        path = request_path_var.get()
+        rate = self._rate_for(event, path)
+        if rate < 1.0 and not _sample_hit(rate, request_id_var.get()):
+            raise structlog.DropEvent
+
+        if self.max_per_second > 0:
+            with self._lock:
+                bucket = self._bucket(event, path)
+                if not bucket.consume():
+                    raise structlog.DropEvent
+                rate *= bucket.pass_ratio()
+
+        if rate < 1.0:
+            event_dict["sample_rate"] = round(rate, 6)
+        return event_dict
+
+    def _always_keep(
+        self, method_name: str, event_dict: MutableMapping[str, Any]
+    ) -> bool:
+        return (
+            method_name in _ALWAYS_KEEP_METHODS
+            or "exc_info" in event_dict
+            or event_dict.get("status_code", 0) >= _SERVER_ERROR_STATUS
+            or event_dict.get("duration_ms", 0.0) >= self.slow_ms
+        )
+
+    def _rate_for(self, event: object, path: str | None) -> float:
+        for rule in self.rules:
+            if rule.matches(event, path):
+                return rule.rate
+        return 1.0
+
+    def _bucket(self, event: object, path: str | None) -> _TokenBucket:
+        key = (event, path)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= _MAX_BUCKETS:
+                self._buckets.clear()
+            bucket = _TokenBucket(self.max_per_second, self.max_per_second)
+            self._buckets[key] = bucket
+        return bucket
+
+
+def _sample_hit(rate: float, request_id: str | None) -> bool:
+    """Decide deterministically per request (randomly without a request ID)."""
+    if request_id is not None:
+        return zlib.crc32(request_id.encode()) / 0xFFFFFFFF < rate
+    return random.random() < rate  # noqa: S311
+
+
+def is_log_sampling() -> bool:
+    """Determine if production logs are sampled."""
+    return os.getenv("LOG_SAMPLING", "true").lower() != "false"
+
+
+def get_sampling_rules() -> tuple[SamplingRule, ...]:
+    """Get sampling rules from LOG_SAMPLING_RULES (JSON list) or the defaults.
+
+    Example:
+        LOG_SAMPLING_RULES='[{"path": "/healthcheck", "rate": 0.01},
+                             {"event": "Request started", "rate": 0.1}]'
+    """
+    raw = os.getenv("LOG_SAMPLING_RULES")
+    if not raw:
+        return DEFAULT_SAMPLING_RULES
+    return tuple(SamplingRule(**rule) for rule in orjson.loads(raw))
+
+
+def build_log_sampler() -> LogSampler:
+    """Build the sampler from environment variables."""
+    return LogSampler(
+        get_sampling_rules(),
+        slow_ms=float(os.getenv("LOG_SLOW_REQUEST_MS", "1000")),
+        max_per_second=float(os.getenv("LOG_MAX_PER_SECOND", "100")),
+    )
+
+
+class OverflowPolicy(StrEnum):
+    """What the background writer does when its queue is full."""
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    SAMPLE = "sample"
+
+
+class BackgroundLogWriter:
+    """Write log lines to a stream from a background thread.
+
+    The logging call only enqueues the rendered bytes. The writer thread
+    collects lines into batches of up to ``batch_size`` lines, waiting at most
+    ``flush_interval`` seconds for a batch to fill, and writes each batch with a
+    single write/flush.
+
+    When the queue is full:
+        - BLOCK: the caller waits for room (no loss).
+        - DROP_OLDEST: the oldest queued line is discarded.
+        - SAMPLE: only every ``sample_every``-th overflowing line is kept
+          (replacing the oldest queued line); the rest are discarded.
+
+    Discarded lines are counted and reported with a warning line in the output.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        stream: BinaryIO,
+        *,
+        queue_size: int = 10000,
+        flush_interval: float = 0.1,
+        batch_size: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        sample_every: int = 10,
+    ) -> None:
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.sample_every = sample_every
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._overflows = 0
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=queue_size)
+        self._overflow_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        self._thread.start()
+
+    def write(self, line: bytes) -> None:
+        """Enqueue one rendered line (including its trailing newline)."""
+        if self.overflow_policy is OverflowPolicy.BLOCK:
+            self._queue.put(line)
+            return
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self._on_overflow(line)
+
+    def _on_overflow(self, line: bytes) -> None:
+        with self._overflow_lock:
+            self._overflows += 1
+            if (
+                self.overflow_policy is OverflowPolicy.SAMPLE
+                and self._overflows % self.sample_every != 0
+            ):
+                self._drop()
+                return
+            try:
+                self._queue.get_nowait()
+                self._drop()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                self._drop()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        LOG_RECORDS_DROPPED.labels(self.overflow_policy.value).inc()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = self._fill_batch(batch)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _fill_batch(self, batch: list[bytes]) -> bool:
+        """Add queued lines to the batch until it is full or the interval ends.
+
+        Returns:
+            True if the stop marker was reached.
+        """
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                line = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                return False
+            if line is None:
+                return True
+            batch.append(line)
+        return False
+
+    def _write_batch(self, batch: list[bytes]) -> None:
+        dropped = self.dropped
+        if dropped > self._reported_dropped:
+            batch.append(
+                orjson.dumps(
+                    {
+                        "event": "Log records dropped",
+                        "dropped": dropped - self._reported_dropped,
+                        "dropped_total": dropped,
+                        "overflow_policy": self.overflow_policy.value,
+                        "level": "warning",
+                        "timestamp": datetime.now(UTC).isoformat(),
+                    }
+                )
+                + b"\n"
+            )
+            self._reported_dropped = dropped
+        try:
+            self.stream.write(b"".join(batch))
+            self.stream.flush()
+        except (OSError, ValueError):
+            # 出力先が閉じられている場合はログを諦め、スレッドを止めない
+            pass
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write all queued lines and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class BackgroundBytesLogger:
+    """structlog logger that hands rendered bytes to a BackgroundLogWriter."""
+
+    def __init__(self, writer: BackgroundLogWriter) -> None:
+        self._writer = writer
+
+    def msg(self, message: bytes) -> None:
+        """Enqueue *message*."""
+        self._writer.write(message + b"\n")
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+class BackgroundLoggerFactory:
+    """structlog logger factory producing BackgroundBytesLogger instances."""
+
+    def __init__(self, writer: BackgroundLogWriter) -> None:
+        self._writer = writer
+
+    def __call__(self, *_args: Any) -> BackgroundBytesLogger:  # noqa: ANN401
+        return BackgroundBytesLogger(self._writer)
+
+
+_log_writer: BackgroundLogWriter | None = None
+
+
+def is_async_logging() -> bool:
+    """Determine if production logs are written by the background writer."""
+    return os.getenv("LOG_ASYNC", "true").lower() != "false"
+
+
+def _start_log_writer() -> BackgroundLogWriter:
+    """Start the shared background writer, replacing any previous one."""
+    global _log_writer  # noqa: PLW0603
+    shutdown_logging()
+    _log_writer = BackgroundLogWriter(
+        sys.stdout.buffer,
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        flush_interval=int(os.getenv("LOG_FLUSH_INTERVAL_MS", "100")) / 1000,
+        batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+        overflow_policy=OverflowPolicy(
+            os.getenv("LOG_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST.value)
+        ),
+        sample_every=int(os.getenv("LOG_SAMPLE_EVERY", "10")),
+    )
+    _log_writer.start()
+    return _log_writer
+
+
+def shutdown_logging() -> None:
+    """Flush queued log lines and stop the background writer."""
+    global _log_writer  # noqa: PLW0603
+    if _log_writer is not None:
+        _log_writer.close()
+        _log_writer = None
+
+
+atexit.register(shutdown_logging)
+
+
 def configure_logging() -> None:
     """Configure structlog."""
     if is_development():
@@ -80,7 +499,9 @@ def configure_logging() -> None:
         )
     else:
         # Production: JSON output (using orjson for performance)
+        # Sampling runs first so dropped lines skip the rest of the chain
         processors = [
+            *([build_log_sampler()] if is_log_sampling() else []),
             structlog.contextvars.merge_contextvars,
             add_request_context,
             structlog.stdlib.add_log_level,
@@ -91,10 +512,15 @@ def configure_logging() -> None:
             structlog.processors.dict_tracebacks,
             structlog.processors.JSONRenderer(serializer=orjson.dumps),
         ]
+        logger_factory: Any = (
+            BackgroundLoggerFactory(_start_log_writer())
+            if is_async_logging()
+            else structlog.BytesLoggerFactory()
+        )
         structlog.configure(
             processors=processors,
             wrapper_class=structlog.make_filtering_bound_logger(get_log_level()),
-            logger_factory=structlog.BytesLoggerFactory(),
+            logger_factory=logger_factory,
             cache_logger_on_first_use=True,
         )
 
@@ -115,10 +541,15 @@ def get_logger(name: str | None = None) -> structlog.stdlib.BoundLogger:
     return structlog.get_logger(name)  # type: ignore[no-any-return]
 
 
-def set_request_context(request_id: str, user_id: str | None = None) -> None:
+def set_request_context(
+    request_id: str,
+    user_id: str | None = None,
+    path: str | None = None,
+) -> None:
     """Set request context."""
     clear_contextvars()
     request_id_var.set(request_id)
+    request_path_var.set(path)
     if user_id:
         user_id_var.set(user_id)
     bind_contextvars(request_id=request_id)
@@ -131,3 +562,9 @@ def clear_request_context() -> None:
     clear_contextvars()
     request_id_var.set(None)
     user_id_var.set(None)
+    request_path_var.set(None)
+
+
+def get_request_id() -> str | None:
+    """Get the request ID of the current request context."""
+    return request_id_var.get()
@@ -0,0 +1,208 @@
+"""Prometheus metrics registry.
+
+Holds the process-wide metrics for HTTP requests, the database pool and
+outbound LLM / Supabase calls, and renders them in Prometheus text format.
+
+When PROMETHEUS_MULTIPROC_DIR is set before the first import, prometheus_client
+writes every sample to memory-mapped files in that directory, and the
+/metrics endpoint aggregates the files of all uvicorn workers.
+"""
+
+import os
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from util.tracing import SpanKind, start_span
+
+# Latency buckets in seconds, from cache hits to slow LLM calls
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status_code"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being processed.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution latency.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections by state.",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "Read-only statements by where they ran (replica, primary_after_write, "
+    "primary_fallback).",
+    ["target"],
+)
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "Outbound call latency (LLM, Supabase).",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total",
+    "Outbound calls that raised an error.",
+    ["service", "operation", "error"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log lines discarded because the background log queue was full.",
+    ["policy"],
+)
+
+JOBS_PROCESSED = Counter(
+    "jobs_processed_total",
+    "Background job attempts by outcome (succeeded, retried, failed, lost, error).",
+    ["kind", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Background job attempt latency.",
+    ["kind"],
+    buckets=LATENCY_BUCKETS,
+)
+
+MESSAGES_INDEXED = Counter(
+    "messages_indexed_total",
+    "Messages indexed into embeddings by outcome (embedded, unchanged).",
+    ["outcome"],
+)
+
+DOCUMENT_CHUNKS_INGESTED = Counter(
+    "document_chunks_ingested_total",
+    "Document chunks ingested into embeddings by outcome (embedded, unchanged).",
+    ["outcome"],
+)
+
+CHAT_CONTEXT_TOKENS = Counter(
+    "chat_context_tokens_total",
+    "Retrieved-context tokens of chat turns, sent or saved by packing.",
+    ["outcome"],
+)
+CHAT_CONTEXT_TEXTS = Counter(
+    "chat_context_texts_total",
+    "Retrieved texts of chat turns by outcome (packed, truncated, covered, "
+    "over_budget).",
+    ["outcome"],
+)
+
+LLM_PROMPT_TOKENS = Counter(
+    "llm_prompt_tokens_total",
+    "Prompt tokens of LLM calls by provider prompt cache outcome (cached, uncached).",
+    ["operation", "cache"],
+)
+LLM_PROMPT_CACHE_RATIO = Histogram(
+    "llm_prompt_cache_ratio",
+    "Share of an LLM call's prompt tokens read from the provider prompt cache.",
+    ["operation"],
+    buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+RATE_LIMITED_REQUESTS = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected because the user exceeded their rate limit.",
+    ["scope", "tier"],
+)
+
+
+def is_multiprocess() -> bool:
+    """Determine if metrics are shared between worker processes."""
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Generator[None, None, None]:
+    """Measure an outbound call, count its errors and trace it as a client span.
+
+    Usage:
+        with track_external_call("openai", "chat_completion"):
+            response = llm.invoke(messages)
+
+    Args:
+        service: Called service (e.g. "openai", "supabase").
+        operation: Called operation.
+
+    Yields:
+        None
+    """
+    start_time = time.perf_counter()
+    with start_span(
+        f"{service}.{operation}", kind=SpanKind.CLIENT, **{"peer.service": service}
+    ):
+        try:
+            yield
+        except Exception as e:
+            EXTERNAL_CALL_ERRORS.labels(service, operation, type(e).__name__).inc()
+            raise
+        finally:
+            EXTERNAL_CALL_DURATION.labels(service, operation).observe(
+                time.perf_counter() - start_time
+            )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all metrics in Prometheus text format.
+
+    Returns:
+        Tuple of the rendered body and its content type.
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Remove live gauges of an exited worker process."""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)  # type: ignore[no-untyped-call]
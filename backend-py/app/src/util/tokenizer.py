@@ -0,0 +1,49 @@
+"""Token counting with the OpenAI models' tokenizers.
+
+tiktoken is imported and each encoding is loaded on first use; tiktoken
+downloads an encoding's file once and caches it in TIKTOKEN_CACHE_DIR (or
+the system temp directory), so ingestion hosts without network access
+should point TIKTOKEN_CACHE_DIR at a pre-filled directory.
+"""
+
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+# Encoding of text-embedding-3-small (and -large)
+EMBEDDING_ENCODING = "cl100k_base"
+# Encoding of the GPT-4o and later chat models
+CHAT_ENCODING = "o200k_base"
+
+
+@cache
+def get_encoding(name: str = EMBEDDING_ENCODING) -> "Encoding":
+    """Get a tiktoken encoding, loaded once per process.
+
+    Args:
+        name: Encoding name
+
+    Returns:
+        The encoding
+    """
+    import tiktoken  # noqa: PLC0415
+
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text: str, encoding: str = EMBEDDING_ENCODING) -> int:
+    """Count the tokens of a text.
+
+    Special-token markers in the text (e.g. "<|endoftext|>") are counted as
+    ordinary text instead of raising.
+
+    Args:
+        text: Text to count
+        encoding: Encoding name
+
+    Returns:
+        Number of tokens
+    """
+    return len(get_encoding(encoding).encode(text, disallowed_special=()))
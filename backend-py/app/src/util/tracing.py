@@ -0,0 +1,535 @@
+"""Lightweight request-scoped span tracing.
+
+Spans are tracked in a context variable, so nested ``start_span`` blocks and
+``traced`` functions form a tree per request without passing anything around.
+Finished spans are batched on a background thread and exported as
+OpenTelemetry (OTLP/JSON) compatible documents, either to a rotating local
+file or to an OTLP/HTTP collector endpoint.
+
+Sampling is decided once per trace at its root span. When a trace is not
+sampled, every nested span is a shared no-op object, so the cost of an
+unsampled span is one context variable lookup.
+"""
+
+import atexit
+import contextlib
+import functools
+import inspect
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Sequence
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from types import TracebackType
+from typing import Any, ParamSpec, Protocol, TypeVar, cast
+
+import httpx
+import orjson
+
+SERVICE_NAME = "backend-py"
+
+AttributeValue = str | bool | int | float
+
+P = ParamSpec("P")
+R = TypeVar("R")
+T = TypeVar("T", bound=type)
+
+
+class SpanKind(IntEnum):
+    """OTLP span kinds."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class StatusCode(IntEnum):
+    """OTLP status codes."""
+
+    UNSET = 0
+    OK = 1
+    ERROR = 2
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None = None
+    kind: SpanKind = SpanKind.INTERNAL
+    attributes: dict[str, AttributeValue] = field(default_factory=dict)
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: int | None = None
+    status: StatusCode = StatusCode.UNSET
+    status_message: str | None = None
+
+    sampled = True
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Set an attribute on the span."""
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        """Mark the span as failed."""
+        self.status = StatusCode.ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Convert to an OTLP/JSON span."""
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": int(self.status)},
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message is not None:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stand-in for spans of unsampled traces."""
+
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+current_span_var: ContextVar[Span | _NoopSpan | None] = ContextVar(
+    "current_span", default=None
+)
+
+
+def _otlp_value(value: AttributeValue) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value}
+
+
+def to_otlp_document(spans: Sequence[Span]) -> dict[str, Any]:
+    """Wrap spans in an OTLP ExportTraceServiceRequest document."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": SERVICE_NAME},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter(Protocol):
+    """Destination for finished spans."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Export a batch of spans."""
+
+    def shutdown(self) -> None:
+        """Release resources."""
+
+
+class InMemorySpanExporter:
+    """Keep exported spans in memory (tests and benchmarks)."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Store the spans."""
+        self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileSpanExporter:
+    """Append one OTLP/JSON document per batch to a size-rotated file."""
+
+    def __init__(
+        self, path: str | Path, max_bytes: int = 10_000_000, backup_count: int = 5
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Write the spans as one JSON line."""
+        line = orjson.dumps(to_otlp_document(spans)) + b"\n"
+        if self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+            self._rotate()
+        with self.path.open("ab") as f:
+            f.write(line)
+
+    def _rotate(self) -> None:
+        """Shift traces.jsonl -> traces.jsonl.1 -> ... dropping the oldest."""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OTLPHttpSpanExporter:
+    """POST OTLP/JSON documents to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Send the spans to the collector."""
+        self._client.post(
+            self.url,
+            content=orjson.dumps(to_otlp_document(spans)),
+            headers={"content-type": "application/json"},
+        )
+
+    def shutdown(self) -> None:
+        """Close the HTTP client."""
+        self._client.close()
+
+
+class BatchSpanProcessor:
+    """Queue finished spans and export them in batches from a thread."""
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        *,
+        queue_size: int = 2048,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        """Enqueue a finished span, dropping it if the queue is full."""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: list[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0.001)
+                    )
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception:  # noqa: BLE001
+            # 送信失敗でリクエスト処理や後続バッチを止めない
+            self.dropped += len(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export queued spans and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+@dataclass
+class Tracer:
+    """Sampling decision and span processor shared by the process."""
+
+    sample_rate: float = 0.0
+    processor: BatchSpanProcessor | None = None
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the process tracer."""
+    return _tracer
+
+
+def _new_trace_id(request_id: str | None) -> str:
+    """Use the request ID as trace ID when it is a UUID, so both correlate."""
+    if request_id is not None:
+        try:
+            return uuid.UUID(request_id).hex
+        except ValueError:
+            pass
+    return secrets.token_hex(16)
+
+
+class _SpanContext:
+    """Context manager returned by start_span (cheaper than a generator)."""
+
+    __slots__ = ("_attributes", "_kind", "_name", "_request_id", "_span", "_token")
+
+    def __init__(
+        self,
+        name: str,
+        kind: SpanKind,
+        attributes: dict[str, AttributeValue],
+        request_id: str | None,
+    ) -> None:
+        self._name = name
+        self._kind = kind
+        self._attributes = attributes
+        self._request_id = request_id
+        self._span: Span | _NoopSpan = NOOP_SPAN
+        self._token: Token[Span | _NoopSpan | None] | None = None
+
+    def __enter__(self) -> Span | _NoopSpan:
+        parent = current_span_var.get()
+        if parent is None:
+            if _tracer.sample_rate <= 0 or random.random() >= _tracer.sample_rate:  # noqa: S311
+                self._token = current_span_var.set(NOOP_SPAN)
+                return NOOP_SPAN
+            span = Span(
+                name=self._name,
+                trace_id=_new_trace_id(self._request_id),
+                span_id=secrets.token_hex(8),
+                kind=self._kind,
+                attributes=self._attributes,
+            )
+            if self._request_id is not None:
+                span.attributes["request.id"] = self._request_id
+        elif isinstance(parent, Span):
+            span = Span(
+                name=self._name,
+                trace_id=parent.trace_id,
+                span_id=secrets.token_hex(8),
+                parent_span_id=parent.span_id,
+                kind=self._kind,
+                attributes=self._attributes,
+            )
+        else:
+            return NOOP_SPAN
+        self._span = span
+        self._token = current_span_var.set(span)
+        return span
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._token is not None:
+            current_span_var.reset(self._token)
+        span = self._span
+        if not isinstance(span, Span):
+            return
+        span.end_time_ns = time.time_ns()
+        if exc is not None:
+            span.set_error(f"{type(exc).__name__}: {exc}")
+        if _tracer.processor is not None:
+            _tracer.processor.on_end(span)
+
+
+def start_span(
+    name: str,
+    *,
+    kind: SpanKind = SpanKind.INTERNAL,
+    request_id: str | None = None,
+    **attributes: AttributeValue,
+) -> _SpanContext:
+    """Start a span as a child of the current span.
+
+    Usage:
+        with start_span("chat.link_virtual_user", room_id=room.id) as span:
+            ...
+            span.set_attribute("created", True)
+
+    Args:
+        name: Span name.
+        kind: OTLP span kind.
+        request_id: Request ID to correlate a root span with (ignored for
+            child spans).
+        **attributes: Initial span attributes.
+
+    Returns:
+        Context manager yielding the span (a no-op span when not sampled).
+    """
+    return _SpanContext(name, kind, attributes, request_id)
+
+
+def traced(
+    name: str, *, kind: SpanKind = SpanKind.INTERNAL
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Wrap a sync or async function, or an async generator, in a span.
+
+    The span of an async generator lasts until the generator is exhausted or
+    closed, but it is current only while the generator runs, so spans the
+    consumer starts between items are not nested in it.
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def asyncgen_wrapper(
+                *args: P.args, **kwargs: P.kwargs
+            ) -> AsyncIterator[Any]:
+                parent = current_span_var.get()
+                generator = cast("AsyncGenerator[Any, None]", func(*args, **kwargs))
+                with start_span(name, kind=kind):
+                    async with contextlib.aclosing(generator):
+                        async for item in generator:
+                            token = current_span_var.set(parent)
+                            try:
+                                yield item
+                            finally:
+                                current_span_var.reset(token)
+
+            return asyncgen_wrapper  # type: ignore[return-value]
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:  # noqa: ANN401
+                with start_span(name, kind=kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with start_span(name, kind=kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(prefix: str) -> Callable[[T], T]:
+    """Class decorator wrapping every public method in a span.
+
+    Usage:
+        @trace_methods("gateway.MessageGateway")
+        class MessageGateway: ...
+    """
+
+    def decorator(cls: T) -> T:
+        for attr_name, attr in list(vars(cls).items()):
+            if attr_name.startswith("_") or not inspect.isfunction(attr):
+                continue
+            setattr(cls, attr_name, traced(f"{prefix}.{attr_name}")(attr))
+        return cls
+
+    return decorator
+
+
+def get_current_span() -> Span | None:
+    """Get the current sampled span, if any."""
+    span = current_span_var.get()
+    return span if isinstance(span, Span) else None
+
+
+def configure_tracing(
+    sample_rate: float, exporter: SpanExporter | None = None
+) -> Tracer:
+    """Configure sampling and export, replacing the previous configuration."""
+    shutdown_tracing()
+    _tracer.sample_rate = sample_rate
+    _tracer.processor = (
+        BatchSpanProcessor(exporter)
+        if exporter is not None and sample_rate > 0
+        else None
+    )
+    return _tracer
+
+
+def build_exporter_from_env() -> SpanExporter | None:
+    """Build the exporter selected by TRACE_EXPORTER (file, otlp or none)."""
+    exporter = os.getenv("TRACE_EXPORTER", "file")
+    if exporter == "file":
+        return FileSpanExporter(
+            os.getenv("TRACE_FILE", "traces.jsonl"),
+            max_bytes=int(os.getenv("TRACE_FILE_MAX_BYTES", "10000000")),
+            backup_count=int(os.getenv("TRACE_FILE_BACKUP_COUNT", "5")),
+        )
+    if exporter == "otlp":
+        return OTLPHttpSpanExporter(
+            os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+        )
+    return None
+
+
+def configure_tracing_from_env() -> Tracer:
+    """Configure tracing from TRACE_SAMPLE_RATE (default 0: off)."""
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    exporter = build_exporter_from_env() if sample_rate > 0 else None
+    atexit.register(shutdown_tracing)
+    return configure_tracing(sample_rate, exporter)
+
+
+def shutdown_tracing() -> None:
+    """Export queued spans and stop the exporter thread."""
+    if _tracer.processor is not None:
+        _tracer.processor.shutdown()
+        _tracer.processor = None
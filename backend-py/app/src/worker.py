@@ -0,0 +1,111 @@
+"""Background job worker launcher.
+
+Runs the job worker pool and the message indexer as their own process, so
+they do not compete with requests for the API workers' event loops and
+database pools. Set JOBS_EMBEDDED_WORKER=true to run them inside each API
+worker instead.
+
+Usage:
+    cd src && python worker.py
+
+Settings (environment variables):
+    JOBS_QUEUE: Queue to claim from (default "default")
+    JOBS_CONCURRENCY: Jobs running at once (default 4)
+    JOBS_VISIBILITY_TIMEOUT: Lease seconds of a claimed job (default 60)
+    JOBS_POLL_INTERVAL: Fallback poll seconds (default 30)
+    JOBS_RETRY_BASE_DELAY / JOBS_RETRY_MAX_DELAY: Backoff bounds in seconds
+        (default 2 / 600)
+    MESSAGE_INDEXER_BATCH_SIZE: Messages per embedding request (default 256)
+    MESSAGE_INDEXER_SETTLE: Seconds a message must age before it is indexed
+        (default 2)
+    MESSAGE_INDEXER_POLL_INTERVAL: Fallback poll seconds (default 60)
+"""
+
+import asyncio
+import contextlib
+import signal
+
+from container import Container
+from gateway.job_gateway import NOTIFY_CHANNEL
+from gateway.message_gateway import NOTIFY_CHANNEL as MESSAGES_CHANNEL
+from infra.db_notify import NotificationListener
+from usecase.job_worker_usecase import JobWorkerUseCase
+from usecase.message_indexer_usecase import MessageIndexerUseCase
+from util.logging import configure_logging, get_logger
+from util.tracing import configure_tracing_from_env
+
+logger = get_logger(__name__)
+
+
+async def run_job_worker(worker: JobWorkerUseCase, stop: asyncio.Event) -> None:
+    """Run the worker pool until ``stop`` is set.
+
+    New jobs wake the pool through LISTEN/NOTIFY. While the notification
+    connection is down and reconnecting, the pool picks jobs up on its poll
+    interval.
+
+    Args:
+        worker: The process's job worker
+        stop: Set to stop claiming jobs and finish the running ones
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        notifications = await stack.enter_async_context(
+            NotificationListener(NOTIFY_CHANNEL)
+        )
+        logger.info("Job worker started", queue=worker.settings.queue)
+        await worker.run(stop, notifications)
+        logger.info("Job worker stopped", queue=worker.settings.queue)
+
+
+async def run_message_indexer(
+    indexer: MessageIndexerUseCase, stop: asyncio.Event
+) -> None:
+    """Index new chat messages into embeddings until ``stop`` is set.
+
+    Args:
+        indexer: The process's message indexer
+        stop: Set to stop after the current batch
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        notifications = await stack.enter_async_context(
+            NotificationListener(MESSAGES_CHANNEL)
+        )
+        logger.info("Message indexer started")
+        await indexer.run(stop, notifications)
+        logger.info("Message indexer stopped")
+
+
+async def run_background(container: Container, stop: asyncio.Event) -> None:
+    """Run the job worker pool and the message indexer until ``stop`` is set.
+
+    Args:
+        container: The process's container
+        stop: Set to stop both
+    """
+    await asyncio.gather(
+        run_job_worker(container.job_worker_usecase, stop),
+        run_message_indexer(container.message_indexer_usecase, stop),
+    )
+
+
+async def _serve() -> None:
+    container = Container.create()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await run_background(container, stop)
+    finally:
+        container.close()
+
+
+def main() -> None:
+    """Run a standalone job worker until SIGINT or SIGTERM."""
+    configure_logging()
+    configure_tracing_from_env()
+    asyncio.run(_serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Chat endpoint query budget tests.
+
+POST /api/chat runs with the real gateways on PostgreSQL with pgvector, so
+the query budget counts the statements the chat path actually issues. Only
+Supabase auth and OpenAI are mocked. The database is TEST_DATABASE_URL if
+set, otherwise a pgvector container (skipped when testcontainers or Docker
+is unavailable).
+"""
+
+import os
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, create_engine
+from sqlmodel import Session, select
+
+from benchmarks.load.database import EMBEDDING_DIMENSIONS, prepare_schema
+from container import get_chat_usecase
+from domain.entity.models import (
+    ChatRooms,
+    Messages,
+    UserChats,
+    UserProfiles,
+    Users,
+    VirtualUsers,
+)
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.current_user_gateway import CurrentUserGateway
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.message_gateway import MessageGateway
+from gateway.rate_limit_gateway import RateLimitGateway
+from gateway.subscription_gateway import SubscriptionGateway
+from gateway.user_profile_gateway import UserProfileGateway
+from gateway.virtual_user_gateway import VirtualUserGateway
+from infra.db_client import get_session
+from infra.db_instrumentation import instrument_engine
+from infra.db_routing import RoutingSession
+from usecase.chat_usecase import ChatSettings, ChatUseCase
+from usecase.rate_limit_usecase import RateLimitUseCase
+
+AUTH_HEADERS = {"Authorization": "Bearer token"}
+
+
+@pytest.fixture(scope="module")
+def database_url() -> Iterator[str]:
+    """URL of a PostgreSQL database with pgvector."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    postgres = pytest.importorskip("testcontainers.postgres")
+    try:
+        container = postgres.PostgresContainer(
+            "pgvector/pgvector:pg16", driver=None
+        ).start()
+    except Exception as error:  # noqa: BLE001 - no Docker daemon
+        pytest.skip(f"PostgreSQL container is unavailable: {error}")
+    yield container.get_connection_url()
+    container.stop()
+
+
+@pytest.fixture(scope="module")
+def engine(database_url) -> Iterator[Engine]:
+    """Instrumented engine of the database with the app's schema."""
+    result = create_engine(database_url)
+    prepare_schema(result)
+    instrument_engine(result)
+    yield result
+    result.dispose()
+
+
+@pytest.fixture
+def chat_room(engine) -> tuple[uuid.UUID, int]:
+    """A new user with a profile, a virtual user and a room of their own.
+
+    The virtual user is not linked to the room yet, so the request is the
+    user's first turn in it.
+    """
+    user_id = uuid.uuid4()
+    with Session(engine) as session:
+        session.add(Users(id=user_id, account_name=f"test_{user_id.hex[:12]}"))
+        session.add(UserProfiles(user_id=user_id, email=f"{user_id}@test.example.com"))
+        session.add(
+            VirtualUsers(id=uuid.uuid4(), name="AI Assistant", owner_id=user_id)
+        )
+        room = ChatRooms(type="PRIVATE")
+        session.add(room)
+        session.flush()
+        assert room.id is not None
+        session.add(UserChats(user_id=user_id, chat_room_id=room.id))
+        session.commit()
+        return user_id, room.id
+
+
+@pytest.fixture
+def client(mocker, engine, chat_room):
+    """Client whose chat use case runs the real gateways on ``engine``."""
+    from app import app
+
+    @contextmanager
+    def session_scope() -> Iterator[Session]:
+        with RoutingSession(engine) as session:
+            yield session
+
+    def get_test_session() -> Iterator[Session]:
+        with session_scope() as session:
+            yield session
+
+    supabase_client = mocker.Mock()
+    supabase_client.get_user.return_value = SimpleNamespace(id=str(chat_room[0]))
+    openai = mocker.Mock()
+    openai.embed_query.return_value = [0.1] * EMBEDDING_DIMENSIONS
+    openai.chat_completion.return_value = "hi"
+    use_case = ChatUseCase(
+        current_user_gateway=CurrentUserGateway(supabase_client),
+        user_profile_gateway=UserProfileGateway(),
+        chat_room_gateway=ChatRoomGateway(),
+        message_gateway=MessageGateway(),
+        virtual_user_gateway=VirtualUserGateway(),
+        embeddings_gateway=EmbeddingsGateway(),
+        openai_gateway=openai,
+        rate_limit_usecase=RateLimitUseCase(
+            rate_limit_gateway=RateLimitGateway(),
+            subscription_gateway=SubscriptionGateway(),
+            session_factory=session_scope,
+        ),
+        projection_gateway=EmbeddingProjectionGateway(),
+        settings=ChatSettings(),
+        token_counter=len,
+    )
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_chat_usecase] = lambda: use_case
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+class TestChatQueryBudget:
+    """Tests for the statement budget of POST /api/chat."""
+
+    def test_first_turn_within_budget(self, client, engine, chat_room, query_budget):
+        """Should stay within budget on a user's first turn in a room."""
+        with query_budget("POST /api/chat") as stats:
+            response = client.post(
+                "/api/chat",
+                json={"message": "hello", "chat_room_id": chat_room[1]},
+                headers=AUTH_HEADERS,
+            )
+
+        assert response.status_code == 200
+        assert response.json()["ai_response"] == "hi"
+        # The user's message and the reply were saved
+        with Session(engine) as session:
+            messages = session.exec(
+                select(Messages).where(Messages.chat_room_id == chat_room[1])
+            ).all()
+        assert [message.content for message in messages] == ["hello", "hi"]
+
+    def test_next_turn_issues_fewer_statements(self, client, chat_room, query_budget):
+        """Should skip the rate limit lease and the room link on the next turn."""
+        request = {"message": "hello", "chat_room_id": chat_room[1]}
+        with query_budget("POST /api/chat") as first:
+            client.post("/api/chat", json=request, headers=AUTH_HEADERS)
+
+        with query_budget("POST /api/chat") as second:
+            response = client.post("/api/chat", json=request, headers=AUTH_HEADERS)
+
+        assert response.status_code == 200
+        assert second.statement_count < first.statement_count
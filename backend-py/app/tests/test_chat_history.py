@@ -0,0 +1,83 @@
+"""Chat history endpoint tests."""
+
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from container import get_chat_history_usecase
+from domain.entity.models import Messages
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.message_gateway import MessageGateway
+from infra.db_client import get_session
+from middleware.auth_middleware import verify_token
+from usecase.chat_history_usecase import ChatHistoryUseCase
+
+USER_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def gateways(mocker):
+    """Mock the gateways used by the history use case."""
+    return SimpleNamespace(
+        chat_room=mocker.create_autospec(ChatRoomGateway, instance=True),
+        message=mocker.create_autospec(MessageGateway, instance=True),
+    )
+
+
+@pytest.fixture
+def client(gateways):
+    """Create a test client with auth, session and use case overridden."""
+    from app import app
+
+    use_case = ChatHistoryUseCase(
+        chat_room_gateway=gateways.chat_room, message_gateway=gateways.message
+    )
+    app.dependency_overrides[verify_token] = lambda: SimpleNamespace(id=str(USER_ID))
+    app.dependency_overrides[get_session] = lambda: None
+    app.dependency_overrides[get_chat_history_usecase] = lambda: use_case
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+class TestChatHistory:
+    """Tests for GET /api/chat/{chat_room_id}/messages."""
+
+    def test_returns_messages_of_member(self, client, gateways):
+        """Should return the room's messages for a member."""
+        gateways.chat_room.is_member.return_value = True
+        gateways.message.get_recent_by_chat_room_id.return_value = [
+            Messages(
+                id=1,
+                chat_room_id=7,
+                content="hello",
+                created_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC),
+                sender_id=USER_ID,
+            )
+        ]
+
+        response = client.get("/api/chat/7/messages?limit=20")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["chat_room_id"] == 7
+        assert [m["content"] for m in body["messages"]] == ["hello"]
+        gateways.chat_room.is_member.assert_called_once_with(7, USER_ID, None)
+        gateways.message.get_recent_by_chat_room_id.assert_called_once_with(7, 20, None)
+
+    def test_non_member_gets_404(self, client, gateways):
+        """Should hide rooms the user does not belong to."""
+        gateways.chat_room.is_member.return_value = False
+
+        response = client.get("/api/chat/7/messages")
+
+        assert response.status_code == 404
+        gateways.message.get_recent_by_chat_room_id.assert_not_called()
+
+    def test_limit_is_bounded(self, client):
+        """Should reject limits above the maximum page size."""
+        response = client.get("/api/chat/7/messages?limit=10000")
+
+        assert response.status_code == 422
@@ -0,0 +1,268 @@
+"""WebSocket chat transport tests."""
+
+import asyncio
+import contextlib
+import itertools
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from container import get_chat_usecase
+from domain.exceptions import AuthenticationError, RateLimitExceededError
+from infra.db_client import get_session_factory
+from usecase.chat_usecase import ChatUseCase
+
+USER_ID = uuid.uuid4()
+VIRTUAL_USER_ID = uuid.uuid4()
+AUTH_HEADERS = {"Authorization": "Bearer token"}
+
+
+async def _stream(
+    user_message, system_prompt=None, context=None, history=(), prompt_cache_key=None
+):
+    for delta in ("Hello", ", ", user_message):
+        await asyncio.sleep(0)
+        yield delta
+
+
+@pytest.fixture
+def gateways(mocker):
+    """Mock the gateways used by the chat use case."""
+    result = SimpleNamespace(
+        current_user=mocker.Mock(),
+        chat_room=mocker.Mock(),
+        message=mocker.Mock(),
+        virtual_user=mocker.Mock(),
+        embeddings=mocker.Mock(),
+        openai=mocker.Mock(),
+        rate_limit=mocker.Mock(),
+    )
+    result.current_user.get_current_user.return_value = SimpleNamespace(id=USER_ID)
+    result.chat_room.create.return_value = SimpleNamespace(id=42)
+    result.chat_room.is_member.return_value = True
+    message_ids = itertools.count(1)
+    result.message.create.side_effect = lambda **_: SimpleNamespace(
+        id=next(message_ids)
+    )
+    result.message.create_from_user.side_effect = lambda **_: SimpleNamespace(
+        id=next(message_ids)
+    )
+    result.virtual_user.get_by_owner_id.return_value = [
+        SimpleNamespace(id=VIRTUAL_USER_ID, name="AI Assistant")
+    ]
+    result.message.get_recent_and_count_by_chat_room_id.return_value = ([], 0)
+    result.embeddings.search_similar.return_value = []
+    result.openai.stream_chat_completion = _stream
+    return result
+
+
+@pytest.fixture
+def client(mocker, gateways, session, session_factory):
+    """Create a test client with the use case and sessions overridden."""
+    from app import app
+
+    use_case = ChatUseCase(
+        current_user_gateway=gateways.current_user,
+        user_profile_gateway=mocker.Mock(),
+        chat_room_gateway=gateways.chat_room,
+        message_gateway=gateways.message,
+        virtual_user_gateway=gateways.virtual_user,
+        embeddings_gateway=gateways.embeddings,
+        openai_gateway=gateways.openai,
+        rate_limit_usecase=gateways.rate_limit,
+    )
+    session.exec.return_value.first.return_value = None
+    app.dependency_overrides[get_chat_usecase] = lambda: use_case
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _receive_until_done(websocket, count: int = 1) -> list[dict]:
+    frames = []
+    while count > 0:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame["type"] in {"done", "error"}:
+            count -= 1
+    return frames
+
+
+class TestChatSocket:
+    """Tests for chat turns over /ws/chat."""
+
+    def test_streams_tokens_then_done(self, client, gateways):
+        """Should send started, each token and the saved reply."""
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            assert websocket.receive_json() == {"type": "ready"}
+            websocket.send_json({"type": "chat", "id": "t1", "message": "hi"})
+            frames = _receive_until_done(websocket)
+
+        assert frames[0]["type"] == "started"
+        assert [f["delta"] for f in frames if f["type"] == "token"] == [
+            "Hello",
+            ", ",
+            "hi",
+        ]
+        done = frames[-1]
+        assert done["type"] == "done"
+        assert done["id"] == "t1"
+        assert done["ai_response"] == "Hello, hi"
+        assert done["chat_room_id"] == 42
+        assert done["user_message_id"] == frames[0]["user_message_id"]
+        gateways.message.create_from_user.assert_called_once_with(
+            chat_room_id=done["chat_room_id"],
+            sender_id=USER_ID,
+            content="hi",
+            session=gateways.message.create_from_user.call_args.kwargs["session"],
+        )
+        gateways.message.create.assert_called_with(
+            chat_room_id=done["chat_room_id"],
+            virtual_sender_id=VIRTUAL_USER_ID,
+            content="Hello, hi",
+            session=gateways.message.create.call_args.kwargs["session"],
+        )
+
+    def test_resolves_user_once_per_connection(self, client, gateways):
+        """Should authenticate and look up the virtual user only once."""
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            for turn_id in ("t1", "t2", "t3"):
+                websocket.send_json(
+                    {"type": "chat", "id": turn_id, "chat_room_id": 7, "message": "q"}
+                )
+                _receive_until_done(websocket)
+
+        gateways.current_user.get_current_user.assert_called_once()
+        gateways.virtual_user.get_by_owner_id.assert_called_once()
+        gateways.chat_room.is_member.assert_called_once()
+        assert gateways.rate_limit.execute.call_count == 3
+
+    def test_multiplexes_rooms(self, client):
+        """Should run turns for different rooms on one connection."""
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            websocket.send_json(
+                {"type": "chat", "id": "a", "chat_room_id": 1, "message": "one"}
+            )
+            websocket.send_json(
+                {"type": "chat", "id": "b", "chat_room_id": 2, "message": "two"}
+            )
+            frames = _receive_until_done(websocket, count=2)
+
+        done = {f["id"]: f for f in frames if f["type"] == "done"}
+        assert done["a"]["chat_room_id"] == 1
+        assert done["a"]["ai_response"] == "Hello, one"
+        assert done["b"]["chat_room_id"] == 2
+        assert done["b"]["ai_response"] == "Hello, two"
+
+    def test_embeds_the_query_without_a_session(self, client, gateways, session):
+        """Should hold no database session while the query is embedded."""
+        from app import app
+
+        open_sessions = 0
+
+        @contextlib.contextmanager
+        def session_factory():
+            nonlocal open_sessions
+            open_sessions += 1
+            try:
+                yield session
+            finally:
+                open_sessions -= 1
+
+        sessions_while_embedding = []
+
+        def embed_query(_message):
+            sessions_while_embedding.append(open_sessions)
+            return [0.5]
+
+        app.dependency_overrides[get_session_factory] = lambda: session_factory
+        gateways.openai.embed_query.side_effect = embed_query
+
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "chat", "id": "t1", "message": "hi"})
+            frames = _receive_until_done(websocket)
+
+        assert frames[-1]["type"] == "done"
+        assert sessions_while_embedding == [0]
+        assert gateways.embeddings.search_similar.call_args.args[0] == [0.5]
+
+    def test_rate_limited_turn_gets_error_frame(self, client, gateways):
+        """Should report the retry delay and keep the connection open."""
+        gateways.rate_limit.execute.side_effect = [RateLimitExceededError(2.5), None]
+
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "chat", "id": "t1", "message": "hi"})
+            error = websocket.receive_json()
+            websocket.send_json({"type": "chat", "id": "t2", "message": "hi"})
+            frames = _receive_until_done(websocket)
+
+        assert error == {
+            "type": "error",
+            "id": "t1",
+            "code": "rate_limited",
+            "detail": "Rate limit exceeded, retry after 2.5s",
+            "retry_after": 2.5,
+        }
+        assert frames[-1]["type"] == "done"
+        gateways.message.create.assert_called()
+        # The rejected turn is not embedded
+        gateways.openai.embed_query.assert_called_once()
+
+    def test_non_member_room_is_not_found(self, client, gateways):
+        """Should refuse rooms the user does not belong to."""
+        gateways.chat_room.is_member.return_value = False
+
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            websocket.send_json(
+                {"type": "chat", "id": "t1", "chat_room_id": 9, "message": "hi"}
+            )
+            error = websocket.receive_json()
+
+        assert error["code"] == "not_found"
+        gateways.message.create_from_user.assert_not_called()
+        gateways.message.create.assert_not_called()
+
+    def test_invalid_frame_gets_error_frame(self, client):
+        """Should reject frames that do not match the protocol."""
+        with client.websocket_connect("/ws/chat", headers=AUTH_HEADERS) as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "chat", "message": "missing id"})
+            error = websocket.receive_json()
+
+        assert error["code"] == "invalid_request"
+        assert error["id"] is None
+
+
+class TestChatSocketAuth:
+    """Tests for authenticating /ws/chat connections."""
+
+    def test_auth_frame(self, client, gateways):
+        """Should accept the token as the first frame."""
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_json({"type": "auth", "token": "token"})
+
+            assert websocket.receive_json() == {"type": "ready"}
+
+        gateways.current_user.get_current_user.assert_called_once()
+        assert gateways.current_user.get_current_user.call_args.args[0] == "token"
+
+    def test_invalid_token_closes_connection(self, client, gateways):
+        """Should close with 4401 when the token is rejected."""
+        gateways.current_user.get_current_user.side_effect = AuthenticationError(
+            "User not found"
+        )
+
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_json({"type": "auth", "token": "bad"})
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_json()
+
+        assert exc_info.value.code == 4401
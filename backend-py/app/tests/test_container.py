@@ -0,0 +1,124 @@
+"""Dependency container tests."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from container import Container
+from domain.service.prompt_service import Persona, compile_prefix
+from usecase.chat_usecase import DEFAULT_VIRTUAL_USER_NAME
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Get the application with the settings its lifespan requires."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from app import app
+
+    return app
+
+
+class TestContainer:
+    """Tests for the lifespan dependency container."""
+
+    def test_shares_one_container_across_requests(self, app, mocker):
+        """Should build dependencies once at startup and close them at shutdown."""
+        close = mocker.patch.object(Container, "close")
+
+        with TestClient(app) as client:
+            container = app.state.container
+            client.get("/healthcheck")
+            client.get("/healthcheck")
+
+            assert app.state.container is container
+            close.assert_not_called()
+
+        close.assert_called_once()
+
+    def test_gateways_share_the_supabase_client(self, monkeypatch):
+        """Should inject the one Supabase client into the use case's gateways."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+        container = Container.create()
+
+        gateway = container.chat_usecase.current_user_gateway
+        assert gateway.supabase_client is container.supabase_client
+        assert container.chat_usecase.openai_gateway is container.openai_gateway
+        container.close()
+
+    def test_warm_up_continues_after_a_failing_step(self, monkeypatch, mocker):
+        """Should run every warm-up step even if one fails."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        container = Container.create()
+        engine_warm_up = mocker.patch(
+            "container.warm_up_engine", side_effect=OSError("db down")
+        )
+        supabase_warm_up = mocker.patch.object(container.supabase_client, "warm_up")
+        llm_warm_up = mocker.patch.object(container.openai_gateway, "warm_up")
+        prompt_warm_up = mocker.patch.object(container.chat_usecase, "warm_up")
+
+        asyncio.run(container.warm_up())
+
+        engine_warm_up.assert_called_once()
+        supabase_warm_up.assert_called_once()
+        llm_warm_up.assert_called_once()
+        prompt_warm_up.assert_called_once()
+        container.close()
+
+    def test_supabase_warm_up_opens_the_auth_connection(self, monkeypatch, mocker):
+        """Should call the public health check over the auth API's client."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        container = Container.create()
+        supabase_client = container.supabase_client
+        get = mocker.patch.object(supabase_client.http_client, "get")
+        get_user = mocker.patch.object(supabase_client.client.auth, "get_user")
+
+        supabase_client.warm_up()
+
+        get.assert_called_once_with(
+            f"{supabase_client.url}/auth/v1/health",
+            headers={"apikey": supabase_client.key},
+        )
+        get.return_value.raise_for_status.assert_called_once()
+        get_user.assert_not_called()
+        # The connection is opened in the pool get_user goes through
+        assert supabase_client.client.auth._http_client is supabase_client.http_client
+        container.close()
+
+    def test_warm_up_compiles_the_default_prompt_prefix(self, monkeypatch):
+        """Should cache the prefix of virtual users without a profile."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        container = Container.create()
+        compile_prefix.cache_clear()
+
+        container.chat_usecase.warm_up()
+
+        assert compile_prefix.cache_info().currsize == 1
+        compile_prefix(Persona(name=DEFAULT_VIRTUAL_USER_NAME))
+        assert compile_prefix.cache_info().hits == 1
+        container.close()
+
+
+class TestReadiness:
+    """Tests for the /readyz probe."""
+
+    def test_not_ready_outside_lifespan(self, app):
+        """Should report 503 until startup has completed."""
+        app.state.ready = False
+
+        response = TestClient(app).get("/readyz")
+
+        assert response.status_code == 503
+
+    def test_ready_after_startup(self, app, mocker):
+        """Should report ready once the warm-up has run."""
+        warm_up = mocker.patch.object(Container, "warm_up")
+        mocker.patch.dict("os.environ", {"APP_WARMUP": "true"})
+
+        with TestClient(app) as client:
+            response = client.get("/readyz")
+
+        warm_up.assert_called_once()
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
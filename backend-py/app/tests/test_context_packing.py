@@ -0,0 +1,44 @@
+"""Context packing tests (one token per character)."""
+
+from domain.service.context_packing_service import pack_context
+
+
+class TestPackContext:
+    """Tests for pack_context."""
+
+    def test_packs_in_relevance_order_under_the_budget(self):
+        """Should keep the most relevant texts whole while they fit."""
+        packed = pack_context(["first", "second", "third"], len, budget=13)
+
+        assert packed.text == "first\nsecond"
+        assert packed.tokens == 12
+        assert (packed.packed, packed.over_budget) == (2, 1)
+        assert packed.tokens_saved == len("first\nsecond\nthird") - 12
+
+    def test_truncates_at_a_sentence_end(self):
+        """Should cut a text that does not fit after its last fitting sentence."""
+        packed = pack_context(
+            ["京都に住んでいます。紅茶が好きです。猫を飼っています。"], len, budget=20
+        )
+
+        assert packed.text == "京都に住んでいます。紅茶が好きです。"
+        assert packed.truncated == 1
+
+    def test_never_cuts_inside_a_sentence(self):
+        """Should leave out a text whose first sentence does not fit."""
+        packed = pack_context(["A long first sentence. Short."], len, budget=10)
+
+        assert packed.text is None
+        assert (packed.tokens, packed.over_budget) == (0, 1)
+
+    def test_skips_texts_in_the_history(self):
+        """Should skip texts the history contains, ignoring width and spacing."""
+        packed = pack_context(
+            ["I like  tea", "I live in Kyoto", "I live in Kyoto"],
+            len,
+            budget=100,
+            history=["Hello! ＩＬike tea? no: I like tea and cake"],
+        )
+
+        assert packed.text == "I live in Kyoto"
+        assert packed.covered == 2
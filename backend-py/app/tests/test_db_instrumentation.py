@@ -0,0 +1,148 @@
+"""SQL instrumentation tests."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from infra.db_instrumentation import (
+    QueryStats,
+    capture_queries,
+    get_query_stats,
+    instrument_engine,
+)
+from middleware.logging_middleware import LoggingMiddleware
+from util.logging import configure_logging
+
+
+@pytest.fixture
+def engine():
+    """Create an instrumented in-memory SQLite engine."""
+    test_engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    instrument_engine(test_engine)
+    with test_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    return test_engine
+
+
+@pytest.fixture
+def client(engine):
+    """Create a test client whose endpoints report their query stats."""
+    configure_logging()
+
+    test_app = FastAPI()
+    test_app.add_middleware(LoggingMiddleware)
+
+    @test_app.get("/single")
+    def single_endpoint():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT name FROM items")).all()
+        stats = get_query_stats()
+        return {"statements": stats.statement_count, "n_plus_one": stats.n_plus_one}
+
+    @test_app.get("/n-plus-one")
+    def n_plus_one_endpoint():
+        with engine.connect() as conn:
+            for item_id in (1, 2, 3):
+                conn.execute(
+                    text("SELECT name FROM items WHERE id = :id"), {"id": item_id}
+                ).all()
+        stats = get_query_stats()
+        return {"statements": stats.statement_count, "n_plus_one": stats.n_plus_one}
+
+    return TestClient(test_app)
+
+
+class TestQueryStats:
+    """Tests for QueryStats."""
+
+    def test_records_count_time_and_slowest(self):
+        """Should accumulate count, total time and the slowest statement."""
+        stats = QueryStats()
+
+        stats.record("SELECT 1", (), 1.5)
+        stats.record("SELECT 2", (), 3.0)
+
+        assert stats.statement_count == 2
+        assert stats.total_ms == pytest.approx(4.5)
+        assert stats.slowest_ms == pytest.approx(3.0)
+        assert stats.slowest_statement == "SELECT 2"
+
+    def test_flags_repeated_statement_with_different_parameters(self):
+        """Should flag a statement repeated with distinct parameters."""
+        stats = QueryStats(n_plus_one_threshold=3)
+
+        for item_id in (1, 2, 3):
+            stats.record("SELECT * FROM items WHERE id = ?", (item_id,), 0.1)
+
+        assert stats.n_plus_one == ["SELECT * FROM items WHERE id = ?"]
+
+    def test_does_not_flag_identical_parameters(self):
+        """Should not flag a statement repeated with the same parameters."""
+        stats = QueryStats(n_plus_one_threshold=3)
+
+        for _ in range(5):
+            stats.record("SELECT * FROM items WHERE id = ?", (1,), 0.1)
+
+        assert stats.n_plus_one == []
+
+    def test_log_fields(self):
+        """Should expose the statistics as log fields."""
+        stats = QueryStats()
+        stats.record("SELECT 1", (), 2.345)
+
+        fields = stats.as_log_fields()
+
+        assert fields["db_statements"] == 1
+        assert fields["db_time_ms"] == 2.35
+        assert fields["db_slowest_statement"] == "SELECT 1"
+        assert "db_n_plus_one" not in fields
+
+
+class TestRequestScopedStats:
+    """Tests for per-request statistics collected through the middleware."""
+
+    def test_counts_statements_of_the_request(self, client):
+        """Should only count statements issued by the current request."""
+        response = client.get("/single")
+
+        assert response.json() == {"statements": 1, "n_plus_one": []}
+
+    def test_detects_n_plus_one(self, client):
+        """Should flag the repeated lookup inside the request."""
+        response = client.get("/n-plus-one")
+
+        body = response.json()
+        assert body["statements"] == 3
+        assert body["n_plus_one"] == ["SELECT name FROM items WHERE id = ?"]
+
+    def test_no_stats_outside_request(self):
+        """Should not collect statistics outside a request."""
+        assert get_query_stats() is None
+
+
+class TestQueryBudget:
+    """Tests for the query_budget fixture."""
+
+    def test_capture_queries_sees_statements_from_client(self, client):
+        """Should capture statements executed by the app's worker thread."""
+        with capture_queries() as stats:
+            client.get("/single")
+            client.get("/single")
+
+        assert stats.statement_count == 2
+
+    def test_healthcheck_within_budget(self, query_budget):
+        """Health check should not touch the database."""
+        from app import app
+
+        with query_budget("GET /healthcheck"):
+            response = TestClient(app).get("/healthcheck")
+
+        assert response.status_code == 200
@@ -0,0 +1,86 @@
+"""LISTEN/NOTIFY listener tests."""
+
+import asyncio
+import socket
+
+import psycopg2
+
+from infra.db_notify import NotificationListener
+
+
+class _Connection:
+    """psycopg2 connection stand-in whose socket is one end of a pair."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.closed = 0
+        self.notifies: list[object] = []
+
+    def fileno(self) -> int:
+        if self.closed:
+            msg = "connection already closed"
+            raise psycopg2.InterfaceError(msg)
+        return self.sock.fileno()
+
+    def poll(self) -> None:
+        self.closed = 2
+        msg = "server closed the connection unexpectedly"
+        raise psycopg2.OperationalError(msg)
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+class TestNotificationListener:
+    """Tests for NotificationListener."""
+
+    def test_reconnects_after_the_connection_is_lost(self, mocker):
+        """Should close the lost connection and LISTEN on a new one."""
+        ours, theirs = socket.socketpair()
+        spare, spare_peer = socket.socketpair()
+        lost, restored = _Connection(ours), _Connection(spare)
+        listener = NotificationListener("jobs")
+        connect = mocker.patch.object(
+            listener, "_connect", side_effect=[lost, restored]
+        )
+
+        async def run() -> None:
+            async with listener:
+                theirs.send(b"x")
+                # Returns as a wake-up once the new connection listens
+                await listener.wait()
+                assert listener._connection is restored
+
+        try:
+            asyncio.run(run())
+        finally:
+            for sock in (ours, theirs, spare, spare_peer):
+                sock.close()
+
+        assert connect.call_count == 2
+        assert lost.closed == 1
+        assert restored.closed == 1
+
+    def test_backs_off_until_the_database_is_reachable(self, mocker):
+        """Should keep retrying a failed first connect with a doubling delay."""
+        sock, other = socket.socketpair()
+        connection = _Connection(sock)
+        listener = NotificationListener("jobs", reconnect_delay=0.01)
+        failure = psycopg2.OperationalError("connection refused")
+        mocker.patch.object(
+            listener, "_connect", side_effect=[failure, failure, failure, connection]
+        )
+        sleep = mocker.patch("infra.db_notify.asyncio.sleep", autospec=True)
+
+        async def run() -> None:
+            async with listener:
+                await listener.wait()
+                assert listener._connection is connection
+
+        try:
+            asyncio.run(run())
+        finally:
+            sock.close()
+            other.close()
+
+        assert [call.args[0] for call in sleep.await_args_list] == [0.01, 0.02]
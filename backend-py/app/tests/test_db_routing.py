@@ -0,0 +1,190 @@
+"""Read replica routing tests.
+
+The unit tests stand two SQLite files in for a primary and a replica whose
+rows differ, so each result shows where the query ran. The integration
+tests run the same checks against two PostgreSQL containers (skipped when
+testcontainers or Docker is unavailable).
+"""
+
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Engine,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    insert,
+    text,
+)
+from sqlmodel import select
+
+from infra import db_routing
+from infra.db_routing import ReplicaRouter, RoutingSession, read_only, replica_lag
+
+metadata = MetaData()
+items = Table("items", metadata, Column("name", Text))
+
+
+def _database(url: str, name: str) -> Engine:
+    engine = create_engine(url)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(items.delete())
+        connection.execute(insert(items).values(name=name))
+    return engine
+
+
+def _names(session: RoutingSession, *, replica: bool = True) -> list[str]:
+    statement = select(items.c.name).order_by(items.c.name)
+    return list(session.exec(read_only(statement) if replica else statement).all())
+
+
+def _router(engines: list[Engine], lag: float = 0.0, **kwargs) -> ReplicaRouter:
+    return ReplicaRouter(
+        engines, max_lag=5, check_interval=60, lag_probe=lambda _: lag, **kwargs
+    )
+
+
+@pytest.fixture
+def primary(tmp_path) -> Iterator[Engine]:
+    """Primary database holding the row "primary"."""
+    engine = _database(f"sqlite:///{tmp_path / 'primary.db'}", "primary")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path) -> Iterator[Engine]:
+    """Replica database holding the row "replica"."""
+    engine = _database(f"sqlite:///{tmp_path / 'replica.db'}", "replica")
+    yield engine
+    engine.dispose()
+
+
+class TestRoutingSession:
+    """Tests for RoutingSession."""
+
+    def test_read_only_statements_run_on_the_replica(self, primary, replica):
+        """Should send only marked reads to the replica."""
+        with RoutingSession(primary, router=_router([replica])) as session:
+            assert _names(session) == ["replica"]
+            assert _names(session, replica=False) == ["primary"]
+
+    def test_reads_after_a_write_run_on_the_primary(self, primary, replica):
+        """Should read the session's own writes from the primary."""
+        with RoutingSession(primary, router=_router([replica])) as session:
+            session.exec(insert(items).values(name="written"))
+            session.commit()
+
+            assert _names(session) == ["primary", "written"]
+
+    def test_lagging_replica_falls_back_to_the_primary(self, primary, replica):
+        """Should not read from a replica past the lag limit."""
+        with RoutingSession(primary, router=_router([replica], lag=30)) as session:
+            assert _names(session) == ["primary"]
+
+    def test_unreachable_replica_falls_back_to_the_primary(self, primary, replica):
+        """Should not read from a replica whose lag cannot be checked."""
+
+        def probe(_engine):
+            msg = "connection refused"
+            raise OSError(msg)
+
+        router = ReplicaRouter([replica], max_lag=5, check_interval=60, lag_probe=probe)
+        with RoutingSession(primary, router=router) as session:
+            assert _names(session) == ["primary"]
+
+    def test_no_router_runs_everything_on_the_primary(self, primary):
+        """Should behave as a plain session without replicas."""
+        with RoutingSession(primary) as session:
+            assert _names(session) == ["primary"]
+
+
+class TestReplicaRouter:
+    """Tests for ReplicaRouter."""
+
+    def test_takes_replicas_in_turn_and_skips_lagging_ones(self, primary, replica):
+        """Should rotate over the replicas within the lag limit."""
+        lags = {primary: 0.0, replica: 0.0}
+        router = ReplicaRouter(
+            [primary, replica], max_lag=5, check_interval=0, lag_probe=lags.get
+        )
+
+        assert [router.pick() for _ in range(3)] == [primary, replica, primary]
+        lags[replica] = 30.0
+        assert [router.pick() for _ in range(2)] == [primary, primary]
+
+    def test_checks_lag_once_per_interval(self, replica):
+        """Should reuse the last lag check within the interval."""
+        calls = []
+        router = ReplicaRouter(
+            [replica],
+            max_lag=5,
+            check_interval=60,
+            lag_probe=lambda engine: calls.append(engine) or 0.0,
+        )
+
+        router.pick()
+        router.pick()
+
+        assert calls == [replica]
+
+    def test_replica_not_streaming_is_unhealthy(self, mocker, replica):
+        """Should treat a replica without a WAL receiver as infinitely behind."""
+        mocker.patch.object(db_routing, "_LAG_QUERY", text("SELECT NULL"))
+        router = ReplicaRouter([replica], max_lag=5, check_interval=60)
+
+        assert replica_lag(replica) == float("inf")
+        assert router.pick() is None
+
+
+@pytest.fixture(scope="module")
+def postgres_urls() -> Iterator[tuple[str, str]]:
+    """URLs of two PostgreSQL containers standing in for primary and replica."""
+    postgres = pytest.importorskip("testcontainers.postgres")
+    containers = []
+    try:
+        for _ in range(2):
+            containers.append(postgres.PostgresContainer("postgres:16-alpine").start())
+    except Exception as error:  # noqa: BLE001 - no Docker daemon
+        for container in containers:
+            container.stop()
+        pytest.skip(f"PostgreSQL containers are unavailable: {error}")
+    yield containers[0].get_connection_url(), containers[1].get_connection_url()
+    for container in containers:
+        container.stop()
+
+
+class TestPostgresReplicaRouting:
+    """Integration tests for routing between two PostgreSQL servers."""
+
+    @pytest.fixture
+    def engines(self, postgres_urls) -> Iterator[tuple[Engine, Engine]]:
+        """Primary and replica engines with differing rows."""
+        primary = _database(postgres_urls[0], "primary")
+        replica = _database(postgres_urls[1], "replica")
+        yield primary, replica
+        primary.dispose()
+        replica.dispose()
+
+    def test_routes_by_read_only_marker_and_writes(self, engines):
+        """Should read from the replica until the session writes."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], max_lag=5, check_interval=60)
+
+        with RoutingSession(primary, router=router) as session:
+            assert _names(session) == ["replica"]
+            session.exec(insert(items).values(name="written"))
+
+            assert _names(session) == ["primary", "written"]
+
+    def test_falls_back_when_the_replica_lags(self, engines):
+        """Should read from the primary when the measured lag is too high."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], max_lag=-1, check_interval=60)
+
+        with RoutingSession(primary, router=router) as session:
+            assert _names(session) == ["primary"]
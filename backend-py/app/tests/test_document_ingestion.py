@@ -0,0 +1,191 @@
+"""Document chunking and ingestion tests."""
+
+import io
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.entity.document import DocumentChunk
+from domain.service.chunking_service import chunk_text, read_blocks, split_sentences
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.openai_gateway import OpenAIGateway
+from usecase.document_ingestion_usecase import (
+    DocumentIngestionSettings,
+    DocumentIngestionUseCase,
+)
+
+JAPANESE = (
+    "吾輩は猫である。名前はまだ無い。どこで生れたかとんと見当がつかぬ。"
+    "何でも薄暗いじめじめした所でニャーニャー泣いていた事だけは記憶している。"
+)
+SETTINGS = DocumentIngestionSettings(chunk_tokens=40, overlap_tokens=10, batch_size=2)
+
+
+def _pieces(text: str, size: int) -> list[str]:
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+class TestChunking:
+    """Tests for the streaming chunker (one token per character)."""
+
+    def test_splits_japanese_sentences_without_whitespace(self):
+        """Should end sentences at 。 even when blocks cut through them."""
+        sentences = list(split_sentences(_pieces(JAPANESE, 5), max_chars=1000))
+
+        assert sentences[:2] == ["吾輩は猫である。", "名前はまだ無い。"]
+        assert "".join(sentences) == JAPANESE
+
+    def test_latin_periods_need_whitespace(self):
+        """Should not end a sentence inside a number."""
+        sentences = list(split_sentences(["Pi is 3.14 today. Yes."], 1000))
+
+        assert sentences == ["Pi is 3.14 today. ", "Yes."]
+
+    def test_chunks_respect_the_token_limit_and_overlap(self):
+        """Should bound chunks and repeat the previous chunk's last sentence."""
+        text = "".join(f"第{i}文です。" for i in range(100))
+
+        chunks = list(
+            chunk_text(_pieces(text, 7), len, max_tokens=40, overlap_tokens=10)
+        )
+
+        assert all(len(chunk) <= 40 for chunk in chunks)
+        for previous, chunk in zip(chunks, chunks[1:], strict=False):
+            last_sentence = previous[previous.rfind("第") :]
+            assert chunk.startswith(last_sentence)
+
+    def test_unpunctuated_text_is_cut_between_characters(self):
+        """Should split text without sentence ends at the token limit."""
+        chunks = list(chunk_text(["あ" * 100], len, max_tokens=30, overlap_tokens=0))
+
+        assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+
+    def test_chunks_do_not_depend_on_block_size(self):
+        """Should produce the same chunks however the text is read."""
+        text = (JAPANESE + "\n\n") * 10
+
+        whole = list(chunk_text([text], len, max_tokens=60, overlap_tokens=20))
+        streamed = list(
+            chunk_text(
+                read_blocks(io.StringIO(text), 3), len, max_tokens=60, overlap_tokens=20
+            )
+        )
+
+        assert streamed == whole
+
+    def test_an_edit_only_changes_nearby_chunks(self):
+        """Should keep later chunks unchanged after an insertion at the start."""
+        text = "".join(f"文{i}はこれです。" for i in range(300))
+
+        before = list(chunk_text([text], len, max_tokens=80, overlap_tokens=16))
+        after = list(
+            chunk_text(["追加した文。" + text], len, max_tokens=80, overlap_tokens=16)
+        )
+
+        assert len(set(before) & set(after)) >= len(before) - 3
+
+    def test_overlap_must_be_smaller_than_the_chunk(self):
+        """Should refuse an overlap as large as a chunk."""
+        with pytest.raises(ValueError, match="overlap_tokens"):
+            list(chunk_text(["text"], len, max_tokens=10, overlap_tokens=10))
+
+
+@pytest.fixture
+def openai_gateway(mocker):
+    """Mock the embedding model."""
+    gateway = mocker.create_autospec(OpenAIGateway, instance=True)
+    gateway.embed_texts.side_effect = lambda texts: [
+        [float(len(text))] for text in texts
+    ]
+    return gateway
+
+
+def _usecase(
+    embeddings_gateway, openai_gateway, session_factory
+) -> DocumentIngestionUseCase:
+    return DocumentIngestionUseCase(
+        embeddings_gateway=embeddings_gateway,
+        openai_gateway=openai_gateway,
+        session_factory=session_factory,
+        settings=SETTINGS,
+        token_counter=len,
+    )
+
+
+class TestDocumentIngestion:
+    """Tests for DocumentIngestionUseCase."""
+
+    def test_embeds_chunks_keyed_by_content_hash(
+        self, embeddings_gateway, openai_gateway, session, session_factory
+    ):
+        """Should upsert each chunk under its content-hash ID and commit."""
+        result = _usecase(embeddings_gateway, openai_gateway, session_factory).ingest(
+            "docs/cat.md", [JAPANESE]
+        )
+
+        rows = [
+            row
+            for call in embeddings_gateway.upsert.call_args_list
+            for row in call.args[0]
+        ]
+        assert result.chunks == len(rows) == result.embedded
+        chunk = DocumentChunk(document_id="docs/cat.md", content=rows[0]["content"])
+        assert rows[0]["id"] == chunk.embedding_id
+        assert rows[0]["id"].endswith(chunk.content_hash)
+        assert rows[0]["metadata_"]["document_id"] == "docs/cat.md"
+        # One commit per batch of two chunks, and one for the deletion
+        assert session.commit.call_count == -(-result.chunks // 2) + 1
+
+    def test_unchanged_chunks_are_not_embedded_again(
+        self, embeddings_gateway, openai_gateway, session_factory
+    ):
+        """Should embed only the chunks without a stored row."""
+        usecase = _usecase(embeddings_gateway, openai_gateway, session_factory)
+        first = usecase.ingest("doc", [JAPANESE])
+        stored = {
+            row["id"]: row["metadata_"]["content_hash"]
+            for call in embeddings_gateway.upsert.call_args_list
+            for row in call.args[0]
+        }
+        embeddings_gateway.get_content_hashes.side_effect = lambda ids, _: {
+            id_: stored[id_] for id_ in ids if id_ in stored
+        }
+        openai_gateway.embed_texts.reset_mock()
+
+        second = usecase.ingest("doc", [JAPANESE + "新しい最後の文。"])
+
+        assert second.embedded < first.chunks
+        embedded = [
+            text
+            for call in openai_gateway.embed_texts.call_args_list
+            for text in call.args[0]
+        ]
+        assert all("新しい最後の文" in text for text in embedded)
+
+    def test_removed_chunks_are_deleted(
+        self, embeddings_gateway, openai_gateway, session, session_factory
+    ):
+        """Should delete the document's rows except the chunks just ingested."""
+        embeddings_gateway.delete_document_chunks.return_value = 3
+
+        result = _usecase(embeddings_gateway, openai_gateway, session_factory).ingest(
+            "doc", ["短い文書。"]
+        )
+
+        assert result.deleted == 3
+        chunk = DocumentChunk(document_id="doc", content="短い文書。")
+        embeddings_gateway.delete_document_chunks.assert_called_once_with(
+            "doc", {chunk.embedding_id}, session
+        )
+
+    def test_delete_document_chunks_keeps_the_given_ids(self, mocker):
+        """Should delete by document ID, excluding the kept chunks."""
+        session = mocker.Mock()
+
+        EmbeddingsGateway().delete_document_chunks("doc", {"document:doc:a"}, session)
+
+        statement = session.exec.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "DELETE FROM embeddings" in sql
+        assert "(embeddings.metadata ->> " in sql
+        assert "NOT IN" in sql
@@ -0,0 +1,272 @@
+"""Embedding dimensionality reduction tests."""
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.entity.projection import REDUCED_DIMENSIONS, EmbeddingProjection
+from domain.service.projection_service import fit_pca, fit_random_projection
+from gateway.embedding_projection_gateway import EmbeddingProjectionGateway
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.job_gateway import JobGateway
+from usecase.embedding_reduction_usecase import (
+    FIT_JOB,
+    REPROJECT_JOB,
+    EmbeddingReductionSettings,
+    EmbeddingReductionUseCase,
+)
+
+QUERY = [0.1] * 1536
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _projection(
+    version: int = 3, source: int = 4, dimensions: int = 2, slot: str = "a"
+):
+    return EmbeddingProjection(
+        version=version,
+        method="pca",
+        mean=np.zeros(source, dtype=np.float32),
+        components=np.eye(dimensions, source, dtype=np.float32),
+        slot=slot,
+    )
+
+
+class TestProjection:
+    """Tests for fitting and applying projections."""
+
+    def test_pca_keeps_the_directions_of_most_variance(self):
+        """Should find the axes the sample varies along."""
+        rng = np.random.default_rng(0)
+        sample = np.zeros((500, 8))
+        sample[:, 2] = rng.normal(scale=10, size=500)
+        sample[:, 5] = rng.normal(scale=5, size=500)
+        sample += rng.normal(scale=0.01, size=sample.shape)
+
+        fit = fit_pca(sample, 2)
+
+        assert fit.components.shape == (2, 8)
+        assert abs(fit.components[0][2]) == pytest.approx(1, abs=1e-3)
+        assert abs(fit.components[1][5]) == pytest.approx(1, abs=1e-3)
+        assert fit.explained_variance == pytest.approx(1, abs=1e-3)
+
+    def test_pca_needs_more_rows_than_dimensions(self):
+        """Should refuse a sample too small to fit."""
+        with pytest.raises(ValueError, match="more than 4"):
+            fit_pca(np.ones((4, 8)), 4)
+
+    def test_random_projection_is_orthonormal(self):
+        """Should draw orthonormal components."""
+        fit = fit_random_projection(32, 8, seed=1)
+
+        np.testing.assert_allclose(
+            fit.components @ fit.components.T, np.eye(8), atol=1e-5
+        )
+
+    def test_projected_vectors_have_unit_length(self):
+        """Should center, project and normalize."""
+        projection = EmbeddingProjection(
+            version=1,
+            method="pca",
+            mean=np.array([1, 1, 1], dtype=np.float32),
+            components=np.eye(2, 3, dtype=np.float32),
+            slot="a",
+        )
+
+        reduced = projection.project([[4, 5, 9]])
+
+        np.testing.assert_allclose(reduced, [[0.6, 0.8]], atol=1e-6)
+
+
+class TestEmbeddingProjectionGateway:
+    """Tests for EmbeddingProjectionGateway."""
+
+    def test_round_trips_the_matrices(self, mocker):
+        """Should store float32 bytes and load the same matrices once."""
+        session = mocker.Mock()
+        session.exec.return_value.first.return_value = None
+        fit = fit_random_projection(6, 3, seed=2)
+        gateway = EmbeddingProjectionGateway()
+        gateway.create(fit, session)
+        row = session.add.call_args.args[0]
+        row.version = 7
+        session.get.return_value = row
+
+        projection = gateway.get(7, session)
+        gateway.get(7, session)
+
+        assert (row.dimensions, row.source_dimensions) == (3, 6)
+        np.testing.assert_array_equal(projection.components, fit.components)
+        np.testing.assert_array_equal(projection.mean, fit.mean)
+        assert projection.slot == "a"
+        session.get.assert_called_once()
+
+    @pytest.mark.parametrize(("active_slot", "slot"), [("a", "b"), ("b", "a")])
+    def test_new_version_takes_the_slot_the_active_one_does_not_use(
+        self, mocker, active_slot, slot
+    ):
+        """Should leave the active version's reduced vectors searchable."""
+        session = mocker.Mock()
+        session.exec.return_value.first.return_value = active_slot
+
+        EmbeddingProjectionGateway().create(fit_random_projection(6, 3), session)
+
+        assert session.add.call_args.args[0].slot == slot
+
+    def test_current_versions_are_the_active_and_the_newest(self, mocker):
+        """Should load the active version and the one being reprojected."""
+        session = mocker.Mock()
+        session.exec.return_value.all.return_value = [3, 4]
+        gateway = EmbeddingProjectionGateway()
+        gateway._cache = {3: _projection(3, slot="a"), 4: _projection(4, slot="b")}
+
+        current = gateway.get_current(session)
+
+        sql = _sql(session.exec.call_args.args[0])
+        assert "embedding_projections.active OR " in sql
+        assert "max(embedding_projections.version)" in sql
+        assert [(p.version, p.slot) for p in current] == [(3, "a"), (4, "b")]
+
+    def test_activation_deactivates_the_old_version_first(self, mocker):
+        """Should never have two active versions at once."""
+        session = mocker.Mock()
+
+        EmbeddingProjectionGateway().activate(5, session)
+
+        deactivate, activate = (call.args[0] for call in session.exec.call_args_list)
+        assert deactivate.compile().params["active"] is False
+        assert "version != " in _sql(deactivate)
+        assert activate.compile().params["active"] is True
+
+
+class TestReducedSearch:
+    """Tests for searching through the reduced vectors."""
+
+    @pytest.mark.parametrize("slot", ["a", "b"])
+    def test_shortlists_by_the_reduced_vectors(self, mocker, slot):
+        """Should compare reduced vectors of the same version, then rerank."""
+        session = mocker.MagicMock()
+        projection = _projection(
+            version=3, source=1536, dimensions=REDUCED_DIMENSIONS, slot=slot
+        )
+
+        EmbeddingsGateway().search_similar(QUERY, 3, session, projection=projection)
+
+        search = session.exec.call_args.args[0]
+        shortlist, rerank = _sql(search).split(") AS anon_1")
+        assert f"ORDER BY embeddings.embedding_reduced_{slot} <=> " in shortlist
+        assert f"embeddings.reduction_version_{slot} = " in shortlist
+        assert "<~>" not in shortlist
+        assert "ORDER BY embeddings.embedding <=> " in rerank
+        assert 3 in search.compile().params.values()
+
+    def test_reduced_vectors_are_set_in_one_statement(self, mocker):
+        """Should update all rows of a batch from a VALUES list."""
+        session = mocker.Mock()
+
+        EmbeddingsGateway().set_reduced(
+            [("a", [0.5]), ("b", [0.25])], _projection(slot="b"), session
+        )
+
+        sql = _sql(session.exec.call_args.args[0])
+        assert "FROM (VALUES " in sql
+        assert "embedding_reduced_b=CAST(reduced.reduced AS VECTOR(256))" in sql
+        assert "reduction_version_b=reduced.version" in sql
+        assert "_a=" not in sql
+
+    def test_new_embeddings_are_reduced_into_every_current_slot(self):
+        """Should fill the slot of each projection and clear the others."""
+        vectors = [[3, 4, 0, 0]]
+
+        only_active = EmbeddingsGateway().reduced_columns(vectors, [_projection(3)])
+        both = EmbeddingsGateway().reduced_columns(
+            vectors, [_projection(3), _projection(4, slot="b")]
+        )
+
+        assert only_active[0]["reduction_version_a"] == 3
+        assert only_active[0]["embedding_reduced_b"] is None
+        assert only_active[0]["reduction_version_b"] is None
+        assert (both[0]["reduction_version_a"], both[0]["reduction_version_b"]) == (
+            3,
+            4,
+        )
+        np.testing.assert_allclose(both[0]["embedding_reduced_b"], [0.6, 0.8])
+
+
+class TestEmbeddingReductionUseCase:
+    """Tests for the reduction jobs."""
+
+    @pytest.fixture
+    def gateways(self, mocker):
+        """Mock the gateways of the use case."""
+        return (
+            mocker.create_autospec(EmbeddingsGateway, instance=True),
+            mocker.create_autospec(EmbeddingProjectionGateway, instance=True),
+            mocker.create_autospec(JobGateway, instance=True),
+        )
+
+    @pytest.fixture
+    def use_case(self, gateways):
+        """Use case reprojecting two embeddings per job."""
+        embeddings, projections, jobs = gateways
+        return EmbeddingReductionUseCase(
+            embeddings_gateway=embeddings,
+            projection_gateway=projections,
+            job_gateway=jobs,
+            settings=EmbeddingReductionSettings(sample_size=100, batch_size=2),
+        )
+
+    def test_small_sample_falls_back_to_a_random_projection(self, use_case, gateways):
+        """Should store a random projection and start reprojecting."""
+        embeddings, projections, jobs = gateways
+        embeddings.sample_embeddings.return_value = [QUERY] * 10
+        projections.create.return_value = 4
+
+        use_case.job_handlers()[FIT_JOB]({}, "session")
+
+        fit = projections.create.call_args.args[0]
+        assert fit.method == "random"
+        assert fit.components.shape == (REDUCED_DIMENSIONS, 1536)
+        jobs.enqueue.assert_called_once_with(REPROJECT_JOB, {"version": 4}, "session")
+
+    def test_full_batch_continues_in_a_new_job(self, use_case, gateways):
+        """Should reduce the batch and enqueue the next one."""
+        embeddings, projections, jobs = gateways
+        projections.get_latest.return_value = _projection(version=3)
+        embeddings.get_unreduced.return_value = [
+            ("a", [3, 4, 0, 0]),
+            ("b", [0, 0, 1, 0]),
+        ]
+
+        use_case.reproject({"version": 3}, "session")
+
+        reduced, projection, _ = embeddings.set_reduced.call_args.args
+        assert projection.version == 3
+        assert reduced[0][0] == "a"
+        np.testing.assert_allclose(reduced[0][1], [0.6, 0.8], atol=1e-6)
+        jobs.enqueue.assert_called_once_with(REPROJECT_JOB, {"version": 3}, "session")
+        projections.activate.assert_not_called()
+
+    def test_last_batch_activates_the_version(self, use_case, gateways):
+        """Should activate the version once every embedding is reduced."""
+        embeddings, projections, jobs = gateways
+        projections.get_latest.return_value = _projection(version=3)
+        embeddings.get_unreduced.return_value = [("a", [1, 0, 0, 0])]
+
+        use_case.reproject({"version": 3}, "session")
+
+        projections.activate.assert_called_once_with(3, "session")
+        jobs.enqueue.assert_not_called()
+
+    def test_superseded_version_is_skipped(self, use_case, gateways):
+        """Should leave reprojection to the newer version's jobs."""
+        embeddings, projections, jobs = gateways
+        projections.get_latest.return_value = _projection(version=4)
+
+        use_case.reproject({"version": 3}, "session")
+
+        embeddings.get_unreduced.assert_not_called()
+        projections.activate.assert_not_called()
@@ -0,0 +1,282 @@
+"""GraphQL API tests."""
+
+import asyncio
+import datetime
+import hashlib
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from container import get_chat_graph_usecase
+from controller.graphql.context import SessionReader
+from controller.graphql.extensions import PersistedQueryStore
+from controller.graphql.schema import GraphQLSettings, create_schema
+from domain.entity.models import (
+    ChatRooms,
+    Messages,
+    VirtualUserProfiles,
+    VirtualUsers,
+)
+from gateway.chat_room_gateway import ChatRoomGateway
+from gateway.message_gateway import MessageGateway
+from gateway.virtual_user_gateway import VirtualUserGateway
+from gateway.virtual_user_profile_gateway import VirtualUserProfileGateway
+from infra.db_client import get_session
+from middleware.auth_middleware import verify_token
+from usecase.chat_graph_usecase import ChatGraphUseCase
+
+USER_ID = uuid.uuid4()
+CREATED_AT = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+VIRTUAL_USERS = [
+    VirtualUsers(
+        id=uuid.uuid4(), name=f"AI {i}", owner_id=USER_ID, created_at=CREATED_AT
+    )
+    for i in range(2)
+]
+
+NESTED_QUERY = """
+query Rooms {
+  chatRooms(first: 10) {
+    id
+    messages(last: 5) {
+      content
+      virtualUser { name profile { backstory } }
+    }
+    virtualUsers { name }
+  }
+}
+"""
+
+
+def _rooms(count: int) -> list[ChatRooms]:
+    return [
+        ChatRooms(id=room_id, type="PRIVATE", created_at=CREATED_AT)
+        for room_id in range(1, count + 1)
+    ]
+
+
+def _messages(chat_room_ids, limit, _session) -> list[Messages]:
+    return [
+        Messages(
+            id=chat_room_id * 100 + i,
+            chat_room_id=chat_room_id,
+            content=f"room {chat_room_id} message {i}",
+            created_at=CREATED_AT,
+            virtual_user_id=VIRTUAL_USERS[i % 2].id,
+        )
+        for chat_room_id in chat_room_ids
+        for i in range(limit)
+    ]
+
+
+@pytest.fixture
+def gateways(mocker):
+    """Mock the gateways used by the GraphQL use case."""
+    result = SimpleNamespace(
+        chat_room=mocker.create_autospec(ChatRoomGateway, instance=True),
+        message=mocker.create_autospec(MessageGateway, instance=True),
+        virtual_user=mocker.create_autospec(VirtualUserGateway, instance=True),
+        profile=mocker.create_autospec(VirtualUserProfileGateway, instance=True),
+    )
+    result.message.get_recent_by_chat_room_ids.side_effect = _messages
+    result.virtual_user.get_by_ids.return_value = VIRTUAL_USERS
+    result.virtual_user.get_by_chat_room_ids.side_effect = lambda ids, _s: [
+        (chat_room_id, VIRTUAL_USERS[0]) for chat_room_id in ids
+    ]
+    result.profile.get_by_virtual_user_ids.return_value = [
+        VirtualUserProfiles(
+            id=1,
+            virtual_user_id=VIRTUAL_USERS[0].id,
+            knowledge_area=[],
+            backstory="helpful",
+        )
+    ]
+    return result
+
+
+@pytest.fixture
+def client(gateways, monkeypatch):
+    """Start the app with auth, session and use case overridden."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from app import app
+
+    use_case = ChatGraphUseCase(
+        chat_room_gateway=gateways.chat_room,
+        message_gateway=gateways.message,
+        virtual_user_gateway=gateways.virtual_user,
+        virtual_user_profile_gateway=gateways.profile,
+    )
+    app.dependency_overrides[verify_token] = lambda: SimpleNamespace(id=str(USER_ID))
+    app.dependency_overrides[get_session] = lambda: None
+    app.dependency_overrides[get_chat_graph_usecase] = lambda: use_case
+    # The GraphQL router is included by the lifespan
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+def _post(client: TestClient, body: dict) -> dict:
+    response = client.post("/graphql", json=body)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestGraphQLQueries:
+    """Tests for the chat room queries."""
+
+    def test_resolves_nested_relations(self, client, gateways):
+        """Should return rooms with messages, virtual users and profiles."""
+        gateways.chat_room.get_by_user_id.return_value = _rooms(1)
+
+        body = _post(client, {"query": NESTED_QUERY})
+
+        assert "errors" not in body
+        room = body["data"]["chatRooms"][0]
+        assert room["id"] == 1
+        assert room["messages"][0] == {
+            "content": "room 1 message 0",
+            "virtualUser": {"name": "AI 0", "profile": {"backstory": "helpful"}},
+        }
+        assert room["messages"][1]["virtualUser"]["profile"] is None
+        assert room["virtualUsers"] == [{"name": "AI 0"}]
+        gateways.chat_room.get_by_user_id.assert_called_once_with(USER_ID, 10, None)
+
+    @pytest.mark.parametrize("room_count", [1, 10])
+    def test_statement_count_is_constant(self, client, gateways, room_count):
+        """Should batch every relation into one gateway call per request."""
+        gateways.chat_room.get_by_user_id.return_value = _rooms(room_count)
+
+        body = _post(client, {"query": NESTED_QUERY})
+
+        assert len(body["data"]["chatRooms"]) == room_count
+        gateways.message.get_recent_by_chat_room_ids.assert_called_once()
+        gateways.virtual_user.get_by_chat_room_ids.assert_called_once()
+        gateways.virtual_user.get_by_ids.assert_called_once()
+        gateways.profile.get_by_virtual_user_ids.assert_called_once()
+
+    def test_chat_room_of_non_member_is_null(self, client, gateways):
+        """Should hide rooms the user does not belong to."""
+        gateways.chat_room.is_member.return_value = False
+
+        body = _post(client, {"query": "{ chatRoom(chatRoomId: 7) { id } }"})
+
+        assert body["data"] == {"chatRoom": None}
+        gateways.chat_room.get_by_id.assert_not_called()
+
+
+class TestGraphQLLimits:
+    """Tests for the depth and cost limits."""
+
+    def test_rejects_too_expensive_query(self, client, gateways):
+        """Should refuse a query whose list sizes multiply past the limit."""
+        query = "{ chatRooms(first: 100) { messages(last: 500) { id content } } }"
+
+        body = _post(client, {"query": query})
+
+        assert body["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+        gateways.chat_room.get_by_user_id.assert_not_called()
+
+    def test_rejects_too_deep_query(self):
+        """Should refuse queries nested deeper than the depth limit."""
+        schema = create_schema(GraphQLSettings(max_depth=2))
+
+        result = schema.execute_sync(
+            "{ chatRooms { messages { virtualUser { name } } } }"
+        )
+
+        assert result.errors
+        assert "exceeds maximum operation depth" in result.errors[0].message
+
+
+class TestPersistedQueries:
+    """Tests for automatic persisted queries."""
+
+    QUERY = "{ chatRooms { id } }"
+    HASH = hashlib.sha256(QUERY.encode()).hexdigest()
+
+    def _extensions(self, sha256_hash: str) -> dict:
+        return {"persistedQuery": {"version": 1, "sha256Hash": sha256_hash}}
+
+    def test_unknown_hash_asks_for_the_query(self, client):
+        """Should answer PersistedQueryNotFound so the client resends the text."""
+        body = _post(client, {"extensions": self._extensions("0" * 64)})
+
+        assert body["errors"][0]["message"] == "PersistedQueryNotFound"
+
+    def test_registered_query_runs_by_hash(self, client, gateways):
+        """Should run a query registered earlier from its hash alone."""
+        gateways.chat_room.get_by_user_id.return_value = _rooms(1)
+        _post(client, {"query": self.QUERY, "extensions": self._extensions(self.HASH)})
+
+        body = _post(client, {"extensions": self._extensions(self.HASH)})
+
+        assert body["data"] == {"chatRooms": [{"id": 1}]}
+
+    def test_rejects_mismatched_hash(self, client):
+        """Should not register a query under a different hash."""
+        body = _post(
+            client, {"query": self.QUERY, "extensions": self._extensions("0" * 64)}
+        )
+
+        assert body["errors"][0]["extensions"]["code"] == "BAD_REQUEST"
+
+
+class TestPersistedQueryStore:
+    """Tests for PersistedQueryStore."""
+
+    def test_evicts_least_recently_used(self):
+        """Should keep at most max_size registered queries."""
+        store = PersistedQueryStore(max_size=2)
+        store.register("a", "{ a }")
+        store.register("b", "{ b }")
+        store.get("a")
+        store.register("c", "{ c }")
+
+        assert store.get("a") == "{ a }"
+        assert store.get("b") is None
+
+    def test_manifest_queries_are_never_evicted(self):
+        """Should keep manifest entries regardless of registrations."""
+        store = PersistedQueryStore({"m": "{ m }"}, max_size=1)
+        store.register("a", "{ a }")
+        store.register("b", "{ b }")
+
+        assert store.get("m") == "{ m }"
+
+    def test_only_persisted_rejects_ad_hoc_queries(self):
+        """Should run only manifest queries when registration is disabled."""
+        schema = create_schema(GraphQLSettings(persisted_queries_only=True))
+
+        result = schema.execute_sync("{ chatRooms { id } }")
+
+        assert result.errors
+        assert result.errors[0].extensions == {"code": "PERSISTED_QUERY_REQUIRED"}
+
+
+class TestSessionReader:
+    """Tests for SessionReader."""
+
+    def test_reads_off_the_event_loop_one_at_a_time(self):
+        """Should run reads in worker threads without overlapping."""
+        session = object()
+        reader = SessionReader(session)
+        active = []
+
+        def read(received):
+            active.append(received)
+            time.sleep(0.01)
+            overlapping = len(active)
+            active.remove(received)
+            return threading.get_ident(), overlapping
+
+        async def main():
+            return await asyncio.gather(reader(read), reader(read))
+
+        results = asyncio.run(main())
+
+        assert all(ident != threading.get_ident() for ident, _ in results)
+        assert [overlapping for _, overlapping in results] == [1, 1]
@@ -0,0 +1,227 @@
+"""Background job queue tests."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import DEFAULT
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.entity.job import ClaimedJob
+from gateway.job_gateway import JobGateway
+from usecase.job_worker_usecase import JobWorkerSettings, JobWorkerUseCase
+
+SETTINGS = JobWorkerSettings(concurrency=2, visibility_timeout=30, poll_interval=60)
+
+
+def _job(kind: str = "work", attempts: int = 1, max_attempts: int = 3) -> ClaimedJob:
+    return ClaimedJob(
+        id=1,
+        kind=kind,
+        payload={"value": 1},
+        attempts=attempts,
+        max_attempts=max_attempts,
+    )
+
+
+class FakeNotifications:
+    """Notifications delivered from the test."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[None] = asyncio.Queue()
+
+    async def wait(self) -> None:
+        await self.queue.get()
+
+
+@pytest.fixture
+def gateway(mocker):
+    """Mock the job gateway; jobs are claimed once, then the queue is empty."""
+    gateway = mocker.create_autospec(JobGateway, instance=True)
+    gateway.claim.side_effect = lambda *_: []
+    gateway.complete.return_value = True
+    return gateway
+
+
+def _worker(gateway, session_factory, handlers) -> JobWorkerUseCase:
+    return JobWorkerUseCase(
+        job_gateway=gateway,
+        handlers=handlers,
+        session_factory=session_factory,
+        settings=SETTINGS,
+    )
+
+
+async def _run_until_set(
+    worker: JobWorkerUseCase, event: asyncio.Event, notifications=None
+) -> None:
+    stop = asyncio.Event()
+    task = asyncio.create_task(worker.run(stop, notifications))
+    async with asyncio.timeout(5):
+        await event.wait()
+    stop.set()
+    await task
+
+
+async def _run_until_called(worker: JobWorkerUseCase, mock) -> None:
+    """Run the worker until ``mock`` is called (from a worker thread)."""
+    called = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    effect = mock.side_effect
+
+    def side_effect(*args, **kwargs):
+        loop.call_soon_threadsafe(called.set)
+        return DEFAULT if effect is None else effect(*args, **kwargs)
+
+    mock.side_effect = side_effect
+    await _run_until_set(worker, called)
+
+
+def _claim_once(gateway, *jobs: ClaimedJob) -> None:
+    batches = iter([list(jobs)])
+    gateway.claim.side_effect = lambda *_: next(batches, [])
+
+
+class TestJobWorker:
+    """Tests for JobWorkerUseCase."""
+
+    def test_runs_handler_and_deletes_job_in_one_transaction(
+        self, gateway, session, session_factory
+    ):
+        """Should commit the handler's writes together with the job deletion."""
+        calls = []
+        _claim_once(gateway, _job())
+        worker = _worker(
+            gateway, session_factory, {"work": lambda p, s: calls.append(p)}
+        )
+
+        asyncio.run(_run_until_called(worker, session.commit))
+
+        assert calls == [{"value": 1}]
+        gateway.complete.assert_called_once_with(_job(), session)
+        gateway.retry.assert_not_called()
+
+    def test_claims_up_to_concurrency(self, gateway, session_factory):
+        """Should claim only as many jobs as there are free slots."""
+        worker = _worker(gateway, session_factory, {})
+
+        asyncio.run(_run_until_called(worker, gateway.claim))
+
+        assert gateway.claim.call_args.args[:3] == (
+            "default",
+            2,
+            timedelta(seconds=30),
+        )
+
+    def test_failed_attempt_is_retried_with_backoff(
+        self, gateway, session, session_factory
+    ):
+        """Should roll back and requeue the job after a delay."""
+        _claim_once(gateway, _job(attempts=2))
+
+        def fail(payload, session):
+            msg = "boom"
+            raise RuntimeError(msg)
+
+        worker = _worker(gateway, session_factory, {"work": fail})
+
+        asyncio.run(_run_until_called(worker, gateway.retry))
+
+        session.rollback.assert_called_once()
+        job, error, delay, _ = gateway.retry.call_args.args
+        assert error == "RuntimeError: boom"
+        assert timedelta(seconds=2) <= delay <= timedelta(seconds=4)
+        gateway.complete.assert_not_called()
+
+    def test_last_attempt_fails_the_job(self, gateway, session, session_factory):
+        """Should stop retrying after max_attempts."""
+        _claim_once(gateway, _job(attempts=3, max_attempts=3))
+
+        def fail(payload, session):
+            msg = "boom"
+            raise RuntimeError(msg)
+
+        worker = _worker(gateway, session_factory, {"work": fail})
+
+        asyncio.run(_run_until_called(worker, gateway.fail))
+
+        gateway.fail.assert_called_once_with(
+            _job(attempts=3, max_attempts=3), "RuntimeError: boom", session
+        )
+        gateway.retry.assert_not_called()
+
+    def test_unknown_kind_fails_the_job(self, gateway, session_factory):
+        """Should not retry jobs no handler is registered for."""
+        _claim_once(gateway, _job(kind="missing"))
+        worker = _worker(gateway, session_factory, {})
+
+        asyncio.run(_run_until_called(worker, gateway.fail))
+
+        assert gateway.fail.call_args.args[1] == "Unknown job kind: missing"
+
+    def test_lost_lease_rolls_back_handler_writes(
+        self, gateway, session, session_factory
+    ):
+        """Should discard the writes if another worker reclaimed the job."""
+        gateway.complete.return_value = False
+        _claim_once(gateway, _job())
+        worker = _worker(gateway, session_factory, {"work": lambda p, s: None})
+
+        asyncio.run(_run_until_called(worker, session.rollback))
+
+        session.commit.assert_not_called()
+
+    def test_notification_wakes_the_worker(self, gateway, session_factory):
+        """Should claim again on NOTIFY instead of waiting for the poll."""
+
+        async def scenario() -> None:
+            notifications = FakeNotifications()
+            claimed_again = asyncio.Event()
+            loop = asyncio.get_running_loop()
+
+            def claim(*_):
+                if gateway.claim.call_count == 1:
+                    loop.call_soon_threadsafe(notifications.queue.put_nowait, None)
+                else:
+                    loop.call_soon_threadsafe(claimed_again.set)
+                return []
+
+            gateway.claim.side_effect = claim
+            await _run_until_set(
+                _worker(gateway, session_factory, {}), claimed_again, notifications
+            )
+
+        asyncio.run(scenario())
+
+        assert gateway.claim.call_count >= 2
+
+
+class TestJobWorkerSettings:
+    """Tests for JobWorkerSettings."""
+
+    @pytest.mark.parametrize(
+        ("attempts", "low", "high"), [(1, 1, 2), (3, 4, 8), (20, 300, 600)]
+    )
+    def test_retry_delay_grows_exponentially_up_to_the_cap(self, attempts, low, high):
+        """Should double the delay per attempt, with jitter, up to the maximum."""
+        delay = JobWorkerSettings().retry_delay(attempts)
+
+        assert timedelta(seconds=low) <= delay <= timedelta(seconds=high)
+
+
+class TestJobGateway:
+    """Tests for the claim statement."""
+
+    def test_claim_skips_locked_rows(self, mocker):
+        """Should lease due and expired jobs without waiting on other workers."""
+        session = mocker.Mock()
+        session.exec.return_value.all.return_value = []
+
+        JobGateway().claim("default", 4, timedelta(seconds=30), session)
+
+        statement = session.exec.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "jobs.locked_until < now()" in sql
+        assert "RETURNING" in sql
+        session.commit.assert_called_once()
@@ -311,3 +311,261 @@ class TestConfigureLogging:
             # Last processor should be JSONRenderer in prod mode
             last_processor = config["processors"][-1]
             assert isinstance(last_processor, structlog.processors.JSONRenderer)
+
+
+class _RecordingStream:
+    """Binary stream that records writes."""
+
+    def __init__(self):
+        self.writes: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.writes.append(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def lines(self) -> list[bytes]:
+        return b"".join(self.writes).splitlines()
+
+
+class TestBackgroundLogWriter:
+    """Tests for BackgroundLogWriter."""
+
+    def test_close_flushes_queued_lines(self):
+        """Should write every queued line before stopping."""
+        from util.logging import BackgroundLogWriter
+
+        stream = _RecordingStream()
+        writer = BackgroundLogWriter(stream, flush_interval=0.01)
+        writer.start()
+        for i in range(100):
+            writer.write(f"line {i}\n".encode())
+        writer.close()
+
+        assert stream.lines() == [f"line {i}".encode() for i in range(100)]
+
+    def test_batches_writes(self):
+        """Should write queued lines in batches of at most batch_size."""
+        from util.logging import BackgroundLogWriter
+
+        stream = _RecordingStream()
+        writer = BackgroundLogWriter(stream, batch_size=10)
+        for i in range(25):
+            writer.write(f"line {i}\n".encode())
+        writer.start()
+        writer.close()
+
+        assert [chunk.count(b"\n") for chunk in stream.writes] == [10, 10, 5]
+
+    def test_drop_oldest_policy(self):
+        """Should discard the oldest lines and report the drop count."""
+        from util.logging import BackgroundLogWriter, OverflowPolicy
+
+        stream = _RecordingStream()
+        writer = BackgroundLogWriter(
+            stream, queue_size=3, overflow_policy=OverflowPolicy.DROP_OLDEST
+        )
+        for i in range(5):
+            writer.write(f"line {i}\n".encode())
+        writer.start()
+        writer.close()
+
+        lines = stream.lines()
+        assert writer.dropped == 2
+        assert lines[:3] == [b"line 2", b"line 3", b"line 4"]
+        assert b'"dropped":2' in lines[3]
+
+    def test_sample_policy(self):
+        """Should keep only every sample_every-th overflowing line."""
+        from util.logging import BackgroundLogWriter, OverflowPolicy
+
+        stream = _RecordingStream()
+        writer = BackgroundLogWriter(
+            stream,
+            queue_size=2,
+            overflow_policy=OverflowPolicy.SAMPLE,
+            sample_every=3,
+        )
+        for i in range(8):
+            writer.write(f"line {i}\n".encode())
+        writer.start()
+        writer.close()
+
+        # 6 overflowing lines: lines 4 and 7 are kept, each evicting the oldest
+        assert stream.lines()[:2] == [b"line 4", b"line 7"]
+        assert writer.dropped == 6
+
+    def test_block_policy_does_not_drop(self):
+        """Should make the caller wait instead of dropping lines."""
+        from util.logging import BackgroundLogWriter, OverflowPolicy
+
+        stream = _RecordingStream()
+        writer = BackgroundLogWriter(
+            stream, queue_size=2, overflow_policy=OverflowPolicy.BLOCK
+        )
+        writer.start()
+        for i in range(50):
+            writer.write(f"line {i}\n".encode())
+        writer.close()
+
+        assert writer.dropped == 0
+        assert len(stream.lines()) == 50
+
+    def test_production_mode_uses_background_writer(self):
+        """In production mode, should hand lines to the background writer."""
+        with (
+            patch.object(sys.stderr, "isatty", return_value=False),
+            patch.dict(os.environ, {"LOG_FORMAT": "json"}),
+        ):
+            import importlib
+
+            import util.logging
+
+            importlib.reload(util.logging)
+            util.logging.configure_logging()
+
+            config = structlog.get_config()
+            assert isinstance(
+                config["logger_factory"], util.logging.BackgroundLoggerFactory
+            )
+            util.logging.shutdown_logging()
+
+    def test_log_async_false_writes_synchronously(self):
+        """LOG_ASYNC=false should keep the synchronous BytesLoggerFactory."""
+        with (
+            patch.object(sys.stderr, "isatty", return_value=False),
+            patch.dict(os.environ, {"LOG_FORMAT": "json", "LOG_ASYNC": "false"}),
+        ):
+            import importlib
+
+            import util.logging
+
+            importlib.reload(util.logging)
+            util.logging.configure_logging()
+
+            config = structlog.get_config()
+            assert isinstance(config["logger_factory"], structlog.BytesLoggerFactory)
+
+
+class TestLogSampler:
+    """Tests for the LogSampler processor."""
+
+    def _run(self, sampler, method_name="info", **event_dict):
+        """Return the processed event dict, or None when it was dropped."""
+        try:
+            return sampler(None, method_name, {"event": "test", **event_dict})
+        except structlog.DropEvent:
+            return None
+
+    def test_keeps_unmatched_lines_without_sample_rate(self):
+        """Lines without a matching rule should pass through unchanged."""
+        from util.logging import LogSampler, SamplingRule
+
+        sampler = LogSampler([SamplingRule(rate=0.0, path="/healthcheck")])
+
+        assert self._run(sampler) == {"event": "test"}
+
+    def test_drops_by_path_rule(self):
+        """Lines of a request to a sampled-out path should be dropped."""
+        from util.logging import (
+            LogSampler,
+            SamplingRule,
+            clear_request_context,
+            set_request_context,
+        )
+
+        sampler = LogSampler([SamplingRule(rate=0.0, path="/healthcheck")])
+        set_request_context("req-1", path="/healthcheck")
+        try:
+            assert self._run(sampler) is None
+        finally:
+            clear_request_context()
+
+    def test_records_sample_rate_on_kept_lines(self):
+        """Kept lines should carry the rate they were sampled at."""
+        from util.logging import LogSampler, SamplingRule
+
+        sampler = LogSampler([SamplingRule(rate=0.5, event="test")])
+
+        kept = [
+            result for _ in range(200) if (result := self._run(sampler)) is not None
+        ]
+
+        assert 0 < len(kept) < 200
+        assert all(line["sample_rate"] == 0.5 for line in kept)
+
+    def test_same_decision_for_all_lines_of_a_request(self):
+        """Sampling should be decided once per request ID."""
+        from util.logging import (
+            LogSampler,
+            SamplingRule,
+            clear_request_context,
+            set_request_context,
+        )
+
+        sampler = LogSampler([SamplingRule(rate=0.5)])
+        for i in range(20):
+            set_request_context(f"req-{i}")
+            decisions = {self._run(sampler, event=e) is None for e in ("a", "b")}
+            assert len(decisions) == 1
+        clear_request_context()
+
+    def test_always_keeps_errors_and_slow_requests(self):
+        """Errors, 5xx and slow requests should bypass sampling."""
+        from util.logging import LogSampler, SamplingRule
+
+        sampler = LogSampler([SamplingRule(rate=0.0)], slow_ms=500)
+
+        assert self._run(sampler, method_name="error") is not None
+        assert self._run(sampler, status_code=503) is not None
+        assert self._run(sampler, duration_ms=800.0) is not None
+        assert self._run(sampler, duration_ms=10.0) is None
+
+    def test_token_bucket_caps_lines_per_event(self):
+        """Each event key should be capped by its token bucket."""
+        import util.logging
+
+        sampler = util.logging.LogSampler([], max_per_second=5)
+        clock = [100.0]
+        with patch.object(util.logging.time, "monotonic", lambda: clock[0]):
+            kept = [self._run(sampler) for _ in range(20)]
+            kept = [line for line in kept if line is not None]
+            assert len(kept) == 5
+            assert "sample_rate" not in kept[-1]
+
+            # One token refills after 0.2s; the line carries the pass ratio
+            clock[0] += 0.2
+            line = self._run(sampler)
+            assert line["sample_rate"] == pytest.approx(6 / 21, abs=1e-6)
+
+            # Other event keys have their own bucket
+            assert self._run(sampler, event="other") is not None
+
+    def test_pass_ratio_covers_the_current_second(self):
+        """A burst should not lower the pass ratio of later seconds."""
+        import util.logging
+
+        sampler = util.logging.LogSampler([], max_per_second=5)
+        clock = [100.0]
+        with patch.object(util.logging.time, "monotonic", lambda: clock[0]):
+            for _ in range(20):
+                self._run(sampler)
+            # A steady stream within the cap; calls are never 1s apart
+            for _ in range(5):
+                clock[0] += 0.3
+                line = self._run(sampler)
+
+            assert line is not None
+            assert "sample_rate" not in line
+
+    def test_rules_from_environment(self):
+        """LOG_SAMPLING_RULES should override the default rules."""
+        from util.logging import SamplingRule, get_sampling_rules
+
+        rules = '[{"event": "Request started", "rate": 0.1}]'
+        with patch.dict(os.environ, {"LOG_SAMPLING_RULES": rules}):
+            assert get_sampling_rules() == (
+                SamplingRule(rate=0.1, event="Request started"),
+            )
@@ -5,6 +5,7 @@ from unittest.mock import patch
 
 import pytest
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
 
 from util.logging import configure_logging, request_id_var, user_id_var
@@ -28,6 +29,17 @@ def app():
         msg = "Test error"
         raise ValueError(msg)
 
+    @test_app.get("/stream")
+    async def stream_endpoint():
+        import util.logging
+
+        async def chunks():
+            # Look the variable up on the module: other tests reload util.logging
+            for i in range(3):
+                yield f"data: {i} {util.logging.request_id_var.get()}\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
     return test_app
 
 
@@ -120,3 +132,28 @@ class TestLoggingMiddleware:
 
         assert "x-request-id" in response.headers
         assert response.headers["x-request-id"] is not None
+
+    def test_streaming_response_keeps_request_id(self, client):
+        """Should add the header and keep context while the body streams."""
+        custom_request_id = "stream-request-id"
+        with client.stream(
+            "GET", "/stream", headers={"x-request-id": custom_request_id}
+        ) as response:
+            assert response.headers["x-request-id"] == custom_request_id
+            lines = [line for line in response.iter_lines() if line]
+
+        assert lines == [f"data: {i} {custom_request_id}" for i in range(3)]
+
+    def test_passes_through_non_http_scopes(self):
+        """Should not touch lifespan or websocket scopes."""
+        import asyncio
+
+        received = []
+
+        async def inner_app(scope, receive, send):
+            received.append(scope["type"])
+
+        middleware = LoggingMiddleware(inner_app)
+        asyncio.run(middleware({"type": "lifespan"}, None, None))
+
+        assert received == ["lifespan"]
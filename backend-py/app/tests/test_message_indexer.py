@@ -0,0 +1,363 @@
+"""Message indexer (long-term memory) tests."""
+
+import asyncio
+import uuid
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.entity.chat import (
+    ChatRequest,
+    HistoryMessage,
+    VirtualUserProfileSummary,
+    VirtualUserSummary,
+)
+from domain.entity.memory import IndexerPosition, MessageDocument
+from gateway.indexer_watermark_gateway import IndexerWatermarkGateway
+from gateway.message_gateway import MessageGateway
+from gateway.openai_gateway import OpenAIGateway
+from usecase.chat_usecase import ChatContext, ChatSettings, ChatUseCase
+from usecase.message_indexer_usecase import (
+    IndexStatus,
+    MessageIndexerSettings,
+    MessageIndexerUseCase,
+)
+
+USER_ID = uuid.uuid4()
+VIRTUAL_USER_ID = uuid.uuid4()
+SETTINGS = MessageIndexerSettings(batch_size=3, settle=0.01, poll_interval=60)
+POSITION = IndexerPosition(xact_id=90, id=10)
+
+
+def _message(message_id: int, content: str = "hello") -> MessageDocument:
+    return MessageDocument(
+        id=message_id,
+        chat_room_id=42,
+        user_id=USER_ID,
+        sender_id=None,
+        virtual_user_id=VIRTUAL_USER_ID,
+        content=content,
+        created_at=datetime(2026, 1, 1, tzinfo=UTC),
+        xact_id=100,
+    )
+
+
+@pytest.fixture
+def gateways(mocker, embeddings_gateway):
+    """Mock the gateways used by the indexer."""
+    result = SimpleNamespace(
+        message=mocker.create_autospec(MessageGateway, instance=True),
+        embeddings=embeddings_gateway,
+        watermark=mocker.create_autospec(IndexerWatermarkGateway, instance=True),
+        openai=mocker.create_autospec(OpenAIGateway, instance=True),
+    )
+    result.watermark.get.return_value = POSITION
+    result.watermark.lock.return_value = POSITION
+    result.message.get_indexable_after.return_value = []
+    result.embeddings.get_content_hashes.return_value = {}
+    result.openai.embed_texts.side_effect = lambda texts: [
+        [float(len(text))] for text in texts
+    ]
+    return result
+
+
+def _indexer(gateways, session_factory) -> MessageIndexerUseCase:
+    return MessageIndexerUseCase(
+        message_gateway=gateways.message,
+        embeddings_gateway=gateways.embeddings,
+        watermark_gateway=gateways.watermark,
+        openai_gateway=gateways.openai,
+        session_factory=session_factory,
+        settings=SETTINGS,
+    )
+
+
+class TestMessageIndexer:
+    """Tests for MessageIndexerUseCase."""
+
+    def test_embeds_new_messages_and_advances_the_watermark(
+        self, gateways, session, session_factory
+    ):
+        """Should upsert embeddings with metadata and move the watermark."""
+        gateways.message.get_indexable_after.return_value = [
+            _message(11, "hi"),
+            _message(12, "bye"),
+        ]
+
+        status = _indexer(gateways, session_factory).index_batch()
+
+        assert status is IndexStatus.CAUGHT_UP
+        assert gateways.message.get_indexable_after.call_args.args[0] == POSITION
+        gateways.openai.embed_texts.assert_called_once_with(["hi", "bye"])
+        rows = gateways.embeddings.upsert.call_args.args[0]
+        assert [row["id"] for row in rows] == ["message:11", "message:12"]
+        assert rows[0]["embedding"] == [2.0]
+        assert rows[0]["metadata_"]["user_id"] == str(USER_ID)
+        assert rows[0]["metadata_"]["chat_room_id"] == 42
+        gateways.watermark.advance.assert_called_once_with(
+            "messages", IndexerPosition(xact_id=100, id=12), session
+        )
+        session.commit.assert_called_once()
+
+    def test_unchanged_content_is_not_embedded_again(self, gateways, session_factory):
+        """Should skip messages whose stored content hash matches."""
+        unchanged = _message(11, "same")
+        gateways.message.get_indexable_after.return_value = [
+            unchanged,
+            _message(12, "new"),
+        ]
+        gateways.embeddings.get_content_hashes.return_value = {
+            "message:11": unchanged.content_hash
+        }
+
+        _indexer(gateways, session_factory).index_batch()
+
+        gateways.openai.embed_texts.assert_called_once_with(["new"])
+        rows = gateways.embeddings.upsert.call_args.args[0]
+        assert [row["id"] for row in rows] == ["message:12"]
+
+    def test_identical_texts_are_embedded_once(self, gateways, session_factory):
+        """Should send each distinct text to the embedding model once."""
+        gateways.message.get_indexable_after.return_value = [
+            _message(11, "ok"),
+            _message(12, "ok"),
+        ]
+
+        _indexer(gateways, session_factory).index_batch()
+
+        gateways.openai.embed_texts.assert_called_once_with(["ok"])
+        assert len(gateways.embeddings.upsert.call_args.args[0]) == 2
+
+    def test_full_batch_reports_more(self, gateways, session_factory):
+        """Should ask to index again right away after a full batch."""
+        gateways.message.get_indexable_after.return_value = [
+            _message(message_id) for message_id in (11, 12, 13)
+        ]
+
+        assert _indexer(gateways, session_factory).index_batch() is IndexStatus.MORE
+
+    def test_locked_watermark_reports_busy(self, gateways, session, session_factory):
+        """Should leave the messages to the indexer holding the watermark."""
+        gateways.message.get_indexable_after.return_value = [_message(11)]
+        gateways.watermark.lock.return_value = None
+
+        status = _indexer(gateways, session_factory).index_batch()
+
+        assert status is IndexStatus.BUSY
+        gateways.embeddings.upsert.assert_not_called()
+        session.commit.assert_not_called()
+
+    def test_moved_watermark_discards_the_batch(
+        self, gateways, session, session_factory
+    ):
+        """Should read again if another indexer advanced the watermark."""
+        gateways.message.get_indexable_after.return_value = [_message(11)]
+        gateways.watermark.lock.return_value = IndexerPosition(xact_id=95, id=11)
+
+        status = _indexer(gateways, session_factory).index_batch()
+
+        assert status is IndexStatus.MORE
+        gateways.embeddings.upsert.assert_not_called()
+        gateways.watermark.advance.assert_not_called()
+        session.commit.assert_not_called()
+
+    def test_embeds_before_locking_the_watermark(self, gateways, session_factory):
+        """Should not hold the watermark lock during the embedding request."""
+        gateways.message.get_indexable_after.return_value = [_message(11)]
+        locked_while_embedding = []
+        gateways.openai.embed_texts.side_effect = lambda texts: (
+            locked_while_embedding.append(gateways.watermark.lock.called)
+            or [[1.0]] * len(texts)
+        )
+
+        _indexer(gateways, session_factory).index_batch()
+
+        assert locked_while_embedding == [False]
+        gateways.watermark.lock.assert_called_once()
+
+    def test_notification_triggers_a_pass(self, gateways, session_factory):
+        """Should index again on NOTIFY instead of waiting for the poll."""
+
+        class Notifications:
+            def __init__(self) -> None:
+                self.queue: asyncio.Queue[None] = asyncio.Queue()
+
+            async def wait(self) -> None:
+                await self.queue.get()
+
+        async def scenario() -> None:
+            notifications = Notifications()
+            stop = asyncio.Event()
+            read_again = asyncio.Event()
+            loop = asyncio.get_running_loop()
+
+            def get_indexable_after(*_):
+                # Called from the indexer's worker thread
+                if gateways.message.get_indexable_after.call_count == 1:
+                    loop.call_soon_threadsafe(notifications.queue.put_nowait, None)
+                else:
+                    loop.call_soon_threadsafe(read_again.set)
+                return []
+
+            gateways.message.get_indexable_after.side_effect = get_indexable_after
+            indexer = _indexer(gateways, session_factory)
+            task = asyncio.create_task(indexer.run(stop, notifications))
+            async with asyncio.timeout(5):
+                await read_again.wait()
+            stop.set()
+            await task
+
+        asyncio.run(scenario())
+
+        assert gateways.message.get_indexable_after.call_count >= 2
+
+
+class TestMessageIndexerStatements:
+    """Tests for the indexer's statements."""
+
+    def test_indexable_messages_are_committed_in_order(self, mocker):
+        """Should read messages of finished transactions in commit order."""
+        session = mocker.Mock()
+        session.exec.return_value.all.return_value = []
+
+        MessageGateway().get_indexable_after(POSITION, 100, session)
+
+        statement = session.exec.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "(messages.xact_id, messages.id) > (" in sql
+        assert (
+            "messages.xact_id < CAST(CAST(pg_snapshot_xmin(pg_current_snapshot())"
+            in sql
+        )
+        assert "ORDER BY messages.xact_id, messages.id" in sql
+        assert "LEFT OUTER JOIN virtual_users" in sql
+
+    def test_watermark_lock_skips_locked(self, mocker):
+        """Should not wait for another indexer's lock."""
+        session = mocker.Mock()
+        session.exec.return_value.first.return_value = None
+
+        IndexerWatermarkGateway().lock("messages", session)
+
+        statement = session.exec.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+class TestChatMemory:
+    """Tests for recalling past conversations in a chat turn."""
+
+    @pytest.fixture
+    def use_case(self, mocker, gateways):
+        """Chat use case with a resolved virtual user."""
+        gateways.openai.embed_query.return_value = [0.5]
+        message_gateway = mocker.Mock()
+        message_gateway.create_from_user.return_value = SimpleNamespace(id=7)
+        message_gateway.get_recent_and_count_by_chat_room_id.return_value = (
+            [
+                SimpleNamespace(id=5, sender_id=USER_ID, content="I live in Kyoto"),
+                SimpleNamespace(id=7, sender_id=USER_ID, content="drinks?"),
+            ],
+            2,
+        )
+        return ChatUseCase(
+            current_user_gateway=mocker.Mock(),
+            user_profile_gateway=mocker.Mock(),
+            chat_room_gateway=mocker.Mock(),
+            message_gateway=message_gateway,
+            virtual_user_gateway=mocker.Mock(),
+            embeddings_gateway=gateways.embeddings,
+            openai_gateway=gateways.openai,
+            settings=ChatSettings(context_tokens=40),
+            token_counter=len,
+        )
+
+    @pytest.fixture
+    def context(self):
+        """Context of a user already linked to chat room 42."""
+        return ChatContext(
+            user_id=USER_ID,
+            virtual_user=VirtualUserSummary(
+                id=VIRTUAL_USER_ID,
+                name="AI Assistant",
+                profile=VirtualUserProfileSummary(),
+            ),
+            linked_chat_room_ids={42},
+        )
+
+    def test_searches_the_users_memory(self, use_case, context, gateways, session):
+        """Should use the user's closest past messages as context."""
+        gateways.embeddings.search_similar.return_value = [
+            SimpleNamespace(content="I like tea"),
+            SimpleNamespace(content="I drink coffee"),
+        ]
+
+        turn = use_case.prepare_turn(
+            context,
+            ChatRequest(message="drinks?", chat_room_id=42),
+            use_case.embed_query("drinks?"),
+            session,
+        )
+
+        gateways.openai.embed_query.assert_called_once_with("drinks?")
+        args = gateways.embeddings.search_similar.call_args
+        assert args.args[0] == [0.5]
+        assert args.kwargs["user_id"] == str(USER_ID)
+        assert turn.prompt_context == "I like tea\nI drink coffee"
+        assert turn.history == (
+            HistoryMessage(content="I live in Kyoto", from_user=True),
+        )
+
+    def test_packs_memory_under_the_token_budget(
+        self, use_case, context, gateways, session
+    ):
+        """Should skip memory in the history and cut what exceeds the budget."""
+        gateways.embeddings.search_similar.return_value = [
+            SimpleNamespace(content="I live in Kyoto"),
+            SimpleNamespace(content="I like tea. Green tea, with no sugar at all."),
+            SimpleNamespace(content="I have a cat"),
+        ]
+
+        turn = use_case.prepare_turn(
+            context, ChatRequest(message="drinks?", chat_room_id=42), [0.5], session
+        )
+
+        assert turn.prompt_context == "I like tea.\nI have a cat"
+
+    def test_answers_without_memory_if_embedding_fails(
+        self, use_case, context, gateways, session
+    ):
+        """Should not fail the turn when the query cannot be embedded."""
+        gateways.openai.embed_query.side_effect = RuntimeError("down")
+
+        query_embedding = use_case.embed_query("hi")
+        turn = use_case.prepare_turn(
+            context,
+            ChatRequest(message="hi", chat_room_id=42),
+            query_embedding,
+            session,
+        )
+
+        assert query_embedding is None
+        assert turn.prompt_context is None
+        gateways.embeddings.search_similar.assert_not_called()
+
+    def test_searches_memory_before_the_turn_writes(
+        self, mocker, use_case, context, gateways, session
+    ):
+        """Should search while the session may still read from a replica."""
+        calls = mocker.Mock()
+        calls.attach_mock(gateways.embeddings.search_similar, "search_similar")
+        calls.attach_mock(use_case.chat_room_gateway.create, "create_room")
+        calls.attach_mock(use_case.message_gateway.create_from_user, "create_message")
+        gateways.embeddings.search_similar.return_value = []
+
+        use_case.prepare_turn(context, ChatRequest(message="drinks?"), [0.5], session)
+
+        assert [call[0] for call in calls.mock_calls] == [
+            "search_similar",
+            "create_room",
+            "create_message",
+        ]
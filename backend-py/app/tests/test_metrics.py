@@ -0,0 +1,109 @@
+"""Metrics tests."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from controller.metrics_controller import router as metrics_router
+from middleware.metrics_middleware import MetricsMiddleware
+from util.metrics import track_external_call
+
+
+def _sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def client():
+    """Create a test client with the metrics middleware and endpoint."""
+    test_app = FastAPI()
+    test_app.add_middleware(MetricsMiddleware)
+    test_app.include_router(metrics_router)
+
+    @test_app.get("/items/{item_id}")
+    async def item_endpoint(item_id: int):
+        return {"id": item_id}
+
+    @test_app.get("/error")
+    async def error_endpoint():
+        msg = "Test error"
+        raise ValueError(msg)
+
+    return TestClient(test_app, raise_server_exceptions=False)
+
+
+class TestMetricsMiddleware:
+    """Tests for MetricsMiddleware."""
+
+    def test_observes_latency_by_route_template(self, client):
+        """Should label requests with the route template, not the raw path."""
+        labels = {"method": "GET", "route": "/items/{item_id}", "status_code": "200"}
+        before = _sample("http_request_duration_seconds_count", labels)
+
+        client.get("/items/1")
+        client.get("/items/2")
+
+        assert _sample("http_request_duration_seconds_count", labels) == before + 2
+
+    def test_unmatched_route(self, client):
+        """Should group unknown paths under a single label."""
+        labels = {"method": "GET", "route": "unmatched", "status_code": "404"}
+        before = _sample("http_request_duration_seconds_count", labels)
+
+        client.get("/does-not-exist/123")
+
+        assert _sample("http_request_duration_seconds_count", labels) == before + 1
+
+    def test_error_is_recorded_as_500(self, client):
+        """Should record failed requests with status 500."""
+        labels = {"method": "GET", "route": "/error", "status_code": "500"}
+        before = _sample("http_request_duration_seconds_count", labels)
+
+        client.get("/error")
+
+        assert _sample("http_request_duration_seconds_count", labels) == before + 1
+
+    def test_in_flight_returns_to_zero(self, client):
+        """Should decrement the in-flight gauge after the request."""
+        client.get("/items/1")
+
+        assert _sample("http_requests_in_flight", {"method": "GET"}) == 0
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    def test_exposes_prometheus_text(self, client):
+        """Should render metrics in Prometheus text format."""
+        client.get("/items/1")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds_bucket" in response.text
+
+
+class TestTrackExternalCall:
+    """Tests for track_external_call."""
+
+    def test_observes_latency(self):
+        """Should observe the call duration."""
+        labels = {"service": "test", "operation": "ok"}
+        before = _sample("external_call_duration_seconds_count", labels)
+
+        with track_external_call("test", "ok"):
+            pass
+
+        assert _sample("external_call_duration_seconds_count", labels) == before + 1
+
+    def test_counts_errors(self):
+        """Should count errors by exception type and re-raise them."""
+        labels = {"service": "test", "operation": "fail", "error": "RuntimeError"}
+        before = _sample("external_call_errors_total", labels)
+
+        with pytest.raises(RuntimeError), track_external_call("test", "fail"):
+            raise RuntimeError
+
+        assert _sample("external_call_errors_total", labels) == before + 1
@@ -0,0 +1,244 @@
+"""Near-duplicate detection tests."""
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from domain.service.near_duplicate_service import (
+    PERMUTATIONS,
+    NearDuplicateIndex,
+    duplicate_mask,
+    find_duplicate_groups,
+    minhash,
+    minhashes,
+    signature_matrix,
+    similarity,
+)
+from gateway.embeddings_gateway import EmbeddingsGateway
+from gateway.openai_gateway import OpenAIGateway
+from usecase.document_ingestion_usecase import (
+    DocumentIngestionSettings,
+    DocumentIngestionUseCase,
+)
+from usecase.near_duplicate_usecase import NearDuplicateSettings, NearDuplicateUseCase
+
+TEMPLATE = (
+    "お問い合わせいただきありがとうございます。担当者より三営業日以内に"
+    "ご連絡いたします。お問い合わせ番号は{}です。今しばらくお待ちください。"
+)
+UNRELATED = "吾輩は猫である。名前はまだ無い。どこで生れたかとんと見当がつかぬ。"
+
+
+def _similarity(first: str, second: str) -> float:
+    return float(similarity(minhashes([first]), minhashes([second]))[0])
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestMinHash:
+    """Tests for MinHash signatures."""
+
+    def test_signature_is_fixed_size(self):
+        """Should sign any text, even a short one, in PERMUTATIONS bytes."""
+        assert len(minhash(TEMPLATE)) == len(minhash("あ")) == PERMUTATIONS
+
+    def test_templated_texts_are_similar(self):
+        """Should rate texts differing in a number far above unrelated ones."""
+        near = _similarity(TEMPLATE.format("12345"), TEMPLATE.format("67890"))
+        far = _similarity(TEMPLATE.format("12345"), UNRELATED)
+
+        assert near >= 0.7
+        assert far <= 0.2
+
+    def test_width_and_spacing_variants_are_equal(self):
+        """Should normalize full-width characters, case and whitespace."""
+        assert minhash("ＡＢＣ　テスト  文書") == minhash("abc テスト 文書")
+
+
+class TestGrouping:
+    """Tests for find_duplicate_groups and duplicate_mask."""
+
+    def test_groups_near_duplicates(self):
+        """Should group edited copies and keep unrelated texts apart."""
+        signatures = minhashes(
+            [
+                TEMPLATE.format("12345"),
+                UNRELATED,
+                TEMPLATE.format("67890"),
+                TEMPLATE.format("12345"),
+            ]
+        )
+
+        labels = find_duplicate_groups(signatures)
+
+        assert labels[0] == labels[2] == labels[3]
+        assert labels[1] != labels[0]
+        assert duplicate_mask(labels).tolist() == [False, False, True, True]
+
+    def test_scopes_are_grouped_separately(self):
+        """Should not group equal texts of different scopes."""
+        signatures = minhashes([UNRELATED, UNRELATED, UNRELATED])
+
+        labels = find_duplicate_groups(signatures, np.array([0, 1, 0]))
+
+        assert labels[0] == labels[2] != labels[1]
+
+    def test_empty_input(self):
+        """Should return no labels for no rows."""
+        assert len(find_duplicate_groups(signature_matrix([]))) == 0
+
+
+class TestNearDuplicateIndex:
+    """Tests for NearDuplicateIndex."""
+
+    def test_finds_indexed_and_added_signatures(self):
+        """Should find near-duplicates in the sorted tables and the buffer."""
+        index = NearDuplicateIndex(minhashes([TEMPLATE.format("1")]), ["a"])
+
+        assert index.find(minhash(TEMPLATE.format("2"))) == "a"
+        assert index.find(minhash(UNRELATED)) is None
+        index.add(minhash(UNRELATED), "b")
+        assert index.find(minhash(UNRELATED + "\n")) == "b"
+        assert len(index) == 2
+
+    def test_buffer_is_merged_when_full(self, monkeypatch):
+        """Should keep finding signatures once the buffer is sorted in."""
+        monkeypatch.setattr(NearDuplicateIndex, "BUFFER_SIZE", 2)
+        index = NearDuplicateIndex(signature_matrix([]), [])
+
+        index.add(minhash(UNRELATED), "a")
+        index.add(minhash(TEMPLATE.format("1")), "b")
+
+        assert index.find(minhash(TEMPLATE.format("2"))) == "b"
+        assert index.find(minhash(UNRELATED)) == "a"
+
+
+def _near_duplicate_usecase(
+    embeddings_gateway, session_factory
+) -> NearDuplicateUseCase:
+    return NearDuplicateUseCase(
+        embeddings_gateway=embeddings_gateway,
+        session_factory=session_factory,
+        settings=NearDuplicateSettings(batch_size=2),
+    )
+
+
+class TestNearDuplicateUseCase:
+    """Tests for NearDuplicateUseCase."""
+
+    def test_deduplicate_keeps_the_oldest_row_per_user(
+        self, embeddings_gateway, session_factory
+    ):
+        """Should delete later copies within a user, not across users."""
+        embeddings_gateway.get_signatures.return_value = [
+            ("m1", "u1", minhash(TEMPLATE.format("1"))),
+            ("m2", "u2", minhash(TEMPLATE.format("2"))),
+            ("m3", "u1", minhash(TEMPLATE.format("3"))),
+            ("m4", "u1", minhash(TEMPLATE.format("4"))),
+            ("d1", None, minhash(UNRELATED)),
+        ]
+
+        result = _near_duplicate_usecase(
+            embeddings_gateway, session_factory
+        ).deduplicate()
+
+        deleted = [
+            id_
+            for call in embeddings_gateway.delete_by_ids.call_args_list
+            for id_ in call.args[0]
+        ]
+        assert deleted == ["m3", "m4"]
+        assert (result.rows, result.groups, result.deleted) == (5, 1, 2)
+
+    def test_dry_run_deletes_nothing(self, embeddings_gateway, session_factory):
+        """Should only count duplicates on a dry run."""
+        embeddings_gateway.get_signatures.return_value = [
+            ("a", None, minhash(UNRELATED)),
+            ("b", None, minhash(UNRELATED)),
+        ]
+
+        result = _near_duplicate_usecase(
+            embeddings_gateway, session_factory
+        ).deduplicate(dry_run=True)
+
+        assert (result.duplicates, result.deleted) == (1, 0)
+        embeddings_gateway.delete_by_ids.assert_not_called()
+
+    def test_sign_missing_signs_batch_by_batch(
+        self, embeddings_gateway, session, session_factory
+    ):
+        """Should store signatures until a batch comes back short."""
+        embeddings_gateway.get_unsigned.side_effect = [
+            [("a", UNRELATED), ("b", "text")],
+            [("c", "more")],
+        ]
+
+        signed = _near_duplicate_usecase(
+            embeddings_gateway, session_factory
+        ).sign_missing()
+
+        assert signed == 3
+        rows = embeddings_gateway.set_signatures.call_args_list[0].args[0]
+        assert rows[0] == ("a", minhash(UNRELATED))
+        assert session.commit.call_count == 2
+
+    def test_ingestion_rejects_near_duplicate_chunks(
+        self, embeddings_gateway, session, session_factory, mocker
+    ):
+        """Should not embed a chunk near another document's chunk."""
+        embeddings_gateway.get_signatures.return_value = [
+            ("document:other:x", None, minhash(TEMPLATE.format("12345")))
+        ]
+        openai_gateway = mocker.create_autospec(OpenAIGateway, instance=True)
+        openai_gateway.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+        usecase = DocumentIngestionUseCase(
+            embeddings_gateway=embeddings_gateway,
+            openai_gateway=openai_gateway,
+            session_factory=session_factory,
+            settings=DocumentIngestionSettings(
+                chunk_tokens=100, overlap_tokens=0, batch_size=8
+            ),
+            token_counter=len,
+            near_duplicate_usecase=_near_duplicate_usecase(
+                embeddings_gateway, session_factory
+            ),
+        )
+
+        result = usecase.ingest("doc", [TEMPLATE.format("67890") + "\n\n" + UNRELATED])
+
+        assert (result.chunks, result.embedded, result.near_duplicates) == (2, 1, 1)
+        row = embeddings_gateway.upsert.call_args.args[0][0]
+        assert row["content"] == UNRELATED
+        assert row["content_minhash"] == minhash(UNRELATED)
+        embeddings_gateway.get_signatures.assert_called_once_with(
+            session, source="document", exclude_document_id="doc"
+        )
+
+
+class TestGateway:
+    """Tests for the signature queries of EmbeddingsGateway."""
+
+    def test_get_signatures_filters_source_and_document(self, mocker):
+        """Should leave out unsigned rows and the excluded document."""
+        session = mocker.Mock()
+        session.exec.return_value = [("a", None, memoryview(b"\x01" * 64))]
+
+        rows = EmbeddingsGateway().get_signatures(
+            session, source="document", exclude_document_id="doc"
+        )
+
+        assert rows == [("a", None, b"\x01" * 64)]
+        sql = _sql(session.exec.call_args.args[0])
+        assert "embeddings.content_minhash IS NOT NULL" in sql
+        assert "IS DISTINCT FROM" in sql
+        assert "ORDER BY embeddings.created_at, embeddings.id" in sql
+
+    def test_delete_by_ids(self, mocker):
+        """Should delete the given rows."""
+        session = mocker.Mock()
+
+        EmbeddingsGateway().delete_by_ids(["a", "b"], session)
+
+        sql = _sql(session.exec.call_args.args[0])
+        assert "DELETE FROM embeddings WHERE embeddings.id IN" in sql
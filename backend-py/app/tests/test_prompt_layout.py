@@ -0,0 +1,239 @@
+"""Chat prompt layout and prompt cache metrics tests."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from prometheus_client import REGISTRY
+
+from domain.entity.chat import HistoryMessage
+from domain.entity.models import VirtualUserProfiles
+from domain.service.prompt_service import Persona, compile_prefix
+from gateway.const.default_template import DEFAULT_SYSTEM_MESSAGE
+from gateway.openai_gateway import OpenAIGateway
+from usecase.chat_usecase import ChatSettings, ChatUseCase
+
+USER_ID = uuid.uuid4()
+USAGE = {
+    "input_tokens": 2000,
+    "output_tokens": 10,
+    "total_tokens": 2010,
+    "input_token_details": {"cache_read": 1536},
+}
+
+
+def _sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestCompilePrefix:
+    """Tests for compile_prefix."""
+
+    def test_persona_follows_the_global_system_prompt(self):
+        """Should put the global prompt first and leave out empty fields."""
+        profile = VirtualUserProfiles(
+            personality="cheerful",
+            tone="polite",
+            knowledge_area=["tea", "cats"],
+            backstory="",
+            quirks=None,
+        )
+
+        prefix = compile_prefix(Persona.from_profile("Hana", profile))
+
+        assert prefix.system_prompt.startswith(DEFAULT_SYSTEM_MESSAGE)
+        assert "「Hana」" in prefix.system_prompt
+        assert "得意分野: tea、cats" in prefix.system_prompt
+        assert "経歴" not in prefix.system_prompt
+
+    def test_is_compiled_once_per_persona(self):
+        """Should reuse the prefix of an equal persona."""
+        first = compile_prefix(Persona(name="Hana", tone="polite"))
+        second = compile_prefix(Persona(name="Hana", tone="polite"))
+        other = compile_prefix(Persona(name="Hana", tone="casual"))
+
+        assert first is second
+        assert first.cache_key != other.cache_key
+
+
+@pytest.fixture
+def gateway(monkeypatch, mocker):
+    """OpenAI gateway with a mocked chat model."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    result = OpenAIGateway()
+    result._llm = mocker.Mock()
+    return result
+
+
+class TestOpenAIGatewayPromptCache:
+    """Tests for the prompt layout and cache metrics of OpenAIGateway."""
+
+    def test_prompt_is_ordered_from_stable_to_variable(self, gateway):
+        """Should send history, then context, then the message after the prefix."""
+        gateway.llm.invoke.return_value = AIMessage(content="hi", usage_metadata=USAGE)
+
+        gateway.chat_completion(
+            "drinks?",
+            system_prompt="prefix",
+            context="I like tea",
+            history=[
+                HistoryMessage(content="I live in Kyoto", from_user=True),
+                HistoryMessage(content="Kyoto is lovely", from_user=False),
+            ],
+            prompt_cache_key="chat:abc",
+        )
+
+        messages = gateway.llm.invoke.call_args.args[0]
+        assert [(message.type, message.content) for message in messages] == [
+            ("system", "prefix"),
+            ("human", "I live in Kyoto"),
+            ("ai", "Kyoto is lovely"),
+            ("human", "参考情報:\nI like tea\n\ndrinks?"),
+        ]
+        assert gateway.llm.invoke.call_args.kwargs == {"prompt_cache_key": "chat:abc"}
+
+    def test_records_cached_prompt_tokens(self, gateway):
+        """Should count cached and uncached prompt tokens from the usage."""
+        labels = {"operation": "chat_completion"}
+        cached = {**labels, "cache": "cached"}
+        uncached = {**labels, "cache": "uncached"}
+        before = [
+            _sample("llm_prompt_tokens_total", cached),
+            _sample("llm_prompt_tokens_total", uncached),
+            _sample("llm_prompt_cache_ratio_sum", labels),
+        ]
+        gateway.llm.invoke.return_value = AIMessage(content="hi", usage_metadata=USAGE)
+
+        gateway.chat_completion("hello")
+
+        assert _sample("llm_prompt_tokens_total", cached) - before[0] == 1536
+        assert _sample("llm_prompt_tokens_total", uncached) - before[1] == 464
+        ratio = _sample("llm_prompt_cache_ratio_sum", labels) - before[2]
+        assert ratio == pytest.approx(0.768)
+
+    def test_stream_records_the_usage_of_the_last_chunk(self, gateway):
+        """Should ask for the usage when streaming and record it."""
+        labels = {"operation": "chat_completion_stream", "cache": "cached"}
+        before = _sample("llm_prompt_tokens_total", labels)
+        stream_kwargs = {}
+
+        async def astream(messages, **kwargs):
+            stream_kwargs.update(kwargs)
+            yield AIMessageChunk(content="hi")
+            yield AIMessageChunk(content="", usage_metadata=USAGE)
+
+        gateway.llm.astream = astream
+
+        async def collect():
+            return [text async for text in gateway.stream_chat_completion("hello")]
+
+        assert asyncio.run(collect()) == ["hi"]
+        assert stream_kwargs == {"stream_usage": True}
+        assert _sample("llm_prompt_tokens_total", labels) - before == 1536
+
+
+class _Room:
+    """Message gateway over the messages of one chat room."""
+
+    def __init__(self) -> None:
+        self.messages: list[SimpleNamespace] = []
+
+    def add(self, content: str, *, from_user: bool = True) -> int:
+        self.messages.append(
+            SimpleNamespace(
+                id=len(self.messages),
+                sender_id=USER_ID if from_user else None,
+                content=content,
+            )
+        )
+        return len(self.messages) - 1
+
+    def get_recent_and_count_by_chat_room_id(self, _chat_room_id, limit, _session):
+        return self.messages[-limit:], len(self.messages)
+
+
+@pytest.fixture
+def room():
+    """Chat room the use case reads its history from."""
+    return _Room()
+
+
+def _use_case(mocker, room, **settings) -> ChatUseCase:
+    return ChatUseCase(
+        current_user_gateway=mocker.Mock(),
+        user_profile_gateway=mocker.Mock(),
+        chat_room_gateway=mocker.Mock(),
+        message_gateway=room,
+        virtual_user_gateway=mocker.Mock(),
+        embeddings_gateway=mocker.Mock(),
+        openai_gateway=mocker.Mock(),
+        settings=ChatSettings(**settings),
+        token_counter=len,
+    )
+
+
+class TestPromptPrefixAcrossTurns:
+    """Tests for the prompt prefix shared by consecutive chat turns."""
+
+    def test_consecutive_turns_share_a_byte_identical_prefix(
+        self, gateway, mocker, room
+    ):
+        """Should begin each turn with the previous turn until a block moves."""
+        use_case = _use_case(mocker, room, history_messages=10, history_block=6)
+        prompts = []
+        for turn in range(12):
+            message_id = room.add(f"question {turn}")
+            history = use_case._history(1, message_id, None)
+            messages = gateway._build_messages(
+                f"question {turn}", "prefix", f"context {turn}", history
+            )
+            prompts.append(
+                [f"{message.type}:{message.content}".encode() for message in messages]
+            )
+            room.add(f"answer {turn}", from_user=False)
+
+        shared = [
+            current[: len(previous) - 1] == previous[:-1]
+            for previous, current in zip(prompts, prompts[1:], strict=False)
+        ]
+        # Two messages per turn, so the start moves every third turn
+        assert shared.count(False) <= len(shared) // 3
+        assert all(len(prompt) <= 12 for prompt in prompts)
+
+    def test_history_start_moves_by_whole_blocks(self, mocker, room):
+        """Should drop the oldest messages a block at a time."""
+        use_case = _use_case(mocker, room, history_messages=4, history_block=2)
+        for index in range(5):
+            room.add(f"m{index}")
+        message_id = room.add("now")
+
+        history = use_case._history(1, message_id, None)
+
+        assert [message.content for message in history] == ["m2", "m3", "m4"]
+
+    def test_history_keeps_the_writer_of_each_message(self, mocker, room):
+        """Should tell the user's messages from the virtual user's."""
+        use_case = _use_case(mocker, room, history_messages=10, history_block=1)
+        room.add("I live in Kyoto")
+        room.add("Kyoto is lovely", from_user=False)
+        message_id = room.add("now")
+
+        assert use_case._history(1, message_id, None) == (
+            HistoryMessage(content="I live in Kyoto", from_user=True),
+            HistoryMessage(content="Kyoto is lovely", from_user=False),
+        )
+
+    def test_token_budget_drops_whole_blocks(self, mocker, room):
+        """Should leave out a block of the oldest messages when over budget."""
+        use_case = _use_case(
+            mocker, room, history_messages=10, history_block=2, history_tokens=7
+        )
+        for text in ("aaa", "bb", "cc", "dd"):
+            room.add(text)
+        message_id = room.add("now")
+
+        history = use_case._history(1, message_id, None)
+
+        assert [message.content for message in history] == ["cc", "dd"]
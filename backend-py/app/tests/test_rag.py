@@ -0,0 +1,190 @@
+"""Retrieval-augmented generation tests."""
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from domain.entity.models import Embeddings
+from domain.service.mmr_service import max_marginal_relevance
+from domain.service.rag_service import RAGService
+from gateway.llm_gateway import LLMGateway
+from gateway.openai_gateway import OpenAIGateway
+from gateway.vectorstore_gateway import VectorStoreGateway
+
+
+def _reference_mmr(query, candidates, k, lambda_mult):
+    """MMR computed pair by pair, as a reference."""
+
+    def cosine(a, b):
+        return float(a @ b / np.linalg.norm(a) / np.linalg.norm(b))
+
+    picks: list[int] = []
+    while len(picks) < min(k, len(candidates)):
+        scores = {
+            index: lambda_mult * cosine(query, candidate)
+            - (1 - lambda_mult)
+            * max((cosine(candidate, candidates[pick]) for pick in picks), default=0)
+            for index, candidate in enumerate(candidates)
+            if index not in picks
+        }
+        picks.append(max(scores, key=scores.__getitem__))
+    return picks
+
+
+def _embedding(id_: str, vector) -> Embeddings:
+    return Embeddings(id=id_, embedding=np.asarray(vector), content=id_, metadata_={})
+
+
+class TestMaxMarginalRelevance:
+    """Tests for the vectorized MMR."""
+
+    @pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 1.0])
+    def test_matches_the_pairwise_definition(self, lambda_mult):
+        """Should pick what the one-by-one computation picks, per query."""
+        rng = np.random.default_rng(0)
+        queries = rng.standard_normal((5, 16))
+        candidates = rng.standard_normal((5, 12, 16))
+
+        picks = max_marginal_relevance(queries, candidates, 4, lambda_mult=lambda_mult)
+
+        for query, found, expected in zip(queries, candidates, picks, strict=True):
+            assert expected.tolist() == _reference_mmr(query, found, 4, lambda_mult)
+
+    def test_skips_near_copies(self):
+        """Should prefer a different candidate over a copy of a picked one."""
+        query = [1.0, 0.0]
+        candidates = [[0.8, 0.6], [0.79, 0.61], [0.8, -0.6]]
+
+        picks = max_marginal_relevance([query], [candidates], 2, lambda_mult=0.5)
+
+        assert picks.tolist() == [[0, 2]]
+
+    def test_masked_candidates_are_never_picked(self):
+        """Should pad with -1 when a query has fewer candidates than k."""
+        candidates = np.ones((2, 3, 2))
+        mask = [[True, True, True], [True, False, False]]
+
+        picks = max_marginal_relevance(np.ones((2, 2)), candidates, 3, mask=mask)
+
+        assert sorted(picks[0].tolist()) == [0, 1, 2]
+        assert picks[1].tolist() == [0, -1, -1]
+
+    def test_lambda_mult_must_be_a_weight(self):
+        """Should refuse weights outside [0, 1]."""
+        with pytest.raises(ValueError, match="lambda_mult"):
+            max_marginal_relevance([[1.0]], [[[1.0]]], 1, lambda_mult=2)
+
+
+@pytest.fixture
+def embeddings_gateway(embeddings_gateway):
+    """Mock the embeddings gateway with two near copies and a distinct row."""
+    gateway = embeddings_gateway
+    gateway.search_similar.return_value = [
+        _embedding("a", [0.8, 0.6]),
+        _embedding("a-copy", [0.79, 0.61]),
+        _embedding("b", [0.8, -0.6]),
+    ]
+    return gateway
+
+
+@pytest.fixture
+def openai_gateway(mocker):
+    """Mock the embedding and chat models."""
+    gateway = mocker.create_autospec(OpenAIGateway, instance=True)
+    gateway.embed_texts.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+    gateway.llm = mocker.Mock()
+    gateway.llm.batch.side_effect = lambda messages: [
+        mocker.Mock(content=f"answer {index}") for index in range(len(messages))
+    ]
+    return gateway
+
+
+@pytest.fixture
+def vector_store(embeddings_gateway, openai_gateway, session_factory):
+    """Vector store over the mocked gateways."""
+    return VectorStoreGateway(
+        embeddings_gateway=embeddings_gateway,
+        openai_gateway=openai_gateway,
+        session_factory=session_factory,
+    )
+
+
+class TestVectorStoreGateway:
+    """Tests for VectorStoreGateway."""
+
+    def test_batch_is_retrieved_in_one_round(
+        self, vector_store, embeddings_gateway, openai_gateway
+    ):
+        """Should embed the distinct queries in one request and rerank them."""
+        results = vector_store.as_retriever(k=2, fetch_k=3, user_id="u1").batch(
+            ["q1", "q2", "q1"]
+        )
+
+        openai_gateway.embed_texts.assert_called_once_with(["q1", "q2"])
+        assert embeddings_gateway.search_similar.call_count == 2
+        assert embeddings_gateway.search_similar.call_args.kwargs["user_id"] == "u1"
+        assert [[row.id for row in found] for found in results] == [["a", "b"]] * 3
+
+    def test_retriever_without_a_user_never_sees_messages(
+        self, vector_store, embeddings_gateway
+    ):
+        """Should search shared embeddings only, unless scoped to a user."""
+        vector_store.as_retriever().invoke("q")
+        unscoped = embeddings_gateway.search_similar.call_args.kwargs
+        vector_store.as_retriever(user_id="u1").invoke("q")
+        scoped = embeddings_gateway.search_similar.call_args.kwargs
+
+        assert (unscoped["user_id"], unscoped["shared"]) == (None, True)
+        assert (scoped["user_id"], scoped["shared"]) == ("u1", False)
+
+    def test_no_candidates(self, vector_store, embeddings_gateway):
+        """Should return no results when nothing is stored."""
+        embeddings_gateway.search_similar.return_value = []
+
+        assert vector_store.as_retriever().invoke("q") == []
+
+    def test_add_texts_stores_rows_per_user(
+        self, vector_store, embeddings_gateway, session
+    ):
+        """Should upsert the texts under content-hash IDs and commit."""
+        ids = vector_store.add_texts(["one", "two"], user_id="u1")
+
+        rows = embeddings_gateway.upsert.call_args.args[0]
+        assert [row["id"] for row in rows] == ids
+        assert ids[0].startswith("text:u1:")
+        assert rows[0]["metadata_"]["user_id"] == "u1"
+        assert rows[0]["content_minhash"] is not None
+        session.commit.assert_called_once()
+
+
+class Answer(BaseModel):
+    """Structured answer."""
+
+    text: str
+
+
+class TestRAGService:
+    """Tests for RAGService over LLMGateway."""
+
+    def test_batched_prompts_share_one_retrieval(self, vector_store, openai_gateway):
+        """Should retrieve once and send every prompt with its context."""
+        service = RAGService(LLMGateway(openai_gateway), vector_store)
+
+        answers = service.generate_texts_from_rag(["first?", "second?"])
+
+        assert answers == ["answer 0", "answer 1"]
+        openai_gateway.embed_texts.assert_called_once()
+        messages = openai_gateway.llm.batch.call_args.args[0]
+        assert "first?" in messages[0][0].content
+        assert "a\n\nb" in messages[0][0].content
+
+    def test_structured_response(self, vector_store, openai_gateway):
+        """Should parse the structured output into the model."""
+        structured = openai_gateway.llm.with_structured_output.return_value
+        structured.batch.return_value = [{"text": "ok"}]
+        service = RAGService(LLMGateway(openai_gateway), vector_store)
+
+        answer = service.generate_model_from_rag("question?", Answer)
+
+        assert answer == Answer(text="ok")
+        openai_gateway.llm.with_structured_output.assert_called_once_with(Answer)
@@ -0,0 +1,239 @@
+"""Per-user rate limit tests."""
+
+import uuid
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from container import get_chat_usecase
+from domain.entity.rate_limit import RateLimitGrant, RateLimitTier
+from domain.exceptions import ConfigurationError, RateLimitExceededError
+from gateway.rate_limit_gateway import RateLimitGateway
+from gateway.subscription_gateway import SubscriptionGateway
+from infra.db_client import get_session
+from usecase.chat_usecase import ChatUseCase
+from usecase.rate_limit_usecase import RateLimitSettings, RateLimitUseCase
+
+USER_ID = uuid.uuid4()
+FREE = RateLimitTier(name="free", requests_per_minute=6, burst=4)
+PRO = RateLimitTier(name="pro", requests_per_minute=60, burst=20)
+
+
+@pytest.fixture
+def gateways(mocker):
+    """Mock the gateways used by the rate limiter."""
+    result = SimpleNamespace(
+        rate_limit=mocker.create_autospec(RateLimitGateway, instance=True),
+        subscription=mocker.create_autospec(SubscriptionGateway, instance=True),
+    )
+    result.subscription.get_active_product_ids.return_value = []
+    return result
+
+
+@pytest.fixture
+def clock(mocker):
+    """Control the monotonic clock seen by the rate limiter."""
+    now = SimpleNamespace(value=1000.0)
+    mocker.patch(
+        "usecase.rate_limit_usecase.time.monotonic", side_effect=lambda: now.value
+    )
+    return now
+
+
+def _limiter(gateways, session_factory, **settings):
+    return RateLimitUseCase(
+        rate_limit_gateway=gateways.rate_limit,
+        subscription_gateway=gateways.subscription,
+        session_factory=session_factory,
+        settings=RateLimitSettings(
+            tiers={"free": FREE, "pro": PRO}, lease_divisor=2, **settings
+        ),
+    )
+
+
+class TestRateLimitUseCase:
+    """Tests for RateLimitUseCase."""
+
+    def test_consumes_leased_tokens_without_database(
+        self, gateways, clock, session, session_factory
+    ):
+        """Should hand out a leased batch from memory."""
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(granted=2)
+        limiter = _limiter(gateways, session_factory)
+
+        limiter.execute(USER_ID, session)
+        limiter.execute(USER_ID, session)
+
+        gateways.rate_limit.acquire.assert_called_once_with(
+            f"chat:{USER_ID}", FREE, 3, session
+        )
+
+    def test_leases_again_when_batch_is_used_up(
+        self, gateways, clock, session, session_factory
+    ):
+        """Should go back to the shared bucket after the lease is consumed."""
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(granted=2)
+        limiter = _limiter(gateways, session_factory)
+
+        for _ in range(3):
+            limiter.execute(USER_ID, session)
+
+        assert gateways.rate_limit.acquire.call_count == 2
+
+    def test_expired_lease_is_dropped(self, gateways, clock, session, session_factory):
+        """Should not use leased tokens after lease_ttl."""
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(granted=2)
+        limiter = _limiter(gateways, session_factory, lease_ttl=5)
+
+        limiter.execute(USER_ID, session)
+        clock.value += 6
+        limiter.execute(USER_ID, session)
+
+        assert gateways.rate_limit.acquire.call_count == 2
+
+    def test_rejects_locally_until_retry_time(
+        self, gateways, clock, session, session_factory
+    ):
+        """Should remember a rejection instead of asking the database again."""
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(
+            granted=0, retry_after_seconds=8.0
+        )
+        limiter = _limiter(gateways, session_factory)
+
+        with pytest.raises(RateLimitExceededError) as first:
+            limiter.execute(USER_ID, session)
+        clock.value += 3
+        with pytest.raises(RateLimitExceededError) as second:
+            limiter.execute(USER_ID, session)
+
+        assert first.value.retry_after == 8.0
+        assert second.value.retry_after == 5.0
+        gateways.rate_limit.acquire.assert_called_once()
+
+    def test_tier_follows_subscription(self, gateways, clock, session, session_factory):
+        """Should use the tier mapped to the subscribed product and cache it."""
+        gateways.subscription.get_active_product_ids.return_value = ["prod_1"]
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(granted=1)
+        limiter = _limiter(gateways, session_factory, product_tiers={"prod_1": "pro"})
+
+        limiter.execute(USER_ID, session)
+        limiter.execute(USER_ID, session)
+
+        assert gateways.rate_limit.acquire.call_args.args[1] == PRO
+        gateways.subscription.get_active_product_ids.assert_called_once()
+
+    def test_falls_back_to_local_bucket(
+        self, gateways, clock, session, session_factory
+    ):
+        """Should limit in-process when the shared store fails."""
+        gateways.rate_limit.acquire.side_effect = OperationalError(
+            "SELECT", {}, Exception("down")
+        )
+        limiter = _limiter(gateways, session_factory)
+
+        for _ in range(FREE.burst):
+            limiter.execute(USER_ID, session)
+        with pytest.raises(RateLimitExceededError) as exc_info:
+            limiter.execute(USER_ID, session)
+
+        assert exc_info.value.retry_after == pytest.approx(10.0)
+
+    def test_leases_in_a_session_of_its_own(self, mocker, gateways, clock, session):
+        """Should commit the lease without committing the caller's session."""
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(granted=2)
+        caller_session = mocker.Mock()
+        limiter = _limiter(gateways, lambda: nullcontext(session))
+
+        limiter.execute(USER_ID, caller_session)
+
+        assert gateways.rate_limit.acquire.call_args.args[3] is session
+        caller_session.commit.assert_not_called()
+
+    def test_disabled_does_nothing(self, gateways, session, session_factory):
+        """Should not touch the database when disabled."""
+        limiter = _limiter(gateways, session_factory, enabled=False)
+
+        limiter.execute(USER_ID, session)
+
+        gateways.subscription.get_active_product_ids.assert_not_called()
+        gateways.rate_limit.acquire.assert_not_called()
+
+
+class TestRateLimitSettings:
+    """Tests for RateLimitSettings."""
+
+    def test_rejects_unknown_tier(self):
+        """Should fail fast on a product mapped to an undefined tier."""
+        with pytest.raises(ConfigurationError):
+            RateLimitSettings(product_tiers={"prod_1": "enterprise"})
+
+    def test_reads_environment(self, monkeypatch):
+        """Should build tiers and mappings from JSON environment variables."""
+        monkeypatch.setenv(
+            "RATE_LIMIT_TIERS",
+            '{"free": {"requests_per_minute": 1, "burst": 1},'
+            ' "pro": {"requests_per_minute": 100, "burst": 10}}',
+        )
+        monkeypatch.setenv("RATE_LIMIT_PRODUCT_TIERS", '{"prod_1": "pro"}')
+
+        settings = RateLimitSettings.from_env()
+
+        assert settings.tier_for([]).requests_per_minute == 1
+        assert settings.tier_for(["prod_1"]).burst == 10
+
+    def test_leases_at_least_min_lease_tokens(self):
+        """Should not lease one token at a time for small bursts."""
+        settings = RateLimitSettings(lease_divisor=4, min_lease=3)
+
+        tiny = RateLimitTier(name="tiny", requests_per_minute=1, burst=2)
+
+        assert settings.lease_size(FREE) == 3
+        assert settings.lease_size(PRO) == 5
+        assert settings.lease_size(tiny) == 2
+
+
+class TestChatRateLimit:
+    """Tests for the rate limit on POST /api/chat."""
+
+    def test_over_quota_gets_429_with_retry_after(
+        self, mocker, gateways, session_factory
+    ):
+        """Should reject before any writes and tell the client when to retry."""
+        from app import app
+
+        gateways.rate_limit.acquire.return_value = RateLimitGrant(
+            granted=0, retry_after_seconds=2.2
+        )
+        current_user_gateway = mocker.Mock()
+        current_user_gateway.get_current_user.return_value = SimpleNamespace(id=USER_ID)
+        message_gateway = mocker.Mock()
+        openai_gateway = mocker.Mock()
+        use_case = ChatUseCase(
+            current_user_gateway=current_user_gateway,
+            user_profile_gateway=mocker.Mock(),
+            chat_room_gateway=mocker.Mock(),
+            message_gateway=message_gateway,
+            virtual_user_gateway=mocker.Mock(),
+            embeddings_gateway=mocker.Mock(),
+            openai_gateway=openai_gateway,
+            rate_limit_usecase=_limiter(gateways, session_factory),
+        )
+        app.dependency_overrides[get_session] = lambda: None
+        app.dependency_overrides[get_chat_usecase] = lambda: use_case
+        try:
+            response = TestClient(app).post(
+                "/api/chat",
+                json={"message": "hi"},
+                headers={"Authorization": "Bearer token"},
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "3"
+        message_gateway.create_from_user.assert_not_called()
+        message_gateway.create.assert_not_called()
+        openai_gateway.chat_completion.assert_not_called()
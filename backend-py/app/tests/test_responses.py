@@ -0,0 +1,95 @@
+"""JSON response class tests."""
+
+import datetime
+import json
+import uuid
+
+from fastapi.responses import ORJSONResponse
+
+from controller.responses import ModelJSONResponse
+from domain.entity.chat import (
+    ChatHistoryResponse,
+    ChatMessage,
+    ChatResponse,
+    VirtualUserProfileSummary,
+    VirtualUserSummary,
+)
+
+VIRTUAL_USER_ID = uuid.uuid4()
+
+
+def _chat_response() -> ChatResponse:
+    return ChatResponse(
+        chat_room_id=1,
+        user_message_id=2,
+        ai_message_id=3,
+        ai_response="こんにちは",
+        virtual_user=VirtualUserSummary(
+            id=VIRTUAL_USER_ID,
+            name="AI Assistant",
+            profile=VirtualUserProfileSummary(backstory=None),
+        ),
+    )
+
+
+class TestModelJSONResponse:
+    """Tests for ModelJSONResponse."""
+
+    def test_renders_model_like_model_dump_json(self):
+        """Should produce the same JSON as pydantic's model_dump_json."""
+        model = _chat_response()
+
+        response = ModelJSONResponse(model)
+
+        assert json.loads(response.body) == json.loads(model.model_dump_json())
+        assert response.media_type == "application/json"
+
+    def test_renders_nested_types(self):
+        """Should encode UUIDs and datetimes as JSON strings."""
+        created_at = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        history = ChatHistoryResponse(
+            chat_room_id=1,
+            messages=[
+                ChatMessage(
+                    id=1,
+                    content="hi",
+                    created_at=created_at,
+                    virtual_user_id=VIRTUAL_USER_ID,
+                )
+            ],
+        )
+
+        body = json.loads(ModelJSONResponse(history).body)
+
+        assert body["messages"][0]["virtual_user_id"] == str(VIRTUAL_USER_ID)
+        assert body["messages"][0]["created_at"] == "2025-01-01T00:00:00Z"
+
+    def test_renders_plain_content_with_orjson(self):
+        """Should fall back to orjson for non-model content."""
+        response = ModelJSONResponse({"message": "OK"})
+
+        assert response.body == b'{"message":"OK"}'
+
+
+class TestChatResponse:
+    """Tests for the chat response DTOs."""
+
+    def test_virtual_user_serializes_to_previous_shape(self):
+        """Should keep the JSON shape of the former virtual_user dict."""
+        body = json.loads(_chat_response().model_dump_json())
+
+        assert body["virtual_user"] == {
+            "id": str(VIRTUAL_USER_ID),
+            "name": "AI Assistant",
+            "profile": {"backstory": None},
+        }
+
+
+class TestDefaultResponseClass:
+    """Tests for the app's default response class."""
+
+    def test_app_uses_orjson_by_default(self):
+        """Should render routes without an explicit class with orjson."""
+        from app import app
+
+        assert app.router.default_response_class is ORJSONResponse
@@ -0,0 +1,85 @@
+"""Production server launcher tests."""
+
+import os
+
+import pytest
+
+import server
+from server import ServerSettings, available_cpus, prepare_multiprocess_metrics
+
+
+class TestAvailableCpus:
+    """Tests for available_cpus."""
+
+    def test_cgroup_quota_limits_cpus(self, monkeypatch, tmp_path):
+        """Should not exceed the container CPU quota."""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("150000 100000\n")
+        monkeypatch.setattr(server, "CGROUP_CPU_MAX", cpu_max)
+        monkeypatch.setattr(os, "sched_getaffinity", lambda _pid: set(range(8)))
+
+        assert available_cpus() == 2
+
+    def test_unlimited_quota_uses_affinity(self, monkeypatch, tmp_path):
+        """Should use the CPUs the process is allowed to run on."""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("max 100000\n")
+        monkeypatch.setattr(server, "CGROUP_CPU_MAX", cpu_max)
+        monkeypatch.setattr(os, "sched_getaffinity", lambda _pid: {0, 1, 2})
+
+        assert available_cpus() == 3
+
+
+class TestServerSettings:
+    """Tests for ServerSettings."""
+
+    def test_from_env(self, monkeypatch):
+        """Should read tuning options from the environment."""
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        monkeypatch.setenv("KEEP_ALIVE_TIMEOUT", "120")
+        monkeypatch.setenv("LIMIT_CONCURRENCY", "500")
+        monkeypatch.delenv("LIMIT_MAX_REQUESTS", raising=False)
+
+        options = ServerSettings.from_env().uvicorn_options()
+
+        assert options["workers"] == 3
+        assert options["timeout_keep_alive"] == 120
+        assert options["limit_concurrency"] == 500
+        assert options["limit_max_requests"] is None
+        assert options["timeout_graceful_shutdown"] == 30
+        assert options["loop"] in {"uvloop", "asyncio"}
+        assert options["http"] in {"httptools", "h11"}
+
+
+class TestPrepareMultiprocessMetrics:
+    """Tests for prepare_multiprocess_metrics."""
+
+    def test_creates_directory_for_multiple_workers(self, mocker):
+        """Should create a shared metrics directory when running several workers."""
+        mocker.patch.dict(os.environ)
+        os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+        prepare_multiprocess_metrics(workers=2)
+
+        directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        assert os.path.isdir(directory)
+        os.rmdir(directory)
+
+    def test_single_worker_keeps_single_process_metrics(self, mocker):
+        """Should leave metrics in-process for a single worker."""
+        mocker.patch.dict(os.environ)
+        os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+        prepare_multiprocess_metrics(workers=1)
+
+        assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_clears_stale_files(self, monkeypatch, tmp_path, workers):
+        """Should remove metric files left by a previous run."""
+        (tmp_path / "histogram_123.db").write_bytes(b"stale")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        prepare_multiprocess_metrics(workers=workers)
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,61 @@
+"""Startup cost tests."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from infra import db_client
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Modules that must only be imported on the code paths that need them
+LAZY_MODULES = (
+    "langchain_core",
+    "langchain_openai",
+    "openai",
+    "strawberry",
+    "supabase",
+    "uvicorn",
+)
+
+
+class TestLazyStartup:
+    """Tests for lazy initialization at import time."""
+
+    def test_app_import_does_not_need_configuration(self):
+        """Should import the app without DB or API credentials."""
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in {"DATABASE_URL", "OPENAI_API_KEY"}
+        }
+        code = (
+            "import sys, app; "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+        )
+
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            cwd=SRC_DIR,
+            env={**env, "PYTHONPATH": str(SRC_DIR)},
+            text=True,
+        )
+
+        assert result.stdout.strip() == ""
+
+    def test_engine_is_created_on_first_use(self, monkeypatch):
+        """Should read DATABASE_URL when the engine is first requested."""
+        db_client.get_engine.cache_clear()
+        monkeypatch.delenv("DATABASE_URL")
+
+        with pytest.raises(ValueError, match="DATABASE_URL"):
+            db_client.get_engine()
+
+        monkeypatch.setenv("DATABASE_URL", "sqlite://")
+        assert db_client.get_engine() is db_client.get_engine()
+        db_client.get_engine.cache_clear()
@@ -0,0 +1,223 @@
+"""Tracing tests."""
+
+import asyncio
+import uuid
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import util.logging
+from middleware.logging_middleware import LoggingMiddleware
+from middleware.tracing_middleware import TracingMiddleware
+from util.metrics import track_external_call
+from util.tracing import (
+    NOOP_SPAN,
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Span,
+    SpanKind,
+    StatusCode,
+    configure_tracing,
+    get_current_span,
+    shutdown_tracing,
+    start_span,
+    trace_methods,
+    traced,
+)
+
+
+@pytest.fixture
+def exporter():
+    """Sample every trace into an in-memory exporter."""
+    exporter = InMemorySpanExporter()
+    configure_tracing(1.0, exporter)
+    yield exporter
+    configure_tracing(0.0)
+
+
+def _finish() -> None:
+    """Flush queued spans to the exporter."""
+    shutdown_tracing()
+
+
+class TestStartSpan:
+    """Tests for start_span."""
+
+    def test_unsampled_is_noop(self):
+        """Should hand out the shared no-op span when sampling is off."""
+        configure_tracing(0.0)
+
+        with start_span("root") as root, start_span("child") as child:
+            assert root is NOOP_SPAN
+            assert child is NOOP_SPAN
+            assert get_current_span() is None
+
+    def test_nested_spans_form_a_tree(self, exporter):
+        """Should link children to their parent within one trace."""
+        request_id = str(uuid.uuid4())
+
+        with start_span("root", request_id=request_id) as root:
+            with start_span("child", step=1) as child:
+                assert get_current_span() is child
+            assert get_current_span() is root
+
+        _finish()
+        child_span, root_span = exporter.spans
+        assert root_span.trace_id == uuid.UUID(request_id).hex
+        assert root_span.attributes["request.id"] == request_id
+        assert root_span.parent_span_id is None
+        assert child_span.trace_id == root_span.trace_id
+        assert child_span.parent_span_id == root_span.span_id
+        assert child_span.attributes == {"step": 1}
+        assert child_span.end_time_ns is not None
+
+    def test_exception_marks_error(self, exporter):
+        """Should record the exception as the span status."""
+        with pytest.raises(ValueError, match="boom"), start_span("failing"):
+            msg = "boom"
+            raise ValueError(msg)
+
+        _finish()
+        (span,) = exporter.spans
+        assert span.status == StatusCode.ERROR
+        assert span.status_message == "ValueError: boom"
+
+    def test_log_lines_carry_trace_id(self, exporter):
+        """Should add trace and span IDs to log lines inside a sampled span."""
+        with start_span("root") as span:
+            event = util.logging.add_request_context(None, "info", {})
+
+        assert event["trace_id"] == span.trace_id
+        assert event["span_id"] == span.span_id
+
+
+class TestDecorators:
+    """Tests for traced and trace_methods."""
+
+    def test_traced_async_function(self, exporter):
+        """Should wrap coroutine functions in a span."""
+
+        @traced("work")
+        async def work() -> int:
+            return 42
+
+        assert asyncio.run(work()) == 42
+
+        _finish()
+        assert [span.name for span in exporter.spans] == ["work"]
+
+    def test_traced_async_generator(self, exporter):
+        """Should span the whole iteration without leaking to the consumer."""
+
+        @traced("stream")
+        async def stream():
+            for item in range(3):
+                with start_span("stream.item"):
+                    yield item
+
+        async def consume() -> list[int]:
+            items = []
+            with start_span("request") as root:
+                async for item in stream():
+                    assert get_current_span() is root
+                    with start_span("consumer"):
+                        items.append(item)
+            return items
+
+        assert asyncio.run(consume()) == [0, 1, 2]
+
+        _finish()
+        spans = {span.name: span for span in exporter.spans}
+        assert spans["stream"].parent_span_id == spans["request"].span_id
+        assert spans["stream.item"].parent_span_id == spans["stream"].span_id
+        assert spans["consumer"].parent_span_id == spans["request"].span_id
+
+    def test_trace_methods_wraps_public_methods(self, exporter):
+        """Should trace public methods only."""
+
+        @trace_methods("gateway.Fake")
+        class FakeGateway:
+            def get(self) -> str:
+                return self._load()
+
+            def _load(self) -> str:
+                return "value"
+
+        assert FakeGateway().get() == "value"
+
+        _finish()
+        assert [span.name for span in exporter.spans] == ["gateway.Fake.get"]
+
+    def test_external_call_is_client_span(self, exporter):
+        """Should trace outbound calls measured by track_external_call."""
+        with start_span("root"), track_external_call("openai", "chat_completion"):
+            pass
+
+        _finish()
+        client_span = exporter.spans[0]
+        assert client_span.name == "openai.chat_completion"
+        assert client_span.kind == SpanKind.CLIENT
+        assert client_span.attributes["peer.service"] == "openai"
+
+
+class TestFileSpanExporter:
+    """Tests for FileSpanExporter."""
+
+    def test_writes_otlp_json_lines(self, tmp_path):
+        """Should write one OTLP ExportTraceServiceRequest per batch."""
+        path = tmp_path / "traces.jsonl"
+        span = Span(name="op", trace_id="a" * 32, span_id="b" * 16)
+        span.set_attribute("count", 3)
+
+        FileSpanExporter(path).export([span])
+
+        document = orjson.loads(path.read_bytes())
+        (otlp_span,) = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert otlp_span["traceId"] == "a" * 32
+        assert otlp_span["attributes"] == [{"key": "count", "value": {"intValue": "3"}}]
+
+    def test_rotates_by_size(self, tmp_path):
+        """Should rotate the file and keep backup_count old files."""
+        path = tmp_path / "traces.jsonl"
+        exporter = FileSpanExporter(path, max_bytes=1, backup_count=2)
+        span = Span(name="op", trace_id="a" * 32, span_id="b" * 16)
+
+        for _ in range(4):
+            exporter.export([span])
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "traces.jsonl",
+            "traces.jsonl.1",
+            "traces.jsonl.2",
+        ]
+
+
+class TestTracingMiddleware:
+    """Tests for TracingMiddleware."""
+
+    def test_root_span_per_request(self, exporter):
+        """Should open a server span correlated with the request ID."""
+        test_app = FastAPI()
+        test_app.add_middleware(TracingMiddleware)
+        test_app.add_middleware(LoggingMiddleware)
+
+        @test_app.get("/items/{item_id}")
+        async def item_endpoint(item_id: int):
+            with start_span("load_item"):
+                return {"id": item_id}
+
+        request_id = str(uuid.uuid4())
+        response = TestClient(test_app).get(
+            "/items/1", headers={"x-request-id": request_id}
+        )
+        assert response.status_code == 200
+
+        _finish()
+        child, root = exporter.spans
+        assert root.kind == SpanKind.SERVER
+        assert root.trace_id == uuid.UUID(request_id).hex
+        assert root.attributes["http.route"] == "/items/{item_id}"
+        assert root.attributes["http.response.status_code"] == 200
+        assert child.parent_span_id == root.span_id
@@ -0,0 +1,66 @@
+"""Two-stage vector search tests."""
+
+from sqlalchemy.dialects import postgresql
+
+from gateway.embeddings_gateway import EmbeddingsGateway
+
+QUERY = [0.1] * 1536
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestSearchSimilar:
+    """Tests for EmbeddingsGateway.search_similar."""
+
+    def test_reranks_binary_quantized_candidates(self, mocker):
+        """Should shortlist by Hamming distance and order by cosine distance."""
+        session = mocker.MagicMock()
+
+        EmbeddingsGateway().search_similar(QUERY, 3, session, user_id="u1")
+
+        set_config, search = (call.args[0] for call in session.exec.call_args_list)
+        settings = set_config.compile().params.values()
+        assert {"hnsw.ef_search", "100"} <= set(settings)
+        assert {"hnsw.iterative_scan", "relaxed_order"} <= set(settings)
+        sql = _sql(search)
+        shortlist, rerank = sql.split(") AS anon_1")
+        assert "embeddings.embedding_bit <~> binary_quantize(CAST(" in shortlist
+        assert "(embeddings.metadata ->> " in shortlist
+        assert "ORDER BY embeddings.embedding <=> " in rerank
+
+    def test_shared_search_leaves_out_message_embeddings(self, mocker):
+        """Should search only unowned documents and texts without a user."""
+        session = mocker.MagicMock()
+
+        EmbeddingsGateway().search_similar(QUERY, 3, session, shared=True)
+
+        search = session.exec.call_args.args[0]
+        shortlist = _sql(search).split(") AS anon_1")[0]
+        assert "(embeddings.metadata ->> " in shortlist
+        assert " IN (__[POSTCOMPILE_" in shortlist
+        assert " IS NULL" in shortlist
+        params = search.compile(dialect=postgresql.dialect()).params
+        assert ["document", "text"] in params.values()
+        assert "message" not in str(params)
+
+    def test_candidates_scale_with_limit(self, mocker):
+        """Should rerank RERANK_FACTOR candidates per requested result."""
+        session = mocker.MagicMock()
+
+        EmbeddingsGateway().search_similar(QUERY, 20, session)
+
+        search = session.exec.call_args.args[0]
+        assert 200 in search.compile().params.values()
+
+    def test_exact_search_scans_float_vectors(self, mocker):
+        """Should skip the quantized stage when exact results are requested."""
+        session = mocker.MagicMock()
+
+        EmbeddingsGateway().search_similar(QUERY, 3, session, exact=True)
+
+        session.exec.assert_called_once()
+        sql = _sql(session.exec.call_args.args[0])
+        assert "<~>" not in sql
+        assert "ORDER BY embeddings.embedding <=> " in sql
@@ -0,0 +1,49 @@
+-- =============================================
+-- Post-Migration SQL: Rate Limiting
+-- =============================================
+-- バックエンドのワーカー間で共有するトークンバケット。
+-- 各ワーカーはrate_limit_acquireでトークンをまとめて借り受け、
+-- 手元のバケットから消費する（リクエストごとにDBへアクセスしない）。
+-- =============================================
+
+-- 状態は失われても制限がリセットされるだけなので、WALを書かないUNLOGGEDにする
+ALTER TABLE rate_limit_buckets SET UNLOGGED;
+
+-- バケットを補充したうえで最大p_requested個のトークンを取得する
+-- granted: 取得できたトークン数（0なら制限中）
+-- retry_after_seconds: granted = 0 の場合、次のトークンが補充されるまでの秒数
+CREATE OR REPLACE FUNCTION rate_limit_acquire(
+  p_key TEXT,
+  p_capacity DOUBLE PRECISION,
+  p_refill_per_second DOUBLE PRECISION,
+  p_requested INTEGER
+)
+RETURNS TABLE (granted INTEGER, retry_after_seconds DOUBLE PRECISION)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  available DOUBLE PRECISION;
+BEGIN
+  -- INSERT ... ON CONFLICTで行ロックを取得し、同時実行でも二重に払い出さない
+  INSERT INTO rate_limit_buckets AS bucket (key, tokens, updated_at)
+  VALUES (p_key, p_capacity, clock_timestamp())
+  ON CONFLICT (key) DO UPDATE
+  SET
+    tokens = LEAST(
+      p_capacity,
+      bucket.tokens
+        + EXTRACT(EPOCH FROM clock_timestamp() - bucket.updated_at) * p_refill_per_second
+    ),
+    updated_at = clock_timestamp()
+  RETURNING bucket.tokens INTO available;
+
+  granted := LEAST(p_requested, FLOOR(available))::INTEGER;
+  UPDATE rate_limit_buckets SET tokens = available - granted WHERE key = p_key;
+
+  retry_after_seconds := CASE
+    WHEN granted > 0 THEN 0
+    ELSE (1 - available) / p_refill_per_second
+  END;
+  RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,24 @@
+-- =============================================
+-- Post-Migration SQL: Background Jobs
+-- =============================================
+-- ジョブが投入されたら、LISTEN jobs で待機しているワーカーを起こす。
+-- NOTIFYはコミット時に配信されるため、ドメインの書き込みと同じトランザクションで
+-- 投入したジョブは、コミット前にワーカーから見えることはない。
+-- =============================================
+
+CREATE OR REPLACE FUNCTION jobs_notify()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- 同一トランザクション内の同じペイロードは1件にまとめて配信される
+  PERFORM pg_notify('jobs', NEW.queue);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS jobs_notify ON jobs;
+CREATE TRIGGER jobs_notify
+AFTER INSERT ON jobs
+FOR EACH ROW
+EXECUTE FUNCTION jobs_notify();
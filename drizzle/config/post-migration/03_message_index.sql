@@ -0,0 +1,27 @@
+-- =============================================
+-- Post-Migration SQL: Message Indexer
+-- =============================================
+-- メッセージが保存されたら、LISTEN messages で待機しているインデクサーを起こし、
+-- embeddingsへの増分取り込みを始めさせる。
+-- =============================================
+
+CREATE OR REPLACE FUNCTION messages_notify()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- 文単位のトリガーなので、一括INSERTでも通知は1件
+  PERFORM pg_notify('messages', '');
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS messages_notify ON messages;
+CREATE TRIGGER messages_notify
+AFTER INSERT ON messages
+FOR EACH STATEMENT
+EXECUTE FUNCTION messages_notify();
+
+-- ユーザーごとの類似検索はこのインデックスで対象行を絞り、距離を正確に計算する
+CREATE INDEX IF NOT EXISTS embeddings_user_id_idx
+ON embeddings ((metadata ->> 'user_id'));
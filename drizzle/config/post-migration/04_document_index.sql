@@ -0,0 +1,9 @@
+-- =============================================
+-- Post-Migration SQL: Document Ingestion
+-- =============================================
+-- 文書を再取り込みしたとき、その文書から生成されなくなったチャンクを
+-- このインデックスで探して削除する。
+-- =============================================
+
+CREATE INDEX IF NOT EXISTS embeddings_document_id_idx
+ON embeddings ((metadata ->> 'document_id'));
@@ -1,7 +1,13 @@
 import { sql } from 'drizzle-orm'
 import {
+  bigint,
+  bigserial,
+  bit,
+  boolean,
   check,
   customType,
+  doublePrecision,
+  index,
   integer,
   jsonb,
   pgPolicy,
@@ -13,18 +19,34 @@ import {
   uuid,
 } from 'drizzle-orm/pg-core'
 // NOTE: Deno互換のため、拡張子を明示
-import { chatTypeEnum, orderStatusEnum, subscriptionStatusEnum } from './types.ts'
+import {
+  chatTypeEnum,
+  jobStatusEnum,
+  orderStatusEnum,
+  subscriptionStatusEnum,
+} from './types.ts'
 
 // pgvector型のカスタム定義
-const vector = customType<{ data: number[]; driverData: string }>({
-  dataType() {
-    return 'vector(1536)'
+const vector = customType<{
+  data: number[]
+  driverData: string
+  config: { dimensions: number }
+}>({
+  dataType(config) {
+    return `vector(${config?.dimensions ?? 1536})`
   },
   toDriver(value: number[]): string {
     return JSON.stringify(value)
   },
 })
 
+// bytea型（カスタム型定義）
+const bytea = customType<{ data: Buffer; driverData: Buffer }>({
+  dataType() {
+    return 'bytea'
+  },
+})
+
 // ===== Organizations テーブル =====
 export const organizations = pgTable('organizations', {
   id: serial('id').primaryKey(),
@@ -270,8 +292,19 @@ export const messages = pgTable(
     })
       .notNull()
       .defaultNow(),
+    // 挿入したトランザクションのID（xid8をbigintにしたもの）。
+    // インデクサーはコミット済みの行をこの順に読む
+    xactId: bigint('xact_id', { mode: 'number' })
+      .notNull()
+      .default(sql`(pg_current_xact_id()::text::bigint)`),
   },
-  () => ({
+  (table) => ({
+    // チャットルームの最新メッセージとメッセージ数をこのインデックスから読む
+    chatRoomIdIdx: index('messages_chat_room_id_id_idx').on(
+      table.chatRoomId,
+      table.id
+    ),
+    xactIdIdx: index('messages_xact_id_id_idx').on(table.xactId, table.id),
     // Check制約: sender_idかvirtual_user_idのどちらか一方のみがNULLでないこと
     senderCheck: check(
       'sender_check',
@@ -421,25 +454,95 @@ export const virtualUserProfiles = pgTable('virtual_user_profiles', {
 })
 
 // ===== Embeddings テーブル（pgvector） =====
-export const embeddings = pgTable('embeddings', {
-  id: text('id').primaryKey(),
-  // pgvector型（カスタム型定義）
-  embedding: vector('embedding').notNull(),
-  content: text('content').notNull(),
-  metadata: jsonb('metadata').notNull(),
-  createdAt: timestamp('created_at', {
-    withTimezone: true,
-    precision: 3,
+export const embeddings = pgTable(
+  'embeddings',
+  {
+    id: text('id').primaryKey(),
+    // pgvector型（カスタム型定義）
+    embedding: vector('embedding').notNull(),
+    // embeddingを1次元1ビットに量子化した列（32分の1のサイズ）。
+    // 類似検索の候補をこの列のハミング距離で絞り、embeddingで厳密に並べ直す
+    embeddingBit: bit('embedding_bit', { dimensions: 1536 }).generatedAlwaysAs(
+      sql`binary_quantize(embedding)::bit(1536)`
+    ),
+    // embedding_projectionsの射影で256次元に縮約したベクトル（スロットaとb）。
+    // 各スロットのreduction_versionの射影で計算されており、同じ版の射影をかけたクエリとだけ
+    // 比較する。新しい版は有効な版と別のスロットに書くので、再射影中も検索は有効な版で続く
+    embeddingReducedA: vector('embedding_reduced_a', { dimensions: 256 }),
+    reductionVersionA: integer('reduction_version_a'),
+    embeddingReducedB: vector('embedding_reduced_b', { dimensions: 256 }),
+    reductionVersionB: integer('reduction_version_b'),
+    // contentの文字3-gramのb-bit MinHash（64バイト）。
+    // 推定類似度が高い行をほぼ重複として取り込み時に弾き、一括パスで削除する
+    contentMinhash: bytea('content_minhash'),
+    content: text('content').notNull(),
+    metadata: jsonb('metadata').notNull(),
+    createdAt: timestamp('created_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+    updatedAt: timestamp('updated_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+  },
+  (table) => ({
+    embeddingBitIdx: index('embeddings_embedding_bit_idx').using(
+      'hnsw',
+      table.embeddingBit.op('bit_hamming_ops')
+    ),
+    embeddingReducedAIdx: index('embeddings_embedding_reduced_a_idx').using(
+      'hnsw',
+      table.embeddingReducedA.op('vector_cosine_ops')
+    ),
+    embeddingReducedBIdx: index('embeddings_embedding_reduced_b_idx').using(
+      'hnsw',
+      table.embeddingReducedB.op('vector_cosine_ops')
+    ),
   })
-    .notNull()
-    .defaultNow(),
-  updatedAt: timestamp('updated_at', {
-    withTimezone: true,
-    precision: 3,
+)
+
+// ===== Embedding Projections =====
+// embeddingsの次元削減（PCAまたはランダム射影）の版。行列はfloat32のバイト列で保存する。
+// 新しい版は有効な版と別のスロット（embeddingsの縮約ベクトルの列）に再射影され、
+// 全行の再射影が終わってから有効（active）になる。
+export const embeddingProjections = pgTable(
+  'embedding_projections',
+  {
+    version: serial('version').primaryKey(),
+    method: text('method').notNull(), // pca または random
+    sourceDimensions: integer('source_dimensions').notNull(),
+    dimensions: integer('dimensions').notNull(),
+    sampleSize: integer('sample_size').notNull(),
+    // PCAで保持された分散の割合（ランダム射影ではNULL）
+    explainedVariance: doublePrecision('explained_variance'),
+    mean: bytea('mean').notNull(), // source_dimensions個のfloat32
+    components: bytea('components').notNull(), // dimensions×source_dimensionsのfloat32（行優先）
+    slot: text('slot').notNull(), // a または b
+    active: boolean('active').notNull().default(false),
+    createdAt: timestamp('created_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+    activatedAt: timestamp('activated_at', {
+      withTimezone: true,
+      precision: 3,
+    }),
+  },
+  (table) => ({
+    // 有効な版は常に1つまで
+    activeKey: uniqueIndex('embedding_projections_active_key')
+      .on(table.active)
+      .where(sql`active`),
+    slotCheck: check('embedding_projections_slot_check', sql`slot IN ('a', 'b')`),
   })
-    .notNull()
-    .defaultNow(),
-})
+).enableRLS()
 
 // ===== Subscriptions テーブル（Polar.sh, RLS付き） =====
 export const subscriptions = pgTable('subscriptions', {
@@ -544,6 +647,83 @@ export const selectPolicyOrders = pgPolicy('select_policy_orders', {
   using: sql`(SELECT auth.uid()) = user_id`,
 }).link(orders)
 
+// ===== Rate Limit Buckets テーブル（APIレート制限の共有トークンバケット） =====
+// バックエンドの全ワーカー・全ノードで共有する。失われても制限がリセットされるだけなので
+// post-migrationでUNLOGGEDに変更し、WALを書かずに更新する。
+// ポリシーは定義しない（RLSによりanon/authenticatedからはアクセス不可）
+export const rateLimitBuckets = pgTable('rate_limit_buckets', {
+  key: text('key').primaryKey(), // 例: chat:<user_id>
+  tokens: doublePrecision('tokens').notNull(),
+  updatedAt: timestamp('updated_at', {
+    withTimezone: true,
+    precision: 3,
+  })
+    .notNull()
+    .defaultNow(),
+}).enableRLS()
+
+// ===== Background Jobs =====
+// バックエンドのワーカーがFOR UPDATE SKIP LOCKEDで取得して実行するジョブキュー。
+// INSERT時にpg_notifyで待機中のワーカーを起こす（post-migration/02_jobs.sql）。
+export const jobs = pgTable(
+  'jobs',
+  {
+    id: bigserial('id', { mode: 'number' }).primaryKey(),
+    queue: text('queue').notNull().default('default'),
+    kind: text('kind').notNull(), // ハンドラー名 例: index_messages
+    payload: jsonb('payload').notNull().default({}),
+    status: jobStatusEnum('status').notNull().default('queued'),
+    attempts: integer('attempts').notNull().default(0),
+    maxAttempts: integer('max_attempts').notNull().default(5),
+    runAt: timestamp('run_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+    // 実行中ジョブの可視性タイムアウト。過ぎたジョブは他のワーカーが再取得する
+    lockedUntil: timestamp('locked_until', {
+      withTimezone: true,
+      precision: 3,
+    }),
+    lastError: text('last_error'),
+    createdAt: timestamp('created_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+    updatedAt: timestamp('updated_at', {
+      withTimezone: true,
+      precision: 3,
+    })
+      .notNull()
+      .defaultNow(),
+  },
+  (table) => ({
+    // 取得クエリ用。失敗したジョブは対象外
+    claimIdx: index('jobs_claim_idx')
+      .on(table.queue, table.runAt)
+      .where(sql`status <> 'failed'`),
+  })
+).enableRLS()
+
+// ===== Indexer Watermarks =====
+// 増分インデクサーが処理済みの位置を記録する（例: messagesのembeddings化）。
+// 行ロックで同時に1つのインデクサーだけが進める。
+export const indexerWatermarks = pgTable('indexer_watermarks', {
+  name: text('name').primaryKey(), // インデクサー名 例: messages
+  position: bigint('position', { mode: 'number' }).notNull().default(0),
+  // positionの行を挿入したトランザクションのID（messages.xact_id）
+  xactId: bigint('xact_id', { mode: 'number' }).notNull().default(0),
+  updatedAt: timestamp('updated_at', {
+    withTimezone: true,
+    precision: 3,
+  })
+    .notNull()
+    .defaultNow(),
+}).enableRLS()
+
 // ===== 型エクスポート（Inferで自動推論） =====
 import type { InferInsertModel, InferSelectModel } from 'drizzle-orm'
 
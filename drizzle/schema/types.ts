@@ -18,3 +18,7 @@ export const subscriptionStatusEnum = pgEnum('subscription_status', [
 // Enum: order_status (Polar.sh)
 // @see https://docs.polar.sh/api-reference/orders/list-orders
 export const orderStatusEnum = pgEnum('order_status', ['paid', 'refunded', 'partially_refunded'])
+
+// Enum: job_status (background job queue)
+// 成功したジョブは削除されるため、成功状態は持たない
+export const jobStatusEnum = pgEnum('job_status', ['queued', 'running', 'failed'])